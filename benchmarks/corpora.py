@@ -0,0 +1,98 @@
+"""Synthetic query corpora for the benchmarks
+
+Every corpus generates a query of a given size, growing along a single
+dimension: length, nesting depth, UNION count or column count. The queries
+contain the constructs the detectors look for, so every code path is taken.
+"""
+from typing import Callable, Dict, List, Tuple
+
+
+def long_query(size: int) -> str:
+    """
+    This function generates a query with a WHERE clause of size conditions.
+
+    Parameters:
+        size (int): The number of conditions.
+
+    Returns:
+        str: The generated query.
+    """
+    conditions = []
+    for i in range(size):
+        if i % 4 == 0:
+            conditions.append(f"c{i} = {i}")
+        elif i % 4 == 1:
+            conditions.append(f"c{i} LIKE '%{i}%'")
+        elif i % 4 == 2:
+            conditions.append(f"c{i} != NULL")
+        else:
+            conditions.append(f"c{i} IN ({i}, {i + 1}, {i + 2})")
+
+    return ("SELECT pId, name FROM product WHERE " + " AND ".join(conditions) +
+            " ORDER BY RAND()")
+
+
+def nested_query(size: int) -> str:
+    """
+    This function generates a query with size levels of nested subqueries.
+
+    Parameters:
+        size (int): The nesting depth.
+
+    Returns:
+        str: The generated query.
+    """
+    query = "SELECT a, b FROM product WHERE price = NULL"
+    for i in range(size):
+        if i % 2 == 0:
+            query = f"SELECT a, b FROM ({query}) t{i} WHERE a > {i}"
+        else:
+            query = f"SELECT a, COUNT(b) FROM t WHERE a IN ({query}) GROUP BY a"
+
+    return query
+
+
+def union_query(size: int) -> str:
+    """
+    This function generates size queries combined with UNION.
+
+    Parameters:
+        size (int): The number of queries in the union.
+
+    Returns:
+        str: The generated query.
+    """
+    queries = []
+    for i in range(size):
+        if i % 2 == 0:
+            queries.append(f"SELECT a, b FROM t{i} WHERE a <> NULL")
+        else:
+            queries.append(f"SELECT a, COUNT(b) FROM t{i} GROUP BY a")
+
+    return " UNION ".join(queries)
+
+
+def wide_query(size: int) -> str:
+    """
+    This function generates a query that selects and groups size columns.
+
+    Parameters:
+        size (int): The number of columns.
+
+    Returns:
+        str: The generated query.
+    """
+    columns = [f"c{i}" for i in range(size)]
+
+    return (f"SELECT {', '.join(columns)}, COUNT(pId) FROM product "
+            f"GROUP BY {', '.join(columns[:max(1, size // 2)])} "
+            f"ORDER BY {', '.join(columns[:max(1, size // 4)])}")
+
+
+# Every corpus with the sizes it is benchmarked at by default
+CORPORA: Dict[str, Tuple[Callable[[int], str], List[int]]] = {
+    "length": (long_query, [4, 16, 64, 256]),
+    "nesting": (nested_query, [1, 2, 4, 8, 16]),
+    "unions": (union_query, [2, 4, 8, 16, 32]),
+    "columns": (wide_query, [4, 16, 64, 256]),
+}
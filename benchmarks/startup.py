@@ -0,0 +1,82 @@
+"""Benchmark of the startup time of the SQLEyes CLI
+
+Runs `sqleyes -q 'SELECT 1'` a number of times in a fresh interpreter and
+reports the wall clock time, next to the startup time of a bare interpreter.
+Exits with status 1 if a median time exceeds its budget, so it can be used to
+catch startup regressions in CI.
+
+The budget is 100ms for machine-readable output (--format jsonl), which does
+not import rich, and 150ms for the text tables, since importing rich alone
+takes about 45ms. Queries that no detector has to parse, such as SELECT 1,
+do not import sqlparse either.
+
+Usage: python benchmarks/startup.py [--runs N] [--max-ms MS] [--max-text-ms MS]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from typing import List
+
+
+def measure(command: List[str], runs: int) -> List[float]:
+    """
+    This function runs a command a number of times and measures every run.
+
+    Parameters:
+        command (List[str]): The command to run.
+        runs (int): The number of measured runs.
+
+    Returns:
+        List[float]: The wall clock time of every run in milliseconds.
+    """
+    # Warm up the file system cache first
+    subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the startup time of the CLI")
+    parser.add_argument("--runs", type=int, default=20,
+                        help="The number of measured runs")
+    parser.add_argument("--max-ms", type=float, default=100,
+                        help="Fail if the median startup time with --format jsonl exceeds this")
+    parser.add_argument("--max-text-ms", type=float, default=150,
+                        help="Fail if the median startup time with text output exceeds this")
+    args = parser.parse_args()
+
+    command = [sys.executable, "-m", "sqleyes.cli", "-q", "SELECT 1"]
+    interpreter = measure([sys.executable, "-c", "pass"], args.runs)
+    jsonl = measure(command + ["--format", "jsonl"], args.runs)
+    text = measure(command, args.runs)
+
+    print(f"{'':<36}{'min':>10}{'median':>10}{'max':>10}")
+    for name, timings in [("python -c pass", interpreter),
+                          ("sqleyes -q 'SELECT 1' --format jsonl", jsonl),
+                          ("sqleyes -q 'SELECT 1'", text)]:
+        print(f"{name:<36}{min(timings):>8.1f}ms{statistics.median(timings):>8.1f}ms"
+              f"{max(timings):>8.1f}ms")
+
+    failed = False
+    for name, timings, budget in [("jsonl", jsonl, args.max_ms), ("text", text, args.max_text_ms)]:
+        median = statistics.median(timings)
+        print(f"Startup overhead over the interpreter with {name} output: "
+              f"{median - statistics.median(interpreter):.1f}ms")
+        if median > budget:
+            print(f"Median startup time with {name} output {median:.1f}ms exceeds {budget:.0f}ms")
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""Benchmark suite of the detectors and query functions
+
+Times Detector.run, the check of every detector and the heavy query functions
+over synthetic corpora that grow in length, nesting depth, UNION count and
+column count (see corpora.py). Results are written as JSON, so runs of
+different commits can be compared with --compare.
+
+For every corpus and target, the growth exponent is estimated by fitting
+time = c * size^exponent: about 1 means the time grows linearly with the size
+of the query, about 2 quadratically. Targets with an exponent above
+--max-exponent are reported as superlinear.
+
+Usage:
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --compare results.json --max-slowdown 1.25
+    python benchmarks/suite.py --corpus nesting --target get_subqueries
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlparse  # noqa: E402
+
+from corpora import CORPORA  # noqa: E402
+from sqleyes import __version__  # noqa: E402
+from sqleyes.detector.detector import DETECTORS, SCANNER, Detector  # noqa: E402
+from sqleyes.utils import query_functions  # noqa: E402
+from sqleyes.utils.parsed_query import ParsedQuery  # noqa: E402
+
+
+# Every target prepares a query and returns the function to time
+Target = Callable[[str], Callable[[], Any]]
+
+HELPERS = ["get_query_complexity", "get_query_ops_and_expr", "get_all_columns",
+           "get_columns_from_select_statement", "get_columns_from_group_by_statement",
+           "get_unions", "parse_query"]
+
+
+def _detector_check(detector: Any) -> Target:
+    def prepare(query: str) -> Callable[[], Any]:
+        parsed_query = ParsedQuery(query)
+        parsed_query.parse()
+        matches = SCANNER.scan(query)
+        return lambda: detector(parsed_query, matches).check()
+    return prepare
+
+
+def _helper(name: str) -> Target:
+    function = getattr(query_functions, name)
+
+    def prepare(query: str) -> Callable[[], Any]:
+        parsed_query = ParsedQuery(query)
+        parsed_query.parse()
+        return lambda: function(parsed_query)
+    return prepare
+
+
+def _get_subqueries(query: str) -> Callable[[], Any]:
+    statement = sqlparse.parse(query)[0]
+    return lambda: query_functions.get_subqueries(statement)
+
+
+TARGETS: Dict[str, Target] = {
+    "Detector.run": lambda query: lambda: Detector(query).run(),
+    "ParsedQuery": lambda query: lambda: ParsedQuery(query).parse(),
+    "Scanner.scan": lambda query: lambda: SCANNER.scan(query),
+    **{f"{detector.__name__}.check": _detector_check(detector) for detector in DETECTORS},
+    **{name: _helper(name) for name in HELPERS},
+    "get_subqueries": _get_subqueries,
+}
+
+
+def measure(function: Callable[[], Any], min_time: float, repeat: int) -> float:
+    """
+    This function measures the time of a single call of a function. Calls are
+    batched until a batch takes at least min_time, and the fastest of repeat
+    batches is used.
+
+    Parameters:
+        function (Callable[[], Any]): The function to time.
+        min_time (float): The minimal duration of a batch in seconds.
+        repeat (int): The number of batches.
+
+    Returns:
+        float: The time of a single call in seconds.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9) * 1.1))
+
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best = min(best, (time.perf_counter() - start) / number)
+
+    return best
+
+
+def growth_exponent(sizes: List[int], seconds: List[float]) -> Optional[float]:
+    """
+    This function estimates how the time grows with the size, as the least
+    squares slope of the measurements on a log-log scale.
+
+    Parameters:
+        sizes (List[int]): The sizes.
+        seconds (List[float]): The time at every size.
+
+    Returns:
+        Optional[float]: The growth exponent, None with less than two sizes.
+    """
+    if len(set(sizes)) < 2 or min(seconds) <= 0:
+        return None
+
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(value) for value in seconds]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+
+    return (sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) /
+            sum((x - mean_x) ** 2 for x in xs))
+
+
+def get_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(corpora: List[str], targets: List[str], scale: float, min_time: float,
+        repeat: int) -> List[Dict[str, Any]]:
+    """
+    This function runs the benchmarks of the given targets over the given
+    corpora and prints every result as it is measured.
+
+    Returns:
+        List[Dict[str, Any]]: A result per corpus and target.
+    """
+    results = []
+
+    for corpus in corpora:
+        generate, default_sizes = CORPORA[corpus]
+        sizes = sorted({max(1, int(size * scale)) for size in default_sizes})
+        queries = [generate(size) for size in sizes]
+
+        for target in targets:
+            seconds = [measure(TARGETS[target](query), min_time, repeat) for query in queries]
+            exponent = growth_exponent(sizes, seconds)
+
+            results.append({"corpus": corpus, "target": target, "sizes": sizes,
+                            "seconds": seconds, "exponent": exponent})
+
+            timings = " ".join(f"{size}:{value * 1000:.3f}ms" for size, value in zip(sizes, seconds))
+            growth = f"  exponent {exponent:.2f}" if exponent is not None else ""
+            print(f"{corpus:<8} {target:<42} {timings}{growth}")
+
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any],
+            max_slowdown: float) -> bool:
+    """
+    This function compares results with the results of an earlier run.
+
+    Returns:
+        bool: True if no target is slower than max_slowdown times the baseline.
+    """
+    previous = {(result["corpus"], result["target"]): result for result in baseline["results"]}
+    ok = True
+
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    for result in results:
+        old = previous.get((result["corpus"], result["target"]))
+        if old is None:
+            continue
+
+        old_seconds = dict(zip(old["sizes"], old["seconds"]))
+        ratios = [seconds / old_seconds[size]
+                  for size, seconds in zip(result["sizes"], result["seconds"])
+                  if old_seconds.get(size)]
+        if not ratios:
+            continue
+
+        ratio = max(ratios)
+        marker = ""
+        if ratio > max_slowdown:
+            marker = "  SLOWER"
+            ok = False
+        print(f"{result['corpus']:<8} {result['target']:<42} {ratio:6.2f}x{marker}")
+
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the detectors and query functions")
+    parser.add_argument("--corpus", action="append", choices=sorted(CORPORA),
+                        help="Only run this corpus, can be given more than once")
+    parser.add_argument("--target", action="append",
+                        help="Only run targets containing this text, can be given more than once")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiply the sizes of all corpora by this factor")
+    parser.add_argument("--min-time", type=float, default=0.05,
+                        help="The minimal duration of a batch of calls in seconds")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="The number of batches, the fastest is used")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare with the results in this JSON file")
+    parser.add_argument("--max-slowdown", type=float, default=1.25,
+                        help="Fail if a target is this much slower than in --compare")
+    parser.add_argument("--max-exponent", type=float, default=1.5,
+                        help="Report targets whose time grows faster than this power of the size")
+    args = parser.parse_args()
+
+    corpora = args.corpus or list(CORPORA)
+    targets = [target for target in TARGETS
+               if not args.target or any(text in target for text in args.target)]
+
+    results = run(corpora, targets, args.scale, args.min_time, args.repeat)
+
+    superlinear = [result for result in results
+                   if result["exponent"] is not None and result["exponent"] > args.max_exponent]
+    if superlinear:
+        print(f"\nGrowing faster than size^{args.max_exponent}:")
+        for result in superlinear:
+            print(f"{result['corpus']:<8} {result['target']:<42} exponent {result['exponent']:.2f}")
+
+    report = {
+        "commit": get_commit(),
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            if not compare(results, json.load(file), args.max_slowdown):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
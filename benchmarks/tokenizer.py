@@ -0,0 +1,102 @@
+"""Throughput of the built-in tokenizer against the sqlparse path
+
+Runs the lexer, ParsedQuery and the full detector pipeline (ParsedQuery,
+Scanner.scan and the check of every detector) once on the built-in tokenizer
+and once on sqlparse, over the synthetic corpora of corpora.py. Throughput is
+reported in queries and megabytes per second, next to the speedup of the
+tokenizer.
+
+Usage:
+    python benchmarks/tokenizer.py
+    python benchmarks/tokenizer.py --corpus length --scale 4
+"""
+import argparse
+import os
+import sys
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlparse import lexer  # noqa: E402
+
+from corpora import CORPORA  # noqa: E402
+from sqleyes.detector.detector import DETECTORS, SCANNER  # noqa: E402
+from sqleyes.utils.parsed_query import ParsedQuery  # noqa: E402
+from sqleyes.utils.tokenizer import tokenize  # noqa: E402
+from suite import measure  # noqa: E402
+
+
+def _lex_sqlparse(query: str) -> Any:
+    return list(lexer.tokenize(query))
+
+
+def _pipeline(use_tokenizer: bool) -> Callable[[str], Any]:
+    def run(query: str) -> Any:
+        parsed_query = ParsedQuery(query, use_tokenizer=use_tokenizer)
+        parsed_query.parse()
+        matches = SCANNER.scan(query)
+        return [detector(parsed_query, matches).check() for detector in DETECTORS]
+    return run
+
+
+# Every stage as (tokenizer, sqlparse)
+STAGES: Dict[str, Tuple[Callable[[str], Any], Callable[[str], Any]]] = {
+    "lexer": (tokenize, _lex_sqlparse),
+    "ParsedQuery": (lambda query: ParsedQuery(query).parse(),
+                    lambda query: ParsedQuery(query, use_tokenizer=False).parse()),
+    "pipeline": (_pipeline(True), _pipeline(False)),
+}
+
+
+def throughput(function: Callable[[str], Any], queries: List[str], min_time: float,
+               repeat: int) -> float:
+    """
+    This function measures how long a function takes on all queries.
+
+    Parameters:
+        function (Callable[[str], Any]): The function to time.
+        queries (List[str]): The queries to call the function on.
+        min_time (float): The minimal duration of a batch in seconds.
+        repeat (int): The number of batches.
+
+    Returns:
+        float: The time of a single pass over all queries in seconds.
+    """
+    def run_all():
+        for query in queries:
+            function(query)
+    return measure(run_all, min_time, repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the tokenizer against sqlparse")
+    parser.add_argument("--corpus", action="append", choices=sorted(CORPORA),
+                        help="Only run this corpus, can be given more than once")
+    parser.add_argument("--stage", action="append", choices=list(STAGES),
+                        help="Only run this stage, can be given more than once")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiply the sizes of all corpora by this factor")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="The minimal duration of a batch of calls in seconds")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="The number of batches, the fastest is used")
+    args = parser.parse_args()
+
+    print(f"{'corpus':<8} {'stage':<12} {'tokenizer':>22} {'sqlparse':>22} {'speedup':>8}")
+
+    for corpus in args.corpus or list(CORPORA):
+        generate, sizes = CORPORA[corpus]
+        queries = [generate(max(1, int(size * args.scale))) for size in sizes]
+        megabytes = sum(len(query.encode()) for query in queries) / 1e6
+
+        for stage in args.stage or list(STAGES):
+            timings = [throughput(function, queries, args.min_time, args.repeat)
+                       for function in STAGES[stage]]
+            cells = [f"{len(queries) / seconds:9.0f} q/s {megabytes / seconds:6.2f} MB/s"
+                     for seconds in timings]
+            print(f"{corpus:<8} {stage:<12} {cells[0]:>22} {cells[1]:>22} "
+                  f"{timings[1] / timings[0]:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
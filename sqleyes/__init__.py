@@ -0,0 +1,16 @@
+import sys
+
+__version__ = "0.5.0"
+
+__all__ = ["analyze_many", "analyze_stream"]
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name: str):
+        # The detectors are only imported on first use, so that importing a
+        # submodule such as sqleyes.cli stays fast
+        if name in __all__:
+            from sqleyes import main
+            return getattr(main, name)
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+else:
+    from sqleyes.main import analyze_many, analyze_stream
@@ -0,0 +1,214 @@
+"""Asyncio API to analyze queries without blocking the event loop
+
+The detectors are CPU-bound, so every query is analyzed in an executor: the
+default thread pool of the event loop, or any executor that is passed, such
+as a ProcessPoolExecutor to analyze queries in parallel.
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import Executor
+from typing import (AsyncGenerator, AsyncIterable, AsyncIterator, Deque,
+                    Iterable, List, Optional, Union)
+
+from sqleyes.detector.detector import Detector
+from sqleyes.detector.detector_output import DetectorOutput
+
+
+DEFAULT_MAX_IN_FLIGHT = 32
+
+Queries = Union[Iterable[str], AsyncIterable[str]]
+
+
+def _run(query: str, statement_index: int) -> List[DetectorOutput]:
+    return Detector(query, statement_index=statement_index).run()
+
+
+async def _iterate(queries: Queries) -> AsyncIterator[str]:
+    if hasattr(queries, "__aiter__"):
+        async for query in queries:  # type: ignore
+            yield query
+    else:
+        for query in queries:
+            yield query
+
+
+async def analyze(query: str, executor: Optional[Executor] = None,
+                  timeout: Optional[float] = None,
+                  statement_index: int = 0) -> List[DetectorOutput]:
+    """
+    This function runs the detector on a query in an executor.
+
+    Cancelling the call, or running into the timeout, cancels the query if it
+    has not started yet. A query that is already being analyzed runs to
+    completion in the executor, but its result is discarded.
+
+    Parameters:
+        query (str): A raw SQL query.
+        executor (Optional[Executor]): The executor to analyze the query in,
+            defaults to the default executor of the event loop.
+        timeout (Optional[float]): The maximum number of seconds to wait.
+        statement_index (int): The statement index of the outputs.
+
+    Returns:
+        List[DetectorOutput]: The detected anti-patterns.
+
+    Raises:
+        asyncio.TimeoutError: If the query is not analyzed within the timeout.
+    """
+    loop = asyncio.get_event_loop()
+    future = loop.run_in_executor(executor, _run, query, statement_index)
+
+    if timeout is None:
+        return await future
+
+    return await asyncio.wait_for(future, timeout)
+
+
+class AsyncAnalyzer:
+    """
+    This is a class that analyzes queries from coroutines, with a limit on the
+    number of queries that are analyzed at the same time. An analyzer can be
+    shared by all requests of a service, so the limit applies to all of them.
+
+    Parameters:
+        executor (Optional[Executor]): The executor to analyze queries in,
+            defaults to the default executor of the event loop.
+        max_in_flight (int): The maximum number of queries that are analyzed
+            or waiting in the executor at the same time.
+        timeout (Optional[float]): The default maximum number of seconds to
+            wait for a query, including the time spent waiting for a slot.
+    """
+
+    def __init__(self, executor: Optional[Executor] = None,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 timeout: Optional[float] = None):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+
+        self.executor = executor
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.__semaphore: Optional[asyncio.Semaphore] = None
+
+    def __get_semaphore(self) -> asyncio.Semaphore:
+        # Created on first use, so it belongs to the running event loop
+        if self.__semaphore is None:
+            self.__semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self.__semaphore
+
+    async def __analyze(self, query: str, statement_index: int) -> List[DetectorOutput]:
+        async with self.__get_semaphore():
+            return await analyze(query, self.executor, statement_index=statement_index)
+
+    async def analyze(self, query: str, timeout: Optional[float] = None,
+                      statement_index: int = 0) -> List[DetectorOutput]:
+        """
+        This function runs the detector on a query, once a slot is free.
+
+        Parameters:
+            query (str): A raw SQL query.
+            timeout (Optional[float]): The maximum number of seconds to wait,
+                defaults to the timeout of the analyzer.
+            statement_index (int): The statement index of the outputs.
+
+        Returns:
+            List[DetectorOutput]: The detected anti-patterns.
+
+        Raises:
+            asyncio.TimeoutError: If the query is not analyzed within the
+                timeout.
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        if timeout is None:
+            return await self.__analyze(query, statement_index)
+
+        return await asyncio.wait_for(self.__analyze(query, statement_index), timeout)
+
+    async def analyze_many(self, queries: Queries, ordered: bool = True,
+                           timeout: Optional[float] = None) -> AsyncGenerator[List[DetectorOutput], None]:
+        """
+        This function runs the detector on many queries concurrently. Queries
+        are taken from the iterable only as slots become free, so it may be
+        very long or endless.
+
+        Closing the iterator, or cancelling the task iterating over it,
+        cancels the queries that are still pending.
+
+        Parameters:
+            queries (Queries): The queries to analyze, an iterable or an async
+                iterable. Queries get their position as statement index.
+            ordered (bool): If True, results are returned in input order,
+                otherwise as soon as they are analyzed.
+            timeout (Optional[float]): The maximum number of seconds to wait
+                for every query, defaults to the timeout of the analyzer.
+
+        Returns:
+            AsyncGenerator[List[DetectorOutput], None]: The detected
+            anti-patterns of every query.
+
+        Raises:
+            asyncio.TimeoutError: If a query is not analyzed within the
+                timeout. The pending queries are cancelled.
+        """
+        pending: Deque["asyncio.Future[List[DetectorOutput]]"] = deque()
+        iterator = _iterate(queries).__aiter__()
+        index = 0
+        exhausted = False
+
+        try:
+            while True:
+                while not exhausted and len(pending) < self.max_in_flight:
+                    try:
+                        query = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+
+                    pending.append(asyncio.ensure_future(self.analyze(query, timeout, index)))
+                    index += 1
+
+                if not pending:
+                    return
+
+                if ordered:
+                    yield await pending.popleft()
+                else:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for future in done:
+                        pending.remove(future)
+                    for future in done:
+                        yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+async def analyze_many(queries: Queries, executor: Optional[Executor] = None,
+                       max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                       ordered: bool = True,
+                       timeout: Optional[float] = None) -> AsyncGenerator[List[DetectorOutput], None]:
+    """
+    This function runs the detector on many queries concurrently, see
+    AsyncAnalyzer.analyze_many.
+
+    Parameters:
+        queries (Queries): The queries to analyze, an iterable or an async
+            iterable.
+        executor (Optional[Executor]): The executor to analyze queries in,
+            defaults to the default executor of the event loop.
+        max_in_flight (int): The maximum number of queries that are analyzed
+            at the same time.
+        ordered (bool): If True, results are returned in input order,
+            otherwise as soon as they are analyzed.
+        timeout (Optional[float]): The maximum number of seconds to wait for
+            every query.
+
+    Returns:
+        AsyncGenerator[List[DetectorOutput], None]: The detected
+        anti-patterns of every query.
+    """
+    analyzer = AsyncAnalyzer(executor, max_in_flight)
+    async for outputs in analyzer.analyze_many(queries, ordered, timeout):
+        yield outputs
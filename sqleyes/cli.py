@@ -1,31 +1,722 @@
 # Setup argument parser
+#
+# The CLI is started very often, for example from pre-commit hooks, so the
+# detectors, printers and caches are only imported once they are needed.
 import argparse
+import sys
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
 
-from sqleyes.main import main
-from sqleyes.printer.printer import IntroPrinter, OutputPrinter
+if TYPE_CHECKING:
+    from sqleyes.detector.detector import DetectorOptions
+    from sqleyes.detector.disk_cache import DiskCache
+    from sqleyes.detector.profiler import Profiler
+    from sqleyes.utils.statement_splitter import Statement
 
 
-parser = argparse.ArgumentParser(
-    description="Analyze raw SQL queries for anti-patterns")
+def create_parser() -> argparse.ArgumentParser:
+    """
+    This function creates the argument parser of the CLI.
 
-parser.add_argument('-q', '--query', metavar="", type=str, required=True,
-                    help="A raw SQL query to analyze")
+    Returns:
+        argparse.ArgumentParser: The argument parser.
+    """
+    parser = argparse.ArgumentParser(
+        description="Analyze raw SQL queries for anti-patterns",
+        epilog="Run 'sqleyes serve -h' to keep the detectors loaded in a server, "
+               "'sqleyes lsp -h' to run a language server for editors, "
+               "'sqleyes watch -h' to watch a directory of SQL files, "
+               "or 'sqleyes scan-py -h' to scan the queries in Python code")
 
-parser.add_argument('-d', '--description', action="store_true",
-                    help="Show descriptions of found errors")
+    source = parser.add_mutually_exclusive_group(required=True)
 
-parser.set_defaults(description=False)
+    source.add_argument('-q', '--query', metavar="", type=str,
+                        help="A raw SQL query to analyze")
 
-args = parser.parse_args()
+    source.add_argument('-f', '--file', metavar="", type=str,
+                        help="A file of SQL statements to analyze, use - to read from stdin")
 
+    source.add_argument('--diff', metavar="", type=str,
+                        help="Only analyze the statements of .sql files that a git revision range "
+                             "such as main..HEAD changes, or a single revision to compare the "
+                             "working tree with")
 
-def cli():
-    IntroPrinter(args.query).print()
-    output = main(args.query)
-    OutputPrinter(output).print(args.description)
+    parser.add_argument('-j', '--jobs', metavar="", type=int, default=1,
+                        help="The number of processes used to analyze a file")
+
+    parser.add_argument('-c', '--cache-size', metavar="", type=int, default=0,
+                        help="Cache the results of up to this many query fingerprints")
+
+    parser.add_argument('--cache-dir', metavar="", type=str, default=None,
+                        help="Keep results in a cache in this directory across runs")
+
+    parser.add_argument('--log-format', metavar="", type=str, default=None,
+                        choices=["postgres", "mysql"],
+                        help="Read the file as a slow query log of postgres or mysql "
+                             "and rank anti-patterns by database time")
+
+    parser.add_argument('--log-state', metavar="", type=str, default=None,
+                        help="Only read log entries added since the last run, keeping the "
+                             "position in this file")
+
+    parser.add_argument('--top', metavar="", type=int, default=10,
+                        help="The number of most expensive queries to show of a log")
+
+    parser.add_argument('-d', '--description', action="store_true",
+                        help="Show descriptions of found errors")
+
+    parser.add_argument('--format', metavar="", type=str, default="text",
+                        choices=["text", "jsonl", "csv", "sarif"],
+                        help="Write results as text tables, or as jsonl, csv or sarif "
+                             "while they are found")
+
+    parser.add_argument('--profile', action="store_true",
+                        help="Show the time spent in every detector and query function")
+
+    parser.add_argument('--only', metavar="", type=str, default=None,
+                        help="Only run these detectors, as a comma-separated list of names "
+                             "such as implicit_columns,fear_of_the_unknown")
+
+    parser.add_argument('--skip', metavar="", type=str, default=None,
+                        help="Do not run these detectors, as a comma-separated list of names")
+
+    parser.add_argument('--min-certainty', metavar="", type=str, default=None,
+                        choices=["low", "medium", "high"],
+                        help="Only report anti-patterns with at least this certainty, "
+                             "low, medium or high")
+
+    parser.add_argument('--fail-fast', action="store_true",
+                        help="Stop at the first anti-pattern found, and exit with status 1 "
+                             "if there is one")
+
+    parser.set_defaults(description=False)
+
+    return parser
+
+
+def create_serve_parser() -> argparse.ArgumentParser:
+    """
+    This function creates the argument parser of the serve command.
+
+    Returns:
+        argparse.ArgumentParser: The argument parser.
+    """
+    parser = argparse.ArgumentParser(
+        prog="sqleyes serve",
+        description="Keep the detectors loaded and analyze queries sent as JSON")
+
+    address = parser.add_mutually_exclusive_group()
+
+    address.add_argument('-s', '--socket', metavar="", type=str, default=None,
+                         help="Listen on this Unix socket for JSON requests, one per line")
+
+    address.add_argument('-p', '--port', metavar="", type=int, default=8765,
+                         help="Listen on this port for HTTP requests")
+
+    parser.add_argument('--host', metavar="", type=str, default="127.0.0.1",
+                        help="Listen on this host for HTTP requests")
+
+    parser.add_argument('-j', '--jobs', metavar="", type=int, default=1,
+                        help="The number of processes used to analyze queries")
+
+    parser.add_argument('-c', '--cache-size', metavar="", type=int, default=0,
+                        help="Cache the results of up to this many query fingerprints")
+
+    return parser
+
+
+def serve(argv: List[str]):
+    """
+    This function runs a server until it is interrupted.
+
+    Parameters:
+        argv (List[str]): The arguments of the serve command.
+    """
+    args = create_serve_parser().parse_args(argv)
+
+    from sqleyes.server import Analyzer, create_server
+
+    analyzer = Analyzer(workers=args.jobs, cache_size=args.cache_size)
+    try:
+        with create_server(analyzer, socket_path=args.socket, host=args.host,
+                           port=args.port) as server:
+            print(f"Listening on {server.address}", flush=True)
+
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+    finally:
+        analyzer.close()
+
+
+def create_lsp_parser() -> argparse.ArgumentParser:
+    """
+    This function creates the argument parser of the lsp command.
+
+    Returns:
+        argparse.ArgumentParser: The argument parser.
+    """
+    parser = argparse.ArgumentParser(
+        prog="sqleyes lsp",
+        description="Run a language server on stdin and stdout that publishes anti-patterns "
+                    "in SQL documents as diagnostics")
+
+    parser.add_argument('--debounce', metavar="", type=int, default=150,
+                        help="Milliseconds without edits before a document is analyzed")
+
+    parser.add_argument('-c', '--cache-size', metavar="", type=int, default=0,
+                        help="Cache the results of up to this many query fingerprints")
+
+    return parser
+
+
+def lsp(argv: List[str]):
+    """
+    This function runs a language server until the client exits.
+
+    Parameters:
+        argv (List[str]): The arguments of the lsp command.
+    """
+    args = create_lsp_parser().parse_args(argv)
+
+    from sqleyes.lsp import LanguageServer
+
+    server = LanguageServer(sys.stdin.buffer, sys.stdout.buffer,
+                            debounce=args.debounce / 1000, cache_size=args.cache_size)
+    sys.exit(server.serve())
+
+
+def create_watch_parser() -> argparse.ArgumentParser:
+    """
+    This function creates the argument parser of the watch command.
+
+    Returns:
+        argparse.ArgumentParser: The argument parser.
+    """
+    parser = argparse.ArgumentParser(
+        prog="sqleyes watch",
+        description="Watch a directory of SQL files and keep a report of their anti-patterns "
+                    "up to date, only analyzing statements that changed")
+
+    parser.add_argument('directory', type=str,
+                        help="The directory to watch, including subdirectories")
+
+    parser.add_argument('-i', '--interval', metavar="", type=float, default=1.0,
+                        help="Seconds between checks of the files for changes")
+
+    parser.add_argument('--once', action="store_true",
+                        help="Print the report once instead of watching")
+
+    parser.add_argument('--top', metavar="", type=int, default=10,
+                        help="The number of files with the most errors to show")
+
+    parser.add_argument('-j', '--jobs', metavar="", type=int, default=1,
+                        help="The number of processes used to analyze statements")
+
+    parser.add_argument('-c', '--cache-size', metavar="", type=int, default=0,
+                        help="Cache the results of up to this many query fingerprints")
+
+    parser.add_argument('--cache-dir', metavar="", type=str, default=None,
+                        help="Keep results in a cache in this directory across runs, and the "
+                             "manifest of the watched files, which is kept in the watched "
+                             "directory otherwise")
+
+    return parser
+
+
+def watch(argv: List[str]):
+    """
+    This function watches a directory until it is interrupted, and updates
+    the report in place whenever files change.
+
+    Parameters:
+        argv (List[str]): The arguments of the watch command.
+    """
+    parser = create_watch_parser()
+    args = parser.parse_args(argv)
+
+    import os
+    import time
+
+    from sqleyes.detector.manifest import Manifest, get_manifest_path
+    from sqleyes.detector.result_cache import ResultCache
+    from sqleyes.printer.printer import WatchPrinter
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"{args.directory} is not a directory")
+
+    cache = ResultCache(args.cache_size) if args.cache_size > 0 else None
+
+    disk_cache = None
+    if args.cache_dir is not None:
+        from sqleyes.detector.disk_cache import DiskCache
+        disk_cache = DiskCache(args.cache_dir)
+
+    # The manifest of the last run, so that only what changed since is read
+    # and analyzed
+    manifest = Manifest(args.directory)
+    manifest_path = get_manifest_path(args.directory, args.cache_dir)
+    saved = manifest.load(manifest_path)
+
+    def update() -> Tuple[bool, WatchPrinter]:
+        nonlocal saved
+        start = time.perf_counter()
+        analyzed = manifest.analyzed
+        changed, removed = manifest.update(workers=args.jobs, cache=cache, disk_cache=disk_cache)
+        if changed or removed or not saved:
+            try:
+                manifest.save(manifest_path)
+                saved = True
+            except OSError:
+                # A directory that cannot be written to is still watched
+                pass
+        status = (f"{time.strftime('%H:%M:%S')} {len(changed)} files changed, {len(removed)} removed, "
+                  f"analyzed {manifest.analyzed - analyzed} statements in "
+                  f"{time.perf_counter() - start:.3f} seconds")
+        if manifest.failures:
+            status += f", the detector failed on {len(manifest.failures)} statements"
+        return bool(changed or removed), WatchPrinter(manifest, args.top, status)
+
+    try:
+        _, printer = update()
+        if args.once:
+            printer.print()
+            return
+
+        from rich.live import Live
+
+        with Live(printer.get_renderable(), console=printer.console, auto_refresh=False) as live:
+            try:
+                while True:
+                    time.sleep(args.interval)
+                    updated, printer = update()
+                    if updated:
+                        live.update(printer.get_renderable(), refresh=True)
+            except KeyboardInterrupt:
+                pass
+    finally:
+        if disk_cache is not None:
+            disk_cache.close()
+
+
+def create_scan_py_parser() -> argparse.ArgumentParser:
+    """
+    This function creates the argument parser of the scan-py command.
+
+    Returns:
+        argparse.ArgumentParser: The argument parser.
+    """
+    parser = argparse.ArgumentParser(
+        prog="sqleyes scan-py",
+        description="Analyze the queries passed as string literal to execute, executemany and "
+                    "text calls in a directory of Python files")
+
+    parser.add_argument('directory', type=str,
+                        help="The directory to scan, including subdirectories")
+
+    parser.add_argument('--exclude', metavar="", type=str, action="append", default=[],
+                        help="Skip files and directories with a name matching this pattern, "
+                             "can be given more than once")
+
+    parser.add_argument('-j', '--jobs', metavar="", type=int, default=None,
+                        help="The number of processes used to scan files, defaults to the "
+                             "number of CPUs")
+
+    parser.add_argument('-c', '--cache-size', metavar="", type=int, default=0,
+                        help="Cache the results of up to this many query fingerprints")
+
+    parser.add_argument('-d', '--description', action="store_true",
+                        help="Show descriptions of found errors")
+
+    parser.add_argument('--format', metavar="", type=str, default="text",
+                        choices=["text", "jsonl", "csv", "sarif"],
+                        help="Write results as text tables, or as jsonl, csv or sarif "
+                             "while they are found")
+
+    return parser
+
+
+def scan_py(argv: List[str]):
+    """
+    This function analyzes the queries in a directory of Python files, and
+    writes the errors of every query with the file, line and column of the
+    query.
+
+    Parameters:
+        argv (List[str]): The arguments of the scan-py command.
+    """
+    parser = create_scan_py_parser()
+    args = parser.parse_args(argv)
+
+    import os
+
+    from sqleyes.detector.result_cache import ResultCache
+    from sqleyes.main import analyze_python_files
+    from sqleyes.utils.python_source import find_python_files
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"{args.directory} is not a directory")
+
+    cache = ResultCache(args.cache_size) if args.cache_size > 0 else None
+
+    if args.format == "text":
+        from sqleyes.printer.printer import OutputPrinter
+    else:
+        from sqleyes.printer.writers import WRITERS
+        writer = WRITERS[args.format](sys.stdout)
+        writer.start()
+
+    files, statements, errors = 0, 0, 0
+    skipped = []
+    for path, count, found, error, failed in analyze_python_files(
+            find_python_files(args.directory, args.exclude), workers=args.jobs, cache=cache):
+        files += 1
+        statements += count
+        if error is not None:
+            skipped.append(f"{path}: {error}")
+        for statement, statement_error in failed:
+            skipped.append(f"{path}:{statement.line}:{statement.column}: {statement_error}")
+
+        for statement, output in found:
+            errors += len(output)
+            if args.format != "text":
+                writer.source = path
+                writer.write(statement, output)
+            else:
+                OutputPrinter(output, f"{path}:{statement.line}:{statement.column}").print(args.description)
+
+    if args.format != "text":
+        writer.finish()
+
+    # Machine-readable output is kept apart from the summary
+    summary = sys.stdout if args.format == "text" else sys.stderr
+
+    for message in skipped:
+        print(f"Skipped {message}", file=sys.stderr)
+
+    print(f"Scanned {files} files, analyzed {statements} statements, found {errors} errors",
+          file=summary)
+
+    if cache is not None:
+        print(f"Result cache: {cache.hits} hits, {cache.misses} misses", file=summary)
+
+
+def analyze_file(path: str, description: bool, jobs: int, cache_size: int,
+                 disk_cache: Optional["DiskCache"] = None,
+                 profiler: Optional["Profiler"] = None, format: str = "text",
+                 options: Optional["DetectorOptions"] = None) -> int:
+    """
+    This function analyzes a file (or stdin) statement by statement and writes
+    the errors of every statement as soon as it is analyzed.
+
+    Parameters:
+        path (str): The path of the file, - for stdin.
+        description (bool): Whether to show descriptions of found errors.
+        jobs (int): The number of processes used to analyze statements.
+        cache_size (int): The number of query fingerprints to cache results
+            for, 0 disables the cache.
+        disk_cache (Optional[DiskCache]): A cache of results kept across runs.
+        profiler (Optional[Profiler]): A profiler to record timings with.
+        format (str): The output format, text or one of the writers.
+        options (Optional[DetectorOptions]): The detectors to run and the
+            outputs to keep. With fail_fast, the file is only analyzed up to
+            the first statement with errors.
+
+    Returns:
+        int: The number of errors found.
+    """
+    from collections import deque
+
+    from sqleyes.detector.result_cache import ResultCache
+    from sqleyes.main import analyze_many
+    from sqleyes.utils.statement_splitter import (Statement, split_file,
+                                                  split_statements)
+
+    # Files are memory-mapped, and statements only decoded once analyzed
+    source = split_statements(sys.stdin.buffer) if path == "-" else split_file(path)
+
+    cache = ResultCache(cache_size) if cache_size > 0 else None
+
+    if format == "text":
+        from sqleyes.printer.printer import OutputPrinter
+    else:
+        from sqleyes.printer.writers import WRITERS
+        writer = WRITERS[format](sys.stdout, None if path == "-" else path)
+        writer.start()
+
+    # Results come in the order of the statements, so the statement of every
+    # result is the oldest one that was read
+    pending: "deque[Statement]" = deque()
+
+    def read_statements() -> Iterator[Statement]:
+        for statement in source:
+            pending.append(statement)
+            yield statement
+
+    def skip(statement: Statement, error: str):
+        _print_skipped(f"statement {statement.index} (line {statement.line}, "
+                       f"byte offset {statement.offset})", error)
+
+    statements, errors = 0, 0
+    for output in analyze_many(read_statements(), workers=jobs, cache=cache,
+                               disk_cache=disk_cache, profiler=profiler, options=options,
+                               on_error=skip):
+        statement = pending.popleft()
+        statements += 1
+        errors += len(output)
+        if format != "text":
+            writer.write(statement, output)
+        elif output:
+            OutputPrinter(output, f"statement {statement.index} (line {statement.line}, "
+                                  f"byte offset {statement.offset})").print(description)
+        if output and options is not None and options.fail_fast:
+            break
+
+    if format != "text":
+        writer.finish()
+
+    # Machine-readable output is kept apart from the summary
+    summary = sys.stdout if format == "text" else sys.stderr
+
+    print(f"Analyzed {statements} statements, found {errors} errors", file=summary)
+
+    if cache is not None:
+        print(f"Result cache: {cache.hits} hits, {cache.misses} misses", file=summary)
+
+    return errors
+
+
+def analyze_diff(revision_range: str, description: bool, jobs: int, cache_size: int,
+                 disk_cache: Optional["DiskCache"] = None,
+                 profiler: Optional["Profiler"] = None, format: str = "text",
+                 options: Optional["DetectorOptions"] = None) -> int:
+    """
+    This function analyzes the statements of SQL files that a git revision
+    range changes, and writes the errors of every changed statement.
+
+    Parameters:
+        revision_range (str): A range such as main..HEAD, or a single
+            revision to compare the working tree with.
+        description (bool): Whether to show descriptions of found errors.
+        jobs (int): The number of processes used to analyze statements.
+        cache_size (int): The number of query fingerprints to cache results
+            for, 0 disables the cache.
+        disk_cache (Optional[DiskCache]): A cache of results kept across runs.
+        profiler (Optional[Profiler]): A profiler to record timings with.
+        format (str): The output format, text or one of the writers.
+        options (Optional[DetectorOptions]): The detectors to run and the
+            outputs to keep. With fail_fast, statements are only analyzed up
+            to the first one with errors.
+
+    Returns:
+        int: The number of errors found.
+    """
+    from sqleyes.detector.result_cache import ResultCache
+    from sqleyes.main import analyze_diff as analyze_changes
+
+    cache = ResultCache(cache_size) if cache_size > 0 else None
+
+    if format == "text":
+        from sqleyes.printer.printer import OutputPrinter
+    else:
+        from sqleyes.printer.writers import WRITERS
+        writer = WRITERS[format](sys.stdout)
+        writer.start()
+
+    def skip(path: str, statement: "Statement", error: str):
+        _print_skipped(f"{path}:{statement.line}:{statement.column}", error)
+
+    files, statements, errors = set(), 0, 0
+    for path, statement, output in analyze_changes(revision_range, workers=jobs, cache=cache,
+                                                   disk_cache=disk_cache, profiler=profiler,
+                                                   options=options, on_error=skip):
+        files.add(path)
+        statements += 1
+        errors += len(output)
+        if format != "text":
+            writer.source = path
+            writer.write(statement, output)
+        elif output:
+            OutputPrinter(output, f"{path}:{statement.line}:{statement.column}").print(description)
+        if output and options is not None and options.fail_fast:
+            break
+
+    if format != "text":
+        writer.finish()
+
+    # Machine-readable output is kept apart from the summary
+    summary = sys.stdout if format == "text" else sys.stderr
+
+    print(f"Analyzed {statements} changed statements in {len(files)} files, found {errors} errors",
+          file=summary)
+
+    if cache is not None:
+        print(f"Result cache: {cache.hits} hits, {cache.misses} misses", file=summary)
+
+    return errors
+
+
+def analyze_log(path: str, log_format: str, log_state: Optional[str], top: int,
+                jobs: int, cache_size: int, disk_cache: Optional["DiskCache"] = None,
+                profiler: Optional["Profiler"] = None,
+                options: Optional["DetectorOptions"] = None):
+    """
+    This function reads a slow query log and prints the anti-patterns ranked
+    by the time the database spent on the queries that contain them.
+
+    Parameters:
+        path (str): The path of the log, - for stdin.
+        log_format (str): The format of the log, postgres or mysql.
+        log_state (Optional[str]): The file to keep the position in the log
+            in, so that only new entries are read.
+        top (int): The number of most expensive queries to show.
+        jobs (int): The number of processes used to analyze queries.
+        cache_size (int): The number of query fingerprints to cache results
+            for, 0 disables the cache.
+        disk_cache (Optional[DiskCache]): A cache of results kept across runs.
+        profiler (Optional[Profiler]): A profiler to record timings with.
+        options (Optional[DetectorOptions]): The detectors to run and the
+            outputs to keep.
+    """
+    from sqleyes.detector.cost_report import CostReport
+    from sqleyes.detector.result_cache import ResultCache
+    from sqleyes.printer.printer import CostPrinter
+    from sqleyes.utils.slow_log import PARSERS, SlowLogReader
+
+    report = CostReport()
+
+    if path == "-":
+        report.add(PARSERS[log_format](sys.stdin.buffer))
+    else:
+        report.add(SlowLogReader(path, log_format, log_state).read())
+
+    report.analyze(workers=jobs, cache=ResultCache(cache_size) if cache_size > 0 else None,
+                   disk_cache=disk_cache, profiler=profiler, options=options)
+
+    CostPrinter(report, top).print()
+
+    for cost in report.get_queries():
+        if cost.error is not None:
+            _print_skipped(f"query at byte offset {cost.offset}", cost.error)
+
+
+def _print_skipped(source: str, error: str):
+    # Statements the detector failed on are reported apart from the results
+    print(f"Skipped {source}: {error}", file=sys.stderr)
+
+
+def _split_names(value: str) -> Tuple[str, ...]:
+    # Names of detectors, separated by commas
+    return tuple(name.strip() for name in value.split(",") if name.strip())
+
+
+def cli(argv: Optional[List[str]] = None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    if argv[:1] == ["serve"]:
+        serve(argv[1:])
+        return
+
+    if argv[:1] == ["lsp"]:
+        lsp(argv[1:])
+        return
+
+    if argv[:1] == ["watch"]:
+        watch(argv[1:])
+        return
+
+    if argv[:1] == ["scan-py"]:
+        scan_py(argv[1:])
+        return
+
+    parser = create_parser()
+    args = parser.parse_args(argv)
+
+    if args.log_format is not None and args.format != "text":
+        parser.error("--format can not be used with --log-format")
+
+    if args.log_format is not None and args.fail_fast:
+        parser.error("--fail-fast can not be used with --log-format")
+
+    options = None
+    if args.only is not None or args.skip is not None or args.min_certainty is not None or args.fail_fast:
+        from sqleyes.detector.detector import DetectorOptions, select_detectors
+        options = DetectorOptions(only=None if args.only is None else _split_names(args.only),
+                                  skip=() if args.skip is None else _split_names(args.skip),
+                                  min_certainty=args.min_certainty, fail_fast=args.fail_fast)
+        try:
+            select_detectors(options)
+        except ValueError as error:
+            parser.error(str(error))
+
+    from sqleyes.main import analyze_many
+
+    disk_cache = None
+    if args.cache_dir is not None:
+        from sqleyes.detector.disk_cache import DiskCache
+        disk_cache = DiskCache(args.cache_dir)
+
+    profiler = None
+    if args.profile:
+        from sqleyes.detector.profiler import Profiler
+        profiler = Profiler()
+
+    errors = 0
+    try:
+        if args.file is not None and args.log_format is not None:
+            from sqleyes.printer.printer import IntroPrinter
+            IntroPrinter("").print()
+            analyze_log(args.file, args.log_format, args.log_state, args.top,
+                        args.jobs, args.cache_size, disk_cache, profiler, options)
+        elif args.diff is not None:
+            try:
+                errors = analyze_diff(args.diff, args.description, args.jobs, args.cache_size,
+                                      disk_cache, profiler, args.format, options)
+            except RuntimeError as error:
+                parser.error(str(error))
+        elif args.file is not None:
+            if args.format == "text":
+                from sqleyes.printer.printer import IntroPrinter
+                IntroPrinter("").print()
+            errors = analyze_file(args.file, args.description, args.jobs, args.cache_size,
+                                  disk_cache, profiler, args.format, options)
+        elif args.format == "text":
+            from sqleyes.printer.printer import IntroPrinter, OutputPrinter
+            IntroPrinter(args.query).print()
+            output = next(analyze_many([args.query], workers=1, disk_cache=disk_cache,
+                                       profiler=profiler, options=options,
+                                       on_error=lambda _, error: _print_skipped("the given query", error)))
+            errors = len(output)
+            OutputPrinter(output).print(args.description)
+        else:
+            from sqleyes.printer.writers import WRITERS
+            from sqleyes.utils.statement_splitter import Statement
+            statement = Statement(0, 0, args.query)
+            output = next(analyze_many([statement], workers=1, disk_cache=disk_cache,
+                                       profiler=profiler, options=options,
+                                       on_error=lambda _, error: _print_skipped("the given query", error)))
+            errors = len(output)
+            writer = WRITERS[args.format](sys.stdout)
+            writer.start()
+            writer.write(statement, output)
+            writer.finish()
+    finally:
+        if disk_cache is not None:
+            disk_cache.close()
+
+    summary = sys.stdout if args.format == "text" else sys.stderr
+
+    if disk_cache is not None:
+        print(f"Disk cache: {disk_cache.hits} hits, {disk_cache.misses} misses", file=summary)
+
+    if profiler is not None:
+        from sqleyes.printer.printer import ProfilePrinter
+        ProfilePrinter(profiler, stderr=summary is sys.stderr).print()
+
+    if args.fail_fast and errors:
+        sys.exit(1)
 
 
 if __name__ == '__main__':
-    IntroPrinter(args.query).print()
-    output = main(args.query)
-    OutputPrinter(output).print(args.description)
+    cli()
@@ -1,7 +1,11 @@
 """Abstract anti-pattern detector class"""
+import re
 from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
 
+from sqleyes.detector.scanner import Matches
 from sqleyes.utils.load_file import load_description
+from sqleyes.utils.parsed_query import ParsedQuery
 
 
 class AbstractDetector(ABC):
@@ -9,28 +13,60 @@ class AbstractDetector(ABC):
     This is a class for detecting anti-patterns.
 
     Parameters:
-        query : str
-            The query to be searched for.
+        query : ParsedQuery
+            The parsed query to be searched for.
+        matches : Optional[Matches]
+            The matches of the patterns of all detectors in the query, found
+            by a Scanner. If None, the detector searches for its own patterns.
 
     Attributes:
         detector_type : str
             The type of detector.
+        parsed_query : ParsedQuery
+            The parsed query to be searched for.
         query : str
             The query to be searched for.
+        matches : Optional[Matches]
+            The matches of the patterns of all detectors in the query.
     """
     filename: str = NotImplemented
     type: str = NotImplemented
     title: str = NotImplemented
+    # Case insensitive regular expressions the detector searches the query for
+    patterns: List[str] = []
+    # Keywords one of which occurs in every query the detector can match,
+    # searched for case insensitively anywhere in the query. If empty, the
+    # detector runs on every query.
+    keywords: List[str] = []
+    # Rough relative cost of a check, cheaper detectors run first
+    cost: int = 1
 
     @abstractmethod
-    def __init__(self, query):
+    def __init__(self, query: ParsedQuery, matches: Optional[Matches] = None):
         self.detector_type = "anti-pattern"
-        self.query = query
+        self.parsed_query = query
+        self.query = query.query
+        self.matches = matches
 
     @abstractmethod
     def check(self):
         pass
 
+    def find_locations(self) -> List[Tuple[int, int]]:
+        """
+        This function returns the locations of all matches of the patterns of
+        this detector in the query, ordered by pattern, then by location.
+
+        Returns:
+            List[Tuple[int, int]]: Start and end location of every match.
+        """
+        if self.matches is not None:
+            return self.matches[self.type]
+
+        return [match.span()
+                for pattern in self.patterns
+                for match in re.finditer(pattern, self.query, re.IGNORECASE)]
+
     def get_description(self):
         return load_description("sqleyes.definitions", "antipatterns/",
                                 self.filename)
@@ -1,9 +1,12 @@
 """Ambiguous Groups anti-pattern detector class"""
 import re
+from typing import Optional
 
 from sqleyes.detector.antipatterns.abstract_base_class import AbstractDetector
 from sqleyes.definitions.definitions import DEFINITIONS
 from sqleyes.detector.detector_output import DetectorOutput
+from sqleyes.detector.scanner import Matches
+from sqleyes.utils.parsed_query import ParsedQuery
 from sqleyes.utils.query_functions import (check_single_value_rule,
                                            get_columns_from_group_by_statement,
                                            get_columns_from_select_statement)
@@ -14,21 +17,20 @@ class AmbiguousGroupsDetector(AbstractDetector):
     filename = DEFINITIONS["anti_patterns"]["ambiguous_groups"]["filename"]
     type = DEFINITIONS["anti_patterns"]["ambiguous_groups"]["type"]
     title = DEFINITIONS["anti_patterns"]["ambiguous_groups"]["title"]
+    patterns = [r'GROUP\s*BY']
+    pattern = re.compile(patterns[0], re.IGNORECASE)
+    keywords = ["GROUP"]
+    # Parses the query and compares the columns of every subquery
+    cost = 10
 
-    def __init__(self, query, subqueries):
-        super().__init__(query)
-        self.subqueries = subqueries
+    def __init__(self, query: ParsedQuery, matches: Optional[Matches] = None):
+        super().__init__(query, matches)
 
     def check(self):
-        pattern = re.compile(r'GROUP\s*BY', re.IGNORECASE)
+        locations = self.find_locations()
 
-        locations = []
-
-        for match in pattern.finditer(self.query):
-            locations.append(match.span())
-
-        for query in self.subqueries:
-            if pattern.search(query):
+        for query in self.parsed_query.subqueries:
+            if self.pattern.search(query.query):
                 # GROUP BY pattern is found in the query
 
                 # Get columns in SELECT & GROUP BY statement
@@ -44,7 +46,7 @@ class AmbiguousGroupsDetector(AbstractDetector):
                 if not single_values:
                     return DetectorOutput(query=self.query,
                                           certainty="high",
-                                          description=super().get_description(),
+                                          description=None,
                                           detector_type=self.detector_type,
                                           locations=locations,
                                           title=self.title,
@@ -1,8 +1,11 @@
 """Fear of the Unknown anti-pattern detector class"""
-import re
+from typing import Optional
+
 from sqleyes.detector.antipatterns.abstract_base_class import AbstractDetector
 from sqleyes.definitions.definitions import DEFINITIONS
 from sqleyes.detector.detector_output import DetectorOutput
+from sqleyes.detector.scanner import Matches
+from sqleyes.utils.parsed_query import ParsedQuery
 
 
 class FearOfTheUnknownDetector(AbstractDetector):
@@ -10,25 +13,21 @@ class FearOfTheUnknownDetector(AbstractDetector):
     filename = DEFINITIONS["anti_patterns"]["fear_of_the_unknown"]["filename"]
     type = DEFINITIONS["anti_patterns"]["fear_of_the_unknown"]["type"]
     title = DEFINITIONS["anti_patterns"]["fear_of_the_unknown"]["title"]
+    patterns = [r'<>\s*NULL',
+                r'!=\s*NULL',
+                r'=\s*NULL']
+    keywords = ["NULL"]
 
-    def __init__(self, query):
-        super().__init__(query)
+    def __init__(self, query: ParsedQuery, matches: Optional[Matches] = None):
+        super().__init__(query, matches)
 
     def check(self):
-        patterns = [re.compile(r'<>\s*NULL', re.IGNORECASE),
-                    re.compile(r'!=\s*NULL', re.IGNORECASE),
-                    re.compile(r'=\s*NULL', re.IGNORECASE)]
-
-        locations = []
-
-        for pattern in patterns:
-            for match in pattern.finditer(self.query):
-                locations.append(match.span())
+        locations = self.find_locations()
 
         if len(locations) > 0:
             return DetectorOutput(query=self.query,
                                   certainty="high",
-                                  description=super().get_description(),
+                                  description=None,
                                   detector_type=self.detector_type,
                                   locations=locations,
                                   title=self.title,
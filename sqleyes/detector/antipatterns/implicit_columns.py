@@ -1,8 +1,11 @@
 """Implicit Columns anti-pattern detector class"""
-import re
+from typing import Optional
+
 from sqleyes.detector.antipatterns.abstract_base_class import AbstractDetector
 from sqleyes.definitions.definitions import DEFINITIONS
 from sqleyes.detector.detector_output import DetectorOutput
+from sqleyes.detector.scanner import Matches
+from sqleyes.utils.parsed_query import ParsedQuery
 
 
 class ImplicitColumnsDetector(AbstractDetector):
@@ -10,22 +13,19 @@ class ImplicitColumnsDetector(AbstractDetector):
     filename = DEFINITIONS["anti_patterns"]["implicit_columns"]["filename"]
     type = DEFINITIONS["anti_patterns"]["implicit_columns"]["type"]
     title = DEFINITIONS["anti_patterns"]["implicit_columns"]["title"]
+    patterns = ["(SELECT\\s+\\*)"]
+    keywords = ["*"]
 
-    def __init__(self, query):
-        super().__init__(query)
+    def __init__(self, query: ParsedQuery, matches: Optional[Matches] = None):
+        super().__init__(query, matches)
 
     def check(self):
-        pattern = re.compile("(SELECT\\s+\\*)", re.IGNORECASE)
-
-        locations = []
-
-        for match in pattern.finditer(self.query):
-            locations.append(match.span())
+        locations = self.find_locations()
 
         if len(locations) > 0:
             return DetectorOutput(query=self.query,
                                   certainty="high",
-                                  description=super().get_description(),
+                                  description=None,
                                   detector_type=self.detector_type,
                                   locations=locations,
                                   title=self.title,
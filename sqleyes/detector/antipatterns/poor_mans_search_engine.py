@@ -1,8 +1,11 @@
 """Poor Man's Search Engine anti-pattern detector class"""
-import re
+from typing import Optional
+
 from sqleyes.detector.antipatterns.abstract_base_class import AbstractDetector
 from sqleyes.definitions.definitions import DEFINITIONS
 from sqleyes.detector.detector_output import DetectorOutput
+from sqleyes.detector.scanner import Matches
+from sqleyes.utils.parsed_query import ParsedQuery
 
 
 class PoorMansSearchEngineDetector(AbstractDetector):
@@ -10,24 +13,20 @@ class PoorMansSearchEngineDetector(AbstractDetector):
     filename = DEFINITIONS["anti_patterns"]["poor_mans_search_engine"]["filename"]
     type = DEFINITIONS["anti_patterns"]["poor_mans_search_engine"]["type"]
     title = DEFINITIONS["anti_patterns"]["poor_mans_search_engine"]["title"]
+    patterns = ["(LIKE)",
+                "(REGEXP)"]
+    keywords = ["LIKE", "REGEXP"]
 
-    def __init__(self, query):
-        super().__init__(query)
+    def __init__(self, query: ParsedQuery, matches: Optional[Matches] = None):
+        super().__init__(query, matches)
 
     def check(self):
-        patterns = [re.compile("(LIKE)", re.IGNORECASE),
-                    re.compile("(REGEXP)", re.IGNORECASE)]
-
-        locations = []
-
-        for pattern in patterns:
-            for match in pattern.finditer(self.query):
-                locations.append(match.span())
+        locations = self.find_locations()
 
         if len(locations) > 0:
             return DetectorOutput(query=self.query,
                                   certainty="medium",
-                                  description=super().get_description(),
+                                  description=None,
                                   detector_type=self.detector_type,
                                   locations=locations,
                                   title=self.title,
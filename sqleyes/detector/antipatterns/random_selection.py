@@ -1,8 +1,11 @@
 """Random Selection anti-pattern detector class"""
-import re
+from typing import Optional
+
 from sqleyes.detector.antipatterns.abstract_base_class import AbstractDetector
 from sqleyes.definitions.definitions import DEFINITIONS
 from sqleyes.detector.detector_output import DetectorOutput
+from sqleyes.detector.scanner import Matches
+from sqleyes.utils.parsed_query import ParsedQuery
 
 
 class RandomSelectionDetector(AbstractDetector):
@@ -10,24 +13,20 @@ class RandomSelectionDetector(AbstractDetector):
     filename = DEFINITIONS["anti_patterns"]["random_selection"]["filename"]
     type = DEFINITIONS["anti_patterns"]["random_selection"]["type"]
     title = DEFINITIONS["anti_patterns"]["random_selection"]["title"]
+    patterns = ["(ORDER\\s+BY\\s+RAND\\s*\\()",
+                "(ORDER\\s+BY\\s+RANDOM\\s*\\()"]
+    keywords = ["RAND"]
 
-    def __init__(self, query):
-        super().__init__(query)
+    def __init__(self, query: ParsedQuery, matches: Optional[Matches] = None):
+        super().__init__(query, matches)
 
     def check(self):
-        patterns = [re.compile("(ORDER\\s+BY\\s+RAND\\s*\\()", re.IGNORECASE),
-                    re.compile("(ORDER\\s+BY\\s+RANDOM\\s*\\()", re.IGNORECASE)]
-
-        locations = []
-
-        for pattern in patterns:
-            for match in pattern.finditer(self.query):
-                locations.append(match.span())
+        locations = self.find_locations()
 
         if len(locations) > 0:
             return DetectorOutput(query=self.query,
                                   certainty="high",
-                                  description=super().get_description(),
+                                  description=None,
                                   detector_type=self.detector_type,
                                   locations=locations,
                                   title=self.title,
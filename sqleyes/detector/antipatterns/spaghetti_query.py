@@ -1,7 +1,11 @@
 """Implicit Columns anti-pattern detector class"""
+from typing import Optional
+
 from sqleyes.definitions.definitions import DEFINITIONS
 from sqleyes.detector.antipatterns.abstract_base_class import AbstractDetector
 from sqleyes.detector.detector_output import DetectorOutput
+from sqleyes.detector.scanner import Matches
+from sqleyes.utils.parsed_query import ParsedQuery
 from sqleyes.utils.query_functions import get_query_complexity
 
 
@@ -10,16 +14,21 @@ class SpaghettiQueryDetector(AbstractDetector):
     filename = DEFINITIONS["anti_patterns"]["spaghetti_query"]["filename"]
     type = DEFINITIONS["anti_patterns"]["spaghetti_query"]["type"]
     title = DEFINITIONS["anti_patterns"]["spaghetti_query"]["title"]
+    # A query without columns in a SELECT, GROUP BY or ORDER BY clause has no
+    # Halstead operands, and a complexity of 0
+    keywords = ["FROM", "GROUP", "ORDER"]
+    # Parses the query and computes its Halstead metrics
+    cost = 20
 
-    def __init__(self, query):
-        super().__init__(query)
+    def __init__(self, query: ParsedQuery, matches: Optional[Matches] = None):
+        super().__init__(query, matches)
 
     def check(self):
         LOW_THRESHOLD = 2.5
         MEDIUM_THRESHOLD = 4
         HIGH_THRESHOLD = 5.5
 
-        query_complexity = get_query_complexity(self.query)
+        query_complexity = get_query_complexity(self.parsed_query)
 
         if query_complexity < LOW_THRESHOLD:
             return None
@@ -35,7 +44,7 @@ class SpaghettiQueryDetector(AbstractDetector):
 
         return DetectorOutput(query=self.query,
                               certainty=certainty,
-                              description=super().get_description(),
+                              description=None,
                               detector_type=self.detector_type,
                               locations=[],
                               title=self.title,
@@ -0,0 +1,198 @@
+"""Cost report class ranking anti-patterns by the time spent on them"""
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+from sqleyes.detector.detector import DetectorOptions
+from sqleyes.detector.detector_output import DetectorOutput
+from sqleyes.detector.result_cache import ResultCache
+from sqleyes.utils.fingerprint import fingerprint_query
+from sqleyes.utils.slow_log import SlowQuery
+from sqleyes.utils.statement_splitter import Statement
+
+if TYPE_CHECKING:
+    from sqleyes.detector.disk_cache import DiskCache
+    from sqleyes.detector.profiler import Profiler
+
+
+class QueryCost:
+    """
+    This class represents the total cost of all executions of a query
+    template, that is of all queries with the same fingerprint.
+
+    Attributes:
+        fingerprint (str): The fingerprint of the queries.
+        query (str): The slowest execution, which is the one analyzed.
+        offset (int): The byte offset of the slowest execution in the log.
+        executions (int): The number of executions.
+        total_time (float): The total duration of all executions in seconds.
+        max_time (float): The duration of the slowest execution in seconds.
+        rows_examined (Optional[int]): The total number of rows examined, if
+            it is logged.
+        first_seen (Optional[str]): The timestamp of the first execution.
+        last_seen (Optional[str]): The timestamp of the last execution.
+        outputs (List[DetectorOutput]): The anti-patterns of the query.
+        error (Optional[str]): The error the detector failed on the query
+            with, if it failed.
+    """
+    __slots__ = ("fingerprint", "query", "offset", "executions", "total_time",
+                 "max_time", "rows_examined", "first_seen", "last_seen", "outputs", "error")
+
+    def __init__(self, fingerprint: str, entry: SlowQuery):
+        self.fingerprint = fingerprint
+        self.query = entry.query
+        self.offset = entry.offset
+        self.executions = 0
+        self.total_time = 0.0
+        self.max_time = entry.duration
+        self.rows_examined: Optional[int] = None
+        self.first_seen = entry.timestamp
+        self.last_seen = entry.timestamp
+        self.outputs: List[DetectorOutput] = []
+        self.error: Optional[str] = None
+
+    def add(self, entry: SlowQuery):
+        """
+        This function adds an execution of the query.
+
+        Parameters:
+            entry (SlowQuery): The execution.
+        """
+        self.executions += 1
+        self.total_time += entry.duration
+
+        if entry.duration > self.max_time:
+            self.query = entry.query
+            self.offset = entry.offset
+            self.max_time = entry.duration
+
+        if entry.rows_examined is not None:
+            self.rows_examined = (self.rows_examined or 0) + entry.rows_examined
+
+        if entry.timestamp is not None:
+            self.first_seen = self.first_seen or entry.timestamp
+            self.last_seen = entry.timestamp
+
+
+class AntiPatternCost:
+    """
+    This class represents the total cost of the queries that contain an
+    anti-pattern.
+
+    Attributes:
+        type (str): The type of the anti-pattern.
+        title (str): The title of the anti-pattern.
+        total_time (float): The total duration of all executions of the
+            queries in seconds.
+        executions (int): The number of executions of the queries.
+        queries (List[QueryCost]): The queries, most expensive first.
+    """
+    __slots__ = ("type", "title", "total_time", "executions", "queries")
+
+    def __init__(self, type: str, title: str):
+        self.type = type
+        self.title = title
+        self.total_time = 0.0
+        self.executions = 0
+        self.queries: List[QueryCost] = []
+
+
+class CostReport:
+    """
+    This is a class that ranks anti-patterns by the time the database spent
+    on the queries that contain them, rather than by how often they occur.
+
+    Executions are grouped by query fingerprint, and the detector only runs
+    once per fingerprint, on its slowest execution.
+
+    Attributes:
+        queries (Dict[str, QueryCost]): The cost of every query, by
+            fingerprint.
+        total_time (float): The total duration of all executions in seconds.
+        executions (int): The number of executions.
+    """
+
+    def __init__(self):
+        self.queries: Dict[str, QueryCost] = {}
+        self.total_time = 0.0
+        self.executions = 0
+
+    def add(self, entries: Iterable[SlowQuery]):
+        """
+        This function adds executions to the report.
+
+        Parameters:
+            entries (Iterable[SlowQuery]): The executions, for example read
+                from a slow query log.
+        """
+        for entry in entries:
+            fingerprint = fingerprint_query(entry.query).text
+            cost = self.queries.get(fingerprint)
+            if cost is None:
+                cost = self.queries[fingerprint] = QueryCost(fingerprint, entry)
+            cost.add(entry)
+
+            self.total_time += entry.duration
+            self.executions += 1
+
+    def analyze(self, workers: Optional[int] = 1, cache: Optional[ResultCache] = None,
+                disk_cache: Optional["DiskCache"] = None,
+                profiler: Optional["Profiler"] = None,
+                options: Optional[DetectorOptions] = None):
+        """
+        This function runs the detector on every query of the report. A
+        query the detector fails on keeps its error and has no outputs.
+
+        Parameters:
+            workers (Optional[int]): The number of processes to analyze
+                queries with.
+            cache (Optional[ResultCache]): A cache of results by fingerprint.
+            disk_cache (Optional[DiskCache]): A cache of results kept across
+                runs.
+            profiler (Optional[Profiler]): A profiler to record timings with.
+            options (Optional[DetectorOptions]): The detectors to run and the
+                outputs to keep, None for defaults.
+        """
+        from sqleyes.main import analyze_many
+
+        costs = list(self.queries.values())
+        statements = [Statement(index, cost.offset, cost.query)
+                      for index, cost in enumerate(costs)]
+
+        def fail(statement: Statement, error: str):
+            costs[statement.index].error = error
+
+        for cost, outputs in zip(costs, analyze_many(statements, workers=workers, cache=cache,
+                                                     disk_cache=disk_cache, profiler=profiler,
+                                                     options=options, on_error=fail)):
+            cost.outputs = outputs
+
+    def get_queries(self) -> List[QueryCost]:
+        """
+        This function ranks the queries by their total duration.
+
+        Returns:
+            List[QueryCost]: The queries, most expensive first.
+        """
+        return sorted(self.queries.values(), key=lambda cost: -cost.total_time)
+
+    def get_anti_patterns(self) -> List[AntiPatternCost]:
+        """
+        This function ranks the anti-patterns by the total duration of the
+        queries that contain them. A query with several anti-patterns counts
+        towards each of them.
+
+        Returns:
+            List[AntiPatternCost]: The anti-patterns, most expensive first.
+        """
+        anti_patterns: Dict[str, AntiPatternCost] = {}
+
+        for cost in self.get_queries():
+            for type in dict.fromkeys(output.type for output in cost.outputs):
+                anti_pattern = anti_patterns.get(type)
+                if anti_pattern is None:
+                    title = next(output.title for output in cost.outputs if output.type == type)
+                    anti_pattern = anti_patterns[type] = AntiPatternCost(type, title)
+                anti_pattern.total_time += cost.total_time
+                anti_pattern.executions += cost.executions
+                anti_pattern.queries.append(cost)
+
+        return sorted(anti_patterns.values(), key=lambda anti_pattern: -anti_pattern.total_time)
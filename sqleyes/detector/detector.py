@@ -1,13 +1,160 @@
 """Detector class running various detectors"""
-from typing import List
-from sqleyes.detector.antipatterns.ambiguous_groups import AmbiguousGroupsDetector
-from sqleyes.detector.antipatterns.fear_of_the_unknown import FearOfTheUnknownDetector
-from sqleyes.detector.antipatterns.implicit_columns import ImplicitColumnsDetector
-from sqleyes.detector.antipatterns.poor_mans_search_engine import PoorMansSearchEngineDetector
-from sqleyes.detector.antipatterns.random_selection import RandomSelectionDetector
-from sqleyes.detector.antipatterns.spaghetti_query import SpaghettiQueryDetector
+import sys
+from importlib import import_module
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Type
+
+from sqleyes.detector.antipatterns.abstract_base_class import AbstractDetector
 from sqleyes.detector.detector_output import DetectorOutput
-from sqleyes.utils.query_functions import parse_query
+from sqleyes.detector.keyword_filter import KeywordFilter
+from sqleyes.detector.scanner import Matches, Scanner
+from sqleyes.utils.parsed_query import ParsedQuery
+
+
+# All anti-pattern detectors by name, in the order their outputs are
+# reported: the module and class of the detector, and the highest certainty
+# of its outputs. Detectors are only imported once they are selected.
+REGISTRY: Dict[str, Tuple[str, str, str]] = {
+    "ambiguous_groups": ("sqleyes.detector.antipatterns.ambiguous_groups", "AmbiguousGroupsDetector", "high"),
+    "fear_of_the_unknown": ("sqleyes.detector.antipatterns.fear_of_the_unknown", "FearOfTheUnknownDetector", "high"),
+    "implicit_columns": ("sqleyes.detector.antipatterns.implicit_columns", "ImplicitColumnsDetector", "high"),
+    "poor_mans_search_engine": ("sqleyes.detector.antipatterns.poor_mans_search_engine",
+                                "PoorMansSearchEngineDetector", "medium"),
+    "random_selection": ("sqleyes.detector.antipatterns.random_selection", "RandomSelectionDetector", "high"),
+    "spaghetti_query": ("sqleyes.detector.antipatterns.spaghetti_query", "SpaghettiQueryDetector", "high"),
+}
+
+# Certainties of outputs, from low to high
+CERTAINTIES = ["low", "medium", "high"]
+
+
+class DetectorOptions(NamedTuple):
+    """
+    This is a class that holds which detectors run on a query and which of
+    their outputs are kept.
+
+    Attributes:
+        only (Optional[Tuple[str, ...]]): The names of the detectors to run,
+            None to run all detectors.
+        skip (Tuple[str, ...]): The names of detectors not to run.
+        min_certainty (Optional[str]): Outputs with a lower certainty are
+            dropped, and detectors that can not reach it do not run.
+        fail_fast (bool): Whether to stop at the first output that is kept.
+    """
+    only: Optional[Tuple[str, ...]] = None
+    skip: Tuple[str, ...] = ()
+    min_certainty: Optional[str] = None
+    fail_fast: bool = False
+
+
+def select_detectors(options: Optional[DetectorOptions] = None) -> List[str]:
+    """
+    This function finds the names of the detectors that run with some options,
+    without importing any detector.
+
+    Parameters:
+        options (Optional[DetectorOptions]): The options, None for defaults.
+
+    Returns:
+        List[str]: The names of the selected detectors, in the order of
+        REGISTRY.
+
+    Raises:
+        ValueError: If a name or certainty is unknown.
+    """
+    if options is None:
+        return list(REGISTRY)
+
+    unknown = [name for name in (options.only or ()) + options.skip if name not in REGISTRY]
+    if unknown:
+        raise ValueError(f"Unknown detector {unknown[0]!r}, choose from {', '.join(REGISTRY)}")
+
+    minimum = 0
+    if options.min_certainty is not None:
+        if options.min_certainty not in CERTAINTIES:
+            raise ValueError(f"Unknown certainty {options.min_certainty!r}, choose from {', '.join(CERTAINTIES)}")
+        minimum = CERTAINTIES.index(options.min_certainty)
+
+    return [name for name, (_, _, certainty) in REGISTRY.items()
+            if (options.only is None or name in options.only) and name not in options.skip
+            and CERTAINTIES.index(certainty) >= minimum]
+
+
+class DetectorSet:
+    """
+    This is a class that holds a selection of detectors, together with the
+    scanner of their patterns, the filter of their keywords and the order
+    they run in.
+
+    Parameters:
+        detectors (Iterable[Type[AbstractDetector]]): The detectors, in the
+            order their outputs are reported.
+
+    Attributes:
+        detectors (List[Type[AbstractDetector]]): The detectors, in the order
+            their outputs are reported.
+        scanner (Scanner): Matches the patterns of all detectors at once.
+        keyword_filter (KeywordFilter): Finds the keywords of all detectors
+            in a query.
+        schedule (List[Tuple[Type[AbstractDetector], int]]): Every detector
+            with the bitmap of its keywords, cheapest first. Detectors without
+            keywords have an empty bitmap and run on every query.
+    """
+
+    def __init__(self, detectors: Iterable[Type[AbstractDetector]]):
+        self.detectors = list(detectors)
+        self.scanner = Scanner({detector.type: detector.patterns for detector in self.detectors})
+        self.keyword_filter = KeywordFilter(keyword for detector in self.detectors
+                                            for keyword in detector.keywords)
+        self.schedule = [(detector, self.keyword_filter.get_mask(detector.keywords))
+                         for detector in sorted(self.detectors, key=lambda detector: detector.cost)]
+
+
+# Detector sets by the names of their detectors, created on first use
+_detector_sets: Dict[Tuple[str, ...], DetectorSet] = {}
+
+
+def get_detector_set(options: Optional[DetectorOptions] = None) -> DetectorSet:
+    """
+    This function returns the detectors that run with some options. Only the
+    selected detectors are imported.
+
+    Parameters:
+        options (Optional[DetectorOptions]): The options, None for defaults.
+
+    Returns:
+        DetectorSet: The selected detectors.
+
+    Raises:
+        ValueError: If a name or certainty is unknown.
+    """
+    names = tuple(select_detectors(options))
+
+    detector_set = _detector_sets.get(names)
+    if detector_set is None:
+        detector_set = _detector_sets[names] = DetectorSet(
+            getattr(import_module(REGISTRY[name][0]), REGISTRY[name][1]) for name in names)
+
+    return detector_set
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name: str):
+        # All detectors are only imported on first use of these, so that a
+        # selection of detectors does not import the others
+        if name == "DETECTORS":
+            return get_detector_set().detectors
+        if name == "SCANNER":
+            return get_detector_set().scanner
+        if name == "KEYWORD_FILTER":
+            return get_detector_set().keyword_filter
+        if name == "SCHEDULE":
+            return get_detector_set().schedule
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+else:
+    DETECTORS = get_detector_set().detectors
+    SCANNER = get_detector_set().scanner
+    KEYWORD_FILTER = get_detector_set().keyword_filter
+    SCHEDULE = get_detector_set().schedule
 
 
 class Detector:
@@ -17,43 +164,62 @@ class Detector:
 
     Attributes:
         query (str): The query to be analyzed.
+        parsed_query (ParsedQuery): The query parsed once, shared by all
+            detectors. It is only parsed if a detector that runs uses it.
+        statement_index (int): The index of the statement within the input
+            the query was taken from.
+        offset (int): The byte offset of the statement within the input.
+        options (DetectorOptions): The detectors to run and the outputs to
+            keep.
     """
 
-    def __init__(self, query: str):
+    def __init__(self, query: str, statement_index: int = 0, offset: int = 0,
+                 options: Optional[DetectorOptions] = None):
         self.query = query
-        self.subqueries = parse_query(query)
-        self.anti_pattern_list: List[DetectorOutput] = []
+        self.parsed_query = ParsedQuery(query)
+        self.statement_index = statement_index
+        self.offset = offset
+        self.options = options or DetectorOptions()
+        self.anti_pattern_list: List[Optional[DetectorOutput]] = []
 
     def run(self) -> List[DetectorOutput]:
         """
-        This function runs various detectors on a query.
+        This function runs various detectors on a query. A single pass over
+        the query finds the keywords of all detectors, detectors none of whose
+        keywords occur are skipped and the others run cheapest first.
 
         Returns:
             List[DetectorOutput]: A list of Detector outputs of various
-            detectors.
+            detectors, in the order of the detectors. With fail_fast, only
+            the first output that is kept.
         """
         if self.query == "":
             return []
 
-        ap_ambiguous_groups = AmbiguousGroupsDetector(query=self.query,
-                                                      subqueries=self.subqueries).check()
-        self.anti_pattern_list.append(ap_ambiguous_groups)
+        detector_set = get_detector_set(self.options)
+        bitmap = detector_set.keyword_filter.scan(self.query)
+        detectors = [detector for detector, mask in detector_set.schedule if not mask or bitmap & mask]
 
-        ap_fear_of_the_unknown = FearOfTheUnknownDetector(query=self.query) \
-            .check()
-        self.anti_pattern_list.append(ap_fear_of_the_unknown)
+        # Without a detector that uses them, the patterns are not searched for
+        matches: Optional[Matches] = None
+        if any(detector.patterns for detector in detectors):
+            matches = detector_set.scanner.scan(self.query)
 
-        ap_implicit_col = ImplicitColumnsDetector(query=self.query).check()
-        self.anti_pattern_list.append(ap_implicit_col)
+        minimum = CERTAINTIES.index(self.options.min_certainty or CERTAINTIES[0])
+        outputs: Dict[Type[AbstractDetector], Optional[DetectorOutput]] = {}
+        for detector in detectors:
+            output = detector(query=self.parsed_query, matches=matches).check()
+            if output is not None and CERTAINTIES.index(output.certainty) < minimum:
+                output = None
+            outputs[detector] = output
+            if output is not None and self.options.fail_fast:
+                break
 
-        ap_pm_search_engine = PoorMansSearchEngineDetector(query=self.query) \
-            .check()
-        self.anti_pattern_list.append(ap_pm_search_engine)
+        self.anti_pattern_list = [outputs.get(detector) for detector in detector_set.detectors]
 
-        ap_random_selection = RandomSelectionDetector(query=self.query).check()
-        self.anti_pattern_list.append(ap_random_selection)
+        anti_patterns = [ap for ap in self.anti_pattern_list if ap is not None]
 
-        ap_spaghetti_query = SpaghettiQueryDetector(query=self.query).check()
-        self.anti_pattern_list.append(ap_spaghetti_query)
+        for anti_pattern in anti_patterns:
+            anti_pattern.set_source(self.statement_index, self.offset)
 
-        return [ap for ap in self.anti_pattern_list if ap is not None]
+        return anti_patterns
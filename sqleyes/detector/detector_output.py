@@ -1,36 +1,72 @@
 """Detector Ouput class specifying general output format"""
 import json
-from typing import List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqleyes.utils.load_file import load_anti_pattern_description
 
 
 class DetectorOutput(object):
     """
-    This class represents the output of a detector.
+    This class represents the output of a detector. Only the finding itself is
+    stored, the description, location snippets and dictionary form are created
+    when they are first used.
 
     Attributes:
         query (str): The query that generated the detector.
         certainty (str): The certainty of the detector detecting the AP.
-        description (str): The detector description for the detection.
+        description (str): The detector description for the detection. If
+            None is given, it is only loaded when it is used.
         detector_type (str): The type of detector that produced this output.
         locations (Tuple): Start and end location where something is detected
+        location_snippets (List[str]): A snippet of the query around every
+            location.
         title (str): The title of output.
         type (str): The type of output.
+        statement_index (int): The index of the statement within the input
+            the query was taken from.
+        offset (int): The byte offset of the statement within the input.
+        dict (Dict[str, Any]): The output as a dictionary.
     """
-    def __init__(self, query: str, certainty: str, description: str,
+    __slots__ = ("query", "certainty", "detector_type", "locations", "title",
+                 "type", "statement_index", "offset", "__description",
+                 "__location_snippets", "__dict")
+
+    def __init__(self, query: str, certainty: str, description: Optional[str],
                  detector_type: str, locations: List[Tuple[int, int]],
-                 title: str, type: str):
+                 title: str, type: str, statement_index: int = 0,
+                 offset: int = 0):
         if certainty not in ["low", "medium", "high"]:
             raise Exception("Certainty must be specified as either 'low', \
                              'medium' or 'high' ")
         self.query = query
         self.certainty = certainty
-        self.description = description
         self.detector_type = detector_type
         self.locations = locations
         self.title = title
         self.type = type
-        self.location_snippets = self.__create_location_snippets()
-        self.dict = self.__create_dictionary()
+        self.statement_index = statement_index
+        self.offset = offset
+        self.__description = description
+        self.__location_snippets: Optional[List[str]] = None
+        self.__dict: Optional[Dict[str, Any]] = None
+
+    @property
+    def description(self) -> str:
+        if self.__description is None:
+            self.__description = load_anti_pattern_description(self.type)
+        return self.__description
+
+    @property
+    def location_snippets(self) -> List[str]:
+        if self.__location_snippets is None:
+            self.__location_snippets = self.__create_location_snippets()
+        return self.__location_snippets
+
+    @property
+    def dict(self) -> Dict[str, Any]:
+        if self.__dict is None:
+            self.__dict = self.__create_dictionary()
+        return self.__dict
 
     def __create_location_snippets(self):
         # Convert possible multiline query back to single line
@@ -77,14 +113,28 @@ class DetectorOutput(object):
             "locations": self.locations,
             "location_snippets": json.dumps(self.location_snippets),
             "title": self.title,
-            "type": self.type
+            "type": self.type,
+            "statement_index": self.statement_index,
+            "offset": self.offset
         }
 
+    def set_source(self, statement_index: int, offset: int):
+        """
+        This function sets where the query of this output was taken from.
+
+        Parameters:
+            statement_index (int): The index of the statement in the input.
+            offset (int): The byte offset of the statement in the input.
+        """
+        self.statement_index = statement_index
+        self.offset = offset
+        self.__dict = None
+
     def __getitem__(self, item):
         return self.dict[item]
 
     def __repr__(self):
-        return json.dumps(self.__create_dictionary())
+        return json.dumps(self.dict)
 
     def __eq__(self, other):
         if isinstance(self, other.__class__):
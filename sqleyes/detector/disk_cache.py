@@ -0,0 +1,265 @@
+"""Disk cache class that keeps detector results across runs"""
+import hashlib
+import importlib.abc
+import importlib.util
+import inspect
+import json
+import marshal
+import os
+import sqlite3
+import sys
+import time
+from typing import List, Optional
+
+from sqleyes.definitions.definitions import DEFINITIONS
+from sqleyes.detector.detector import (CERTAINTIES, REGISTRY, DetectorOptions,
+                                       select_detectors)
+from sqleyes.detector.detector_output import DetectorOutput
+
+
+CACHE_FILENAME = "sqleyes-cache.sqlite3"
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+# Stored results are written to the file in batches of this many results
+COMMIT_INTERVAL = 1000
+
+# Modules the results of the detectors depend on, next to the detector modules
+RULESET_MODULES = [
+    "sqleyes.detector.antipatterns.abstract_base_class",
+    "sqleyes.detector.detector",
+    "sqleyes.detector.keyword_filter",
+    "sqleyes.detector.scanner",
+    "sqleyes.utils.code_complexity_metrics",
+    "sqleyes.utils.parsed_query",
+    "sqleyes.utils.query_functions",
+    "sqleyes.utils.query_keywords",
+    "sqleyes.utils.tokenizer",
+]
+
+_ruleset_version: Optional[str] = None
+
+
+def get_ruleset_version() -> str:
+    """
+    This function computes a version of the current set of detectors, based on
+    DEFINITIONS, the source code of the detector classes and the version of
+    sqlparse, which parses the queries. Any change to the detectors results
+    in a different version.
+
+    Returns:
+        str: The ruleset version as a hexadecimal hash.
+    """
+    global _ruleset_version
+
+    if _ruleset_version is not None:
+        return _ruleset_version
+
+    import sqlparse
+
+    digest = hashlib.sha256(json.dumps(DEFINITIONS, sort_keys=True).encode())
+    digest.update(sqlparse.__version__.encode())
+
+    modules = sorted({module for module, _, _ in REGISTRY.values()} | set(RULESET_MODULES))
+    for name in modules:
+        # The source is read without importing the module, so that detectors
+        # that do not run are not imported
+        spec = importlib.util.find_spec(name)
+        source = None
+        if spec is not None and isinstance(spec.loader, importlib.abc.InspectLoader):
+            source = spec.loader.get_source(name)
+        if source is not None:
+            digest.update(source.encode())
+            continue
+
+        module = sys.modules.get(name)
+        if module is None:
+            __import__(name)
+            module = sys.modules[name]
+        try:
+            digest.update(inspect.getsource(module).encode())
+        except (OSError, TypeError):
+            # Source is not available, fall back to the compiled code
+            for value in vars(module).values():
+                if inspect.isfunction(value) and value.__module__ == name:
+                    digest.update(marshal.dumps(value.__code__))
+
+    _ruleset_version = digest.hexdigest()
+    return _ruleset_version
+
+
+class DiskCache:
+    """
+    This is a cache of detector results that is stored in a SQLite file, so
+    results are kept across runs. Results are stored by a hash of the query
+    and are only valid for the ruleset version they were computed with.
+
+    Parameters:
+        directory (str): The directory to store the cache file in.
+        max_size (int): The maximum size of the cache in bytes. Least recently
+            used results are evicted when it grows larger.
+
+    Attributes:
+        path (str): The path of the cache file.
+        max_size (int): The maximum size of the cache in bytes.
+        ruleset (str): The ruleset version results are stored for.
+        hits (int): The number of queries answered from the cache.
+        misses (int): The number of queries not found in the cache.
+    """
+
+    def __init__(self, directory: str, max_size: int = DEFAULT_MAX_SIZE):
+        os.makedirs(directory, exist_ok=True)
+
+        self.path = os.path.join(directory, CACHE_FILENAME)
+        self.max_size = max_size
+        self.ruleset = get_ruleset_version()
+        self.hits = 0
+        self.misses = 0
+        self.__pending = 0
+
+        self.__connection = sqlite3.connect(self.path, timeout=30)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                ruleset TEXT NOT NULL,
+                data TEXT NOT NULL,
+                accessed REAL NOT NULL
+            )""")
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+
+        # Results of other versions of the detectors are no longer valid
+        self.__connection.execute("DELETE FROM results WHERE ruleset != ?",
+                                  (self.ruleset,))
+        self.__connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @staticmethod
+    def get_key(query: str, options: Optional[DetectorOptions] = None) -> str:
+        """
+        This function returns the key results of a query are stored by.
+
+        Parameters:
+            query (str): The query string.
+            options (Optional[DetectorOptions]): The options the results were
+                found with, None for defaults.
+
+        Returns:
+            str: A hash of the query, and of the options if they are not the
+            defaults.
+        """
+        digest = hashlib.sha256(query.encode("utf-8", "surrogatepass"))
+        if options is not None:
+            # Options that select the same detectors share their results
+            selection = (select_detectors(options), options.min_certainty or CERTAINTIES[0], options.fail_fast)
+            if selection != (list(REGISTRY), CERTAINTIES[0], False):
+                digest.update(b"\0" + repr(selection).encode())
+        return digest.hexdigest()
+
+    def get(self, query: str, statement_index: int = 0, offset: int = 0,
+            options: Optional[DetectorOptions] = None) -> Optional[List[DetectorOutput]]:
+        """
+        This function looks up the results of a query in the cache.
+
+        Parameters:
+            query (str): The query string.
+            statement_index (int): The index of the statement within the input
+                the query was taken from.
+            offset (int): The byte offset of the statement within the input.
+            options (Optional[DetectorOptions]): The options of the detector,
+                None for defaults.
+
+        Returns:
+            Optional[List[DetectorOutput]]: The cached results, None if the
+            query is not in the cache.
+        """
+        key = self.get_key(query, options)
+        row = self.__connection.execute(
+            "SELECT data FROM results WHERE key = ? AND ruleset = ?",
+            (key, self.ruleset)).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.__connection.execute("UPDATE results SET accessed = ? WHERE key = ?",
+                                  (time.time(), key))
+
+        return [DetectorOutput(query=query,
+                               certainty=record["certainty"],
+                               description=None,
+                               detector_type=record["detector_type"],
+                               locations=[tuple(location) for location in record["locations"]],
+                               title=record["title"],
+                               type=record["type"],
+                               statement_index=statement_index,
+                               offset=offset)
+                for record in json.loads(row[0])]
+
+    def put(self, query: str, outputs: List[DetectorOutput],
+            options: Optional[DetectorOptions] = None):
+        """
+        This function stores the results of a query in the cache.
+
+        Parameters:
+            query (str): The query string.
+            outputs (List[DetectorOutput]): The results of the query.
+            options (Optional[DetectorOptions]): The options of the detector,
+                None for defaults.
+        """
+        data = json.dumps([{"certainty": output.certainty,
+                            "detector_type": output.detector_type,
+                            "locations": output.locations,
+                            "title": output.title,
+                            "type": output.type} for output in outputs])
+
+        self.__connection.execute(
+            "INSERT OR REPLACE INTO results (key, ruleset, data, accessed) VALUES (?, ?, ?, ?)",
+            (self.get_key(query, options), self.ruleset, data, time.time()))
+
+        self.__pending += 1
+        if self.__pending >= COMMIT_INTERVAL:
+            self.commit()
+
+    def get_size(self) -> int:
+        """
+        This function returns the size of the data in the cache file.
+
+        Returns:
+            int: The number of bytes in use by the cache file.
+        """
+        page_count, = self.__connection.execute("PRAGMA page_count").fetchone()
+        free_count, = self.__connection.execute("PRAGMA freelist_count").fetchone()
+        page_size, = self.__connection.execute("PRAGMA page_size").fetchone()
+        return int((page_count - free_count) * page_size)
+
+    def commit(self):
+        """
+        This function writes all pending changes to the cache file, and
+        evicts the least recently used results if the cache is too large.
+        """
+        self.__connection.commit()
+        self.__pending = 0
+
+        while self.get_size() > self.max_size:
+            count, = self.__connection.execute("SELECT COUNT(*) FROM results").fetchone()
+            if count == 0:
+                break
+
+            # Evict a tenth of the results at a time
+            self.__connection.execute("""
+                DELETE FROM results WHERE key IN (
+                    SELECT key FROM results ORDER BY accessed LIMIT ?
+                )""", (max(1, count // 10),))
+            self.__connection.commit()
+
+    def close(self):
+        """
+        This function commits all pending changes and closes the cache file.
+        """
+        self.commit()
+        self.__connection.close()
@@ -0,0 +1,74 @@
+"""Keyword filter class telling which detectors can match a query"""
+from typing import Dict, Iterable, List
+
+
+# Characters that case insensitive regular expressions match to a letter,
+# but that are not converted to it by upper
+_UPPER_CASE_EXCEPTIONS = [("\u0130", "I"), ("\u212a", "K")]
+
+
+class KeywordFilter:
+    """
+    This is a class that finds which of a set of keywords occur in a query,
+    as a bitmap with a bit for every keyword.
+
+    Keywords are searched for case insensitively anywhere in the query, in
+    the same way as the patterns of the detectors, so a keyword such as RAND
+    is also found in RANDOM. A detector whose keywords are all absent can not
+    match the query and does not have to run.
+
+    Parameters:
+        keywords (Iterable[str]): The keywords, for example "GROUP" or "*".
+
+    Attributes:
+        keywords (List[str]): The keywords in upper case without duplicates,
+            the i-th keyword is the i-th bit of a bitmap.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = []
+        for keyword in keywords:
+            if keyword.upper() not in self.keywords:
+                self.keywords.append(keyword.upper())
+
+        self.__bits: Dict[str, int] = {keyword: 1 << index for index, keyword in enumerate(self.keywords)}
+
+    def get_mask(self, keywords: Iterable[str]) -> int:
+        """
+        This function returns the bitmap of some of the keywords.
+
+        Parameters:
+            keywords (Iterable[str]): Keywords of this filter.
+
+        Returns:
+            int: The bitmap with the bits of the keywords set.
+        """
+        mask = 0
+        for keyword in keywords:
+            mask |= self.__bits[keyword.upper()]
+        return mask
+
+    def scan(self, query: str) -> int:
+        """
+        This function finds the keywords that occur in a query. The query is
+        converted to upper case once, after which every keyword is a plain
+        substring search, which is many times faster than a case insensitive
+        regular expression.
+
+        Parameters:
+            query (str): The query string.
+
+        Returns:
+            int: The bitmap of the keywords that occur in the query.
+        """
+        text = query.upper()
+        for character, letter in _UPPER_CASE_EXCEPTIONS:
+            if character in text:
+                text = text.replace(character, letter)
+
+        bitmap = 0
+        for keyword, bit in self.__bits.items():
+            if keyword in text:
+                bitmap |= bit
+
+        return bitmap
@@ -0,0 +1,448 @@
+"""Manifest class keeping the results of every statement in a directory of SQL files"""
+import hashlib
+import io
+import json
+import os
+from typing import (TYPE_CHECKING, Any, Dict, Iterable, Iterator, List,
+                    Optional, Tuple)
+
+from sqleyes.detector.detector_output import DetectorOutput
+from sqleyes.detector.result_cache import ResultCache
+from sqleyes.utils.statement_splitter import Statement, split_statements
+
+if TYPE_CHECKING:
+    from sqleyes.detector.disk_cache import DiskCache
+
+
+# File extensions that are watched by default
+SUFFIXES = (".sql",)
+
+# The file a manifest is saved in, in the watched directory
+MANIFEST_FILENAME = ".sqleyes-manifest.json"
+# The version of the format of saved manifests
+MANIFEST_FORMAT = 1
+
+# The outputs of a statement text and the error if the detector failed on it
+Analysis = Tuple[List[DetectorOutput], Optional[str]]
+
+
+def hash_bytes(data: bytes) -> str:
+    """
+    This function computes the hash the manifest identifies contents by.
+
+    Parameters:
+        data (bytes): The contents of a file or statement.
+
+    Returns:
+        str: The hash as a hexadecimal string.
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def get_manifest_path(directory: str, cache_dir: Optional[str] = None) -> str:
+    """
+    This function returns the path the manifest of a directory is saved at.
+
+    Parameters:
+        directory (str): The watched directory.
+        cache_dir (Optional[str]): The directory to save the manifest in, by
+            default it is saved in the watched directory.
+
+    Returns:
+        str: The path of the manifest file.
+    """
+    if cache_dir is None:
+        return os.path.join(directory, MANIFEST_FILENAME)
+
+    # A cache directory can hold the manifests of many watched directories
+    name = hash_bytes(os.path.abspath(directory).encode("utf-8", "surrogateescape"))
+    return os.path.join(cache_dir, f"sqleyes-manifest-{name}.json")
+
+
+class FileEntry:
+    """
+    This class represents a file in the manifest.
+
+    Attributes:
+        mtime (int): The modification time of the file in nanoseconds.
+        size (int): The size of the file in bytes.
+        digest (str): The hash of the contents of the file.
+        statements (List[Tuple[Statement, str]]): Every statement of the file
+            and the hash of its text.
+        errors (Dict[str, int]): The number of outputs of every anti-pattern
+            type in the file.
+    """
+    __slots__ = ("mtime", "size", "digest", "statements", "errors")
+
+    def __init__(self, mtime: int, size: int, digest: str,
+                 statements: List[Tuple[Statement, str]]):
+        self.mtime = mtime
+        self.size = size
+        self.digest = digest
+        self.statements = statements
+        self.errors: Dict[str, int] = {}
+
+
+class Manifest:
+    """
+    This is a class that keeps the hash of every SQL file in a directory, and
+    the results of every statement in them. An update only reads the files
+    whose size or modification time changed, and only runs the detector on
+    statements whose text it has no results for. The totals of the report are
+    updated along with the files. If an update fails, for example because
+    the analysis is interrupted, the manifest is left as it was before. A
+    manifest can be saved and loaded, so that the next run only analyzes
+    what changed in between.
+
+    Parameters:
+        directory (str): The directory to watch, including subdirectories.
+        suffixes (Tuple[str, ...]): The extensions of the files to watch.
+
+    Attributes:
+        directory (str): The watched directory.
+        files (Dict[str, FileEntry]): Every watched file by path.
+        results (Dict[Tuple[str, int], List[DetectorOutput]]): The outputs of
+            every statement by path and statement index.
+        failures (Dict[Tuple[str, int], str]): The error of every statement
+            the detector failed on by path and statement index, such
+            statements have no outputs.
+        errors (Dict[str, int]): The number of outputs of every anti-pattern
+            type in all files.
+        files_with_errors (Dict[str, int]): The number of files with outputs
+            of every anti-pattern type.
+        titles (Dict[str, str]): The title of every anti-pattern type.
+        statements (int): The number of statements in all files.
+        analyzed (int): The number of statements the detector ran on.
+    """
+
+    def __init__(self, directory: str, suffixes: Tuple[str, ...] = SUFFIXES):
+        self.directory = directory
+        self.suffixes = suffixes
+        self.files: Dict[str, FileEntry] = {}
+        self.results: Dict[Tuple[str, int], List[DetectorOutput]] = {}
+        self.failures: Dict[Tuple[str, int], str] = {}
+        self.errors: Dict[str, int] = {}
+        self.files_with_errors: Dict[str, int] = {}
+        self.titles: Dict[str, str] = {}
+        self.statements = 0
+        self.analyzed = 0
+        # The analysis of every statement text by hash, and the number of
+        # statements with that text
+        self.__analyses: Dict[str, Analysis] = {}
+        self.__references: Dict[str, int] = {}
+
+    def find_files(self) -> Dict[str, Tuple[int, int]]:
+        """
+        This function lists the files to watch. Hidden directories are
+        skipped.
+
+        Returns:
+            Dict[str, Tuple[int, int]]: The modification time and size of
+            every file by path.
+        """
+        found = {}
+        directories = [self.directory]
+
+        while directories:
+            try:
+                entries = list(os.scandir(directories.pop()))
+            except OSError:
+                continue
+
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        if not entry.name.startswith("."):
+                            directories.append(entry.path)
+                    elif entry.name.endswith(self.suffixes) and entry.is_file():
+                        stat = entry.stat()
+                        found[entry.path] = (stat.st_mtime_ns, stat.st_size)
+                except OSError:
+                    # Removed while listing the directory
+                    continue
+
+        return found
+
+    def update(self, workers: Optional[int] = 1, cache: Optional[ResultCache] = None,
+               disk_cache: Optional["DiskCache"] = None) -> Tuple[List[str], List[str]]:
+        """
+        This function brings the manifest up to date with the directory.
+
+        Parameters:
+            workers (Optional[int]): The number of processes to analyze new
+                statements with.
+            cache (Optional[ResultCache]): A cache of results by fingerprint.
+            disk_cache (Optional[DiskCache]): A cache of results kept across
+                runs.
+
+        Returns:
+            Tuple[List[str], List[str]]: The paths of the files whose contents
+            changed, including new files, and of the removed files.
+        """
+        found = self.find_files()
+        removed = [path for path in self.files if path not in found]
+        touched: List[Tuple[FileEntry, int, int]] = []
+        entries: Dict[str, FileEntry] = {}
+
+        for path, (mtime, size) in found.items():
+            entry = self.files.get(path)
+            if entry is not None and entry.mtime == mtime and entry.size == size:
+                continue
+
+            try:
+                with open(path, "rb") as file:
+                    data = file.read()
+            except OSError:
+                continue
+
+            digest = hash_bytes(data)
+            if entry is not None and entry.digest == digest:
+                # Touched, but the contents are the same
+                touched.append((entry, mtime, size))
+                continue
+
+            statements = [(statement, hash_bytes(statement.text.encode("utf-8")))
+                          for statement in split_statements(io.BytesIO(data))]
+            entries[path] = FileEntry(mtime, size, digest, statements)
+
+        # The manifest is only changed once all new statements are analyzed
+        analyses = self.__analyze(entries.values(), workers, cache, disk_cache)
+
+        for entry, mtime, size in touched:
+            entry.mtime, entry.size = mtime, size
+
+        # The new statements are referenced before the old ones are released,
+        # so the analyses of unchanged statements are kept
+        for entry in entries.values():
+            for _, digest in entry.statements:
+                self.__references[digest] = self.__references.get(digest, 0) + 1
+        self.__analyses.update(analyses)
+        self.analyzed += len(analyses)
+
+        for path in removed:
+            self.__remove(path)
+
+        for path, entry in entries.items():
+            if path in self.files:
+                self.__remove(path)
+            self.__add(path, entry)
+
+        return list(entries), removed
+
+    def save(self, path: str):
+        """
+        This function saves the manifest to a file. The file is replaced at
+        once, so it is never left half written.
+
+        Parameters:
+            path (str): The path of the manifest file.
+        """
+        from sqleyes.detector.disk_cache import get_ruleset_version
+
+        files = {}
+        for file_path, entry in self.files.items():
+            files[os.path.relpath(file_path, self.directory)] = {
+                "mtime": entry.mtime,
+                "size": entry.size,
+                "digest": entry.digest,
+                "statements": [[statement.index, statement.offset, statement.text,
+                                statement.line, statement.column, digest]
+                               for statement, digest in entry.statements],
+            }
+
+        analyses = {digest: {"outputs": [{"certainty": output.certainty,
+                                          "detector_type": output.detector_type,
+                                          "locations": output.locations,
+                                          "title": output.title,
+                                          "type": output.type} for output in outputs],
+                             "error": error}
+                    for digest, (outputs, error) in self.__analyses.items()}
+
+        data = {"format": MANIFEST_FORMAT, "ruleset": get_ruleset_version(),
+                "suffixes": list(self.suffixes), "files": files, "analyses": analyses}
+
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "w", encoding="utf-8") as file:
+                json.dump(data, file)
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+
+    def load(self, path: str) -> bool:
+        """
+        This function loads a saved manifest into an empty manifest. Saved
+        manifests of another version of the detectors are not loaded, since
+        their results are no longer valid.
+
+        Parameters:
+            path (str): The path of the manifest file.
+
+        Returns:
+            bool: True if the manifest was loaded, False if there is no valid
+            saved manifest.
+        """
+        from sqleyes.detector.disk_cache import get_ruleset_version
+
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data: Dict[str, Any] = json.load(file)
+        except (OSError, ValueError):
+            return False
+
+        if (not isinstance(data, dict) or data.get("format") != MANIFEST_FORMAT
+                or data.get("ruleset") != get_ruleset_version()
+                or data.get("suffixes") != list(self.suffixes)):
+            return False
+
+        try:
+            entries = {}
+            texts: Dict[str, Statement] = {}
+            for file_path, record in data["files"].items():
+                statements = []
+                for index, offset, text, line, column, digest in record["statements"]:
+                    statement = Statement(index, offset, text, line, column)
+                    statements.append((statement, digest))
+                    texts.setdefault(digest, statement)
+                entries[os.path.join(self.directory, file_path)] = FileEntry(
+                    record["mtime"], record["size"], record["digest"], statements)
+
+            analyses: Dict[str, Analysis] = {}
+            for digest, record in data["analyses"].items():
+                statement = texts[digest]
+                outputs = [DetectorOutput(query=statement.text,
+                                          certainty=output["certainty"],
+                                          description=None,
+                                          detector_type=output["detector_type"],
+                                          locations=[tuple(location) for location in output["locations"]],
+                                          title=output["title"],
+                                          type=output["type"],
+                                          statement_index=statement.index,
+                                          offset=statement.offset)
+                           for output in record["outputs"]]
+                analyses[digest] = (outputs, record["error"])
+        except Exception:
+            # The file does not have the structure of a saved manifest
+            return False
+
+        if any(digest not in analyses for entry in entries.values() for _, digest in entry.statements):
+            return False
+
+        self.__analyses = analyses
+        for file_path, entry in entries.items():
+            for _, digest in entry.statements:
+                self.__references[digest] = self.__references.get(digest, 0) + 1
+            self.__add(file_path, entry)
+
+        return True
+
+    def get_outputs(self, path: str) -> Iterator[Tuple[Statement, List[DetectorOutput]]]:
+        """
+        This function returns the results of the statements of a file.
+
+        Parameters:
+            path (str): The path of the file.
+
+        Returns:
+            Iterator[Tuple[Statement, List[DetectorOutput]]]: Every statement
+            of the file and its outputs.
+        """
+        for statement, _ in self.files[path].statements:
+            yield statement, self.results[(path, statement.index)]
+
+    def get_files(self) -> List[Tuple[str, int]]:
+        """
+        This function ranks the files with errors by their number of errors.
+
+        Returns:
+            List[Tuple[str, int]]: The path and number of errors of every file
+            with errors, most errors first.
+        """
+        files = [(path, sum(entry.errors.values())) for path, entry in self.files.items()
+                 if entry.errors]
+        return sorted(files, key=lambda file: (-file[1], file[0]))
+
+    def __analyze(self, entries: Iterable[FileEntry], workers: Optional[int],
+                  cache: Optional[ResultCache],
+                  disk_cache: Optional["DiskCache"]) -> Dict[str, Analysis]:
+        # Every new statement text is analyzed once, wherever it occurs
+        from sqleyes.main import analyze_many
+
+        pending: Dict[str, Statement] = {}
+        for entry in entries:
+            for statement, digest in entry.statements:
+                if digest not in self.__analyses and digest not in pending:
+                    pending[digest] = statement
+
+        digests = {id(statement): digest for digest, statement in pending.items()}
+        failures: Dict[str, str] = {}
+
+        def fail(statement: Statement, error: str):
+            failures[digests[id(statement)]] = error
+
+        analyses: Dict[str, Analysis] = {}
+        for digest, outputs in zip(pending, analyze_many(pending.values(), workers=workers,
+                                                         cache=cache, disk_cache=disk_cache,
+                                                         on_error=fail)):
+            analyses[digest] = (outputs, failures.get(digest))
+
+        return analyses
+
+    def __add(self, path: str, entry: FileEntry):
+        self.files[path] = entry
+        self.statements += len(entry.statements)
+
+        for statement, digest in entry.statements:
+            outputs, error = self.__analyses[digest]
+            key = (path, statement.index)
+            self.results[key] = [_relocate(output, statement) for output in outputs]
+            if error is not None:
+                self.failures[key] = error
+
+        self.__count(path, entry, 1)
+
+    def __count(self, path: str, entry: FileEntry, sign: int):
+        # Adds the errors of a file to the totals, or subtracts them
+        if sign > 0:
+            for statement, _ in entry.statements:
+                for output in self.results[(path, statement.index)]:
+                    entry.errors[output.type] = entry.errors.get(output.type, 0) + 1
+                    self.titles.setdefault(output.type, output.title)
+
+        for type, errors in entry.errors.items():
+            self.errors[type] = self.errors.get(type, 0) + sign * errors
+            self.files_with_errors[type] = self.files_with_errors.get(type, 0) + sign
+            if not self.errors[type]:
+                del self.errors[type]
+                del self.files_with_errors[type]
+
+    def __remove(self, path: str):
+        entry = self.files.pop(path)
+        self.__count(path, entry, -1)
+        self.statements -= len(entry.statements)
+
+        for statement, digest in entry.statements:
+            del self.results[(path, statement.index)]
+            self.failures.pop((path, statement.index), None)
+
+            # Analyses are dropped once no statement has their text anymore
+            self.__references[digest] -= 1
+            if not self.__references[digest]:
+                del self.__references[digest]
+                del self.__analyses[digest]
+
+
+def _relocate(output: DetectorOutput, statement: Statement) -> DetectorOutput:
+    # The outputs of a statement text, as found in a statement with that text
+    if (output.statement_index, output.offset) == (statement.index, statement.offset):
+        return output
+    return DetectorOutput(query=output.query,
+                          certainty=output.certainty,
+                          description=None,
+                          detector_type=output.detector_type,
+                          locations=output.locations,
+                          title=output.title,
+                          type=output.type,
+                          statement_index=statement.index,
+                          offset=statement.offset)
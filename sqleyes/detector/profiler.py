@@ -0,0 +1,163 @@
+"""Profiler class timing the detectors and query functions"""
+import math
+import sys
+import time
+from array import array
+from functools import wraps
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqleyes.detector.detector import DETECTORS
+from sqleyes.detector.scanner import Scanner
+from sqleyes.utils import query_functions
+from sqleyes.utils.parsed_query import ParsedQuery
+
+
+PERCENTILES = [50, 90, 99]
+
+# Wall times of every call, by target
+Timings = Dict[str, "array[float]"]
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    This function computes a percentile of sorted values, using the nearest
+    rank method.
+
+    Parameters:
+        values (List[float]): The values, sorted in increasing order.
+        percent (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The percentile of the values.
+    """
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(percent / 100 * len(values)))
+    return values[rank - 1]
+
+
+class Profiler:
+    """
+    This is a class that records the wall time and number of calls of the
+    check of every detector, of parsing and scanning queries and of the query
+    functions.
+
+    While the profiler is enabled, these are replaced by timed wrappers. When
+    it is disabled the originals are restored, so profiling costs nothing
+    when it is not used.
+
+    Attributes:
+        timings (Timings): The wall time of every call in seconds, by target.
+            Only the outermost call of recursive functions is recorded.
+    """
+
+    def __init__(self):
+        self.timings: Timings = {}
+        self.__patches: List[Tuple[Any, str, Any]] = []
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *args):
+        self.disable()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.__patches)
+
+    def enable(self):
+        """
+        This function starts recording, by replacing all targets by timed
+        wrappers.
+        """
+        if self.enabled:
+            return
+
+        self.__patch(ParsedQuery, "parse", "ParsedQuery")
+        self.__patch(Scanner, "scan", "Scanner.scan")
+
+        for detector in DETECTORS:
+            self.__patch(detector, "check", f"{detector.__name__}.check")
+
+        for name, function in list(vars(query_functions).items()):
+            if callable(function) and getattr(function, "__module__", None) == query_functions.__name__:
+                self.__patch_function(function, name)
+
+    def disable(self):
+        """
+        This function stops recording and restores all targets.
+        """
+        while self.__patches:
+            owner, name, original = self.__patches.pop()
+            setattr(owner, name, original)
+
+    def merge(self, timings: Timings):
+        """
+        This function adds timings recorded elsewhere, for example by another
+        process, to the timings of this profiler.
+
+        Parameters:
+            timings (Timings): The timings to add.
+        """
+        for target, samples in timings.items():
+            self.timings.setdefault(target, array("d")).extend(samples)
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        This function summarizes the recorded timings of every target.
+
+        Returns:
+            Dict[str, Dict[str, float]]: The number of calls, and the total,
+            mean, percentile and maximum wall time in seconds, by target.
+        """
+        stats = {}
+
+        for target, samples in self.timings.items():
+            values = sorted(samples)
+            total = math.fsum(values)
+            stats[target] = {
+                "calls": len(values),
+                "total": total,
+                "mean": total / len(values) if values else 0.0,
+                **{f"p{percent}": percentile(values, percent) for percent in PERCENTILES},
+                "max": values[-1] if values else 0.0,
+            }
+
+        return stats
+
+    def __wrap(self, function: Callable[..., Any], target: str) -> Callable[..., Any]:
+        samples = self.timings.setdefault(target, array("d"))
+        depth = [0]
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if depth[0]:
+                return function(*args, **kwargs)
+
+            depth[0] += 1
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+                depth[0] -= 1
+
+        return wrapper
+
+    def __patch(self, owner: Any, name: str, target: str):
+        original = vars(owner)[name]
+        self.__patches.append((owner, name, original))
+        setattr(owner, name, self.__wrap(original, target))
+
+    def __patch_function(self, function: Callable[..., Any], target: str):
+        wrapper = self.__wrap(function, target)
+
+        # Functions are also replaced where they are imported by name
+        for module_name, module in list(sys.modules.items()):
+            if not module_name.startswith("sqleyes") or module is None:
+                continue
+            for name, value in list(vars(module).items()):
+                if value is function:
+                    self.__patches.append((module, name, function))
+                    setattr(module, name, wrapper)
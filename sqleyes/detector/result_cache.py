@@ -0,0 +1,149 @@
+"""Result cache class that skips the detector for known query templates"""
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+from sqleyes.detector.detector import Detector, DetectorOptions, get_detector_set
+from sqleyes.detector.detector_output import DetectorOutput
+from sqleyes.detector.keyword_filter import KeywordFilter
+from sqleyes.utils.fingerprint import Fingerprint, fingerprint_query
+from sqleyes.utils.query_keywords import SQL_FUNCTIONS
+
+
+# Findings of a template as (representative output, normalized locations)
+CachedResult = List[Tuple[DetectorOutput, List[Tuple[int, int]]]]
+
+# The literals of a query that the results depend on
+LiteralKey = Tuple[Union[str, int], ...]
+
+# Words the query functions search the query text for, which they also find
+# within literals
+_QUERY_WORDS = KeywordFilter(["SELECT", "FROM", "UNION", "EXCEPT"] + SQL_FUNCTIONS)
+
+# Characters within a literal that change how the query functions split the
+# query text into words and columns
+_RELEVANT_CHARACTERS = re.compile(r"[^\w.@:/+%-]")
+
+
+class ResultCache:
+    """
+    This is a bounded LRU cache in front of Detector.run. Results are stored
+    by query fingerprint, so queries that only differ in literal values share
+    a single detector run. Results found with different detector options are
+    kept apart.
+
+    Detectors also read the text within literals, so literals that contain a
+    keyword of a detector or a character that splits words are part of the
+    key, and so is which of the other literals are equal to each other.
+
+    Parameters:
+        maxsize (int): The maximum number of fingerprints to keep.
+
+    Attributes:
+        maxsize (int): The maximum number of fingerprints to keep.
+        hits (int): The number of queries answered from the cache.
+        misses (int): The number of queries the detector had to run for.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.__results: "OrderedDict[Tuple[DetectorOptions, str, LiteralKey], CachedResult]" = OrderedDict()
+
+    def __len__(self):
+        return len(self.__results)
+
+    def run(self, query: str, statement_index: int = 0, offset: int = 0,
+            options: Optional[DetectorOptions] = None) -> List[DetectorOutput]:
+        """
+        This function runs the detector on a query, unless a query with the
+        same fingerprint has been analyzed before.
+
+        Parameters:
+            query (str): The query to be analyzed.
+            statement_index (int): The index of the statement within the input
+                the query was taken from.
+            offset (int): The byte offset of the statement within the input.
+            options (Optional[DetectorOptions]): The detectors to run and the
+                outputs to keep, None for defaults.
+
+        Returns:
+            List[DetectorOutput]: A list of Detector outputs of various
+            detectors.
+        """
+        options = options or DetectorOptions()
+        fingerprint = fingerprint_query(query)
+        key = (options, fingerprint.text, self.__get_literal_key(fingerprint, options))
+        cached = self.__results.get(key)
+
+        if cached is not None:
+            self.hits += 1
+            self.__results.move_to_end(key)
+            return [self.__remap(output, locations, query, fingerprint,
+                                 statement_index, offset)
+                    for output, locations in cached]
+
+        self.misses += 1
+        outputs = Detector(query, statement_index=statement_index,
+                           offset=offset, options=options).run()
+
+        result = self.__normalize(outputs, fingerprint)
+        if result is not None:
+            self.__results[key] = result
+            if len(self.__results) > self.maxsize:
+                self.__results.popitem(last=False)
+
+        return outputs
+
+    @staticmethod
+    def __get_literal_key(fingerprint: Fingerprint, options: DetectorOptions) -> "LiteralKey":
+        keyword_filter = get_detector_set(options).keyword_filter
+        key: List[Union[str, int]] = []
+        # Index of the first occurrence of every literal
+        first: Dict[str, int] = {}
+
+        for literal, listed in fingerprint.literals:
+            content = literal[1:-1] if literal[0] == "'" else literal
+            if (_RELEVANT_CHARACTERS.search(content) or keyword_filter.scan(content)
+                    or _QUERY_WORDS.scan(content)):
+                key.append(literal)
+            elif not listed:
+                # A column that is a literal counts as an operand once for
+                # every distinct value
+                key.append(first.setdefault(literal, len(first)))
+
+        return tuple(key)
+
+    @staticmethod
+    def __normalize(outputs: List[DetectorOutput],
+                    fingerprint: Fingerprint) -> Optional[CachedResult]:
+        result = []
+
+        for output in outputs:
+            locations = []
+            for location in output.locations:
+                span, exact = fingerprint.to_normalized(location)
+                if not exact:
+                    # The finding lies within a literal, so other queries with
+                    # this fingerprint may not share it
+                    return None
+                locations.append(span)
+            result.append((output, locations))
+
+        return result
+
+    @staticmethod
+    def __remap(output: DetectorOutput, locations: List[Tuple[int, int]],
+                query: str, fingerprint: Fingerprint, statement_index: int,
+                offset: int) -> DetectorOutput:
+        return DetectorOutput(query=query,
+                              certainty=output.certainty,
+                              description=None,
+                              detector_type=output.detector_type,
+                              locations=[fingerprint.to_raw(location)
+                                         for location in locations],
+                              title=output.title,
+                              type=output.type,
+                              statement_index=statement_index,
+                              offset=offset)
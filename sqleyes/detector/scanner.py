@@ -0,0 +1,133 @@
+"""Scanner class matching the patterns of all lexical detectors at once"""
+import re
+from typing import Dict, List, Optional, Pattern, Tuple
+
+
+# Locations of the matches of every rule, by rule name
+Matches = Dict[str, List[Tuple[int, int]]]
+
+_LEADING_GROUPS = re.compile(r"(?:\((?:\?:|\?P<\w+>)?)*")
+_SPECIAL = ".^$*+?{}[]\\|()"
+
+
+def _first_character(pattern: str) -> Optional[str]:
+    """
+    Returns the literal character every match of a pattern starts with, or
+    None if the pattern is too complex to tell.
+    """
+    if "|" in pattern:
+        return None
+
+    rest = _LEADING_GROUPS.sub("", pattern, count=1)
+    if not rest or rest[0] in _SPECIAL:
+        return None
+
+    if len(rest) > 1 and rest[1] in "?*{":
+        # The first character is optional
+        return None
+
+    return rest[0]
+
+
+class Scanner:
+    """
+    This is a class that compiles the patterns of many rules into a single
+    regular expression, so a query is scanned only once for all of them.
+
+    Every pattern is matched as if it were searched for on its own: matches of
+    one pattern do not overlap, but matches of different patterns may.
+
+    Parameters:
+        rules (Dict[str, List[str]]): The patterns of every rule, by rule name.
+        flags (int): The regular expression flags of all patterns.
+
+    Attributes:
+        rules (Dict[str, List[str]]): The patterns of every rule, by rule name.
+    """
+
+    def __init__(self, rules: Dict[str, List[str]], flags: int = re.IGNORECASE):
+        self.rules = rules
+
+        # Rule of every pattern, in declared order
+        self.__rules: List[str] = []
+        alternatives = []
+        first: List[Optional[str]] = []
+
+        for rule, patterns in rules.items():
+            for pattern in patterns:
+                alternatives.append("(?P<p{}>{})".format(len(self.__rules), pattern))
+                first.append(_first_character(pattern))
+                self.__rules.append(rule)
+
+        # If all matches start with one of a few characters, the regular
+        # expression engine can skip ahead to those quickly
+        characters = sorted({character for character in first if character is not None})
+        prefilter = ""
+        if first and None not in first:
+            prefilter = "(?=[{}])".format("".join(re.escape(character)
+                                                  for character in characters))
+
+        # A lookahead finds every position where a pattern matches without
+        # consuming it. It only reports the first pattern that matches, so the
+        # i-th expression is kept to try the patterns after the i-th one.
+        self.__sources = [prefilter + "(?={})".format("|".join(alternatives[index:]))
+                          for index in range(len(alternatives))]
+        self.__flags = flags
+        self.__patterns: List[Optional[Pattern[str]]] = [None] * len(alternatives)
+
+    def __get_pattern(self, index: int) -> Pattern[str]:
+        # Expressions are compiled on first use, which keeps importing the
+        # detectors fast and skips expressions that are never needed
+        pattern = self.__patterns[index]
+        if pattern is None:
+            pattern = self.__patterns[index] = re.compile(self.__sources[index], self.__flags)
+        return pattern
+
+    def compile(self):
+        """
+        This function compiles all expressions up front, for example to keep
+        a long running process from compiling them while it handles queries.
+        """
+        for index in range(len(self.__patterns)):
+            self.__get_pattern(index)
+
+    def scan(self, query: str) -> Matches:
+        """
+        This function finds the matches of all rules in a query in one pass.
+
+        Parameters:
+            query (str): The query string.
+
+        Returns:
+            Matches: The start and end location of every match, by rule name.
+            The matches of a rule are ordered by pattern, then by location.
+        """
+        count = len(self.__rules)
+        found: List[List[Tuple[int, int]]] = [[] for _ in range(count)]
+        ends = [0] * count
+
+        if count:
+            for match in self.__get_pattern(0).finditer(query):
+                position = match.start()
+
+                while True:
+                    group = str(match.lastgroup)
+                    index = int(group[1:])
+                    start, end = match.span(group)
+                    if start >= ends[index]:
+                        found[index].append((start, end))
+                        ends[index] = end
+
+                    # Later patterns may match at the same position as well
+                    if index + 1 == count:
+                        break
+                    next_match = self.__get_pattern(index + 1).match(query, position)
+                    if next_match is None:
+                        break
+                    match = next_match
+
+        matches: Matches = {rule: [] for rule in self.rules}
+        for index, rule in enumerate(self.__rules):
+            matches[rule].extend(found[index])
+
+        return matches
@@ -0,0 +1,493 @@
+"""A language server publishing the anti-patterns of SQL documents as diagnostics
+
+The server speaks the Language Server Protocol over stdin and stdout. Every
+open document keeps its statement boundaries, which are updated around each
+edit, and the results of its statements by statement text. After an edit,
+analysis waits until no edit has been made for a short while, and then only
+runs the detectors on the statements whose text is not known yet. The
+diagnostics of all statements are published together.
+"""
+import json
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from sqleyes import __version__
+from sqleyes.detector.detector import Detector
+from sqleyes.detector.detector_output import DetectorOutput
+from sqleyes.detector.result_cache import ResultCache
+from sqleyes.utils.statement_splitter import DELIMITER, StatementSplitter
+
+
+# Seconds without edits before a document is analyzed
+DEFAULT_DEBOUNCE = 0.15
+
+# Diagnostic severity of every certainty, 2 is a warning, 3 an information
+SEVERITIES = {"high": 2, "medium": 2, "low": 3}
+
+# Diagnostic severity of a statement the detectors failed on
+ERROR_SEVERITY = 1
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+
+_LINE_BREAK_PATTERN = re.compile(r"\r\n|\r|\n")
+
+_WHITESPACE = " \t\r\n\f\v"
+
+Message = Dict[str, Any]
+
+
+def _to_index(line: str, character: int) -> int:
+    # Converts a UTF-16 offset in a line into a character index
+    encoded = line.encode("utf-16-le")
+    if len(encoded) == 2 * len(line):
+        return min(character, len(line))
+    return len(encoded[:2 * character].decode("utf-16-le", "ignore"))
+
+
+class Document:
+    """
+    This is a class that holds the text of an open document, split into
+    segments that each end directly after a statement terminator. The last
+    segment holds the text after the last terminator. An edit only splits the
+    text again from the segment it starts in, up to the first boundary after
+    the edit that existed before it.
+
+    Parameters:
+        uri (str): The URI of the document.
+        text (str): The text of the document.
+        version (int): The version of the document.
+
+    Attributes:
+        uri (str): The URI of the document.
+        text (str): The text of the document.
+        version (int): The version of the document.
+        results (Dict[str, List[DetectorOutput]]): The outputs of statements
+            by statement text.
+        failures (Dict[str, str]): The error of every statement the detectors
+            failed on by statement text, such statements have no outputs.
+    """
+
+    def __init__(self, uri: str, text: str, version: int = 0):
+        self.uri = uri
+        self.text = ""
+        self.version = version
+        self.results: Dict[str, List[DetectorOutput]] = {}
+        self.failures: Dict[str, str] = {}
+        self.__ends: List[int] = [0]
+        self.__statements: List[Tuple[int, str]] = [(0, "")]
+        # The terminator after every segment, which DELIMITER commands change
+        self.__delimiters: List[str] = [DELIMITER]
+        self.__line_starts: Optional[List[int]] = None
+        self.replace(0, 0, text)
+
+    def get_statements(self) -> List[Tuple[int, str]]:
+        """
+        This function returns the statements of the document, without the
+        whitespace around them.
+
+        Returns:
+            List[Tuple[int, str]]: The offset and text of every statement.
+        """
+        return [statement for statement in self.__statements if statement[1]]
+
+    def apply_change(self, change: Message):
+        """
+        This function applies a change of a didChange notification.
+
+        Parameters:
+            change (Message): A change with a range and the new text of the
+                range, or without a range to replace the whole text.
+        """
+        if "range" not in change:
+            self.replace(0, len(self.text), change["text"])
+            return
+
+        start = self.get_offset(change["range"]["start"])
+        end = self.get_offset(change["range"]["end"])
+        self.replace(start, max(start, end), change["text"])
+
+    def replace(self, start: int, end: int, text: str):
+        """
+        This function replaces part of the document and finds the statement
+        boundaries around it again.
+
+        Parameters:
+            start (int): The offset of the first replaced character.
+            end (int): The offset after the last replaced character.
+            text (str): The new text of the range.
+        """
+        self.text = self.text[:start] + text + self.text[end:]
+        self.__line_starts = None
+
+        delta = len(text) - (end - start)
+        edit_end = start + len(text)
+        ends, statements, delimiters = self.__ends, self.__statements, self.__delimiters
+
+        # Split again from the start of the segment the edit starts in, or
+        # ends at, since a DELIMITER command at the end of the text continues
+        # on the same line. The scanner is outside quotes and comments at
+        # every segment boundary.
+        index = min(bisect_left(ends, start), len(ends) - 1)
+        pos = ends[index - 1] if index > 0 else 0
+        new_ends, new_statements = ends[:index], statements[:index]
+        new_delimiters = delimiters[:index]
+        splitter = StatementSplitter(delimiters[index - 1] if index > 0 else DELIMITER)
+
+        while True:
+            segment_start = pos
+            boundary, pos = splitter.find_boundary(self.text, pos, True)
+            if boundary is None:
+                # The last segment, after the last terminator
+                new_ends.append(len(self.text))
+                new_statements.append(self.__strip(segment_start, len(self.text), splitter))
+                new_delimiters.append(splitter.delimiter)
+                break
+
+            new_ends.append(boundary)
+            new_statements.append(self.__strip(segment_start, boundary, splitter))
+            new_delimiters.append(splitter.delimiter)
+
+            if boundary >= edit_end:
+                # The rest of the text is unchanged after a boundary that
+                # existed before with the same terminator, so are its segments
+                old = bisect_left(ends, boundary - delta, index)
+                if (old < len(ends) - 1 and ends[old] == boundary - delta
+                        and delimiters[old] == splitter.delimiter):
+                    new_ends.extend(end + delta for end in ends[old + 1:])
+                    new_statements.extend((offset + delta, statement)
+                                          for offset, statement in statements[old + 1:])
+                    new_delimiters.extend(delimiters[old + 1:])
+                    break
+
+        self.__ends, self.__statements = new_ends, new_statements
+        self.__delimiters = new_delimiters
+
+    def get_offset(self, position: Message) -> int:
+        """
+        This function converts a position of the protocol into an offset.
+
+        Parameters:
+            position (Message): A line and a UTF-16 character offset in the
+                line, both starting at 0.
+
+        Returns:
+            int: The offset in the text.
+        """
+        line_starts = self.__get_line_starts()
+        line = position["line"]
+        if line >= len(line_starts):
+            return len(self.text)
+
+        start = line_starts[line]
+        end = line_starts[line + 1] if line + 1 < len(line_starts) else len(self.text)
+        return start + _to_index(self.text[start:end].rstrip("\r\n"), position["character"])
+
+    def get_position(self, offset: int) -> Message:
+        """
+        This function converts an offset into a position of the protocol.
+
+        Parameters:
+            offset (int): The offset in the text.
+
+        Returns:
+            Message: The line and UTF-16 character offset in the line.
+        """
+        line_starts = self.__get_line_starts()
+        line = bisect_right(line_starts, offset) - 1
+        prefix = self.text[line_starts[line]:offset]
+        return {"line": line, "character": len(prefix.encode("utf-16-le")) // 2}
+
+    def get_diagnostics(self) -> List[Message]:
+        """
+        This function creates the diagnostics of the document from the
+        results of its statements. Outputs without a location get a
+        diagnostic at the start of their statement, as do statements the
+        detectors failed on.
+
+        Returns:
+            List[Message]: The diagnostics of the document.
+        """
+        diagnostics = []
+
+        for offset, statement in self.get_statements():
+            error = self.failures.get(statement)
+            if error is not None:
+                diagnostics.append({
+                    "range": {"start": self.get_position(offset),
+                              "end": self.get_position(offset)},
+                    "severity": ERROR_SEVERITY,
+                    "source": "sqleyes",
+                    "message": f"Could not analyze the statement: {error}",
+                })
+
+            for output in self.results.get(statement, []):
+                for start, end in output.locations or [(0, 0)]:
+                    diagnostics.append({
+                        "range": {"start": self.get_position(offset + start),
+                                  "end": self.get_position(offset + end)},
+                        "severity": SEVERITIES[output.certainty],
+                        "code": output.type,
+                        "source": "sqleyes",
+                        "message": output.title,
+                    })
+
+        return diagnostics
+
+    def __strip(self, start: int, end: int, splitter: StatementSplitter) -> Tuple[int, str]:
+        if splitter.command:
+            # A DELIMITER command is not a statement
+            return start, ""
+
+        segment = self.text[start:end]
+        statement = segment.strip(_WHITESPACE)
+        if splitter.delimiter != DELIMITER and statement.endswith(splitter.delimiter):
+            statement = statement[:-len(splitter.delimiter)].rstrip(_WHITESPACE)
+        return start + len(segment) - len(segment.lstrip(_WHITESPACE)), statement
+
+    def __get_line_starts(self) -> List[int]:
+        if self.__line_starts is None:
+            self.__line_starts = [0] + [match.end() for match in
+                                        _LINE_BREAK_PATTERN.finditer(self.text)]
+        return self.__line_starts
+
+
+class LanguageServer:
+    """
+    This is a class that serves the Language Server Protocol on a pair of
+    binary streams. Messages are read on the calling thread, documents are
+    analyzed on a separate thread.
+
+    Parameters:
+        reader (BinaryIO): The stream messages are read from.
+        writer (BinaryIO): The stream messages are written to.
+        debounce (float): The number of seconds without edits before a
+            document is analyzed.
+        cache_size (int): The number of query fingerprints to cache results
+            for across documents, 0 disables the cache.
+
+    Attributes:
+        documents (Dict[str, Document]): The open documents by URI.
+        analyzed (int): The number of statements the detectors ran on.
+    """
+
+    def __init__(self, reader: BinaryIO, writer: BinaryIO,
+                 debounce: float = DEFAULT_DEBOUNCE, cache_size: int = 0):
+        self.documents: Dict[str, Document] = {}
+        self.analyzed = 0
+        self.__reader = reader
+        self.__writer = writer
+        self.__debounce = debounce
+        self.__cache = ResultCache(cache_size) if cache_size > 0 else None
+        self.__write_lock = threading.Lock()
+        self.__condition = threading.Condition()
+        # Time every document with unanalyzed edits is due to be analyzed
+        self.__due: Dict[str, float] = {}
+        self.__shutdown = False
+        self.__stopped = False
+
+    def serve(self) -> int:
+        """
+        This function handles messages until the client sends exit or closes
+        the stream.
+
+        Returns:
+            int: The exit code, 0 if the client asked to shut down first.
+        """
+        from sqleyes.server import warm_up
+        warm_up()
+
+        worker = threading.Thread(target=self.__analyze_documents, daemon=True)
+        worker.start()
+
+        try:
+            while True:
+                try:
+                    message = self.read_message()
+                except ValueError as error:
+                    self.__send({"id": None, "error": {"code": PARSE_ERROR, "message": str(error)}})
+                    continue
+
+                if message is None or message.get("method") == "exit":
+                    break
+
+                try:
+                    self.handle(message)
+                except (KeyError, TypeError, AttributeError) as error:
+                    if "id" in message:
+                        self.__send({"id": message["id"], "error": {
+                            "code": INVALID_PARAMS, "message": f"Invalid params: {error!r}"}})
+        finally:
+            with self.__condition:
+                self.__stopped = True
+                self.__condition.notify()
+            worker.join()
+
+        return 0 if self.__shutdown else 1
+
+    def read_message(self) -> Optional[Message]:
+        """
+        This function reads a message, preceded by its headers.
+
+        Returns:
+            Optional[Message]: The message, None at the end of the stream.
+
+        Raises:
+            ValueError: If the message is not valid JSON.
+        """
+        length = None
+        while True:
+            line = self.__reader.readline()
+            if not line:
+                return None
+            line = line.strip()
+            if not line:
+                if length is not None:
+                    break
+                continue
+            name, _, value = line.decode("ascii", "replace").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+
+        body = self.__reader.read(length)
+        try:
+            message = json.loads(body.decode("utf-8"))
+        except ValueError as error:
+            raise ValueError(f"Invalid JSON: {error}")
+
+        if not isinstance(message, dict):
+            raise ValueError("Message must be a JSON object")
+
+        return message
+
+    def handle(self, message: Message):
+        """
+        This function handles a request or notification.
+
+        Parameters:
+            message (Message): The message.
+        """
+        method = message.get("method")
+        params = message.get("params") or {}
+
+        if method == "initialize":
+            self.__respond(message, {
+                "capabilities": {"textDocumentSync": {"openClose": True, "change": 2}},
+                "serverInfo": {"name": "sqleyes", "version": __version__},
+            })
+        elif method == "shutdown":
+            self.__shutdown = True
+            self.__respond(message, None)
+        elif method == "textDocument/didOpen":
+            document = params["textDocument"]
+            with self.__condition:
+                self.documents[document["uri"]] = Document(document["uri"], document["text"],
+                                                           document.get("version", 0))
+                self.__schedule(document["uri"], 0.0)
+        elif method == "textDocument/didChange":
+            uri = params["textDocument"]["uri"]
+            with self.__condition:
+                document = self.documents.get(uri)
+                if document is None:
+                    return
+                for change in params["contentChanges"]:
+                    document.apply_change(change)
+                document.version = params["textDocument"].get("version", document.version + 1)
+                self.__schedule(uri, self.__debounce)
+        elif method == "textDocument/didClose":
+            uri = params["textDocument"]["uri"]
+            with self.__condition:
+                self.documents.pop(uri, None)
+                self.__due.pop(uri, None)
+            self.__notify("textDocument/publishDiagnostics", {"uri": uri, "diagnostics": []})
+        elif "id" in message:
+            self.__send({"id": message["id"], "error": {
+                "code": METHOD_NOT_FOUND if method is not None else INVALID_REQUEST,
+                "message": f"Unsupported method: {method}"}})
+
+    def __schedule(self, uri: str, delay: float):
+        # Called with the condition held, a newer edit postpones the analysis
+        self.__due[uri] = time.monotonic() + delay
+        self.__condition.notify()
+
+    def __analyze_documents(self):
+        while True:
+            with self.__condition:
+                while not self.__stopped:
+                    now = time.monotonic()
+                    due = [(at, uri) for uri, at in self.__due.items() if at <= now]
+                    if due:
+                        break
+                    timeout = min(self.__due.values()) - now if self.__due else None
+                    self.__condition.wait(timeout)
+
+                if self.__stopped:
+                    return
+
+                uri = min(due)[1]
+                del self.__due[uri]
+                document = self.documents[uri]
+                version = document.version
+                statements = document.get_statements()
+                known = document.results
+                known_failures = document.failures
+
+            results: Dict[str, List[DetectorOutput]] = {}
+            failures: Dict[str, str] = {}
+            complete = True
+            for _, statement in statements:
+                outputs = known.get(statement, results.get(statement))
+                if outputs is None:
+                    if document.version != version:
+                        # Edited meanwhile, the next analysis continues here
+                        complete = False
+                        break
+                    try:
+                        outputs = self.__analyze(statement)
+                    except Exception as error:
+                        # A statement the detectors fail on gets an error
+                        # diagnostic, and does not stop the analysis
+                        outputs = []
+                        failures[statement] = f"{type(error).__name__}: {error}"
+                elif statement in known_failures:
+                    failures[statement] = known_failures[statement]
+                results[statement] = outputs
+
+            with self.__condition:
+                if self.documents.get(uri) is not document:
+                    continue
+                if not complete or document.version != version:
+                    document.results = {**known, **results}
+                    document.failures = {**known_failures, **failures}
+                    continue
+                # Only the results of current statements are kept
+                document.results = results
+                document.failures = failures
+                diagnostics = document.get_diagnostics()
+
+            self.__notify("textDocument/publishDiagnostics",
+                          {"uri": uri, "version": version, "diagnostics": diagnostics})
+
+    def __analyze(self, statement: str) -> List[DetectorOutput]:
+        self.analyzed += 1
+        if self.__cache is not None:
+            return self.__cache.run(statement)
+        return Detector(statement).run()
+
+    def __respond(self, request: Message, result: Any):
+        self.__send({"id": request.get("id"), "result": result})
+
+    def __notify(self, method: str, params: Message):
+        self.__send({"method": method, "params": params})
+
+    def __send(self, message: Message):
+        body = json.dumps(dict(message, jsonrpc="2.0")).encode("utf-8")
+        with self.__write_lock:
+            self.__writer.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+            self.__writer.flush()
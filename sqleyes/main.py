@@ -1,6 +1,43 @@
 """A Python CLI tool for detecting anti-patterns in raw SQL queries"""
+import os
+import time
+from collections import deque
+from itertools import islice
+from typing import (TYPE_CHECKING, BinaryIO, Callable, Deque, Dict, Iterable,
+                    Iterator, List, Optional, Set, Tuple, Union)
 
-from sqleyes.detector.detector import Detector
+from sqleyes.detector.detector import Detector, DetectorOptions
+from sqleyes.detector.detector_output import DetectorOutput
+from sqleyes.utils.statement_splitter import Statement, split_statements
+
+if TYPE_CHECKING:
+    from sqleyes.detector.disk_cache import DiskCache
+    from sqleyes.detector.profiler import Profiler, Timings
+    from sqleyes.detector.result_cache import ResultCache
+
+
+# Chunks are sized so that a worker spends roughly this long on each chunk,
+# which keeps the pickling overhead per statement low
+TARGET_CHUNK_SECONDS = 0.05
+MAX_CHUNK_SIZE = 1024
+
+_worker_cache: Optional["ResultCache"] = None
+_worker_profiler: Optional["Profiler"] = None
+
+# Outputs, errors by position in the chunk, elapsed time, cache hits, cache
+# misses and profiler timings
+ChunkResult = Tuple[List[List[DetectorOutput]], Dict[int, str], float, int, int, Optional["Timings"]]
+
+# Path, number of statements, statements with outputs, the error that kept
+# the file from being scanned and the statements the detector failed on
+PythonFileResult = Tuple[str, int, List[Tuple[Statement, List[DetectorOutput]]], Optional[str],
+                         List[Tuple[Statement, str]]]
+
+# Called with every statement the detector failed on and the error
+ErrorHandler = Callable[[Statement, str], None]
+
+# Python files sent to a worker at once
+PYTHON_CHUNK_SIZE = 32
 
 
 def main(query: str):
@@ -14,3 +51,422 @@ def main(query: str):
         dict: A dictionary of detected anti-patterns.
     """
     return Detector(query).run()
+
+
+def analyze_stream(stream: BinaryIO, workers: int = 1,
+                   cache: Optional["ResultCache"] = None,
+                   disk_cache: Optional["DiskCache"] = None,
+                   profiler: Optional["Profiler"] = None,
+                   options: Optional[DetectorOptions] = None,
+                   on_error: Optional[ErrorHandler] = None) -> Iterator[List[DetectorOutput]]:
+    """
+    This function splits a stream of SQL into statements and runs the detector
+    on every statement, one statement at a time.
+
+    Parameters:
+        stream (BinaryIO): A binary stream of SQL statements.
+        workers (int): The number of processes to analyze statements with.
+        cache (Optional[ResultCache]): A cache of results by fingerprint.
+        disk_cache (Optional[DiskCache]): A cache of results kept across runs.
+        profiler (Optional[Profiler]): A profiler to record timings with.
+        options (Optional[DetectorOptions]): The detectors to run and the
+            outputs to keep, None for defaults.
+        on_error (Optional[ErrorHandler]): Called with every statement the
+            detector fails on and the error, the statement gets no outputs.
+
+    Returns:
+        Iterator[List[DetectorOutput]]: The detected anti-patterns of every
+        statement, in order of the statements.
+    """
+    return analyze_many(split_statements(stream), workers=workers, cache=cache,
+                        disk_cache=disk_cache, profiler=profiler, options=options,
+                        on_error=on_error)
+
+
+def _analyze_statement(statement: Statement, cache: Optional["ResultCache"],
+                       options: Optional[DetectorOptions] = None) -> List[DetectorOutput]:
+    if cache is not None:
+        return cache.run(statement.text, statement_index=statement.index,
+                         offset=statement.offset, options=options)
+
+    return Detector(statement.text, statement_index=statement.index,
+                    offset=statement.offset, options=options).run()
+
+
+def _try_analyze_statement(statement: Statement, cache: Optional["ResultCache"],
+                           options: Optional[DetectorOptions] = None) -> Tuple[List[DetectorOutput], Optional[str]]:
+    # A statement the detector fails on gets no outputs, so that it does not
+    # stop the analysis of the other statements
+    try:
+        return _analyze_statement(statement, cache, options), None
+    except Exception as error:
+        return [], f"{type(error).__name__}: {error}"
+
+
+def _lookup_chunk(statements: List[Statement], disk_cache: Optional["DiskCache"],
+                  options: Optional[DetectorOptions] = None) -> List[Optional[List[DetectorOutput]]]:
+    if disk_cache is None:
+        return [None] * len(statements)
+
+    return [disk_cache.get(statement.text, statement_index=statement.index,
+                           offset=statement.offset, options=options)
+            for statement in statements]
+
+
+def _analyze_chunk(statements: List[Statement], cache_size: int,
+                   profile: bool, options: Optional[DetectorOptions] = None) -> ChunkResult:
+    global _worker_cache, _worker_profiler
+
+    if cache_size and _worker_cache is None:
+        from sqleyes.detector.result_cache import ResultCache
+        _worker_cache = ResultCache(cache_size)
+
+    if profile and _worker_profiler is None:
+        from sqleyes.detector.profiler import Profiler
+        _worker_profiler = Profiler()
+
+    hits = _worker_cache.hits if _worker_cache else 0
+    misses = _worker_cache.misses if _worker_cache else 0
+
+    if profile and _worker_profiler is not None:
+        _worker_profiler.timings = {}
+        _worker_profiler.enable()
+
+    outputs: List[List[DetectorOutput]] = []
+    errors: Dict[int, str] = {}
+    try:
+        start = time.perf_counter()
+        for position, statement in enumerate(statements):
+            found, error = _try_analyze_statement(statement, _worker_cache, options)
+            outputs.append(found)
+            if error is not None:
+                errors[position] = error
+        elapsed = time.perf_counter() - start
+    finally:
+        if _worker_profiler is not None:
+            _worker_profiler.disable()
+
+    timings = _worker_profiler.timings if profile and _worker_profiler is not None else None
+
+    if _worker_cache is None:
+        return outputs, errors, elapsed, 0, 0, timings
+
+    return outputs, errors, elapsed, _worker_cache.hits - hits, _worker_cache.misses - misses, timings
+
+
+def analyze_many(queries: Iterable[Union[str, Statement]],
+                 workers: Optional[int] = None,
+                 chunksize: Optional[int] = None,
+                 ordered: bool = True,
+                 cache: Optional["ResultCache"] = None,
+                 disk_cache: Optional["DiskCache"] = None,
+                 profiler: Optional["Profiler"] = None,
+                 options: Optional[DetectorOptions] = None,
+                 on_error: Optional[ErrorHandler] = None) -> Iterator[List[DetectorOutput]]:
+    """
+    This function runs the detector on many queries, spread over a pool of
+    worker processes. Queries are sent to the workers in chunks. A query the
+    detector fails on gets no outputs, and the other queries are still
+    analyzed.
+
+    Parameters:
+        queries (Iterable[Union[str, Statement]]): The queries to analyze.
+            Plain strings get their position in the iterable as statement
+            index.
+        workers (Optional[int]): The number of worker processes, defaults to
+            the number of CPUs. With 1 worker, no pool is used at all.
+        chunksize (Optional[int]): The number of queries sent to a worker at
+            once. By default it is tuned while running.
+        ordered (bool): If True, results are returned in input order,
+            otherwise as soon as their chunk is analyzed.
+        cache (Optional[ResultCache]): A cache of results by fingerprint.
+            With more than 1 worker, every worker keeps a cache of the same
+            size, and the hits and misses of all workers are added to it.
+        disk_cache (Optional[DiskCache]): A cache of results kept across runs.
+            It is only used by this process, so workers only get the queries
+            that are not in it.
+        profiler (Optional[Profiler]): A profiler to record timings with.
+            With more than 1 worker, the timings of all workers are added to
+            it.
+        options (Optional[DetectorOptions]): The detectors to run and the
+            outputs to keep, None for defaults.
+        on_error (Optional[ErrorHandler]): Called with every statement the
+            detector fails on and the error, right before its (empty) outputs
+            are returned. Failed statements are not kept in the disk cache.
+
+    Returns:
+        Iterator[List[DetectorOutput]]: The detected anti-patterns of every
+        query. Closing the iterator early, for example at the first
+        anti-pattern found, stops reading queries and cancels the chunks
+        that have not started.
+    """
+    statements = (query if isinstance(query, Statement) else Statement(index, 0, query)
+                  for index, query in enumerate(queries))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1:
+        for statement in statements:
+            found = _lookup_chunk([statement], disk_cache, options)[0]
+            if found is None:
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    found, error = _try_analyze_statement(statement, cache, options)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+                if error is not None:
+                    if on_error is not None:
+                        on_error(statement, error)
+                elif disk_cache is not None:
+                    disk_cache.put(statement.text, found, options)
+            yield found
+        return
+
+    size = chunksize or 1
+    max_pending = workers * 2
+    cache_size = cache.maxsize if cache is not None else 0
+
+    # Only imported when a pool is used, since it is slow to import
+    from concurrent.futures import (FIRST_COMPLETED, Future,
+                                    ProcessPoolExecutor, wait)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        ordered_pending: Deque["Future[ChunkResult]"] = deque()
+        unordered_pending: Set["Future[ChunkResult]"] = set()
+        # Chunk and disk cache results of every pending future
+        chunks: Dict["Future[ChunkResult]", Tuple[List[Statement], List[Optional[List[DetectorOutput]]]]] = {}
+        exhausted = False
+
+        try:
+            while True:
+                while not exhausted and len(ordered_pending) + len(unordered_pending) < max_pending:
+                    chunk = list(islice(statements, size))
+                    if not chunk:
+                        exhausted = True
+                        break
+
+                    cached = _lookup_chunk(chunk, disk_cache, options)
+                    missing = [statement for statement, outputs in zip(chunk, cached)
+                               if outputs is None]
+
+                    if missing:
+                        future = executor.submit(_analyze_chunk, missing, cache_size,
+                                                 profiler is not None, options)
+                    else:
+                        future = Future()
+                        future.set_result(([], {}, 0.0, 0, 0, None))
+
+                    chunks[future] = (chunk, cached)
+                    if ordered:
+                        ordered_pending.append(future)
+                    else:
+                        unordered_pending.add(future)
+
+                if ordered and ordered_pending:
+                    done = [ordered_pending.popleft()]
+                elif not ordered and unordered_pending:
+                    done_set, unordered_pending = wait(unordered_pending,
+                                                       return_when=FIRST_COMPLETED)
+                    done = list(done_set)
+                else:
+                    return
+
+                for future in done:
+                    chunk, cached = chunks.pop(future)
+                    outputs, errors, elapsed, hits, misses, timings = future.result()
+
+                    if cache is not None:
+                        cache.hits += hits
+                        cache.misses += misses
+
+                    if profiler is not None and timings is not None:
+                        profiler.merge(timings)
+
+                    if chunksize is None and elapsed > 0:
+                        per_statement = elapsed / len(outputs)
+                        size = max(1, min(MAX_CHUNK_SIZE,
+                                          int(TARGET_CHUNK_SECONDS / per_statement)))
+
+                    position = 0
+                    for statement, result in zip(chunk, cached):
+                        if result is None:
+                            result = outputs[position]
+                            error = errors.get(position)
+                            position += 1
+                            if error is not None:
+                                if on_error is not None:
+                                    on_error(statement, error)
+                            elif disk_cache is not None:
+                                disk_cache.put(statement.text, result, options)
+                        yield result
+        finally:
+            for future in list(ordered_pending) + list(unordered_pending):
+                future.cancel()
+
+
+def analyze_diff(revision_range: str, suffixes: Tuple[str, ...] = (".sql",),
+                 cwd: Optional[str] = None, workers: int = 1,
+                 cache: Optional["ResultCache"] = None,
+                 disk_cache: Optional["DiskCache"] = None,
+                 profiler: Optional["Profiler"] = None,
+                 options: Optional[DetectorOptions] = None,
+                 on_error: Optional[Callable[[str, Statement, str], None]] = None
+                 ) -> Iterator[Tuple[str, Statement, List[DetectorOutput]]]:
+    """
+    This function runs the detector on the statements that a git revision
+    range changes. Only the changed files are read, and only the statements
+    that overlap a changed line are analyzed, so the time spent grows with
+    the size of the diff rather than the size of the repository.
+
+    Parameters:
+        revision_range (str): A range such as main..HEAD, or a single
+            revision to compare the working tree with.
+        suffixes (Tuple[str, ...]): The extensions of the SQL files.
+        cwd (Optional[str]): A directory in the repository.
+        workers (int): The number of processes to analyze statements with.
+        cache (Optional[ResultCache]): A cache of results by fingerprint.
+        disk_cache (Optional[DiskCache]): A cache of results kept across runs.
+        profiler (Optional[Profiler]): A profiler to record timings with.
+        options (Optional[DetectorOptions]): The detectors to run and the
+            outputs to keep, None for defaults.
+        on_error (Optional[Callable[[str, Statement, str], None]]): Called
+            with the path, the statement and the error of every statement the
+            detector fails on, the statement gets no outputs.
+
+    Returns:
+        Iterator[Tuple[str, Statement, List[DetectorOutput]]]: The path
+        relative to the top of the repository, the statement and the
+        detected anti-patterns of every changed statement.
+
+    Raises:
+        RuntimeError: If git fails, for example on an unknown revision.
+    """
+    import io
+
+    from sqleyes.utils.git_diff import (get_changed_lines, get_head_revision,
+                                        read_files, select_statements)
+
+    changes = get_changed_lines(revision_range, suffixes, cwd)
+    changed: List[Tuple[str, Statement]] = []
+    for path, data in read_files(get_head_revision(revision_range), changes, cwd):
+        for statement in select_statements(split_statements(io.BytesIO(data)), changes[path]):
+            changed.append((path, statement))
+
+    # Statements are only numbered within their file
+    paths = {id(statement): path for path, statement in changed}
+
+    def fail(statement: Statement, error: str):
+        if on_error is not None:
+            on_error(paths[id(statement)], statement, error)
+
+    outputs = analyze_many((statement for _, statement in changed), workers=workers,
+                           cache=cache, disk_cache=disk_cache, profiler=profiler,
+                           options=options, on_error=fail)
+    for (path, statement), output in zip(changed, outputs):
+        yield path, statement, output
+
+
+def _analyze_python_file(path: str, cache: Optional["ResultCache"]) -> PythonFileResult:
+    from sqleyes.utils.python_source import (decode_source,
+                                             extract_statements,
+                                             may_contain_queries)
+
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+        if not may_contain_queries(data):
+            return path, 0, [], None, []
+        statements = extract_statements(decode_source(data))
+    except (OSError, SyntaxError, ValueError, RecursionError) as error:
+        return path, 0, [], f"{type(error).__name__}: {error}", []
+
+    found: List[Tuple[Statement, List[DetectorOutput]]] = []
+    failed: List[Tuple[Statement, str]] = []
+    for statement in statements:
+        outputs, message = _try_analyze_statement(statement, cache)
+        if message is not None:
+            failed.append((statement, message))
+        elif outputs:
+            found.append((statement, outputs))
+
+    return path, len(statements), found, None, failed
+
+
+def _analyze_python_chunk(paths: List[str], cache_size: int) -> Tuple[List[PythonFileResult], int, int]:
+    global _worker_cache
+
+    if cache_size and _worker_cache is None:
+        from sqleyes.detector.result_cache import ResultCache
+        _worker_cache = ResultCache(cache_size)
+
+    hits = _worker_cache.hits if _worker_cache else 0
+    misses = _worker_cache.misses if _worker_cache else 0
+
+    results = [_analyze_python_file(path, _worker_cache) for path in paths]
+
+    if _worker_cache is None:
+        return results, 0, 0
+
+    return results, _worker_cache.hits - hits, _worker_cache.misses - misses
+
+
+def analyze_python_files(paths: Iterable[str], workers: Optional[int] = None,
+                         cache: Optional["ResultCache"] = None) -> Iterator[PythonFileResult]:
+    """
+    This function runs the detector on the queries in Python source files,
+    spread over a pool of worker processes. Files are sent to the workers in
+    chunks, and only the statements with outputs are sent back.
+
+    Parameters:
+        paths (Iterable[str]): The paths of the Python files.
+        workers (Optional[int]): The number of worker processes, defaults to
+            the number of CPUs. With 1 worker, no pool is used at all.
+        cache (Optional[ResultCache]): A cache of results by fingerprint.
+            With more than 1 worker, every worker keeps a cache of the same
+            size, and the hits and misses of all workers are added to it.
+
+    Returns:
+        Iterator[PythonFileResult]: The path of every file, its number of
+        statements, its statements with outputs, the error that kept it
+        from being scanned and the statements the detector failed on with
+        their errors, in order of the paths.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1:
+        for path in paths:
+            yield _analyze_python_file(path, cache)
+        return
+
+    paths = iter(paths)
+    cache_size = cache.maxsize if cache is not None else 0
+
+    from concurrent.futures import Future, ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Deque["Future[Tuple[List[PythonFileResult], int, int]]"] = deque()
+
+        try:
+            while True:
+                while len(pending) < workers * 2:
+                    chunk = list(islice(paths, PYTHON_CHUNK_SIZE))
+                    if not chunk:
+                        break
+                    pending.append(executor.submit(_analyze_python_chunk, chunk, cache_size))
+
+                if not pending:
+                    return
+
+                results, hits, misses = pending.popleft().result()
+                if cache is not None:
+                    cache.hits += hits
+                    cache.misses += misses
+
+                yield from results
+        finally:
+            for future in pending:
+                future.cancel()
@@ -1,14 +1,18 @@
 from abc import ABC, abstractmethod
 import json
-from typing import List
-import pkg_resources
-import sqlparse
-from rich.console import Console
-from rich.markdown import Markdown
+from typing import TYPE_CHECKING, List
+from rich import box
+from rich.console import Console, Group
 from rich.padding import Padding
 from rich.table import Table
+from sqleyes import __version__
 from sqleyes.detector.detector_output import DetectorOutput
 
+if TYPE_CHECKING:
+    from sqleyes.detector.cost_report import CostReport
+    from sqleyes.detector.manifest import Manifest
+    from sqleyes.detector.profiler import Profiler
+
 
 class AbstractPrinter(ABC):
     """
@@ -34,22 +38,30 @@ class AbstractPrinter(ABC):
 class IntroPrinter(AbstractPrinter):
     def __init__(self, input_query):
         super().__init__()
-        self.input_query = sqlparse.format(input_query, reindent=True,
-                                           keyword_case='upper')
+        self.raw_input_query = input_query
+
+    @property
+    def input_query(self):
+        # Formatting parses the query, so it is only done when it is used
+        import sqlparse
+        return sqlparse.format(self.raw_input_query, reindent=True,
+                               keyword_case='upper')
 
     def print(self):
-        self.console.print(f"[bold cyan]SQLEyes v{pkg_resources.require('sqleyes')[0].version}[/bold cyan]")
+        self.console.print(f"[bold cyan]SQLEyes v{__version__}[/bold cyan]")
         self.console.print()
 
 
 class OutputPrinter(AbstractPrinter):
-    def __init__(self, detector_output: List[DetectorOutput]):
+    def __init__(self, detector_output: List[DetectorOutput],
+                 source: str = "the given query"):
         super().__init__()
         self.detector_output = detector_output
+        self.source = source
 
     def print_summary(self):
         table = Table(
-            title=f"""[bold cyan]Summary of analysis[/bold cyan] \nFound {len(self.detector_output)} errors in the given query""",
+            title=f"""[bold cyan]Summary of analysis[/bold cyan] \nFound {len(self.detector_output)} errors in {self.source}""",
             title_justify="left")
 
         table.add_column("Error", justify="right", style="cyan", no_wrap=True)
@@ -70,6 +82,9 @@ class OutputPrinter(AbstractPrinter):
         self.console.print("-" * 10)
 
     def print_descriptions(self):
+        # Markdown is slow to import and only needed for descriptions
+        from rich.markdown import Markdown
+
         self.console.print("[bold cyan]Detailed descriptions of found errors[/bold cyan]")
 
         self.print_line()
@@ -79,25 +94,165 @@ class OutputPrinter(AbstractPrinter):
             title = output["title"]
             locations = str(output["locations"]).replace("[", "").replace("]", "")
             location_snippets = json.loads(output["location_snippets"])
-            filename = output["type"].replace(" ", "_").replace("'", "").lower()
 
-            with open(pkg_resources.resource_filename("sqleyes.definitions", f"antipatterns/{filename}.md"), "r+") as definition:
-                self.console.print()
-                self.console.print(f"[bold red]type[/bold red]: {type}")
-                self.console.print(f"[bold red]title[/bold red]: {title}")
+            self.console.print()
+            self.console.print(f"[bold red]type[/bold red]: {type}")
+            self.console.print(f"[bold red]title[/bold red]: {title}")
 
-                if locations:
-                    self.console.print(f"[bold red]location(s)[/bold red]: {locations}")
+            if locations:
+                self.console.print(f"[bold red]location(s)[/bold red]: {locations}")
 
-                for snippet in location_snippets:
-                    self.console.print(Padding(snippet, (2, 2, 1, 2)))
+            for snippet in location_snippets:
+                self.console.print(Padding(snippet, (2, 2, 1, 2)))
 
-                self.console.print("[bold red]description[/bold red]:")
-                self.console.print(Padding(Markdown(definition.read()), (1, 2)))
-                self.print_line()
+            self.console.print("[bold red]description[/bold red]:")
+            self.console.print(Padding(Markdown(output.description), (1, 2)))
+            self.print_line()
 
     def print(self, descriptions=False):
         self.print_summary()
         if descriptions and len(self.detector_output) != 0:
             self.console.print()
             self.print_descriptions()
+
+
+class ProfilePrinter(AbstractPrinter):
+    def __init__(self, profiler: "Profiler", stderr: bool = False):
+        super().__init__()
+        self.profiler = profiler
+        if stderr:
+            self.console = Console(stderr=True)
+
+    def print(self):
+        table = Table(title="[bold cyan]Profile of analysis[/bold cyan] \nWall times in milliseconds",
+                      title_justify="left", box=box.SIMPLE_HEAD)
+
+        # Timings are never cut off, long target names are wrapped instead
+        table.add_column("Target", style="cyan", overflow="fold")
+        table.add_column("Calls", justify="right", no_wrap=True)
+        for column in ["Total", "Mean", "p50", "p90", "p99", "Max"]:
+            table.add_column(column, justify="right", no_wrap=True)
+
+        stats = self.profiler.get_stats()
+        for target in sorted(stats, key=lambda target: -stats[target]["total"]):
+            if not stats[target]["calls"]:
+                continue
+            row = stats[target]
+            table.add_row(target, str(int(row["calls"])),
+                          *[f"{row[key] * 1000:.3f}" for key in
+                            ["total", "mean", "p50", "p90", "p99", "max"]])
+
+        self.console.print()
+        self.console.print(table)
+
+
+class CostPrinter(AbstractPrinter):
+    def __init__(self, report: "CostReport", top: int = 10):
+        super().__init__()
+        self.report = report
+        self.top = top
+
+    def __share(self, seconds: float) -> str:
+        if not self.report.total_time:
+            return "0.0%"
+        return f"{seconds / self.report.total_time * 100:.1f}%"
+
+    def print_anti_patterns(self):
+        report = self.report
+        table = Table(
+            title=f"""[bold cyan]Anti-patterns by database time[/bold cyan] \nAnalyzed {report.executions} executions of {len(report.queries)} queries, """
+                  f"""taking {report.total_time:.3f} seconds""",
+            title_justify="left")
+
+        table.add_column("Type", style="red")
+        table.add_column("Title", style="red")
+        table.add_column("Time (s)", justify="right", style="green")
+        table.add_column("Share", justify="right", style="green")
+        table.add_column("Executions", justify="right")
+        table.add_column("Queries", justify="right")
+
+        for anti_pattern in self.report.get_anti_patterns():
+            table.add_row(anti_pattern.type,
+                          anti_pattern.title,
+                          f"{anti_pattern.total_time:.3f}",
+                          self.__share(anti_pattern.total_time),
+                          str(anti_pattern.executions),
+                          str(len(anti_pattern.queries)))
+
+        self.console.print(table)
+
+    def print_queries(self):
+        table = Table(title=f"[bold cyan]Top {self.top} queries by database time[/bold cyan]",
+                      title_justify="left")
+
+        table.add_column("Query", overflow="fold")
+        table.add_column("Time (s)", justify="right", style="green", no_wrap=True)
+        table.add_column("Share", justify="right", style="green", no_wrap=True)
+        table.add_column("Executions", justify="right", no_wrap=True)
+        table.add_column("Rows examined", justify="right", no_wrap=True)
+        table.add_column("Anti-patterns", style="red")
+
+        for cost in self.report.get_queries()[:self.top]:
+            types = ", ".join(dict.fromkeys(output.type for output in cost.outputs))
+            table.add_row(cost.fingerprint,
+                          f"{cost.total_time:.3f}",
+                          self.__share(cost.total_time),
+                          str(cost.executions),
+                          "" if cost.rows_examined is None else str(cost.rows_examined),
+                          types)
+
+        self.console.print(table)
+
+    def print(self):
+        self.print_anti_patterns()
+        self.console.print()
+        self.print_queries()
+
+
+class WatchPrinter(AbstractPrinter):
+    def __init__(self, manifest: "Manifest", top: int = 10, status: str = ""):
+        super().__init__()
+        self.manifest = manifest
+        self.top = top
+        self.status = status
+
+    def get_anti_patterns(self) -> Table:
+        manifest = self.manifest
+        errors = sum(manifest.errors.values())
+        table = Table(
+            title=f"""[bold cyan]Anti-patterns in {manifest.directory}[/bold cyan] \nFound {errors} errors in {manifest.statements} statements """
+                  f"""of {len(manifest.files)} files""",
+            title_justify="left")
+
+        table.add_column("Type", style="red")
+        table.add_column("Title", style="red")
+        table.add_column("Errors", justify="right", style="green")
+        table.add_column("Files", justify="right")
+
+        for type in sorted(manifest.errors, key=lambda type: -manifest.errors[type]):
+            table.add_row(type,
+                          manifest.titles[type],
+                          str(manifest.errors[type]),
+                          str(manifest.files_with_errors[type]))
+
+        return table
+
+    def get_files(self) -> Table:
+        table = Table(title=f"[bold cyan]Top {self.top} files by errors[/bold cyan]",
+                      title_justify="left")
+
+        table.add_column("File", overflow="fold")
+        table.add_column("Errors", justify="right", style="green", no_wrap=True)
+        table.add_column("Anti-patterns", style="red")
+
+        for path, errors in self.manifest.get_files()[:self.top]:
+            types = ", ".join(sorted(self.manifest.files[path].errors))
+            table.add_row(path, str(errors), types)
+
+        return table
+
+    def get_renderable(self) -> Group:
+        return Group(self.get_anti_patterns(), "", self.get_files(), "", self.status)
+
+    def print(self):
+        self.console.print(self.get_renderable())
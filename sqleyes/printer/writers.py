@@ -0,0 +1,213 @@
+"""Writers that stream results in machine-readable formats
+
+Every writer writes the results of a statement as soon as it is analyzed, so
+memory use does not grow with the number of results. Unlike the printers,
+the writers do not use rich, which keeps them fast to import.
+"""
+import csv
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Type
+
+from sqleyes import __version__
+from sqleyes.definitions.definitions import DEFINITIONS
+from sqleyes.detector.detector_output import DetectorOutput
+from sqleyes.utils.statement_splitter import Statement
+
+
+# Fields of every record, in order
+FIELDS = ["source", "statement_index", "offset", "line", "column", "end_line",
+          "end_column", "type", "title", "detector_type", "certainty"]
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+INFORMATION_URI = "https://github.com/leonardomathon/sqleyes"
+
+# SARIF level of every certainty
+SARIF_LEVELS = {"high": "warning", "medium": "warning", "low": "note"}
+
+# SARIF requires the artifact of every physical location, results without a
+# source file were read from stdin or given on the command line
+SARIF_STDIN_URI = "stdin"
+
+
+def iter_records(statement: Statement, outputs: List[DetectorOutput],
+                 source: Optional[str]) -> Iterator[Dict[str, Any]]:
+    """
+    This function converts the outputs of a statement into flat records, one
+    per location. Outputs without a location get a single record at the start
+    of the statement.
+
+    Parameters:
+        statement (Statement): The analyzed statement.
+        outputs (List[DetectorOutput]): The outputs of the statement.
+        source (Optional[str]): The file the statement was taken from.
+
+    Returns:
+        Iterator[Dict[str, Any]]: The records, with the keys of FIELDS.
+    """
+    for output in outputs:
+        for start, end in output.locations or [(0, 0)]:
+            line, column = statement.get_position(start)
+            end_line, end_column = statement.get_position(end)
+
+            yield {
+                "source": source,
+                "statement_index": statement.index,
+                "offset": statement.offset,
+                "line": line,
+                "column": column,
+                "end_line": end_line,
+                "end_column": end_column,
+                "type": output.type,
+                "title": output.title,
+                "detector_type": output.detector_type,
+                "certainty": output.certainty,
+            }
+
+
+class AbstractWriter(ABC):
+    """
+    This is a class for writing results to a text stream.
+
+    Parameters:
+        stream (TextIO): The stream to write to.
+        source (Optional[str]): The file the statements are taken from, None
+            if they do not come from a file.
+    """
+
+    def __init__(self, stream: TextIO, source: Optional[str] = None):
+        self.stream = stream
+        self.source = source
+
+    def start(self):
+        pass
+
+    @abstractmethod
+    def write(self, statement: Statement, outputs: List[DetectorOutput]):
+        pass
+
+    def finish(self):
+        self.stream.flush()
+
+
+class JSONLinesWriter(AbstractWriter):
+    """
+    This is a class that writes every result as a line of JSON.
+    """
+
+    def write(self, statement: Statement, outputs: List[DetectorOutput]):
+        if not outputs:
+            return
+        for record in iter_records(statement, outputs, self.source):
+            self.stream.write(json.dumps(record))
+            self.stream.write("\n")
+        self.stream.flush()
+
+
+class CSVWriter(AbstractWriter):
+    """
+    This is a class that writes every result as a row of CSV, after a header.
+    """
+
+    def __init__(self, stream: TextIO, source: Optional[str] = None):
+        super().__init__(stream, source)
+        self.writer = csv.DictWriter(stream, FIELDS, lineterminator="\n")
+
+    def start(self):
+        self.writer.writeheader()
+
+    def write(self, statement: Statement, outputs: List[DetectorOutput]):
+        if not outputs:
+            return
+        self.writer.writerows(iter_records(statement, outputs, self.source))
+        self.stream.flush()
+
+
+class SARIFWriter(AbstractWriter):
+    """
+    This is a class that writes a SARIF 2.1.0 log. The log is a single JSON
+    document, which is written in pieces: the run is opened at the start,
+    every result is appended as it is found and the run is closed at the end.
+    """
+
+    def __init__(self, stream: TextIO, source: Optional[str] = None):
+        super().__init__(stream, source)
+        self.results = 0
+        # Rule id and index of every anti-pattern type
+        self.rules = {anti_pattern["type"]: (id, index)
+                      for index, (id, anti_pattern)
+                      in enumerate(DEFINITIONS["anti_patterns"].items())}
+
+    def start(self):
+        rules = [{
+            "id": id,
+            "name": anti_pattern["type"],
+            "shortDescription": {"text": anti_pattern["title"]},
+        } for id, anti_pattern in DEFINITIONS["anti_patterns"].items()]
+
+        header = json.dumps({
+            "$schema": SARIF_SCHEMA,
+            "version": "2.1.0",
+            "runs": [{
+                "tool": {"driver": {"name": "sqleyes", "version": __version__,
+                                    "informationUri": INFORMATION_URI, "rules": rules}},
+                "columnKind": "unicodeCodePoints",
+                "results": [],
+            }],
+        })
+        # Everything up to the empty list of results, which is filled in by
+        # write and closed by finish
+        self.stream.write(header[:header.rindex("[]") + 1])
+
+    def write(self, statement: Statement, outputs: List[DetectorOutput]):
+        if not outputs:
+            return
+
+        for output in outputs:
+            self.stream.write(",\n" if self.results else "\n")
+            self.stream.write(json.dumps(self.create_result(statement, output)))
+            self.results += 1
+        self.stream.flush()
+
+    def create_result(self, statement: Statement, output: DetectorOutput) -> Dict[str, Any]:
+        locations = []
+        for start, end in output.locations or [(0, 0)]:
+            line, column = statement.get_position(start)
+            end_line, end_column = statement.get_position(end)
+
+            uri = SARIF_STDIN_URI if self.source is None else self.source.replace("\\", "/")
+            locations.append({"physicalLocation": {
+                "artifactLocation": {"uri": uri},
+                "region": {
+                    "startLine": line,
+                    "startColumn": column,
+                    "endLine": end_line,
+                    "endColumn": end_column,
+                },
+            }})
+
+        result: Dict[str, Any] = {
+            "message": {"text": output.title},
+            "level": SARIF_LEVELS.get(output.certainty, "warning"),
+            "locations": locations,
+            "properties": {"certainty": output.certainty,
+                           "statementIndex": statement.index},
+        }
+
+        rule = self.rules.get(output.type)
+        if rule is not None:
+            result["ruleId"], result["ruleIndex"] = rule
+
+        return result
+
+    def finish(self):
+        self.stream.write("\n]}]}\n")
+        super().finish()
+
+
+# Writer of every machine-readable format
+WRITERS: Dict[str, Type[AbstractWriter]] = {
+    "jsonl": JSONLinesWriter,
+    "csv": CSVWriter,
+    "sarif": SARIFWriter,
+}
@@ -0,0 +1,378 @@
+"""A server that keeps the detectors loaded and analyzes queries sent as JSON
+
+Two transports are supported:
+
+- A Unix socket, where every line is a JSON request and every response is a
+  line of JSON. Requests can be pipelined: a client may send many requests
+  without waiting, they are read while earlier ones are analyzed and answered
+  in order. With several worker processes they are analyzed in parallel.
+- HTTP on localhost, where a JSON request is POSTed to /analyze.
+
+A request is either {"query": "..."} or {"queries": ["...", ...]}, with an
+optional "id" that is copied to the response. The response contains "result",
+the outputs of the query, or "results", the outputs of every query, in the
+same format as DetectorOutput.dict. Invalid requests get an "error" instead.
+A query of "queries" the detector fails on gets {"error": "..."} in place of
+its outputs, the other queries are still analyzed.
+"""
+import json
+import os
+import socketserver
+import stat
+import threading
+from concurrent.futures import (Executor, Future, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from queue import Queue
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from sqleyes import __version__
+from sqleyes.definitions.definitions import DEFINITIONS
+from sqleyes.detector.detector import SCANNER, Detector
+from sqleyes.detector.result_cache import ResultCache
+from sqleyes.utils.load_file import load_anti_pattern_description
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Number of requests of one connection that may be analyzed at the same time
+MAX_PIPELINED = 64
+
+# Outputs of every query of a request, as dictionaries, or the error of a
+# query the detector failed on
+Results = List[Union[List[Dict[str, Any]], Dict[str, str]]]
+
+Response = Dict[str, Any]
+
+_worker_cache: Optional[ResultCache] = None
+_warm = False
+
+
+def warm_up(cache_size: int = 0):
+    """
+    This function loads everything the detectors need up front, so that the
+    first requests are not slower than the others: the compiled expressions,
+    the descriptions and the parser.
+
+    Parameters:
+        cache_size (int): The number of query fingerprints to cache results
+            for in this process, 0 disables the cache.
+    """
+    global _worker_cache, _warm
+
+    if cache_size and _worker_cache is None:
+        _worker_cache = ResultCache(cache_size)
+
+    if _warm:
+        return
+
+    SCANNER.compile()
+    for anti_pattern in DEFINITIONS["anti_patterns"].values():
+        load_anti_pattern_description(anti_pattern["type"])
+    Detector("SELECT * FROM t WHERE a = NULL AND b LIKE '%b%' GROUP BY c ORDER BY RAND()").run()
+
+    _warm = True
+
+
+def analyze_queries(queries: List[str], start: int = 0,
+                    cache_size: int = 0) -> Results:
+    """
+    This function analyzes a batch of queries.
+
+    Parameters:
+        queries (List[str]): The queries to analyze.
+        start (int): The statement index of the first query.
+        cache_size (int): The number of query fingerprints to cache results
+            for in this process, 0 disables the cache.
+
+    Returns:
+        Results: The outputs of every query, as dictionaries, or the error
+        of every query the detector failed on.
+    """
+    warm_up(cache_size)
+
+    results: Results = []
+    for index, query in enumerate(queries, start):
+        try:
+            if _worker_cache is not None:
+                outputs = _worker_cache.run(query, statement_index=index)
+            else:
+                outputs = Detector(query, statement_index=index).run()
+        except Exception as error:
+            # The other queries of the batch are still analyzed
+            results.append({"error": f"{type(error).__name__}: {error}"})
+            continue
+        results.append([output.dict for output in outputs])
+
+    return results
+
+
+def parse_request(data: bytes) -> Tuple[Any, List[str], bool]:
+    """
+    This function parses and validates a request.
+
+    Parameters:
+        data (bytes): The JSON request.
+
+    Returns:
+        Tuple[Any, List[str], bool]: The id of the request, its queries and
+        whether it contained a single query.
+
+    Raises:
+        ValueError: If the request is not valid.
+    """
+    try:
+        request = json.loads(data)
+    except ValueError as error:
+        raise ValueError(f"Invalid JSON: {error}")
+
+    if not isinstance(request, dict):
+        raise ValueError("Request must be a JSON object")
+
+    if "query" in request:
+        queries = [request["query"]]
+    elif "queries" in request and isinstance(request["queries"], list):
+        queries = request["queries"]
+    else:
+        raise ValueError('Request must contain "query" or a list of "queries"')
+
+    if not all(isinstance(query, str) for query in queries):
+        raise ValueError("Queries must be strings")
+
+    return request.get("id"), queries, "query" in request
+
+
+class Analyzer:
+    """
+    This is a class that analyzes the queries of requests, either in this
+    process or spread over a pool of worker processes. Everything the
+    detectors need is loaded before the first request arrives.
+
+    Parameters:
+        workers (int): The number of worker processes. With 1 worker, queries
+            are analyzed one at a time by a thread of this process, which has
+            the lowest overhead.
+        cache_size (int): The number of query fingerprints every process
+            caches results for, 0 disables the cache.
+    """
+
+    def __init__(self, workers: int = 1, cache_size: int = 0):
+        self.workers = workers
+        self.cache_size = cache_size
+        self.__executor: Executor
+
+        if workers > 1:
+            warm_up()
+            self.__executor = ProcessPoolExecutor(max_workers=workers)
+            # Start the workers now instead of on the first request
+            for future in [self.__executor.submit(analyze_queries, [], 0, cache_size)
+                           for _ in range(workers)]:
+                future.result()
+        else:
+            warm_up(cache_size)
+            # A single thread, which also keeps the cache to itself, so that
+            # the threads of the connections keep reading requests meanwhile
+            self.__executor = ThreadPoolExecutor(max_workers=1)
+
+    def submit(self, queries: List[str]) -> List["Future[Results]"]:
+        """
+        This function starts analyzing a batch of queries. With a pool, the
+        batch is split over the workers.
+
+        Parameters:
+            queries (List[str]): The queries to analyze.
+
+        Returns:
+            List[Future[Results]]: The results of every part of the batch, in
+            order.
+        """
+        if self.workers <= 1:
+            return [self.__executor.submit(analyze_queries, queries, 0, self.cache_size)]
+
+        size = max(1, -(-len(queries) // self.workers))
+        return [self.__executor.submit(analyze_queries, queries[start:start + size],
+                                       start, self.cache_size)
+                for start in range(0, max(len(queries), 1), size)]
+
+    def request(self, data: bytes) -> Callable[[], Response]:
+        """
+        This function starts handling a request.
+
+        Parameters:
+            data (bytes): The JSON request.
+
+        Returns:
+            Callable[[], Response]: A function that waits for the analysis and
+            returns the response.
+        """
+        try:
+            id, queries, single = parse_request(data)
+        except ValueError as error:
+            response = {"error": str(error)}
+            return lambda: response
+
+        futures = self.submit(queries)
+
+        def wait() -> Response:
+            response: Response = {} if id is None else {"id": id}
+            try:
+                results = [result for future in futures for result in future.result()]
+            except Exception as error:
+                response["error"] = f"Analysis failed: {error}"
+                return response
+
+            if single and isinstance(results[0], dict):
+                response["error"] = f"Analysis failed: {results[0]['error']}"
+            elif single:
+                response["result"] = results[0]
+            else:
+                response["results"] = results
+            return response
+
+        return wait
+
+    def close(self):
+        self.__executor.shutdown()
+
+
+class JSONLinesHandler(socketserver.StreamRequestHandler):
+    """
+    This is a class that handles a connection of JSON requests, one per line.
+    Requests are read while earlier ones are analyzed, and a separate thread
+    writes the responses in order.
+    """
+
+    server: "UnixServer"
+
+    def handle(self):
+        pending: "Queue[Optional[Callable[[], Response]]]" = Queue(MAX_PIPELINED)
+        writer = threading.Thread(target=self.write_responses, args=(pending,), daemon=True)
+        writer.start()
+
+        try:
+            for line in self.rfile:
+                if line.strip():
+                    pending.put(self.server.analyzer.request(line))
+        finally:
+            pending.put(None)
+            writer.join()
+
+    def write_responses(self, pending: "Queue[Optional[Callable[[], Response]]]"):
+        while True:
+            wait = pending.get()
+            if wait is None:
+                return
+            try:
+                self.wfile.write(json.dumps(wait()).encode("utf-8") + b"\n")
+            except OSError:
+                # The client went away, the remaining responses are dropped
+                pass
+
+
+class HTTPHandler(BaseHTTPRequestHandler):
+    """
+    This is a class that handles HTTP requests. Connections are kept alive, so
+    a client can send many requests over one connection.
+    """
+
+    server: "LocalHTTPServer"
+    protocol_version = "HTTP/1.1"
+    server_version = f"sqleyes/{__version__}"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, {"status": "ok", "version": __version__})
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path not in ("/", "/analyze"):
+            self.send_json(404, {"error": "Not found"})
+            return
+
+        # Without a valid length, the end of the body and so the start of
+        # the next request is unknown, and the connection is closed
+        header = self.headers.get("Content-Length")
+        if header is None:
+            self.close_connection = True
+            self.send_json(411, {"error": "Content-Length is required"})
+            return
+        try:
+            length = int(header)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            self.send_json(400, {"error": f"Invalid Content-Length: {header}"})
+            return
+
+        response = self.server.analyzer.request(self.rfile.read(length))()
+        self.send_json(400 if "error" in response else 200, response)
+
+    def send_json(self, status: int, response: Response):
+        body = json.dumps(response).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Logging every request would cost more than analyzing it
+        pass
+
+
+class UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, analyzer: Analyzer):
+        self.analyzer = analyzer
+        self.address = path
+
+        # Remove the socket of a server that was not shut down cleanly
+        if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)
+
+        super().__init__(path, JSONLinesHandler)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+
+
+class LocalHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str, port: int, analyzer: Analyzer):
+        self.analyzer = analyzer
+        super().__init__((host, port), HTTPHandler)
+        self.address = f"http://{host}:{self.server_port}"
+
+
+def create_server(analyzer: Analyzer, socket_path: Optional[str] = None,
+                  host: str = DEFAULT_HOST,
+                  port: int = DEFAULT_PORT) -> Union[UnixServer, LocalHTTPServer]:
+    """
+    This function creates a server, listening on a Unix socket if a path is
+    given and for HTTP requests otherwise.
+
+    Parameters:
+        analyzer (Analyzer): The analyzer of the requests.
+        socket_path (Optional[str]): The path of the Unix socket.
+        host (str): The host to listen on for HTTP requests.
+        port (int): The port to listen on for HTTP requests, 0 picks a free
+            port.
+
+    Returns:
+        Union[UnixServer, LocalHTTPServer]: The server, call serve_forever to
+        start it. Its address is the path of the socket or the URL.
+    """
+    if socket_path is not None:
+        return UnixServer(socket_path, analyzer)
+
+    return LocalHTTPServer(host, port, analyzer)
@@ -25,11 +25,66 @@ def halstead_metrics(n1: int, n2: int, N1: int, N2: int):
     # Program vocabulary
     n = n1 + n2
 
-    # Volume
-    V = N * math.log2(n)
+    # Volume, 0 for a query without operators and operands
+    V = N * math.log2(n) if n > 0 else 0.0
 
-    # Difficulty
-    D = (n1/2) * (N2/n2)
+    # Difficulty, 0 for a query without operands
+    D = (n1/2) * (N2/n2) if n2 > 0 else 0.0
+
+    # Effort
+    E = D * V
+
+    return (N, n, V, D, E)
+
+
+def halstead_metrics_batch(n1, n2, N1, N2):
+    """
+    Compute the Halstead metrics of many programs at once. Every parameter
+    holds one count per program, the metrics of all programs are computed in
+    a single vectorized pass with NumPy.
+
+    Parameters:
+        n1 (array_like): Number of unique operators in every query.
+        n2 (array_like): Number of unique operands in every query.
+        N1 (array_like): Number of operators in every query.
+        N2 (array_like): Number of operands in every query.
+
+    Returns:
+        N (numpy.ndarray): Program length of every query.
+        n (numpy.ndarray): Program vocabulary of every query.
+        V (numpy.ndarray): Program volume of every query.
+        D (numpy.ndarray): Program difficulty of every query.
+        E (numpy.ndarray): Program effort of every query.
+
+    Raises:
+        ImportError: If NumPy is not installed.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("Batch Halstead metrics require NumPy, install it "
+                          "with 'pip install sqleyes[numpy]'") from None
+
+    n1 = np.asarray(n1, dtype=np.int64)
+    n2 = np.asarray(n2, dtype=np.int64)
+    N1 = np.asarray(N1, dtype=np.int64)
+    N2 = np.asarray(N2, dtype=np.int64)
+
+    # Program length
+    N = N1 + N2
+
+    # Program vocabulary
+    n = n1 + n2
+
+    # Volume, 0 for a query without operators and operands
+    V = np.zeros(n.shape)
+    np.log2(n, out=V, where=n > 0)
+    V *= N
+
+    # Difficulty, 0 for a query without operands
+    D = np.zeros(n2.shape)
+    np.divide(N2, n2, out=D, where=n2 > 0)
+    D *= n1 / 2
 
     # Effort
     E = D * V
@@ -0,0 +1,223 @@
+"""Utility functions w.r.t query fingerprints"""
+import re
+from bisect import bisect_right
+from itertools import groupby
+from typing import Dict, List, Optional, Tuple
+
+from sqleyes.utils.tokenizer import KEYWORD_TYPES, is_supported, tokenize
+
+
+PLACEHOLDER = "?"
+
+_NEWLINES = re.compile(r"\r\n|\r")
+_TRAILING_WHITESPACE = re.compile(r"[^\S\n]+\n")
+
+_TOKEN_PATTERN = re.compile(r"""
+    (?P<whitespace>\s+)
+    |(?P<comment>--[^\n]*|/\*.*?\*/)
+    |(?P<string>'(?:''|\\.|[^'\\])*')
+    |(?P<word>[A-Za-z_][\w$#]*)
+    |(?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+)
+    |(?P<quoted>"(?:""|[^"])*"|`(?:``|[^`])*`)
+    |(?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+
+class Fingerprint:
+    """
+    This class represents the fingerprint of a query. Queries that only differ
+    in literal values, the length of IN-lists, whitespace and keyword case
+    have the same fingerprint.
+
+    Attributes:
+        text (str): The normalized query, used as the fingerprint itself.
+        raw_starts (List[int]): Start of every token in the raw query.
+        normalized_starts (List[int]): Start of every token in the text.
+        verbatim (List[bool]): Whether every token is copied as is, meaning
+            positions within the token are the same in both queries.
+        literals (List[Tuple[str, bool]]): Every replaced literal as it is in
+            the raw query, and whether it is within a collapsed IN-list.
+    """
+    __slots__ = ("text", "raw_starts", "normalized_starts", "verbatim", "literals")
+
+    def __init__(self, text: str, raw_starts: List[int],
+                 normalized_starts: List[int], verbatim: List[bool],
+                 literals: Optional[List[Tuple[str, bool]]] = None):
+        self.text = text
+        self.raw_starts = raw_starts
+        self.normalized_starts = normalized_starts
+        self.verbatim = verbatim
+        self.literals = literals or []
+
+    def __map(self, position: int, from_starts: List[int],
+              to_starts: List[int]) -> Tuple[int, bool]:
+        index = bisect_right(from_starts, position) - 1
+        if index < 0:
+            return position, True
+        if self.verbatim[index]:
+            return to_starts[index] + position - from_starts[index], True
+        return to_starts[index], position == from_starts[index]
+
+    def to_normalized(self, span: Tuple[int, int]) -> Tuple[Tuple[int, int], bool]:
+        """
+        This function maps a span in the raw query onto the normalized query.
+
+        Parameters:
+            span (Tuple[int, int]): A start and end location in the raw query.
+
+        Returns:
+            Tuple[int, int]: The span in the normalized query.
+            bool: False if the span starts or ends within a replaced literal,
+            meaning it can not be mapped exactly.
+        """
+        start, exact_start = self.__map(span[0], self.raw_starts,
+                                        self.normalized_starts)
+        end, exact_end = self.__map(span[1] - 1, self.raw_starts,
+                                    self.normalized_starts)
+        return (start, end + 1), exact_start and exact_end
+
+    def to_raw(self, span: Tuple[int, int]) -> Tuple[int, int]:
+        """
+        This function maps a span in the normalized query onto the raw query.
+
+        Parameters:
+            span (Tuple[int, int]): A start and end location in the normalized
+                query.
+
+        Returns:
+            Tuple[int, int]: The span in the raw query.
+        """
+        start, _ = self.__map(span[0], self.normalized_starts, self.raw_starts)
+        end, _ = self.__map(span[1] - 1, self.normalized_starts, self.raw_starts)
+        return start, end + 1
+
+
+def _collapse_whitespace(whitespace: str) -> str:
+    """
+    Collapses a run of whitespace. The first and last character and whether
+    the run contains a newline are kept, since format_query strips spaces at
+    the end of lines and some query functions match a single space.
+    """
+    whitespace = _TRAILING_WHITESPACE.sub("\n", _NEWLINES.sub("\n", whitespace))
+
+    middle = "\n" if "\n" in whitespace[1:-1] else ""
+    collapsed = whitespace[0] + middle + whitespace[-1]
+
+    return "".join(character for character, _ in groupby(collapsed))
+
+
+def _collapse_in_lists(tokens: List[Tuple[int, str, bool]]) -> List[Tuple[int, str, bool]]:
+    """
+    Replaces every IN-list that only consists of literals by a single
+    placeholder, so IN-lists of any length have the same fingerprint.
+    """
+    result: List[Tuple[int, str, bool]] = []
+    i = 0
+
+    while i < len(tokens):
+        result.append(tokens[i])
+        i += 1
+
+        if result[-1][1].upper() != "IN":
+            continue
+
+        # Skip whitespace between IN and the opening parenthesis
+        j = i
+        while j < len(tokens) and tokens[j][1].isspace():
+            j += 1
+        if j >= len(tokens) or tokens[j][1] != "(":
+            continue
+
+        k = j + 1
+        literals = 0
+        while k < len(tokens) and (tokens[k][1] in (PLACEHOLDER, ",") or tokens[k][1].isspace()):
+            literals += tokens[k][1] == PLACEHOLDER
+            k += 1
+        if k >= len(tokens) or tokens[k][1] != ")" or literals == 0:
+            continue
+
+        result.extend(tokens[i:j])
+        result.append((tokens[j][0], "(" + PLACEHOLDER + ")", False))
+        i = k + 1
+
+    return result
+
+
+def _get_keyword_ends(query: str) -> Dict[int, int]:
+    """
+    Finds the tokens that format_query converts to upper case, by their start
+    and end. Whether a word is such a keyword depends on where it is, for
+    example IN and LIKE are comparisons and a keyword followed by a
+    parenthesis is a name, so the query is split as sqlparse splits it.
+    """
+    if is_supported():
+        tokens = tokenize(query)
+        return {start: end for type, start, end in zip(tokens.types, tokens.starts, tokens.ends)
+                if type in KEYWORD_TYPES}
+
+    from sqlparse import lexer
+    from sqlparse import tokens as T
+
+    ends = {}
+    start = 0
+    for ttype, value in lexer.tokenize(query):
+        if ttype in T.Keyword:
+            ends[start] = start + len(value)
+        start += len(value)
+    return ends
+
+
+def fingerprint_query(query: str) -> Fingerprint:
+    """
+    This function normalizes a query into its fingerprint. Literals and
+    IN-lists are replaced by placeholders, whitespace is collapsed and the
+    keywords that format_query converts to upper case are converted as well.
+
+    Parameters:
+        query (str): The query string.
+
+    Returns:
+        Fingerprint: The fingerprint of the query.
+    """
+    # Every token as (start in raw query, normalized text, verbatim)
+    tokens: List[Tuple[int, str, bool]] = []
+    # Every literal as (start in raw query, literal)
+    literals: List[Tuple[int, str]] = []
+    keyword_ends = _get_keyword_ends(query)
+    # The end of the last keyword, a keyword such as GROUP BY has many words
+    keyword_end = 0
+
+    for match in _TOKEN_PATTERN.finditer(query):
+        kind = match.lastgroup
+        value = match.group()
+
+        if kind == "whitespace" and tokens and tokens[-1][1] in ("GROUP", "ORDER"):
+            # sqlparse only recognizes the GROUP BY and ORDER BY clauses with
+            # a single space, so this whitespace is kept as it is
+            tokens.append((match.start(), value, True))
+        elif kind == "whitespace":
+            tokens.append((match.start(), _collapse_whitespace(value), False))
+        elif kind == "string" or kind == "number":
+            tokens.append((match.start(), PLACEHOLDER, False))
+            literals.append((match.start(), value))
+        elif kind == "word" and (match.start() in keyword_ends or match.start() < keyword_end):
+            keyword_end = max(keyword_end, keyword_ends.get(match.start(), 0))
+            tokens.append((match.start(), value.upper(), True))
+        else:
+            tokens.append((match.start(), value, True))
+
+    tokens = _collapse_in_lists(tokens)
+    placeholders = {start for start, text, _ in tokens if text == PLACEHOLDER}
+
+    raw_starts, normalized_starts, verbatim, parts = [], [], [], []
+    length = 0
+
+    for start, text, is_verbatim in tokens:
+        raw_starts.append(start)
+        normalized_starts.append(length)
+        verbatim.append(is_verbatim)
+        parts.append(text)
+        length += len(text)
+
+    return Fingerprint("".join(parts), raw_starts, normalized_starts, verbatim,
+                       [(literal, start not in placeholders) for start, literal in literals])
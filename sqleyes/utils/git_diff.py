@@ -0,0 +1,200 @@
+"""Utility functions w.r.t finding the statements a git diff changes"""
+import codecs
+import os
+import re
+import subprocess
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqleyes.utils.statement_splitter import Statement
+
+# Lines of a hunk in the new version of a file, as a first and last line. A
+# deletion is stored as the line after it and the line before it, so that it
+# only touches statements that span the deleted lines.
+Hunk = Tuple[int, int]
+
+_HUNK_PATTERN = re.compile(rb"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+# Options that keep the output of git diff the same whatever the git config
+_DIFF_OPTIONS = ["--unified=0", "--no-color", "--no-ext-diff", "--no-textconv", "--find-renames",
+                 "--src-prefix=a/", "--dst-prefix=b/"]
+
+
+def run_git(args: List[str], cwd: Optional[str] = None, input: Optional[bytes] = None) -> bytes:
+    """
+    This function runs a git command.
+
+    Parameters:
+        args (List[str]): The arguments after git.
+        cwd (Optional[str]): The directory to run git in.
+        input (Optional[bytes]): The standard input of the command.
+
+    Returns:
+        bytes: The standard output of the command.
+
+    Raises:
+        RuntimeError: If git is not installed or the command fails.
+    """
+    try:
+        process = subprocess.run(["git", "-c", "core.quotePath=false"] + args, cwd=cwd, input=input,
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as error:
+        raise RuntimeError(f"Could not run git: {error}")
+
+    if process.returncode != 0:
+        message = process.stderr.decode("utf-8", "replace").strip()
+        raise RuntimeError(f"git {args[0]} failed: {message}")
+
+    return process.stdout
+
+
+def get_head_revision(revision_range: str) -> Optional[str]:
+    """
+    This function finds the revision whose files a revision range compares
+    against.
+
+    Parameters:
+        revision_range (str): A range such as main..HEAD or main...HEAD, or a
+            single revision to compare the working tree with.
+
+    Returns:
+        Optional[str]: The head revision, None for the working tree.
+    """
+    for separator in ("...", ".."):
+        if separator in revision_range:
+            return revision_range.split(separator, 1)[1] or "HEAD"
+    return None
+
+
+def parse_hunks(diff: bytes) -> Dict[str, List[Hunk]]:
+    """
+    This function reads the changed lines of every file from the output of
+    git diff --unified=0.
+
+    Parameters:
+        diff (bytes): The output of git diff.
+
+    Returns:
+        Dict[str, List[Hunk]]: The hunks of every changed file by path, in
+        order of the lines. Deleted files are left out.
+    """
+    hunks: Dict[str, List[Hunk]] = {}
+    current: Optional[List[Hunk]] = None
+
+    for line in diff.splitlines():
+        if line.startswith(b"+++ "):
+            # Paths with spaces are followed by a tab
+            path = _unquote(line[4:].rstrip(b"\t"))
+            current = hunks.setdefault(path[2:], []) if path.startswith("b/") else None
+            continue
+
+        match = _HUNK_PATTERN.match(line)
+        if match is None or current is None:
+            continue
+
+        start = int(match.group(1))
+        count = 1 if match.group(2) is None else int(match.group(2))
+        current.append((start, start + count - 1) if count else (start + 1, start))
+
+    return hunks
+
+
+def get_changed_lines(revision_range: str, suffixes: Sequence[str] = (".sql",),
+                      cwd: Optional[str] = None) -> Dict[str, List[Hunk]]:
+    """
+    This function lists the hunks of the files that a revision range changes.
+
+    Parameters:
+        revision_range (str): A range such as main..HEAD, or a single
+            revision to compare the working tree with.
+        suffixes (Sequence[str]): The extensions of the files to include.
+        cwd (Optional[str]): A directory in the repository.
+
+    Returns:
+        Dict[str, List[Hunk]]: The hunks of every changed file, by path
+        relative to the top of the repository.
+    """
+    if revision_range.startswith("-"):
+        raise RuntimeError(f"Invalid revision range: {revision_range}")
+
+    pathspecs = [f":(top,glob)**/*{suffix}" for suffix in suffixes]
+    return parse_hunks(run_git(["diff"] + _DIFF_OPTIONS + [revision_range, "--"] + pathspecs, cwd))
+
+
+def read_files(revision: Optional[str], paths: Iterable[str],
+               cwd: Optional[str] = None) -> Iterator[Tuple[str, bytes]]:
+    """
+    This function reads files at a revision, all with a single git process.
+
+    Parameters:
+        revision (Optional[str]): The revision, None for the working tree.
+        paths (Iterable[str]): The paths relative to the top of the
+            repository.
+        cwd (Optional[str]): A directory in the repository.
+
+    Returns:
+        Iterator[Tuple[str, bytes]]: The path and contents of every file
+        that exists at the revision.
+    """
+    paths = list(paths)
+    if not paths:
+        return
+
+    top = os.fsdecode(run_git(["rev-parse", "--show-toplevel"], cwd).rstrip(b"\n"))
+
+    if revision is None:
+        for path in paths:
+            try:
+                with open(os.path.join(top, path), "rb") as file:
+                    yield path, file.read()
+            except OSError:
+                continue
+        return
+
+    output = run_git(["cat-file", "--batch"], top,
+                     b"".join(f"{revision}:{path}\n".encode() for path in paths))
+
+    pos = 0
+    for path in paths:
+        header_end = output.index(b"\n", pos)
+        header = output[pos:header_end].split()
+        pos = header_end + 1
+        if len(header) != 3:
+            # Missing at the revision
+            continue
+        size = int(header[2])
+        yield path, output[pos:pos + size]
+        pos += size + 1
+
+
+def select_statements(statements: Iterable[Statement], hunks: List[Hunk]) -> Iterator[Statement]:
+    """
+    This function selects the statements that overlap the hunks of a file.
+
+    Parameters:
+        statements (Iterable[Statement]): The statements of the file, in
+            order.
+        hunks (List[Hunk]): The hunks of the file, in order.
+
+    Returns:
+        Iterator[Statement]: The statements with a changed line.
+    """
+    index = 0
+    for statement in statements:
+        first = statement.line
+        last = statement.get_position(len(statement.text))[0]
+
+        # Hunks before the statement can not overlap later statements either
+        while index < len(hunks) and hunks[index][1] < first:
+            index += 1
+        if index == len(hunks):
+            return
+
+        if hunks[index][0] <= last:
+            yield statement
+
+
+def _unquote(path: bytes) -> str:
+    # git quotes paths with unusual characters like a C string
+    if path.startswith(b'"') and path.endswith(b'"'):
+        path = codecs.escape_decode(path[1:-1])[0]  # type: ignore
+    return os.fsdecode(path)
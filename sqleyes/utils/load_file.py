@@ -1,9 +1,14 @@
-import pkg_resources
+from functools import lru_cache
 
+from sqleyes.definitions.definitions import DEFINITIONS
 
-def load_description(package: str, path: str, filename: str):
+
+@lru_cache(maxsize=None)
+def load_description(package: str, path: str, filename: str) -> str:
     """
-    This function loads a static description file.
+    This function loads a static description file. Every file is only read
+    once per process. Files are read through the loader of the package, so
+    this also works when the package is installed as a zip file.
 
     Parameters:
         package (str): Package name where file is located in
@@ -13,6 +18,30 @@ def load_description(package: str, path: str, filename: str):
     Returns:
         str: Content of loaded file
     """
-    with open(pkg_resources.resource_filename(
-            package, f"{path}{filename}"), "r+") as file:
-        return file.read()
+    # Imported here, since descriptions are rarely needed and pkgutil is slow
+    # to import
+    import pkgutil
+
+    data = pkgutil.get_data(package, f"{path}{filename}")
+    if data is None:
+        raise FileNotFoundError(f"{path}{filename} not found in {package}")
+    return data.decode("utf-8")
+
+
+def load_anti_pattern_description(type: str) -> str:
+    """
+    This function loads the description of an anti-pattern by its type.
+
+    Parameters:
+        type (str): The type of the anti-pattern, for example "Random
+            Selection".
+
+    Returns:
+        str: The description of the anti-pattern.
+    """
+    for anti_pattern in DEFINITIONS["anti_patterns"].values():
+        if anti_pattern["type"] == type:
+            return load_description("sqleyes.definitions", "antipatterns/",
+                                    anti_pattern["filename"])
+
+    raise KeyError(f"Unknown anti-pattern type: {type}")
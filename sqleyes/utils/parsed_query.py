@@ -0,0 +1,662 @@
+"""Parsed query class shared by all detectors and query functions"""
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from sqleyes.utils.tokenizer import (BUILTIN, CLOSE, COMMA, COMMENT, DDL,
+                                     KEYWORD, KEYWORD_TYPES, LINE_COMMENT,
+                                     NAME, NEWLINE, OPEN, ORDER, OTHER,
+                                     PLACEHOLDER, PUNCTUATION, SYMBOL, TZCAST,
+                                     WHITESPACE, Tokens, is_supported,
+                                     tokenize)
+
+# sqlparse is slow to import, so it is only imported once a query is parsed
+if TYPE_CHECKING:
+    from sqlparse.sql import Token
+
+
+CLAUSES = ["GROUP BY", "ORDER BY"]
+
+# Keywords that sqlparse groups with the tokens around them, so they do not
+# simply end the columns of a clause
+_GROUPED_KEYWORDS = frozenset(["AS", "CASE", "WHERE", "VALUES", "NULL", "ROLE", "TIMESTAMP",
+                               "CURRENT_DATE", "CURRENT_TIME", "CURRENT_TIMESTAMP"])
+
+_WHITESPACE_TYPES = (WHITESPACE, NEWLINE)
+_NAME_TYPES = (NAME, SYMBOL)
+_ITEM_TYPES = (NAME, SYMBOL, BUILTIN)
+_FUNCTION_NAME_TYPES = (NAME, BUILTIN, PLACEHOLDER)
+
+
+def _format_tokens(tokens: List["Token"]) -> str:
+    """
+    This function joins a list of tokens back into a query string, converting
+    all keywords to upper case.
+
+    Parameters:
+        tokens (List["Token"]): A list of (possibly grouped) sqlparse tokens.
+
+    Returns:
+        str: The joined query string with upper case keywords.
+    """
+    from sqlparse import tokens as T
+
+    values = []
+    for token in tokens:
+        for leaf in token.flatten():
+            if leaf.ttype in T.Keyword:
+                values.append(leaf.value.upper())
+            else:
+                values.append(leaf.value)
+    return "".join(values)
+
+
+def _get_clause_columns(tokens: List["Token"], index: Optional[int]) -> List[str]:
+    """
+    This function returns the names of the columns of a clause, from the top
+    level sqlparse tokens of a query.
+
+    Parameters:
+        tokens (List["Token"]): The top level tokens of the query.
+        index (Optional[int]): The index of the clause keyword in tokens.
+
+    Returns:
+        List[str]: The names of the columns, empty if there is no clause.
+    """
+    if index is None:
+        return []
+
+    from sqlparse import tokens as T
+    from sqlparse.sql import Identifier, IdentifierList
+
+    # Find possible index of next keyword
+    for end in range(index + 1, len(tokens)):
+        if tokens[end].ttype is T.Keyword:
+            break
+
+    columns = []
+    for item in tokens[index:end + 1]:
+        if isinstance(item, IdentifierList):
+            # Positions such as GROUP BY 1, 2 are single tokens, not columns
+            for identifier in item.get_identifiers():
+                if identifier.is_group:
+                    columns.append(identifier.get_name())
+        elif isinstance(item, Identifier):
+            columns.append(item.get_name())
+
+    return columns
+
+
+def _split_statements(types: List[int], values: List[str]) -> Optional[List[Tuple[int, int]]]:
+    """
+    Splits tokens into statements in the same way as sqlparse does.
+
+    Returns:
+        Optional[List[Tuple[int, int]]]: The start and end index of every
+        statement, None if the tokens contain a CREATE statement, which
+        sqlparse splits by its blocks.
+    """
+    statements = []
+    start = level = 0
+    ended = False
+
+    for index, type in enumerate(types):
+        # Whitespace and comments on the line of the semicolon still belong
+        # to the statement
+        if ended and type != WHITESPACE and type != LINE_COMMENT:
+            statements.append((start, index))
+            start, level, ended = index, 0, False
+
+        if type == OPEN:
+            level += 1
+        elif type == CLOSE:
+            level -= 1
+        elif type in KEYWORD_TYPES:
+            keyword = values[index].upper()
+            if type == DDL and keyword.startswith("CREATE"):
+                return None
+            if keyword in ("END", "END IF", "END FOR", "END WHILE"):
+                level -= 1
+        elif type == PUNCTUATION and level <= 0 and values[index] == ";":
+            ended = True
+
+    if any(type != WHITESPACE and type != NEWLINE for type in types[start:]):
+        statements.append((start, len(types)))
+
+    return statements
+
+
+def _match_groups(types: List[int], values: List[str], start: int,
+                  end: int) -> Optional[Dict[int, int]]:
+    """
+    Finds the parentheses and CASE blocks of a statement in the same way as
+    sqlparse groups them.
+
+    Returns:
+        Optional[Dict[int, int]]: The index of the last token of every group
+        by the index of its first token, None if the statement contains
+        unbalanced parentheses or tokens that sqlparse groups in ways that
+        are not reproduced here, such as square brackets, BEGIN blocks,
+        assignments and type casts or comments right next to parentheses.
+    """
+    groups: Dict[int, int] = {}
+    parentheses: List[int] = []
+    # The open CASE blocks within every level of parentheses
+    cases: List[List[int]] = [[]]
+
+    for index in range(start, end):
+        type = types[index]
+
+        if type == OPEN:
+            parentheses.append(index)
+            cases.append([])
+        elif type == CLOSE:
+            if not parentheses:
+                return None
+            groups[parentheses.pop()] = index
+            cases.pop()
+        elif type in KEYWORD_TYPES:
+            keyword = values[index].upper()
+            if type == KEYWORD and keyword == "CASE":
+                cases[-1].append(index)
+            elif type == KEYWORD and keyword == "END":
+                # An END without CASE is not grouped
+                if cases[-1]:
+                    groups[cases[-1].pop()] = index
+            elif keyword == "BEGIN" or (keyword.startswith("END") and keyword[3:4].isspace()):
+                return None
+            elif type == KEYWORD and keyword == "AS":
+                # An alias is grouped with the tokens around AS, even if they
+                # are the parentheses themselves
+                previous = _skip_whitespace_back(types, index - 1, start)
+                following = _skip_whitespace(types, index + 1, end)
+                if (previous >= start and types[previous] == OPEN) or (following < end and types[following] == CLOSE):
+                    return None
+        elif type == PUNCTUATION and values[index] in ("[", "]"):
+            return None
+        elif type == OTHER and values[index] == ":=":
+            # An assignment is grouped with everything up to the end of the
+            # statement
+            return None
+        elif type == NAME and values[index] == "SELECT":
+            # A name is grouped into an identifier, which sqlparse then takes
+            # for a subquery
+            return None
+
+        if type == TZCAST or (type == PUNCTUATION and values[index] == "::"):
+            # A type cast is grouped with the tokens around it, whatever they
+            # are, which only keeps parentheses and queries intact if it is
+            # between other tokens
+            previous = _skip_whitespace_back(types, index - 1, start)
+            following = _skip_whitespace(types, index + 1, end)
+            if (previous < start or types[previous] == OPEN or values[previous].upper() == "SELECT"
+                    or following >= end or types[following] == CLOSE):
+                return None
+        elif type == COMMENT or type == LINE_COMMENT:
+            # A comment is added to the group before it, which would take the
+            # place of the closing parenthesis
+            previous = _skip_whitespace_back(types, index - 1, start)
+            if previous >= start and types[previous] == CLOSE:
+                return None
+
+    if parentheses:
+        return None
+
+    return groups
+
+
+def _skip_whitespace(types: List[int], index: int, end: int) -> int:
+    while index < end and types[index] in _WHITESPACE_TYPES:
+        index += 1
+    return index
+
+
+def _skip_whitespace_back(types: List[int], index: int, start: int) -> int:
+    while index >= start and types[index] in _WHITESPACE_TYPES:
+        index -= 1
+    return index
+
+
+def _find_clause_columns(types: List[int], values: List[str], groups: Dict[int, int],
+                         start: int, end: int, clause: str, top_level: bool) -> Optional[List[str]]:
+    """
+    Finds the names of the columns of a clause from the tokens of a query, in
+    the same way as _get_clause_columns does from the sqlparse tokens. Some
+    groups, such as a name with ASC or DESC, are only formed at the top level
+    of a statement, not within parentheses.
+
+    Returns:
+        Optional[List[str]]: The names of the columns, None if the clause
+        contains more than a list of (qualified) column names, which sqlparse
+        groups in ways that are not reproduced here.
+    """
+    # Find the clause keyword among the top level tokens
+    index = start
+    previous = None
+    while index < end:
+        if index in groups:
+            previous = None
+            index = groups[index] + 1
+            continue
+
+        type = types[index]
+        if type in KEYWORD_TYPES:
+            keyword = values[index].upper()
+            if keyword == clause:
+                break
+            # Everything from VALUES up to the last parenthesis is grouped
+            if type == KEYWORD and keyword == "VALUES":
+                return None
+        if type not in _WHITESPACE_TYPES:
+            previous = index
+        index += 1
+
+    # A clause keyword as the very last token has no columns
+    if index >= end - 1:
+        return []
+
+    # A keyword after a comma, AS or a type cast is grouped with the tokens
+    # before it
+    if previous is not None and (types[previous] in (COMMA, TZCAST) or values[previous] == "::" or (
+            types[previous] == KEYWORD and values[previous].upper() == "AS")):
+        return None
+
+    from sqlparse.utils import remove_quotes
+
+    # Every item of the clause as (name, whether it is grouped with a comma
+    # before it, whether it is grouped with a comma after it, whether it is
+    # a function call). Builtin types such as DATE are not grouped at all and
+    # have no name.
+    items: List[Tuple[Optional[str], bool, bool, bool]] = []
+    index = _skip_whitespace(types, index + 1, end)
+
+    while index < end:
+        type = types[index]
+        following = index + 1
+        function = False
+        name: Optional[str]
+
+        if type == BUILTIN:
+            name = None
+        elif type == NAME and following < end and types[following] == OPEN:
+            name = values[index]
+            following = groups[following] + 1
+            function = True
+        elif type in _NAME_TYPES:
+            name = values[index]
+            # A qualified name, only the last part is the name of the column
+            if following < end and types[following] == PUNCTUATION and values[following] == ".":
+                following += 1
+                if following >= end or types[following] not in _NAME_TYPES:
+                    return None
+                name = values[following]
+                following += 1
+                if following < end and types[following] == PUNCTUATION and values[following] == ".":
+                    return None
+        else:
+            break
+
+        index = _skip_whitespace(types, following, end)
+        grouped = type != BUILTIN
+        if index < end and types[index] == ORDER:
+            # ASC or DESC is only grouped with a name at the top level
+            grouped = grouped and top_level and not function
+            index = _skip_whitespace(types, index + 1, end)
+
+        items.append((None if name is None else remove_quotes(name), type != BUILTIN, grouped, function))
+
+        if index < end and types[index] == COMMA:
+            index = _skip_whitespace(types, index + 1, end)
+            if index >= end or types[index] not in _ITEM_TYPES:
+                return None
+            continue
+
+        break
+
+    # A comma groups the items around it into a list, the name of a function
+    # only counts within a list
+    links = [items[position][2] and items[position + 1][1] for position in range(len(items) - 1)]
+    columns = []
+    for position, (name, _, _, function) in enumerate(items):
+        listed = (position > 0 and links[position - 1]) or (position < len(links) and links[position])
+        if name is not None and (listed or not function):
+            columns.append(name)
+
+    if index >= end:
+        return columns
+
+    # The columns must be followed by a keyword that ends the clause, or by
+    # the end of the statement
+    if types[index] == KEYWORD:
+        following = _skip_whitespace(types, index + 1, end)
+        if values[index].upper() in _GROUPED_KEYWORDS or (following < end and (
+                types[following] in (COMMA, TZCAST) or values[following] == "::")):
+            return None
+        return columns
+
+    if types[index] == PUNCTUATION and values[index] == ";" and _skip_whitespace(types, index + 1, end) == end:
+        return columns
+
+    return None
+
+
+class ParsedQuery:
+    """
+    This is a class that holds a query which has been parsed exactly once, so
+    that every detector and query function can share the same parse.
+
+    By default the query is split by the built-in tokenizer, which is many
+    times faster than sqlparse. Queries the tokenizer does not understand,
+    such as CREATE statements and procedural blocks, are parsed by sqlparse
+    instead, as are all queries if the installed version of sqlparse is not
+    the one the tokenizer mirrors. The query is only parsed when the parse is
+    first used, and the sqlparse tokens of a tokenized query only when they
+    are used.
+
+    Parameters:
+        query (str): The raw query string.
+        use_tokenizer (bool): Whether to use the built-in tokenizer, if False
+            the query is always parsed by sqlparse.
+
+    Attributes:
+        query (str): The raw query string.
+        formatted (str): The query with all keywords in upper case, equal to
+            the output of format_query.
+        subqueries (List[ParsedQuery]): The main query and all subqueries.
+    """
+    __subqueries: List["ParsedQuery"]
+    __tokens: Optional[List["Token"]]
+
+    def __init__(self, query: str, use_tokenizer: bool = True):
+        self.__reset(query)
+        self.__parsed = False
+        self.__use_tokenizer = use_tokenizer
+
+    def parse(self):
+        """
+        This function parses the query, if it has not been parsed yet. It is
+        called on first use of the parse, so it only has to be called to
+        parse a query up front.
+        """
+        if self.__parsed:
+            return
+        self.__parsed = True
+
+        if self.query == "":
+            self.__tokens = []
+            return
+
+        if self.__use_tokenizer and is_supported() and self.__tokenize():
+            return
+
+        import sqlparse
+        from sqlparse import tokens as T
+        from sqlparse.filters import SerializerUnicode
+
+        statements = sqlparse.parse(self.query)
+        _, _, self.__subqueries = self.__collect_subqueries(statements[0])
+
+        # Convert keywords to upper case in place, so that the token tree is
+        # the same as the tree of the formatted query
+        for statement in statements:
+            for leaf in statement.flatten():
+                if leaf.ttype in T.Keyword:
+                    leaf.value = leaf.value.upper()
+
+        self.__formatted = "".join(SerializerUnicode.process(statement)
+                                   for statement in statements)
+        self.__tokens = statements[0].tokens
+
+    def __reset(self, query: str, formatted: str = ""):
+        self.query = query
+        self.__formatted = formatted
+        self.__subqueries = []
+        self.__parsed = True
+        # The sqlparse tokens and clause indexes, found on first use for a
+        # tokenized query
+        self.__tokens = None
+        self.__clause_indexes: Optional[Dict[str, int]] = None
+        # The tokenized query: the tokens, their text, the groups and the span
+        # of this (sub)query
+        self.__types: Optional[List[int]] = None
+        self.__values: List[str] = []
+        self.__groups: Dict[int, int] = {}
+        self.__span = (0, 0)
+        # The query this is a subquery of and its position in the subqueries
+        self.__root = self
+        self.__position = 0
+        self.__tree: Optional[ParsedQuery] = None
+
+    @classmethod
+    def from_tokens(cls, query: str, formatted: str,
+                    tokens: List["Token"]) -> "ParsedQuery":
+        """
+        This function creates a ParsedQuery from an already parsed list of
+        tokens, without parsing the query again.
+
+        Parameters:
+            query (str): The raw query string the tokens represent.
+            formatted (str): The query string with upper case keywords.
+            tokens (List["Token"]): The top level tokens of the query.
+
+        Returns:
+            ParsedQuery: The parsed query.
+        """
+        from sqlparse.filters import SerializerUnicode
+
+        parsed_query = cls.__new__(cls)
+        parsed_query.__reset(query, SerializerUnicode.process(formatted))
+        parsed_query.__tokens = tokens
+        return parsed_query
+
+    def __tokenize(self) -> bool:
+        """
+        Parses the query from the tokens of the built-in tokenizer.
+
+        Returns:
+            bool: False if the query has to be parsed by sqlparse instead.
+        """
+        from sqlparse.filters import SerializerUnicode
+
+        tokens: Tokens = tokenize(self.query)
+        types = tokens.types
+        values = tokens.get_values()
+
+        statements = _split_statements(types, values)
+        if not statements:
+            return False
+
+        start, end = statements[0]
+        groups = _match_groups(types, values, start, end)
+        if groups is None:
+            return False
+
+        def is_select(index: int) -> bool:
+            return types[index] in KEYWORD_TYPES and values[index].upper() == "SELECT"
+
+        # The main query and every parenthesis starting with SELECT, in order
+        selects = [index for index in sorted(groups)
+                   if types[index] == OPEN and is_select(index + 1)]
+        spans = [(start, end)] if is_select(start) else []
+        spans.extend((index + 1, groups[index]) for index in selects)
+
+        # sqlparse does not group the names within a qualified function call
+        # such as a.f(...), so neither within the queries in it
+        for index in groups if selects else ():
+            name = _skip_whitespace_back(types, index - 1, start)
+            if types[index] != OPEN or name < start or types[name] not in _FUNCTION_NAME_TYPES:
+                continue
+            period = _skip_whitespace_back(types, name - 1, start)
+            if period >= start and values[period] == "." and any(
+                    index <= select < groups[index] for select in selects):
+                return False
+
+        for span_start, span_end in spans:
+            # sqlparse groups SELECT with a comma after it into a list
+            following = _skip_whitespace(types, span_start + 1, span_end)
+            if following < span_end and types[following] == COMMA:
+                return False
+
+        formatted = [value.upper() if type in KEYWORD_TYPES else value
+                     for type, value in zip(types, values)]
+        nested = set(selects)
+
+        for position, span in enumerate(spans):
+            query_parts, formatted_parts = [], []
+            index, span_end = span
+            while index < span_end:
+                if index in nested:
+                    query_parts.append("<subquery>")
+                    formatted_parts.append("<subquery>")
+                    index = groups[index] + 1
+                    continue
+                # As in __collect_subqueries, the parentheses of a group are
+                # left out of the text
+                if types[index] != OPEN and types[index] != CLOSE:
+                    query_parts.append(values[index])
+                    formatted_parts.append(formatted[index])
+                index += 1
+
+            subquery = ParsedQuery.__new__(ParsedQuery)
+            subquery.__reset("".join(query_parts),
+                             SerializerUnicode.process("".join(formatted_parts)))
+            subquery.__use_tokens(types, values, groups, span, self, position)
+            self.__subqueries.append(subquery)
+
+        self.__formatted = "".join(SerializerUnicode.process("".join(formatted[start:end]))
+                                   for start, end in statements)
+        self.__use_tokens(types, values, groups, statements[0], self, 0)
+        return True
+
+    def __use_tokens(self, types: List[int], values: List[str], groups: Dict[int, int],
+                     span: Tuple[int, int], root: "ParsedQuery", position: int):
+        self.__types = types
+        self.__values = values
+        self.__groups = groups
+        self.__span = span
+        self.__root = root
+        self.__position = position
+
+    def __get_tree(self) -> "ParsedQuery":
+        # The same (sub)query, parsed by sqlparse
+        if self.__root is not self:
+            return self.__root.__get_tree().subqueries[self.__position]
+        if self.__tree is None:
+            self.__tree = ParsedQuery(self.query, use_tokenizer=False)
+        return self.__tree
+
+    @property
+    def formatted(self) -> str:
+        """
+        str: The query with all keywords in upper case.
+        """
+        if not self.__parsed:
+            self.parse()
+        return self.__formatted
+
+    @property
+    def subqueries(self) -> List["ParsedQuery"]:
+        """
+        List[ParsedQuery]: The main query and all subqueries.
+        """
+        if not self.__parsed:
+            self.parse()
+        return self.__subqueries
+
+    @property
+    def tokens(self) -> List["Token"]:
+        """
+        List["Token"]: The top level sqlparse tokens of the (first) statement.
+        """
+        if not self.__parsed:
+            self.parse()
+        if self.__tokens is None:
+            self.__tokens = self.__get_tree().tokens
+        return self.__tokens
+
+    @property
+    def clause_indexes(self) -> Dict[str, int]:
+        """
+        Dict[str, int]: Index in tokens of every clause keyword in CLAUSES
+        that is present in the query.
+        """
+        if self.__clause_indexes is None:
+            self.__clause_indexes = self.__find_clause_indexes()
+        return self.__clause_indexes
+
+    def __find_clause_indexes(self) -> Dict[str, int]:
+        indexes: Dict[str, int] = {}
+
+        # A clause keyword as the very last token has no columns, so it is
+        # treated as if it was not present at all
+        for index, token in enumerate(self.tokens[:-1]):
+            if not token.is_keyword:
+                continue
+            value = token.value.upper()
+            if value in CLAUSES and value not in indexes:
+                indexes[value] = index
+
+        return indexes
+
+    def __collect_subqueries(self, token: "Token") -> Tuple[str, str, List["ParsedQuery"]]:
+        """
+        Walks the token tree in the same way as get_subqueries, but also keeps
+        the tokens of every subquery so they do not have to be parsed again.
+
+        Returns:
+            str: The raw text of the token with subqueries replaced.
+            str: The formatted text of the token with subqueries replaced.
+            List[ParsedQuery]: The subqueries found within the token.
+        """
+        if not token.is_group:
+            return token.value, _format_tokens([token]), []
+
+        from sqlparse.sql import Parenthesis
+
+        paren = isinstance(token, Parenthesis)
+        children = token.tokens[1:-1] if paren else token.tokens
+        parts = [self.__collect_subqueries(child) for child in children]
+
+        query = "".join(part[0] for part in parts)
+        formatted = "".join(part[1] for part in parts)
+        subqueries = [subquery for part in parts for subquery in part[2]]
+
+        if token.tokens[paren].normalized == "SELECT":
+            subquery = ParsedQuery.from_tokens(query, formatted, children)
+            return "<subquery>", "<subquery>", [subquery] + subqueries
+
+        return query, formatted, subqueries
+
+    def get_clause_index(self, clause: str) -> Optional[int]:
+        """
+        This function returns the index of a clause keyword in the top level
+        tokens of the query.
+
+        Parameters:
+            clause (str): The clause keyword, for example "GROUP BY".
+
+        Returns:
+            Optional[int]: The index of the clause, None if it is not present.
+        """
+        return self.clause_indexes.get(clause)
+
+    def get_clause_columns(self, clause: str) -> List[str]:
+        """
+        This function returns the names of the columns in a clause of the
+        query.
+
+        Parameters:
+            clause (str): The clause keyword, for example "GROUP BY".
+
+        Returns:
+            List[str]: The names of the columns, empty if the clause is not
+            present.
+        """
+        if not self.__parsed:
+            self.parse()
+        if self.__types is not None:
+            start, end = self.__span
+            columns = _find_clause_columns(self.__types, self.__values, self.__groups, start, end,
+                                           clause, self.__span == self.__root.__span)
+            if columns is not None:
+                return columns
+
+        return _get_clause_columns(self.tokens, self.get_clause_index(clause))
@@ -0,0 +1,358 @@
+"""Utility functions w.r.t extracting SQL queries from Python source code"""
+import ast
+import fnmatch
+import io
+import os
+import re
+import tokenize
+from bisect import bisect_right
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from sqleyes.utils.statement_splitter import Statement, StatementSplitter
+
+
+# Names of the functions and methods whose first argument is a query
+QUERY_FUNCTIONS = frozenset(["execute", "executemany", "text"])
+
+# Names of the keyword arguments that may hold the query instead
+QUERY_KEYWORDS = frozenset(["sql", "query", "operation", "statement", "text"])
+
+# Replaces every replacement field of an f-string
+PLACEHOLDER = "?"
+
+# Directories that are never scanned, next to hidden directories
+SKIPPED_DIRECTORIES = frozenset(["__pycache__", "node_modules"])
+
+# Finds files that may call a query function, before they are parsed
+_CALL_PATTERN = re.compile(rb"\b(?:" + b"|".join(name.encode() for name in sorted(QUERY_FUNCTIONS))
+                           + rb")\s*\(")
+
+_ESCAPE_PATTERN = re.compile(r"\\(?:\r\n|\r|\n|[\\'\"abfnrtv]|[0-7]{1,3}|x[0-9a-fA-F]{2}"
+                             r"|N\{[^}\r\n]*\}|u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8})")
+_LINE_BREAK_PATTERN = re.compile(r"\r\n|\r|\n")
+_PREFIX_PATTERN = re.compile(r"[A-Za-z]*")
+# Whitespace, line continuations and comments between implicitly
+# concatenated string literals
+_SEPARATOR_PATTERN = re.compile(r"(?:[ \t\f\r\n]|\\(?:\r\n|\r|\n)|#[^\r\n]*)*")
+
+_WHITESPACE = " \t\r\n\f\v"
+
+
+class EmbeddedStatement(Statement):
+    """
+    This class represents a statement taken from a string literal in Python
+    source code. Every character of the statement maps back to the position
+    of the source it was written as.
+
+    Attributes:
+        positions (List[Tuple[int, int]]): The line and column in the source
+            of every character of the statement, followed by those of the end
+            of the statement.
+    """
+    __slots__ = ("positions",)
+
+    def __init__(self, index: int, offset: int, text: str,
+                 positions: List[Tuple[int, int]]):
+        super().__init__(index, offset, text, *positions[0])
+        self.positions = positions
+
+    def get_position(self, location: int) -> Tuple[int, int]:
+        """
+        This function converts a location in the statement into a position in
+        the source.
+
+        Parameters:
+            location (int): A character index in the statement.
+
+        Returns:
+            Tuple[int, int]: The line and column in the source.
+        """
+        return self.positions[max(0, min(location, len(self.text)))]
+
+
+def may_contain_queries(data: bytes) -> bool:
+    """
+    This function quickly checks whether a source file calls a query function
+    at all, so that most files never have to be parsed.
+
+    Parameters:
+        data (bytes): The contents of the file.
+
+    Returns:
+        bool: False if the file certainly contains no queries.
+    """
+    return _CALL_PATTERN.search(data) is not None
+
+
+def decode_source(data: bytes) -> str:
+    """
+    This function decodes Python source code, respecting its encoding
+    declaration.
+
+    Parameters:
+        data (bytes): The contents of the file.
+
+    Returns:
+        str: The source code.
+
+    Raises:
+        SyntaxError: If the encoding declaration is invalid.
+        UnicodeDecodeError: If the source is not in its declared encoding.
+    """
+    encoding, _ = tokenize.detect_encoding(io.BytesIO(data).readline)
+    return data.decode(encoding)
+
+
+def find_python_files(directory: str, exclude: Sequence[str] = ()) -> Iterator[str]:
+    """
+    This function lists the Python files in a directory and its
+    subdirectories, in a stable order. Hidden directories are skipped.
+
+    Parameters:
+        directory (str): The directory to search.
+        exclude (Sequence[str]): Patterns of file and directory names to
+            skip, for example "venv" or "test_*.py".
+
+    Returns:
+        Iterator[str]: The paths of the files.
+    """
+    def excluded(name: str) -> bool:
+        return any(fnmatch.fnmatch(name, pattern) for pattern in exclude)
+
+    for root, directories, files in os.walk(directory):
+        directories[:] = sorted(name for name in directories
+                                if not name.startswith(".") and name not in SKIPPED_DIRECTORIES
+                                and not excluded(name))
+        for name in sorted(files):
+            if name.endswith(".py") and not excluded(name):
+                yield os.path.join(root, name)
+
+
+def extract_statements(source: str) -> List[EmbeddedStatement]:
+    """
+    This function finds the queries passed as string literal to execute,
+    executemany and text calls. The replacement fields of f-strings become
+    placeholders, and a literal holding several statements is split.
+
+    Parameters:
+        source (str): Python source code.
+
+    Returns:
+        List[EmbeddedStatement]: The statements, in order of the source.
+
+    Raises:
+        SyntaxError: If the source can not be parsed.
+    """
+    tree = ast.parse(source)
+    calls = sorted((node for node in ast.walk(tree)
+                    if isinstance(node, ast.Call) and _get_name(node.func) in QUERY_FUNCTIONS),
+                   key=lambda node: (node.lineno, node.col_offset))
+
+    line_starts = [0] + [match.end() for match in _LINE_BREAK_PATTERN.finditer(source)]
+    statements: List[EmbeddedStatement] = []
+
+    for call in calls:
+        argument = _get_query_argument(call)
+        value = None if argument is None else _get_value(argument)
+        if argument is None or value is None:
+            continue
+
+        # The end of a node is known since Python 3.8
+        end_line = getattr(argument, "end_lineno", None)
+        end_column = getattr(argument, "end_col_offset", None)
+
+        literal = None
+        if end_line is not None and end_column is not None:
+            literal = _read_literal(source,
+                                    _to_offset(source, line_starts, argument.lineno, argument.col_offset),
+                                    _to_offset(source, line_starts, end_line, end_column))
+        if literal is None or literal[0] != value:
+            # Without the span of the literal, the query maps to its call
+            start = _to_offset(source, line_starts, call.lineno, call.col_offset)
+            literal = value, [start] * (len(value) + 1)
+
+        text, offsets = literal
+        for start, end in _split(text):
+            # A statement followed by another one ends after its last
+            # character, rather than where the next one starts
+            end_offset = offsets[end] if end == len(text) else min(offsets[end], offsets[end - 1] + 1)
+            positions = []
+            for offset in offsets[start:end] + [end_offset]:
+                line = bisect_right(line_starts, offset)
+                positions.append((line, offset - line_starts[line - 1] + 1))
+            statements.append(EmbeddedStatement(len(statements),
+                                                len(source[:offsets[start]].encode("utf-8")),
+                                                text[start:end], positions))
+
+    return statements
+
+
+def _get_name(node: ast.AST) -> Optional[str]:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _get_query_argument(call: ast.Call) -> Optional[ast.expr]:
+    if call.args:
+        return call.args[0]
+    for keyword in call.keywords:
+        if keyword.arg in QUERY_KEYWORDS:
+            return keyword.value
+    return None
+
+
+def _get_value(node: ast.AST) -> Optional[str]:
+    # The text of a string literal, with placeholders for replacement fields
+    if isinstance(node, ast.Constant):
+        return node.value if isinstance(node.value, str) else None
+    if type(node).__name__ == "Str":
+        # String literals before Python 3.8
+        text: str = getattr(node, "s")
+        return text
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            part = PLACEHOLDER if isinstance(value, ast.FormattedValue) else _get_value(value)
+            if part is None:
+                return None
+            parts.append(part)
+        return "".join(parts)
+    return None
+
+
+def _to_offset(source: str, line_starts: List[int], line: int, column: int) -> int:
+    # Columns of the syntax tree count UTF-8 bytes
+    start = line_starts[line - 1]
+    end = line_starts[line] if line < len(line_starts) else len(source)
+    return start + len(source[start:end].encode("utf-8")[:column].decode("utf-8", "ignore"))
+
+
+def _read_literal(source: str, start: int, end: int) -> Optional[Tuple[str, List[int]]]:
+    # Reads the (implicitly concatenated) string literals between start and
+    # end, and the offset in the source of every character of their value,
+    # followed by the offset of the end of the value
+    chars: List[str] = []
+    offsets: List[int] = []
+    pos = start
+    value_end = None
+
+    while True:
+        pos = _SEPARATOR_PATTERN.match(source, pos, end).end()  # type: ignore
+        if pos >= end:
+            break
+
+        prefix = _PREFIX_PATTERN.match(source, pos, end).group().lower()  # type: ignore
+        if not set(prefix) <= set("rfu"):
+            return None
+        pos += len(prefix)
+        raw, formatted = "r" in prefix, "f" in prefix
+
+        quote = source[pos:pos + 3] if source.startswith(('"""', "'''"), pos) else source[pos:pos + 1]
+        if quote not in ('"', "'", '"""', "'''"):
+            return None
+        pos += len(quote)
+
+        while not source.startswith(quote, pos):
+            if pos >= end:
+                return None
+
+            char = source[pos]
+            if char == "\\" and raw:
+                # Kept, but the next quote or backslash does not end anything
+                chars.append(char)
+                offsets.append(pos)
+                pos += 1
+                if source.startswith((quote[0], "\\"), pos):
+                    chars.append(source[pos])
+                    offsets.append(pos)
+                    pos += 1
+            elif char == "\\":
+                match = _ESCAPE_PATTERN.match(source, pos, end)
+                if match is None:
+                    # An unknown escape sequence keeps its backslash
+                    chars.append(char)
+                    offsets.append(pos)
+                    pos += 1
+                    continue
+                escape = match.group()
+                if escape[1] not in "\r\n":
+                    try:
+                        decoded = escape.encode("ascii").decode("unicode_escape")
+                    except UnicodeError:
+                        return None
+                    chars.extend(decoded)
+                    offsets.extend([pos] * len(decoded))
+                pos = match.end()
+            elif formatted and char in "{}":
+                if source.startswith(char * 2, pos):
+                    chars.append(char)
+                    offsets.append(pos)
+                    pos += 2
+                    continue
+                field_end = _skip_field(source, pos, end)
+                if char == "}" or field_end is None:
+                    return None
+                chars.append(PLACEHOLDER)
+                offsets.append(pos)
+                pos = field_end
+            elif char == "\r":
+                # Line breaks in literals are always read as \n
+                chars.append("\n")
+                offsets.append(pos)
+                pos += 2 if source.startswith("\r\n", pos) else 1
+            else:
+                chars.append(char)
+                offsets.append(pos)
+                pos += 1
+
+        value_end = pos
+        pos += len(quote)
+
+    if value_end is None:
+        return None
+
+    offsets.append(value_end)
+    return "".join(chars), offsets
+
+
+def _skip_field(source: str, pos: int, end: int) -> Optional[int]:
+    # Skips a replacement field of an f-string, which may contain brackets
+    # and strings of its own
+    depth = 0
+    while pos < end:
+        char = source[pos]
+        if char in "{[(":
+            depth += 1
+        elif char in "}])":
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+        elif char in "'\"":
+            quote = source[pos:pos + 3] if source.startswith((char * 3), pos) else char
+            pos += len(quote)
+            while pos < end and not source.startswith(quote, pos):
+                pos += 2 if source[pos] == "\\" else 1
+            pos += len(quote)
+            continue
+        pos += 1
+    return None
+
+
+def _split(text: str) -> Iterator[Tuple[int, int]]:
+    # Splits a query into statements, without the whitespace around them
+    splitter = StatementSplitter()
+    pos = 0
+    while pos < len(text):
+        start = pos
+        boundary, pos = splitter.find_boundary(text, pos, True)
+        end = len(text) if boundary is None else boundary
+        segment = text[start:end]
+        stripped = segment.strip(_WHITESPACE)
+        if stripped and not splitter.command:
+            start += len(segment) - len(segment.lstrip(_WHITESPACE))
+            yield start, start + len(stripped)
+        if boundary is None:
+            return
@@ -1,12 +1,14 @@
 """Utility functions w.r.t queries"""
 import re
-from typing import List, Tuple
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Tuple
 
-import sqlparse
-
-from sqleyes.utils.code_complexity_metrics import halstead_metrics
+from sqleyes.utils.code_complexity_metrics import halstead_metrics, halstead_metrics_batch
+from sqleyes.utils.parsed_query import ParsedQuery
 from sqleyes.utils.query_keywords import SQL_FUNCTIONS
 
+if TYPE_CHECKING:
+    import sqlparse
+
 
 OPERATORS = ["+", "-", "*", "**", "/", "%", "&", "|", "||", "^", "=", "!=",
              ">", "<", ">=", "<=", "!<", "!>", "<>", "+=", "-=", "/=", "/=",
@@ -18,8 +20,20 @@ EXPRESSIONS = ["CASE", "DECODE", "IF", "NULLIF", "COALESCE", "GREATEST",
                "GREATER", "LEAST", "LESSER", "CAST", "JOIN", "GROUP BY",
                "WHERE", "HAVING", "ORDER BY", "UNION", "EXCEPT"]
 
+# Number of entries of every operator and expression in the lists above
+_OPS_AND_EXPR: Dict[str, int] = {}
+for _word in OPERATORS + EXPRESSIONS:
+    _OPS_AND_EXPR[_word] = _OPS_AND_EXPR.get(_word, 0) + 1
+
+# Pairs of words that are merged into a single operator or expression
+_MERGED_WORDS = frozenset([("IS", "NULL"), ("ORDER", "BY"), ("GROUP", "BY")])
+
+# Matches a column containing any of the SQL functions
+_SQL_FUNCTIONS_PATTERN = re.compile("|".join(re.escape(function) for function in SQL_FUNCTIONS),
+                                    re.IGNORECASE)
+
 
-def get_subqueries(parsed_query: sqlparse.sql.Statement) -> Tuple[str, List[str]]:
+def get_subqueries(parsed_query: "sqlparse.sql.Statement") -> Tuple[str, List[str]]:
     """
     This function takes parsed query Statement object as input and returns a
     list of the main query and all the subqueries.
@@ -30,154 +44,144 @@ def get_subqueries(parsed_query: sqlparse.sql.Statement) -> Tuple[str, List[str]
     Returns:
         List[str]: A list of queries contained in the query.
     """
+    import sqlparse
+
     if type(parsed_query) != sqlparse.sql.Token:
         paren = isinstance(parsed_query, sqlparse.sql.Parenthesis)
         v = [get_subqueries(i) for i in (parsed_query if not paren else parsed_query[1:-1])]
         subseq, qrs = ''.join(str(i[0]) for i in v), [x for _, y in v for x in y]
-        if [*parsed_query][paren].value == 'SELECT':
+        if [*parsed_query][paren].normalized == 'SELECT':
             return '<subquery>', [subseq]+qrs
         return subseq, qrs
     return parsed_query, []
 
 
-def parse_query(query: str) -> List[str]:
+def parse_query(query: ParsedQuery) -> List[str]:
     """
-    This function takes a query string as input and returns a list of the main
+    This function takes a parsed query as input and returns a list of the main
     query and all the subqueries.
 
     Parameters:
-        query (str): The query string.
+        query (ParsedQuery): The parsed query.
 
     Returns:
         List[str]: A list of queries contained in the query.
     """
-    if query == "":
-        return []
-
-    parsed_query = sqlparse.parse(query)[0]
-    _, subqueries = get_subqueries(parsed_query)
+    return [subquery.query for subquery in query.subqueries]
 
-    return subqueries
 
-
-def format_query(query: str) -> str:
+def format_query(query: ParsedQuery) -> str:
     """
-    This function takes a query string as input and returns a formatted query.
+    This function takes a parsed query as input and returns a formatted query.
 
     Parameters:
-        query (str): The query string.
+        query (ParsedQuery): The parsed query.
 
     Returns:
         str: A query that is properly formatted.
     """
-    return str(sqlparse.format(query, keyword_case='upper'))
+    return query.formatted
 
 
-def has_subqueries(query: str) -> bool:
+def has_subqueries(query: ParsedQuery) -> bool:
     """
-    This function takes a query string as input and returns True if that query
+    This function takes a parsed query as input and returns True if that query
     contains subqueries.
 
     Parameters:
-        query (str): The query string.
+        query (ParsedQuery): The parsed query.
 
     Returns:
         bool: True if query contains subqueries, False otherwise
     """
-    query = format_query(query)
-
-    select_count = re.findall(r'\(\s*SELECT', query, flags=re.DOTALL |
+    select_count = re.findall(r'\(\s*SELECT', query.formatted, flags=re.DOTALL |
                               re.IGNORECASE)
 
     return len(select_count) > 0
 
 
-def has_union(query: str) -> bool:
+def has_union(query: ParsedQuery) -> bool:
     """
-    This function takes a query string as input and returns True if that query
+    This function takes a parsed query as input and returns True if that query
     contains a UNION.
 
     Parameters:
-        query (str): The query string.
+        query (ParsedQuery): The parsed query.
 
     Returns:
         bool: True if query contains a UNION, False otherwise
     """
-    query = format_query(query)
-
-    union_count = re.findall(r'UNION', query, flags=re.DOTALL |
+    union_count = re.findall(r'UNION', query.formatted, flags=re.DOTALL |
                              re.IGNORECASE)
 
     return len(union_count) > 0
 
 
-def get_unions(query: str) -> List[str]:
+def get_unions(query: ParsedQuery) -> List[ParsedQuery]:
     """
-    This function takes a query string as input and returns a list of query
+    This function takes a parsed query as input and returns a list of query
     unions
 
     Parameters:
-        query (str): The query string.
+        query (ParsedQuery): The parsed query.
 
     Returns:
-        List[str]: A list of query unions
+        List[ParsedQuery]: A list of query unions
     """
     if not has_union(query):
         return [query]
 
-    return re.split("\\s*UNION\\s*", query, flags=re.DOTALL | re.IGNORECASE)
+    return [ParsedQuery(union) for union in
+            re.split("\\s*UNION\\s*", query.query, flags=re.DOTALL | re.IGNORECASE)]
 
 
-def has_except(query: str) -> bool:
+def has_except(query: ParsedQuery) -> bool:
     """
-    This function takes a query string as input and returns True if that query
+    This function takes a parsed query as input and returns True if that query
     contains a EXCEPT.
 
     Parameters:
-        query (str): The query string.
+        query (ParsedQuery): The parsed query.
 
     Returns:
         bool: True if query contains a EXCEPT, False otherwise
     """
-    query = format_query(query)
-
-    except_count = re.findall(r'EXCEPT', query, flags=re.DOTALL |
+    except_count = re.findall(r'EXCEPT', query.formatted, flags=re.DOTALL |
                               re.IGNORECASE)
 
     return len(except_count) > 0
 
 
-def get_excepts(query: str) -> List[str]:
+def get_excepts(query: ParsedQuery) -> List[ParsedQuery]:
     """
-    This function takes a query string as input and returns a list of query
+    This function takes a parsed query as input and returns a list of query
     excepts
 
     Parameters:
-        query (str): The query string.
+        query (ParsedQuery): The parsed query.
 
     Returns:
-        List[str]: A list of query excepts
+        List[ParsedQuery]: A list of query excepts
     """
     if not has_except(query):
         return [query]
 
-    return re.split("\\s*EXCEPT\\s*", query, flags=re.DOTALL | re.IGNORECASE)
+    return [ParsedQuery(except_query) for except_query in
+            re.split("\\s*EXCEPT\\s*", query.query, flags=re.DOTALL | re.IGNORECASE)]
 
 
-def get_columns_from_select_statement(query: str) -> List[str]:
+def get_columns_from_select_statement(query: ParsedQuery) -> List[str]:
     """
-    This function takes a query string as input and returns a list of columns
+    This function takes a parsed query as input and returns a list of columns
     in the SELECT statement.
 
     Parameters:
-        query (str): The query string.
+        query (ParsedQuery): The parsed query.
 
     Returns:
         List[str]: A list of columns selected in the SELECT statement.
     """
-    query = format_query(query)
-
-    columns = re.findall(r'SELECT (.*?) FROM', query,
+    columns = re.findall(r'SELECT (.*?) FROM', query.formatted,
                          flags=re.DOTALL | re.IGNORECASE)
 
     if len(columns) == 0:
@@ -188,89 +192,35 @@ def get_columns_from_select_statement(query: str) -> List[str]:
     return columns
 
 
-def get_columns_from_group_by_statement(query: str) -> List[str]:
+def get_columns_from_group_by_statement(query: ParsedQuery) -> List[str]:
     """
-    This function takes a query string as input and returns a list of columns
+    This function takes a parsed query as input and returns a list of columns
     in the GROUP BY statement.
 
     Parameters:
-        query (str): A SQL query string.
+        query (ParsedQuery): The parsed query.
 
     Returns:
         List[str]: A list of column names in the GROUP BY statement.
     """
-    query = format_query(query)
-
-    tokens = sqlparse.parse(query)[0].tokens
-
-    # Find index of group by keyword in tokens
-    for i in range(0, len(tokens)):
-        if tokens[i].value.upper() == "GROUP BY":
-            break
-
-    # Query has no GROUP BY statement
-    if i == len(tokens) - 1:
-        return []
-
-    # Find possible index of next keyword
-    for j in range(i + 1, len(tokens)):
-        if tokens[j].ttype is sqlparse.tokens.Keyword:
-            break
-
-    # Get column names
-    group_columns = []
-    for item in tokens[i:j + 1]:
-        if isinstance(item, sqlparse.sql.IdentifierList):
-            for identifier in item.get_identifiers():
-                group_columns.append(identifier.get_name())
-        elif isinstance(item, sqlparse.sql.Identifier):
-            group_columns.append(item.get_name())
+    return query.get_clause_columns("GROUP BY")
 
-    return group_columns
 
-
-def get_columns_from_order_by_statement(query: str) -> List[str]:
+def get_columns_from_order_by_statement(query: ParsedQuery) -> List[str]:
     """
-    This function takes a query string as input and returns a list of columns
+    This function takes a parsed query as input and returns a list of columns
     in the ORDER BY statement.
 
     Parameters:
-        query (str): The query string.
+        query (ParsedQuery): The parsed query.
 
     Returns:
         List[str]: A list of columns selected in the SELECT statement.
     """
-    query = format_query(query)
-
-    tokens = sqlparse.parse(query)[0].tokens
-
-    # Find index of group by keyword in tokens
-    for i in range(0, len(tokens)):
-        if tokens[i].value.upper() == "ORDER BY":
-            break
-
-    # Query has no GROUP BY statement
-    if i == len(tokens) - 1:
-        return []
+    return query.get_clause_columns("ORDER BY")
 
-    # Find possible index of next keyword
-    for j in range(i + 1, len(tokens)):
-        if tokens[j].ttype is sqlparse.tokens.Keyword:
-            break
 
-    # Get column names
-    order_columns = []
-    for item in tokens[i:j + 1]:
-        if isinstance(item, sqlparse.sql.IdentifierList):
-            for identifier in item.get_identifiers():
-                order_columns.append(identifier.get_name())
-        elif isinstance(item, sqlparse.sql.Identifier):
-            order_columns.append(item.get_name())
-
-    return order_columns
-
-
-def get_all_columns(query: str) -> List[str]:
+def get_all_columns(query: ParsedQuery) -> List[str]:
     select_columns = get_columns_from_select_statement(query)
     group_by_columns = get_columns_from_group_by_statement(query)
     order_by_columns = get_columns_from_order_by_statement(query)
@@ -278,88 +228,94 @@ def get_all_columns(query: str) -> List[str]:
     return select_columns + group_by_columns + order_by_columns
 
 
-def get_query_ops_and_expr(query: str) -> List[str]:
+def _get_ops_and_expr_tokens(query: ParsedQuery) -> Iterator[str]:
     """
-    Finds all the operators and expressions used inside a query. Returns a list
-    of all operators and expressions
+    This function splits a query into words, in a single pass over the
+    formatted query. Words of a multi-word operator or expression, such as
+    IS NOT NULL and GROUP BY, are merged while scanning, as is SELECT *.
 
     Parameters:
-        query (str): A SQL query string.
+        query (ParsedQuery): The parsed query.
 
     Returns:
-        List[str]: A list a all operators and expressions from the input query
+        Iterator[str]: The words of the query.
     """
-    result = []
+    query_tokens = query.formatted.split()
+    i, query_len = 0, len(query_tokens)
+    while i < query_len:
+        token = query_tokens[i]
+        if i + 1 < query_len:
+            next_token = query_tokens[i + 1]
+            if (token, next_token) in _MERGED_WORDS or (next_token == "*" and "SELECT" in token):
+                token = f"{token} {next_token}"
+                i += 1
+            elif (token == "IS" and next_token == "NOT" and i + 2 < query_len and
+                    query_tokens[i + 2] == "NULL"):
+                token = "IS NOT NULL"
+                i += 2
+        yield token
+        i += 1
 
-    # Format the query
-    query = sqlparse.format(query, keyword_case="upper")
 
-    # Split the query
-    query_tokens = query.split()
+def count_query_ops_and_expr(query: ParsedQuery) -> Dict[str, int]:
+    """
+    Counts the operators and expressions used inside a query, in a single pass
+    over the query.
 
-    # Fix split
-    # Merges ["SELECT", "*"] into ["SELECT *"]
-    # Merges ["IS", "NULL"] into ["IS NULL"]
-    # Merges ["ORDER", "BY"] into ["ORDER BY"]
-    # Merges ["GROUP", "BY"] into ["GROUP BY"]
-    i, query_len = 0, len(query_tokens)
-    while i < query_len - 1:
-        merge_current_cel = False
-        if "SELECT" in query_tokens[i] and query_tokens[i + 1] == "*":
-            merge_current_cel = True
-        elif query_tokens[i] == "IS" and query_tokens[i + 1] == "NULL":
-            merge_current_cel = True
-        elif query_tokens[i] == "ORDER" and query_tokens[i + 1] == "BY":
-            merge_current_cel = True
-        elif query_tokens[i] == "GROUP" and query_tokens[i + 1] == "BY":
-            merge_current_cel = True
-
-        # Merge two cells into one
-        # Adjust overall query length since we have one less cell
-        if merge_current_cel:
-            query_tokens[i:i + 2] = [' '.join(query_tokens[i:i + 2])]
-            query_len -= 1
+    Parameters:
+        query (ParsedQuery): The parsed query.
 
-        i += 1
+    Returns:
+        Dict[str, int]: The number of times every operator and expression
+        occurs in the input query
+    """
+    counts: Dict[str, int] = {}
+    ops_and_expr = _OPS_AND_EXPR
+    for token in _get_ops_and_expr_tokens(query):
+        occurrences = ops_and_expr.get(token)
+        if occurrences:
+            counts[token] = counts.get(token, 0) + occurrences
+
+    return counts
 
-    # Fix split
-    # Merges ["IS", "NOT", "NULL"] into ["IS NOT NULL"]
-    i, query_len = 0, len(query_tokens)
-    while i < query_len - 1:
-        if (query_tokens[i] == "IS" and query_tokens[i + 1] == "NOT" and
-                query_tokens[i + 2] == "NULL"):
-            query_tokens[i:i + 3] = [' '.join(query_tokens[i: i + 3])]
-            query_len -= 2
-        i += 1
 
-    # Check every element if its an operator or expression
-    for elem in query_tokens:
-        for operator in OPERATORS:
-            if elem == operator:
-                result.append(operator)
+def get_query_ops_and_expr(query: ParsedQuery) -> List[str]:
+    """
+    Finds all the operators and expressions used inside a query. Returns a list
+    of all operators and expressions
 
-        for expression in EXPRESSIONS:
-            if elem == expression:
-                result.append(expression)
+    Parameters:
+        query (ParsedQuery): The parsed query.
+
+    Returns:
+        List[str]: A list a all operators and expressions from the input query
+    """
+    result = []
+    ops_and_expr = _OPS_AND_EXPR
+    for token in _get_ops_and_expr_tokens(query):
+        occurrences = ops_and_expr.get(token)
+        if occurrences:
+            result.extend([token] * occurrences)
 
     return result
 
 
-def get_query_complexity(query: str) -> float:
+def get_halstead_counts(query: ParsedQuery) -> Tuple[int, int, int, int]:
     """
-    Calculates the complexity of a query based on the Halstead Metric + LoC
+    This function counts the Halstead operators and operands of a query.
 
     Parameters:
-        query (str): A SQL query string.
+        query (ParsedQuery): The parsed query.
 
     Returns:
-        int: The complexity of the query
+        n1 (int): Number of unique operators in the query.
+        n2 (int): Number of unique operands in the query.
+        N1 (int): Number of operators in the query.
+        N2 (int): Number of operands in the query.
     """
-    query = format_query(query)
-
     # From paper 'Measuring Query Complexity in SQLShare Workload'
     # Number of operators and expressions as Halstead operators
-    operators = get_query_ops_and_expr(query)
+    operators = count_query_ops_and_expr(query)
 
     # Number of columns referenced in query as Halstead operants
     # If query has a UNION, get all columns for each query in the union
@@ -370,14 +326,53 @@ def get_query_complexity(query: str) -> float:
     else:
         operands.extend(get_all_columns(query))
 
-    N1, N2 = len(operators), len(operands)
-    n1, n2 = len(set(operators)), len(set(operands))
+    N1, N2 = sum(operators.values()), len(operands)
+    n1, n2 = len(operators), len(set(operands))
 
-    complexity = float(halstead_metrics(n1, n2, N1, N2)[3])
+    return (n1, n2, N1, N2)
+
+
+def get_query_complexity(query: ParsedQuery) -> float:
+    """
+    Calculates the complexity of a query based on the Halstead Metric + LoC
+
+    Parameters:
+        query (ParsedQuery): The parsed query.
+
+    Returns:
+        int: The complexity of the query
+    """
+    complexity = float(halstead_metrics(*get_halstead_counts(query))[3])
 
     return complexity
 
 
+def get_queries_halstead_metrics(queries: Iterable[ParsedQuery]):
+    """
+    This function computes all Halstead metrics of many queries. The counts
+    of every query are gathered into arrays, after which the metrics of all
+    queries are computed in a single vectorized pass with NumPy.
+
+    Parameters:
+        queries (Iterable[ParsedQuery]): The parsed queries.
+
+    Returns:
+        N (numpy.ndarray): Program length of every query.
+        n (numpy.ndarray): Program vocabulary of every query.
+        V (numpy.ndarray): Program volume of every query.
+        D (numpy.ndarray): Program difficulty, the complexity, of every query.
+        E (numpy.ndarray): Program effort of every query.
+
+    Raises:
+        ImportError: If NumPy is not installed.
+    """
+    counts: List[Tuple[int, int, int, int]] = [get_halstead_counts(query) for query in queries]
+    if not counts:
+        return halstead_metrics_batch([], [], [], [])
+
+    return halstead_metrics_batch(*zip(*counts))
+
+
 def check_single_value_rule(columns: List[str]) -> bool:
     """
     This function checks if the columns in the list break the single-value
@@ -396,9 +391,8 @@ def check_single_value_rule(columns: List[str]) -> bool:
         if column == "*":
             single_value = True
 
-        for function in SQL_FUNCTIONS:
-            if re.search(function, column, re.IGNORECASE):
-                single_value = True
+        if _SQL_FUNCTIONS_PATTERN.search(column):
+            single_value = True
 
         if not single_value:
             return False
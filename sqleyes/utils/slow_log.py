@@ -0,0 +1,285 @@
+"""Utility functions w.r.t reading slow query logs of PostgreSQL and MySQL"""
+import glob
+import json
+import os
+import re
+from datetime import datetime, timezone
+from typing import (BinaryIO, Callable, Dict, Generator, Iterator, List,
+                    Optional, Tuple)
+
+
+# Entry as (byte offset, byte offset after the entry, lines)
+Record = Tuple[int, int, List[bytes]]
+
+_POSTGRES_DURATION = re.compile(
+    rb"duration: (?P<duration>\d+(?:\.\d+)?) ms\s+(?:statement|execute [^:]*): ")
+_POSTGRES_TIMESTAMP = re.compile(
+    rb"^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?: ?[A-Za-z]{1,5}|[+-]\d{2}(?::?\d{2})?)?")
+
+_MYSQL_QUERY_TIME = re.compile(rb"Query_time: (?P<duration>\d+(?:\.\d+)?)")
+_MYSQL_ROWS_EXAMINED = re.compile(rb"Rows_examined: (?P<rows>\d+)")
+_MYSQL_SET_TIMESTAMP = re.compile(rb"^SET timestamp=(?P<timestamp>\d+);\s*$", re.IGNORECASE)
+_MYSQL_USE = re.compile(rb"^use [^;\s]+;\s*$", re.IGNORECASE)
+# Lines the server writes at startup, which may appear between entries
+_MYSQL_HEADER = re.compile(rb"^(?:\S+, Version: |Tcp port: |Time\s+Id\s+Command\s+Argument)")
+
+
+class SlowQuery:
+    """
+    This class represents a single statement taken from a slow query log.
+
+    Attributes:
+        query (str): The statement itself.
+        duration (float): The duration of the statement in seconds.
+        rows_examined (Optional[int]): The number of rows the database
+            examined, if it is logged.
+        timestamp (Optional[str]): When the statement ran, as logged.
+        offset (int): The byte offset of the entry in the log.
+        end (int): The byte offset right after the entry in the log.
+    """
+    __slots__ = ("query", "duration", "rows_examined", "timestamp", "offset", "end")
+
+    def __init__(self, query: str, duration: float, rows_examined: Optional[int],
+                 timestamp: Optional[str], offset: int, end: int):
+        self.query = query
+        self.duration = duration
+        self.rows_examined = rows_examined
+        self.timestamp = timestamp
+        self.offset = offset
+        self.end = end
+
+    def __repr__(self):
+        return (f"SlowQuery(query={self.query!r}, duration={self.duration}, "
+                f"rows_examined={self.rows_examined}, timestamp={self.timestamp!r}, "
+                f"offset={self.offset}, end={self.end})")
+
+
+def _read_records(stream: BinaryIO, is_start: Callable[[bytes, List[bytes]], bool],
+                  final: bool, offset: int) -> Iterator[Record]:
+    # Groups lines into entries, every entry starts at a line for which
+    # is_start holds. Without final, the last entry is held back, since it may
+    # still be written to.
+    lines: List[bytes] = []
+    start = position = offset
+
+    for line in stream:
+        if not line.endswith(b"\n") and not final:
+            break
+
+        if is_start(line, lines) and lines:
+            yield start, position, lines
+            lines = []
+            start = position
+
+        lines.append(line)
+        position += len(line)
+
+    if lines and final:
+        yield start, position, lines
+
+
+def _decode(lines: List[bytes]) -> str:
+    return b"".join(lines).decode("utf-8", "replace").strip()
+
+
+def parse_postgres_log(stream: BinaryIO, final: bool = True,
+                       offset: int = 0) -> Iterator[SlowQuery]:
+    """
+    This function lazily reads the statements from a PostgreSQL log written
+    with log_min_duration_statement. Lines of other messages are skipped.
+
+    Parameters:
+        stream (BinaryIO): A binary stream of the log.
+        final (bool): Whether the end of the stream is the end of the log. If
+            not, the last entry is not read, since it may be incomplete.
+        offset (int): The byte offset of the stream in the log.
+
+    Returns:
+        Iterator[SlowQuery]: The statements in the log, in order.
+    """
+    # Continuation lines of a message start with a tab
+    records = _read_records(stream, lambda line, lines: not line.startswith(b"\t"),
+                            final, offset)
+
+    for start, end, lines in records:
+        match = _POSTGRES_DURATION.search(lines[0])
+        if match is None:
+            continue
+
+        query = _decode([lines[0][match.end():]] + lines[1:])
+        if not query:
+            continue
+
+        timestamp = _POSTGRES_TIMESTAMP.match(lines[0])
+
+        yield SlowQuery(query, float(match.group("duration")) / 1000, None,
+                        timestamp.group().decode() if timestamp else None,
+                        start, end)
+
+
+def _is_mysql_start(line: bytes, lines: List[bytes]) -> bool:
+    if line.startswith(b"# Time:"):
+        return True
+    # The time is only logged when it changed since the previous entry
+    return line.startswith(b"# User@Host:") and not (len(lines) == 1 and lines[0].startswith(b"# Time:"))
+
+
+def parse_mysql_slow_log(stream: BinaryIO, final: bool = True,
+                         offset: int = 0) -> Iterator[SlowQuery]:
+    """
+    This function lazily reads the statements from a MySQL (or MariaDB) slow
+    query log.
+
+    Parameters:
+        stream (BinaryIO): A binary stream of the log.
+        final (bool): Whether the end of the stream is the end of the log. If
+            not, the last entry is not read, since it may be incomplete.
+        offset (int): The byte offset of the stream in the log.
+
+    Returns:
+        Iterator[SlowQuery]: The statements in the log, in order.
+    """
+    for start, end, lines in _read_records(stream, _is_mysql_start, final, offset):
+        duration: Optional[float] = None
+        rows_examined: Optional[int] = None
+        timestamp: Optional[str] = None
+        query_lines = []
+
+        for line in lines:
+            if line.startswith(b"# Time:"):
+                timestamp = line[len(b"# Time:"):].decode().strip()
+                continue
+
+            if line.startswith(b"#"):
+                match = _MYSQL_QUERY_TIME.search(line)
+                if match is not None:
+                    duration = float(match.group("duration"))
+                match = _MYSQL_ROWS_EXAMINED.search(line)
+                if match is not None:
+                    rows_examined = int(match.group("rows"))
+                continue
+
+            match = _MYSQL_SET_TIMESTAMP.match(line)
+            if match is not None:
+                # Only used when the time was not logged for this entry
+                if timestamp is None:
+                    seconds = int(match.group("timestamp"))
+                    timestamp = datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            elif not _MYSQL_USE.match(line) and not _MYSQL_HEADER.match(line):
+                query_lines.append(line)
+
+        query = _decode(query_lines)
+        if query.endswith(";"):
+            query = query[:-1].rstrip()
+
+        if duration is None or not query:
+            continue
+
+        yield SlowQuery(query, duration, rows_examined, timestamp, start, end)
+
+
+# Parser of every supported log format
+PARSERS: Dict[str, Callable[..., Iterator[SlowQuery]]] = {
+    "postgres": parse_postgres_log,
+    "mysql": parse_mysql_slow_log,
+}
+
+
+class SlowLogReader:
+    """
+    This is a class that reads a slow query log. With a state file, every read
+    only returns the entries added since the previous read, also when the log
+    has been rotated in between.
+
+    After rotation, the rest of the previous log is read first if it can be
+    found next to the log, for example as slow.log.1. A log that was truncated
+    is read from the start.
+
+    Parameters:
+        path (str): The path of the log.
+        format (str): The format of the log, one of PARSERS.
+        state_path (Optional[str]): The file to keep the read position in.
+
+    Attributes:
+        path (str): The path of the log.
+        format (str): The format of the log.
+        state_path (Optional[str]): The file to keep the read position in.
+    """
+
+    def __init__(self, path: str, format: str, state_path: Optional[str] = None):
+        if format not in PARSERS:
+            raise ValueError(f"Unknown log format: {format}")
+
+        self.path = path
+        self.format = format
+        self.state_path = state_path
+
+    def read(self) -> Generator[SlowQuery, None, None]:
+        """
+        This function lazily reads the new entries of the log. The position is
+        saved as entries are consumed, so a read that is stopped early resumes
+        at the first entry that was not returned.
+
+        Without a state file the whole log is read. With a state file, the
+        last entry is held back until the next entry starts or the log is
+        rotated, since it may still be written to.
+
+        Returns:
+            Generator[SlowQuery, None, None]: The new statements in the log,
+            in order. Closing it stops the read.
+        """
+        inode = os.stat(self.path).st_ino
+        offset = 0
+        state = self.__load_state()
+
+        if state is not None:
+            if state["inode"] == inode:
+                # A log that shrank was truncated and is read from the start
+                if state["offset"] <= os.path.getsize(self.path):
+                    offset = state["offset"]
+            else:
+                rotated = self.__find_rotated(state["inode"])
+                if rotated is not None:
+                    yield from self.__read(rotated, state["offset"], True, None)
+
+        yield from self.__read(self.path, offset, self.state_path is None, inode)
+
+    def __read(self, path: str, offset: int, final: bool,
+               inode: Optional[int]) -> Iterator[SlowQuery]:
+        # Only the position in the current log is saved, so a read that stops
+        # within a rotated log continues there
+        position = offset
+        try:
+            with open(path, "rb") as stream:
+                stream.seek(offset)
+                for entry in PARSERS[self.format](stream, final=final, offset=offset):
+                    position = entry.end
+                    yield entry
+        finally:
+            if inode is not None:
+                self.__save_state({"inode": inode, "offset": position})
+
+    def __find_rotated(self, inode: int) -> Optional[str]:
+        for path in sorted(glob.glob(glob.escape(self.path) + ".*")):
+            try:
+                if os.stat(path).st_ino == inode:
+                    return path
+            except OSError:
+                continue
+        return None
+
+    def __load_state(self) -> Optional[Dict[str, int]]:
+        if self.state_path is None or not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path) as file:
+            state: Dict[str, int] = json.load(file)
+        return state
+
+    def __save_state(self, state: Dict[str, int]):
+        if self.state_path is None:
+            return
+        # Written to a new file first, so the state is never half written
+        temporary = f"{self.state_path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(state, file)
+        os.replace(temporary, self.state_path)
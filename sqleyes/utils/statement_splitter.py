@@ -0,0 +1,435 @@
+"""Utility functions w.r.t splitting SQL input into single statements"""
+import mmap
+import re
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple, Union
+
+
+CHUNK_SIZE = 64 * 1024
+
+# The number of bytes of a memory-mapped file after which the pages that were
+# already scanned are released
+RELEASE_SIZE = 16 * 1024 * 1024
+
+# The statement terminator until a DELIMITER command changes it
+DELIMITER = ";"
+
+# The longest dollar quote tag or DELIMITER command that is still found when
+# it is split over two chunks
+MAX_TAIL = 256
+
+NORMAL, SINGLE_QUOTE, DOUBLE_QUOTE, BACKTICK, LINE_COMMENT, BLOCK_COMMENT, DOLLAR_QUOTE = range(7)
+
+# Dollar quotes of postgres, such as $$ or $body$. The lookbehind follows the
+# first character, so that the pattern still starts with a literal character.
+_DOLLAR_QUOTE = rb"\$(?<!\w\$)(?:[A-Za-z_]\w*)?\$"
+
+# DELIMITER commands of the mysql client, which are only looked for at the
+# first word of a statement
+_COMMAND_PATTERN = re.compile(rb"(?i:delimiter)[ \t]+(\S+)[^\n]*(?:\n|\Z)")
+_WORD_PATTERN = re.compile(rb"\S")
+
+_OPENERS = {
+    b"'": SINGLE_QUOTE,
+    b'"': DOUBLE_QUOTE,
+    b"`": BACKTICK,
+    b"--": LINE_COMMENT,
+    b"/*": BLOCK_COMMENT,
+}
+
+_CLOSERS = {
+    SINGLE_QUOTE: re.compile(rb"\\.|'", re.DOTALL),
+    DOUBLE_QUOTE: re.compile(rb"\\.|\"", re.DOTALL),
+    BACKTICK: re.compile(rb"`"),
+    LINE_COMMENT: re.compile(rb"\n"),
+    BLOCK_COMMENT: re.compile(rb"\*/"),
+}
+
+_TEXT_OPENERS = {opener.decode(): state for opener, state in _OPENERS.items()}
+_TEXT_CLOSERS = {state: re.compile(closer.pattern.decode(), closer.flags & re.DOTALL)
+                 for state, closer in _CLOSERS.items()}
+
+# Statement, command and word patterns, openers, closers, terminator, escape
+# character, dollar sign and newline to scan bytes or text with, by terminator
+_SYNTAXES: Dict[Tuple[str, bool], Tuple[Any, ...]] = {}
+
+_WHITESPACE = b" \t\r\n\f\v"
+
+Buffer = Union[bytes, bytearray, mmap.mmap]
+
+
+class Statement:
+    """
+    This class represents a single statement taken from a larger SQL input.
+
+    Attributes:
+        index (int): The index of the statement in the input, starting at 0.
+        offset (int): The byte offset of the statement in the input.
+        text (str): The statement itself.
+        line (int): The line of the input the statement starts on, starting
+            at 1.
+        column (int): The column of the input the statement starts at, in
+            characters, starting at 1.
+    """
+    __slots__ = ("index", "offset", "text", "line", "column")
+
+    def __init__(self, index: int, offset: int, text: str, line: int = 1,
+                 column: int = 1):
+        self.index = index
+        self.offset = offset
+        self.text = text
+        self.line = line
+        self.column = column
+
+    def get_position(self, location: int) -> Tuple[int, int]:
+        """
+        This function converts a location in the statement into a position in
+        the input.
+
+        Parameters:
+            location (int): A character index in the statement.
+
+        Returns:
+            Tuple[int, int]: The line and column in the input.
+        """
+        newlines = self.text.count("\n", 0, location)
+        if newlines:
+            return self.line + newlines, location - self.text.rfind("\n", 0, location)
+        return self.line, self.column + location
+
+    def __repr__(self):
+        return (f"Statement(index={self.index}, offset={self.offset}, text={self.text!r}, "
+                f"line={self.line}, column={self.column})")
+
+
+class MappedStatement(Statement):
+    """
+    This class represents a statement that is a slice of a memory-mapped
+    file. The text is only decoded when it is first used, and a copy of the
+    statement that is sent to another process is a plain Statement.
+
+    Attributes:
+        data (Optional[memoryview]): The bytes of the statement, until they
+            are decoded.
+        encoding (str): The encoding of the file.
+    """
+    __slots__ = ("data", "encoding", "__text")
+
+    def __init__(self, index: int, offset: int, data: memoryview, line: int,
+                 column: int, encoding: str = "utf-8"):
+        self.index = index
+        self.offset = offset
+        self.line = line
+        self.column = column
+        self.data: Optional[memoryview] = data
+        self.encoding = encoding
+        self.__text: Optional[str] = None
+
+    @property  # type: ignore
+    def text(self) -> str:  # type: ignore
+        if self.__text is None:
+            assert self.data is not None
+            self.__text = str(self.data, self.encoding, "replace")
+            # The map is released once no statement refers to it
+            self.data = None
+        return self.__text
+
+    @text.setter
+    def text(self, text: str):
+        self.__text = text
+        self.data = None
+
+    def __reduce__(self):
+        return Statement, (self.index, self.offset, self.text, self.line, self.column)
+
+
+def _get_syntax(delimiter: str, text: bool) -> Tuple[Any, ...]:
+    # Compiles the patterns for a terminator once
+    syntax = _SYNTAXES.get((delimiter, text))
+    if syntax is None:
+        pattern = b"|".join([re.escape(delimiter.encode()), rb"'|\"|`|--|/\*", _DOLLAR_QUOTE])
+        if text:
+            # Character classes match the same characters as for bytes
+            syntax = (re.compile(pattern.decode(), re.ASCII),
+                      re.compile(_COMMAND_PATTERN.pattern.decode(), re.ASCII),
+                      re.compile(_WORD_PATTERN.pattern.decode(), re.ASCII), _TEXT_OPENERS,
+                      _TEXT_CLOSERS, delimiter, "\\", "$", "\n")
+        else:
+            syntax = (re.compile(pattern), _COMMAND_PATTERN, _WORD_PATTERN, _OPENERS, _CLOSERS,
+                      delimiter.encode(), 92, b"$", b"\n")
+        _SYNTAXES[(delimiter, text)] = syntax
+    return syntax
+
+
+class StatementSplitter:
+    """
+    This is a class that finds statement boundaries in SQL bytes. It keeps
+    track of quotes, dollar quotes and comments, so it can be fed an input
+    piece by piece. A DELIMITER command at the start of a statement changes
+    the terminator, like in the mysql client.
+
+    Attributes:
+        state (int): Whether the scanner is inside a quote or comment.
+        delimiter (str): The current statement terminator.
+        command (bool): Whether the last boundary ended a DELIMITER command
+            rather than a statement.
+    """
+
+    def __init__(self, delimiter: str = DELIMITER):
+        self.state = NORMAL
+        self.delimiter = delimiter
+        self.command = False
+        self.__tag: Any = None
+        # Whether only whitespace and comments were seen since the boundary
+        self.__empty = True
+
+    def find_boundary(self, buffer: Union[Buffer, str], pos: int,
+                      final: bool) -> Tuple[Optional[int], int]:
+        """
+        This function scans a buffer for the end of the current statement.
+
+        Parameters:
+            buffer (Union[Buffer, str]): A bytes-like object or string
+                holding (part of) the input.
+            pos (int): The position in the buffer to continue scanning from.
+            final (bool): True if no more data follows the buffer.
+
+        Returns:
+            Optional[int]: The position directly after the statement
+            terminator, None if the buffer does not contain one.
+            int: The position scanning can continue from once more data is
+            appended to the buffer.
+        """
+        end = len(buffer)
+        self.command = False
+
+        (normal_pattern, command_pattern, word_pattern, openers, closers,
+         delimiter, backslash, dollar, newline) = _get_syntax(self.delimiter, isinstance(buffer, str))
+
+        while pos < end:
+            if self.state == NORMAL:
+                match = normal_pattern.search(buffer, pos)
+
+                if self.__empty:
+                    word = word_pattern.search(buffer, pos, end if match is None else match.start())
+                    if word is not None:
+                        if (not final and end - word.start() < MAX_TAIL
+                                and buffer.find(newline, word.start(), end) == -1):
+                            # The first line of the statement may be a
+                            # command that continues in the next chunk
+                            return None, pos
+                        command = command_pattern.match(buffer, word.start())
+                        if command is not None:
+                            self.delimiter = _to_text(command.group(1))
+                            self.command = True
+                            return command.end(), command.end()
+                        self.__empty = False
+
+                if match is None:
+                    if final:
+                        return None, end
+                    # A '-' or '/' at the end may be the start of a comment,
+                    # and a '$' the start of a dollar quote
+                    found = buffer.rfind(dollar, max(pos, end - MAX_TAIL), end)
+                    return None, max(pos, end - 1 if found == -1 else found)
+
+                token = match.group()
+                pos = match.end()
+
+                if token == delimiter:
+                    self.__empty = True
+                    return pos, pos
+
+                state = openers.get(token)
+                if state is None:
+                    state = DOLLAR_QUOTE
+                    self.__tag = token
+                self.state = state
+
+                if self.__empty and state != LINE_COMMENT and state != BLOCK_COMMENT:
+                    self.__empty = False
+            elif self.state == DOLLAR_QUOTE:
+                found = buffer.find(self.__tag, pos)
+                if found == -1:
+                    # The end of the buffer may be the start of the tag
+                    return None, max(pos, end - len(self.__tag) + 1) if not final else end
+
+                self.state = NORMAL
+                pos = found + len(self.__tag)
+            else:
+                match = closers[self.state].search(buffer, pos)
+                if match is None:
+                    # A '*' or '\' at the end may be the start of a closer
+                    return None, max(pos, end - 1) if not final else end
+
+                if buffer[match.start()] == backslash:
+                    # Escaped character within a quoted string
+                    pos = match.end()
+                    continue
+
+                self.state = NORMAL
+                pos = match.end()
+
+        return None, pos
+
+
+def _to_text(token: Union[bytes, str]) -> str:
+    return token if isinstance(token, str) else token.decode("utf-8", "replace")
+
+
+def _strip(buffer: Buffer, start: int, end: int) -> Tuple[int, int]:
+    while start < end and buffer[start] in _WHITESPACE:
+        start += 1
+    while end > start and buffer[end - 1] in _WHITESPACE:
+        end -= 1
+    return start, end
+
+
+def _strip_statement(buffer: Buffer, start: int, end: int, delimiter: str) -> Tuple[int, int]:
+    # Strips whitespace and a terminator set by a DELIMITER command, which
+    # belongs to the client rather than the statement
+    start, end = _strip(buffer, start, end)
+    if delimiter != DELIMITER:
+        terminator = delimiter.encode()
+        if end - start >= len(terminator) and buffer[end - len(terminator):end] == terminator:
+            start, end = _strip(buffer, start, end - len(terminator))
+    return start, end
+
+
+def _advance(buffer: Union[bytes, bytearray], start: int, end: int, line: int, column: int,
+             encoding: str) -> Tuple[int, int]:
+    # Moves a line and column from the start to the end of part of a buffer
+    newlines = buffer.count(b"\n", start, end)
+    if newlines:
+        start = buffer.rfind(b"\n", start, end) + 1
+        line += newlines
+        column = 1
+    return line, column + len(buffer[start:end].decode(encoding, "replace"))
+
+
+def split_statements(stream: BinaryIO, encoding: str = "utf-8",
+                     chunk_size: int = CHUNK_SIZE) -> Iterator[Statement]:
+    """
+    This function lazily splits a binary stream of SQL into statements. Only
+    the statement that is currently being read is kept in memory.
+
+    Parameters:
+        stream (BinaryIO): A binary stream, for example an opened file.
+        encoding (str): The encoding of the stream.
+        chunk_size (int): The number of bytes to read at once.
+
+    Returns:
+        Iterator[Statement]: The statements in the stream, in order.
+    """
+    splitter = StatementSplitter()
+    buffer = bytearray()
+    buffer_offset = 0
+    # Line and column at the start of the buffer
+    line, column = 1, 1
+    pos = 0
+    index = 0
+    final = False
+
+    while True:
+        boundary, pos = splitter.find_boundary(buffer, pos, final)
+
+        if boundary is None:
+            if final:
+                boundary = len(buffer)
+            else:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    final = True
+                buffer.extend(chunk)
+                continue
+
+        start, end = _strip_statement(buffer, 0, boundary, splitter.delimiter)
+        if start < end and not splitter.command:
+            line, column = _advance(buffer, 0, start, line, column, encoding)
+            yield Statement(index, buffer_offset + start,
+                            buffer[start:end].decode(encoding, "replace"),
+                            line, column)
+            index += 1
+            line, column = _advance(buffer, start, boundary, line, column, encoding)
+        else:
+            line, column = _advance(buffer, 0, boundary, line, column, encoding)
+
+        del buffer[:boundary]
+        buffer_offset += boundary
+        pos -= boundary
+
+        if final and not buffer:
+            return
+
+
+def split_file(path: str, encoding: str = "utf-8") -> Iterator[Statement]:
+    """
+    This function splits a file of SQL into statements through a memory map,
+    so that the file is never read into memory as a whole. Statements are
+    slices of the map that are only decoded when their text is used, so peak
+    memory depends on the largest statement rather than the size of the
+    file. Files that can not be mapped, such as pipes, are read in chunks.
+
+    Parameters:
+        path (str): The path of the file.
+        encoding (str): The encoding of the file.
+
+    Returns:
+        Iterator[Statement]: The statements in the file, in order.
+    """
+    with open(path, "rb") as file:
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Empty files and pipes can not be mapped
+            yield from split_statements(file, encoding)
+            return
+
+    # Advice to the kernel is only available since Python 3.8, and not on
+    # every platform
+    advise = getattr(data, "madvise", None)
+    if advise is not None and hasattr(mmap, "MADV_SEQUENTIAL"):
+        advise(mmap.MADV_SEQUENTIAL)
+    if not hasattr(mmap, "MADV_DONTNEED"):
+        advise = None
+
+    view = memoryview(data)
+    splitter = StatementSplitter()
+    line, column = 1, 1
+    pos = segment_start = released = 0
+    index = 0
+
+    try:
+        while segment_start < len(data):
+            boundary, pos = splitter.find_boundary(data, pos, True)
+            if boundary is None:
+                boundary = len(data)
+
+            # Only the segment of a single statement is copied, to find its
+            # line and column
+            segment = data[segment_start:boundary]
+            start, end = _strip_statement(segment, 0, len(segment), splitter.delimiter)
+            if start < end and not splitter.command:
+                line, column = _advance(segment, 0, start, line, column, encoding)
+                yield MappedStatement(index, segment_start + start,
+                                      view[segment_start + start:segment_start + end],
+                                      line, column, encoding)
+                index += 1
+                line, column = _advance(segment, start, len(segment), line, column, encoding)
+            else:
+                line, column = _advance(segment, 0, len(segment), line, column, encoding)
+
+            segment_start = boundary
+
+            if advise is not None and segment_start - released >= RELEASE_SIZE:
+                # Scanned pages no longer count towards the memory of the
+                # process, they are read again if a statement is decoded
+                end = segment_start - segment_start % mmap.PAGESIZE
+                advise(mmap.MADV_DONTNEED, released, end - released)
+                released = end
+    finally:
+        view.release()
+        try:
+            data.close()
+        except BufferError:
+            # Statements still refer to the map, it is closed along with them
+            pass
@@ -0,0 +1,303 @@
+"""A lightweight SQL tokenizer producing flat lists of token types and offsets
+
+The rules are those of the sqlparse lexer, in the same order, compiled into a
+single regular expression. Both therefore split a query into the same tokens,
+but the tokenizer neither creates a token object per token nor groups the
+tokens into a tree, which makes it many times faster.
+
+The rules are those of one version of sqlparse, SQLPARSE_VERSION, which is
+the version the package requires. The lexer of other versions may split some
+queries differently, so with those the tokenizer is not used and a warning is
+issued, see is_supported.
+"""
+import re
+import warnings
+from typing import Dict, List, Optional, Pattern, Tuple
+
+
+# The version of sqlparse whose lexer rules the tokenizer mirrors
+SQLPARSE_VERSION = "0.4.2"
+
+# Token types
+WHITESPACE = 0
+NEWLINE = 1
+COMMENT = 2
+LINE_COMMENT = 3
+KEYWORD = 4
+DML = 5
+DDL = 6
+ORDER = 7
+TZCAST = 8
+OTHER_KEYWORD = 9
+NAME = 10
+BUILTIN = 11
+PLACEHOLDER = 12
+SYMBOL = 13
+STRING = 14
+NUMBER = 15
+LITERAL = 16
+OPERATOR = 17
+COMPARISON = 18
+WILDCARD = 19
+OPEN = 20
+CLOSE = 21
+COMMA = 22
+PUNCTUATION = 23
+OTHER = 24
+
+# Types of the tokens that format_query converts to upper case
+KEYWORD_TYPES = frozenset([KEYWORD, DML, DDL, ORDER, TZCAST, OTHER_KEYWORD])
+
+# Rule of the lexer as (expression, type), None as type for a keyword lookup
+Rule = Tuple[str, Optional[int]]
+
+_NUMBER_RULES: List[Rule] = [
+    (r"-?0x[\dA-F]+", NUMBER),
+    (r"-?\d+(?:\.\d+)?E-?\d+", NUMBER),
+    (r"(?![_A-ZÀ-Ü])-?(?:\d+\.\d*|\.\d+)(?![_A-ZÀ-Ü])", NUMBER),
+    (r"(?![_A-ZÀ-Ü])-?\d+(?![_A-ZÀ-Ü])", NUMBER),
+]
+_WORD_RULE: Rule = (r"[0-9_A-ZÀ-Ü][_$#\w]*", None)
+
+# The rules of the sqlparse lexer as (expression, type), the type of words is
+# looked up in the keywords of sqlparse. Runs of whitespace are a single token
+# and punctuation is split by character, which does not change the meaning.
+_RULES: List[Rule] = [
+    (r"(?:--|# )\+.*?(?:\r\n|\r|\n|$)", COMMENT),
+    (r"/\*\+[\s\S]*?\*/", COMMENT),
+    (r"(?:--|# ).*?(?:\r\n|\r|\n|$)", LINE_COMMENT),
+    (r"/\*[\s\S]*?\*/", COMMENT),
+    (r"\r\n|\r|\n", NEWLINE),
+    (r"[^\S\r\n]+", WHITESPACE),
+    (r":=", OTHER),
+    (r"::", PUNCTUATION),
+    (r"\*", WILDCARD),
+    (r"`(?:``|[^`])*`", NAME),
+    (r"´(?:´´|[^´])*´", NAME),
+    (r"(?P<tag>(?<!\S)\$(?:[_A-ZÀ-Ü]\w*)?\$)[\s\S]*?(?P=tag)", LITERAL),
+    (r"\?", PLACEHOLDER),
+    (r"%(?:\(\w+\))?s", PLACEHOLDER),
+    (r"(?<!\w)[$:?]\w+", PLACEHOLDER),
+    (r"\\\w+", OTHER),
+    (r"(?:NOT\s+)?IN\b", COMPARISON),
+    (r"(?:CASE|IN|VALUES|USING|FROM|AS)\b", KEYWORD),
+    (r"(?:@|##|#)[A-ZÀ-Ü]\w+", NAME),
+    (r"[A-ZÀ-Ü]\w*(?=\s*\.)", NAME),
+    (r"(?<=\.)[A-ZÀ-Ü]\w*", NAME),
+    (r"[A-ZÀ-Ü]\w*(?=\()", NAME),
+    *_NUMBER_RULES,
+    (r"'(?:''|\\\\|\\'|[^'])*'", STRING),
+    (r'"(?:""|\\\\|\\"|[^"])*"', SYMBOL),
+    (r'""|".*?[^\\]"', SYMBOL),
+    (r"(?<![\w\])])\[[^\]\[]+\]", NAME),
+    (r"(?:(?:LEFT\s+|RIGHT\s+|FULL\s+)?(?:INNER\s+|OUTER\s+|STRAIGHT\s+)?"
+     r"|(?:CROSS\s+|NATURAL\s+)?)?JOIN\b", KEYWORD),
+    (r"END(?:\s+IF|\s+LOOP|\s+WHILE)?\b", KEYWORD),
+    (r"NOT\s+NULL\b", KEYWORD),
+    (r"NULLS\s+(?:FIRST|LAST)\b", KEYWORD),
+    (r"UNION\s+ALL\b", KEYWORD),
+    (r"CREATE(?:\s+OR\s+REPLACE)?\b", DDL),
+    (r"DOUBLE\s+PRECISION\b", BUILTIN),
+    (r"GROUP\s+BY\b", KEYWORD),
+    (r"ORDER\s+BY\b", KEYWORD),
+    (r"HANDLER\s+FOR\b", KEYWORD),
+    (r"LATERAL\s+VIEW\s+(?:EXPLODE|INLINE|PARSE_URL_TUPLE|POSEXPLODE|STACK)\b", KEYWORD),
+    (r"(?:AT|WITH')\s+TIME\s+ZONE\s+'[^']+'", TZCAST),
+    (r"(?:NOT\s+)?(?:LIKE|ILIKE|RLIKE)\b", COMPARISON),
+    _WORD_RULE,
+    (r"\(", OPEN),
+    (r"\)", CLOSE),
+    (r",", COMMA),
+    (r"[;:\[\]\.]", PUNCTUATION),
+    (r"[<>=~!]+", COMPARISON),
+    (r"[+/@#%^&|^-]+", OPERATOR),
+    (r"[\s\S]", OTHER),
+]
+
+# Words that start a rule other than those for names and words
+_KEYWORD_STARTS = ["AS", "AT", "CASE", "CREATE", "CROSS", "DOUBLE", "END", "FROM", "FULL", "GROUP",
+                   "HANDLER", "ILIKE", "IN", "INNER", "JOIN", "LATERAL", "LEFT", "LIKE", "NATURAL",
+                   "NOT", "NULLS", "ORDER", "OUTER", "RIGHT", "RLIKE", "STRAIGHT", "UNION", "USING",
+                   "VALUES", "WITH"]
+
+# Shortcuts for the most common tokens as (guard, rules). Where the guard
+# matches, no rule can match but the given ones, in the same order, so they
+# are tried before all rules, which gives the same tokens without trying
+# every rule in between.
+_SHORTCUTS: List[Tuple[str, List[Rule]]] = [
+    (r"(?=[\s(),<>=~!])(?![\r\n])", [
+        (r"[^\S\r\n]+", WHITESPACE),
+        (r"\(", OPEN),
+        (r"\)", CLOSE),
+        (r",", COMMA),
+        (r"[<>=~!]+", COMPARISON),
+    ]),
+    (rf"(?=[A-ZÀ-Ü])(?!(?:{'|'.join(_KEYWORD_STARTS)})\b)", [
+        (r"[A-ZÀ-Ü]\w*(?=\s*\.|\()", NAME),
+        (r"(?<=\.)[A-ZÀ-Ü]\w*", NAME),
+        _WORD_RULE,
+    ]),
+    (r"(?=[0-9])", _NUMBER_RULES + [_WORD_RULE]),
+]
+
+
+def _compile_rules() -> Tuple[Pattern[str], List[int]]:
+    # Every rule becomes a group of one expression, the type of a match is
+    # found by the index of the outer group that matched
+    group_types: List[int] = [OTHER]
+
+    def compile_rules(rules: List[Rule]) -> str:
+        parts = []
+        for expression, type in rules:
+            parts.append(f"({expression})")
+            group_types.append(-1 if type is None else type)
+            group_types.extend([OTHER] * re.compile(expression).groups)
+        return "|".join(parts)
+
+    parts = [f"{guard}(?:{compile_rules(rules)})" for guard, rules in _SHORTCUTS]
+    parts.append(compile_rules(_RULES))
+    return re.compile("|".join(parts), re.IGNORECASE | re.UNICODE), group_types
+
+
+def _keyword_type(ttype) -> int:
+    from sqlparse import tokens as T
+
+    if ttype is T.Keyword:
+        return KEYWORD
+    if ttype is T.Keyword.DML:
+        return DML
+    if ttype is T.Keyword.DDL:
+        return DDL
+    if ttype is T.Keyword.Order:
+        return ORDER
+    if ttype in T.Keyword:
+        return OTHER_KEYWORD
+    if ttype is T.Name:
+        return NAME
+    return BUILTIN
+
+
+def _get_word_types() -> Dict[str, int]:
+    # Type of every word sqlparse knows, earlier keyword lists take precedence
+    from sqlparse import keywords
+
+    word_types: Dict[str, int] = {}
+    for keyword_dict in (keywords.KEYWORDS, keywords.KEYWORDS_HQL, keywords.KEYWORDS_PLPGSQL,
+                         keywords.KEYWORDS_ORACLE, keywords.KEYWORDS_COMMON):
+        word_types.update((word, _keyword_type(ttype)) for word, ttype in keyword_dict.items())
+    return word_types
+
+
+# The compiled rules, the type of every group and the type of every word,
+# only built on first use since compiling the rules and importing sqlparse
+# takes a while
+_compiled: Optional[Tuple[Pattern[str], List[int], Dict[str, int]]] = None
+
+# Whether the warning that the tokenizer is not used was issued
+_warned = False
+
+
+def _get_compiled() -> Tuple[Pattern[str], List[int], Dict[str, int]]:
+    global _compiled
+    if _compiled is None:
+        pattern, group_types = _compile_rules()
+        _compiled = (pattern, group_types, _get_word_types())
+    return _compiled
+
+
+def is_supported() -> bool:
+    """
+    This function tells whether the installed version of sqlparse is the one
+    the tokenizer mirrors, so that both split a query into the same tokens.
+    The first time it is not, a warning is issued, since every query is then
+    parsed by sqlparse, which is much slower.
+
+    Returns:
+        bool: True if the tokenizer can be used instead of sqlparse.
+    """
+    global _warned
+    import sqlparse
+
+    if sqlparse.__version__ == SQLPARSE_VERSION:
+        return True
+
+    if not _warned:
+        _warned = True
+        warnings.warn(f"sqlparse {sqlparse.__version__} is installed, but the tokenizer mirrors "
+                      f"sqlparse {SQLPARSE_VERSION}, queries are parsed by sqlparse instead, "
+                      f"which is slower", RuntimeWarning)
+    return False
+
+
+class Tokens:
+    """
+    This class represents a tokenized query as flat lists, the type, start
+    and end of the token at every index.
+
+    Attributes:
+        query (str): The tokenized query.
+        types (List[int]): The type of every token.
+        starts (List[int]): The start of every token in the query.
+        ends (List[int]): The end of every token in the query.
+    """
+    __slots__ = ("query", "types", "starts", "ends")
+
+    def __init__(self, query: str, types: List[int], starts: List[int],
+                 ends: List[int]):
+        self.query = query
+        self.types = types
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def get_value(self, index: int) -> str:
+        """
+        This function returns the text of a token.
+
+        Parameters:
+            index (int): The index of the token.
+
+        Returns:
+            str: The text of the token.
+        """
+        return self.query[self.starts[index]:self.ends[index]]
+
+    def get_values(self) -> List[str]:
+        """
+        This function returns the text of every token.
+
+        Returns:
+            List[str]: The text of every token.
+        """
+        query = self.query
+        return [query[start:end] for start, end in zip(self.starts, self.ends)]
+
+
+def tokenize(query: str) -> Tokens:
+    """
+    This function splits a query into tokens, in the same way as the sqlparse
+    lexer does.
+
+    Parameters:
+        query (str): The query string.
+
+    Returns:
+        Tokens: The tokens of the query.
+    """
+    types: List[int] = []
+    starts: List[int] = []
+    ends: List[int] = []
+    pattern, group_types, word_types = _get_compiled()
+
+    for match in pattern.finditer(query):
+        start, end = match.span()
+        type = group_types[match.lastindex]  # type: ignore
+        if type < 0:
+            type = word_types.get(query[start:end].upper(), NAME)
+        types.append(type)
+        starts.append(start)
+        ends.append(end)
+
+    return Tokens(query, types, starts, ends)
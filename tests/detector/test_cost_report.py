@@ -0,0 +1,77 @@
+"""Tests for sqleyes.detector.cost_report"""
+import pytest
+
+from sqleyes.detector.cost_report import CostReport
+from sqleyes.utils.slow_log import SlowQuery
+
+
+def entry(query, duration, rows_examined=None, timestamp=None):
+    return SlowQuery(query, duration, rows_examined, timestamp, 0, 0)
+
+
+@pytest.fixture
+def report():
+    report = CostReport()
+    report.add([
+        # Frequent but cheap
+        *[entry(f"SELECT * FROM product WHERE pId = {index}", 0.001, 1) for index in range(100)],
+        # Rare but expensive
+        entry("SELECT pId FROM product ORDER BY RAND()", 5.0, 1000, "t1"),
+        entry("SELECT pId FROM product ORDER BY RAND()", 7.0, 2000, "t2"),
+        entry("SELECT pId FROM product", 1.0),
+    ])
+    report.analyze()
+    return report
+
+
+def test_cost_report_groups_by_fingerprint(report):
+    assert report.executions == 103
+    assert report.total_time == pytest.approx(13.1)
+    assert len(report.queries) == 3
+
+    costs = report.get_queries()
+    assert [cost.executions for cost in costs] == [2, 1, 100]
+    assert costs[0].total_time == 12.0
+    assert costs[0].max_time == 7.0
+    assert costs[0].rows_examined == 3000
+    assert (costs[0].first_seen, costs[0].last_seen) == ("t1", "t2")
+    assert costs[1].rows_examined is None
+
+
+def test_cost_report_ranks_by_time(report):
+    anti_patterns = report.get_anti_patterns()
+
+    assert [anti_pattern.type for anti_pattern in anti_patterns] == ["Random Selection", "Implicit Columns"]
+    assert anti_patterns[0].total_time == 12.0
+    assert anti_patterns[0].executions == 2
+    assert anti_patterns[1].total_time == pytest.approx(0.1)
+    assert anti_patterns[1].executions == 100
+    assert len(anti_patterns[1].queries) == 1
+
+
+def test_cost_report_analyzes_slowest_execution():
+    report = CostReport()
+    report.add([entry("SELECT a FROM t WHERE b = 1", 1.0),
+                entry("SELECT a FROM t WHERE b = 2", 3.0)])
+    report.analyze()
+
+    assert report.get_queries()[0].query == "SELECT a FROM t WHERE b = 2"
+
+
+def test_cost_report_empty():
+    report = CostReport()
+    report.analyze()
+    assert report.get_anti_patterns() == []
+    assert report.total_time == 0.0
+
+
+def test_cost_report_statement_error():
+    report = CostReport()
+    report.add([entry("SELECT a FROM t WHERE x ( AS )", 2.0),
+                entry("SELECT * FROM t", 1.0)])
+    report.analyze()
+
+    costs = report.get_queries()
+    assert [(cost.outputs, (cost.error or "").split(":")[0]) for cost in costs][0] == ([], "IndexError")
+    assert [output.type for output in costs[1].outputs] == ["Implicit Columns"]
+    assert costs[1].error is None
@@ -0,0 +1,95 @@
+"""Tests for sqleyes.detector.detector"""
+import subprocess
+import sys
+
+import pytest
+
+from sqleyes.detector.detector import (DETECTORS, REGISTRY, SCHEDULE, Detector,
+                                       DetectorOptions, select_detectors)
+from sqleyes.utils.parsed_query import ParsedQuery
+
+
+def test_schedule_runs_cheapest_first():
+    costs = [detector.cost for detector, _ in SCHEDULE]
+
+    assert costs == sorted(costs)
+    assert sorted(detector.__name__ for detector, _ in SCHEDULE) == \
+        sorted(detector.__name__ for detector in DETECTORS)
+
+
+@pytest.mark.parametrize("query, parsed", [
+    ("SELECT 1", False),
+    ("INSERT INTO product (pId) VALUES (1)", False),
+    ("SELECT * FROM product", True),
+])
+def test_detector_parses_only_when_needed(monkeypatch, query, parsed):
+    calls = []
+    parse = ParsedQuery.parse
+
+    def counted_parse(self):
+        calls.append(self.query)
+        parse(self)
+
+    monkeypatch.setattr(ParsedQuery, "parse", counted_parse)
+    detector = Detector(query)
+    detector.run()
+
+    assert bool(calls) == parsed
+    assert len(detector.anti_pattern_list) == len(DETECTORS)
+
+
+def test_detector_reports_in_declared_order():
+    query = "SELECT * FROM t WHERE a = NULL AND b LIKE '%b%' GROUP BY c ORDER BY RAND()"
+    types = [output.type for output in Detector(query).run()]
+    order = [detector.type for detector in DETECTORS]
+
+    assert types == sorted(types, key=order.index)
+    assert len(types) > 3
+
+
+@pytest.mark.parametrize("options, expected", [
+    (None, list(REGISTRY)),
+    (DetectorOptions(only=("implicit_columns", "random_selection")), ["implicit_columns", "random_selection"]),
+    (DetectorOptions(skip=("spaghetti_query",)), list(REGISTRY)[:-1]),
+    (DetectorOptions(min_certainty="high"), [name for name in REGISTRY if name != "poor_mans_search_engine"]),
+    (DetectorOptions(only=("poor_mans_search_engine",), min_certainty="high"), []),
+])
+def test_select_detectors(options, expected):
+    assert select_detectors(options) == expected
+
+
+@pytest.mark.parametrize("options", [
+    DetectorOptions(only=("implicit_column",)),
+    DetectorOptions(skip=("",)),
+    DetectorOptions(min_certainty="certain"),
+])
+def test_select_detectors_unknown(options):
+    with pytest.raises(ValueError):
+        select_detectors(options)
+
+
+@pytest.mark.parametrize("options, expected", [
+    (DetectorOptions(only=("fear_of_the_unknown", "poor_mans_search_engine")),
+     ["Fear of the Unknown", "Poor Man's Search Engine"]),
+    (DetectorOptions(skip=("implicit_columns",), min_certainty="high"),
+     ["Fear of the Unknown", "Random Selection"]),
+    # The cheapest detector with a finding
+    (DetectorOptions(fail_fast=True), ["Fear of the Unknown"]),
+    (DetectorOptions(min_certainty="high", fail_fast=True, skip=("fear_of_the_unknown",)),
+     ["Implicit Columns"]),
+])
+def test_detector_options(options, expected):
+    query = "SELECT * FROM t WHERE a = NULL AND b LIKE '%b%' ORDER BY RAND()"
+
+    assert [output.type for output in Detector(query, options=options).run()] == expected
+
+
+def test_detector_imports_only_selected_detectors():
+    code = ("import sys; from sqleyes.detector.detector import Detector, DetectorOptions; "
+            "Detector('SELECT * FROM t', options=DetectorOptions(only=('implicit_columns',))).run(); "
+            "print(' '.join(sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, check=True)
+    modules = [module for module in result.stdout.decode().split() if ".antipatterns." in module]
+
+    assert sorted(modules) == ["sqleyes.detector.antipatterns.abstract_base_class",
+                               "sqleyes.detector.antipatterns.implicit_columns"]
@@ -0,0 +1,72 @@
+"""Tests for sqleyes.detector.detector_output"""
+import json
+import pickle
+from typing import Any, Dict
+
+import pytest
+
+from sqleyes.detector.detector_output import DetectorOutput
+
+
+def create_output(**kwargs):
+    arguments: Dict[str, Any] = dict(query="SELECT pId FROM product\nORDER BY RAND()",
+                                     certainty="high",
+                                     description=None,
+                                     detector_type="anti-pattern",
+                                     locations=[(24, 39)],
+                                     title="Avoid ORDER BY RAND() usage",
+                                     type="Random Selection")
+    arguments.update(kwargs)
+    return DetectorOutput(**arguments)
+
+
+def test_detector_output_is_compact():
+    output = create_output()
+
+    assert not hasattr(output, "__dict__")
+    with pytest.raises(AttributeError):
+        output.unknown = 1
+
+
+def test_detector_output_snippets():
+    assert create_output().location_snippets == \
+        ["Query contains an Anti-Pattern:\n\n...d FROM productORDER BY RAND()...\n" + " " * 18 + "^" + "-" * 14]
+    assert create_output(locations=[(0, 6)]).location_snippets == \
+        ["Query contains an Anti-Pattern:\n\nSELECT pId F\n^-----"]
+
+
+def test_detector_output_dict():
+    output = create_output(statement_index=2, offset=40)
+
+    assert output["title"] == "Avoid ORDER BY RAND() usage"
+    assert output["description"].startswith("### Random Selection")
+    assert json.loads(output["location_snippets"]) == output.location_snippets
+    assert json.loads(repr(output))["statement_index"] == 2
+
+    output.set_source(5, 100)
+    assert (output["statement_index"], output["offset"]) == (5, 100)
+
+
+def test_detector_output_given_description():
+    assert create_output(description="Custom")["description"] == "Custom"
+
+
+def test_detector_output_positional_arguments():
+    output = DetectorOutput("SELECT pId FROM product", "low", "Custom", "anti-pattern", [(0, 6)],
+                            "Title", "Random Selection", 3, 40)
+
+    assert (output.certainty, output.description, output.detector_type) == ("low", "Custom", "anti-pattern")
+    assert (output.title, output.type, output.statement_index, output.offset) == \
+        ("Title", "Random Selection", 3, 40)
+
+
+def test_detector_output_invalid_certainty():
+    with pytest.raises(Exception):
+        create_output(certainty="unknown")
+
+
+def test_detector_output_pickle():
+    output = pickle.loads(pickle.dumps(create_output(offset=7)))
+
+    assert (output.type, output.locations, output.offset) == ("Random Selection", [(24, 39)], 7)
+    assert output.location_snippets == create_output().location_snippets
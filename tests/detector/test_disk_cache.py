@@ -0,0 +1,119 @@
+"""Tests for sqleyes.detector.disk_cache"""
+import subprocess
+import sys
+
+from sqleyes.detector import disk_cache as disk_cache_module
+from sqleyes.detector.detector import REGISTRY, DetectorOptions
+from sqleyes.detector.disk_cache import (RULESET_MODULES, DiskCache,
+                                         get_ruleset_version)
+from sqleyes.main import analyze_many, main
+
+
+QUERIES = ["SELECT * FROM product",
+           "SELECT pId FROM product ORDER BY RAND()",
+           "SELECT pId FROM product WHERE price = 1"]
+
+
+def summarize(outputs):
+    return [[(output.type, output.locations, output.statement_index, output.description)
+             for output in query_outputs] for query_outputs in outputs]
+
+
+def test_disk_cache_hits_across_runs(tmp_path):
+    with DiskCache(str(tmp_path)) as cache:
+        first = list(analyze_many(QUERIES, workers=1, disk_cache=cache))
+        assert (cache.hits, cache.misses) == (0, 3)
+
+    with DiskCache(str(tmp_path)) as cache:
+        second = list(analyze_many(QUERIES, workers=1, disk_cache=cache))
+        assert (cache.hits, cache.misses) == (3, 0)
+
+    assert summarize(first) == summarize(second)
+    assert summarize(second) == summarize(list(analyze_many(QUERIES, workers=1)))
+    assert [output.statement_index for output in second[1]] == [1]
+
+
+def test_disk_cache_with_workers(tmp_path):
+    with DiskCache(str(tmp_path)) as cache:
+        list(analyze_many(QUERIES[:2], workers=1, disk_cache=cache))
+
+    with DiskCache(str(tmp_path)) as cache:
+        outputs = list(analyze_many(QUERIES, workers=2, chunksize=2, disk_cache=cache))
+        assert (cache.hits, cache.misses) == (2, 1)
+
+    assert summarize(outputs) == summarize(list(analyze_many(QUERIES, workers=1)))
+
+
+def test_disk_cache_invalidated_by_ruleset(tmp_path, monkeypatch):
+    with DiskCache(str(tmp_path)) as cache:
+        cache.put(QUERIES[0], main(QUERIES[0]))
+
+    monkeypatch.setattr(disk_cache_module, "_ruleset_version", "other")
+
+    with DiskCache(str(tmp_path)) as cache:
+        assert cache.get(QUERIES[0]) is None
+        assert cache.misses == 1
+
+
+def test_ruleset_version_is_stable():
+    assert get_ruleset_version() == get_ruleset_version()
+    assert len(get_ruleset_version()) == 64
+
+
+def test_ruleset_modules_cover_detector_code():
+    # Every module of sqleyes used by the detectors is part of the ruleset
+    # version, except packages, definitions that are hashed as data and
+    # modules whose code does not change the results
+    code = ("from sqleyes.detector.detector import Detector; "
+            "Detector('SELECT * FROM t GROUP BY a ORDER BY RAND()').run(); "
+            "import sys; print(' '.join(sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, check=True)
+    modules = [module for module in result.stdout.decode().split() if module.startswith("sqleyes.")]
+
+    hashed = set(RULESET_MODULES) | {module for module, _, _ in REGISTRY.values()}
+    unhashed = {"sqleyes.definitions", "sqleyes.definitions.definitions", "sqleyes.detector",
+                "sqleyes.detector.antipatterns", "sqleyes.detector.detector_output", "sqleyes.utils",
+                "sqleyes.utils.load_file"}
+    assert [module for module in modules if module not in hashed | unhashed] == []
+
+
+def test_ruleset_version_of_sqlparse_version(monkeypatch):
+    import sqlparse
+
+    version = get_ruleset_version()
+    monkeypatch.setattr(disk_cache_module, "_ruleset_version", None)
+    monkeypatch.setattr(sqlparse, "__version__", "0.0.0")
+
+    assert get_ruleset_version() != version
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    with DiskCache(str(tmp_path), max_size=0) as cache:
+        for index in range(20):
+            cache.put(f"SELECT * FROM product WHERE pId = {index}", [])
+        cache.commit()
+
+        assert cache.get("SELECT * FROM product WHERE pId = 0") is None
+
+
+def test_disk_cache_key_of_options():
+    query = QUERIES[0]
+
+    assert DiskCache.get_key(query, DetectorOptions()) == DiskCache.get_key(query)
+    assert DiskCache.get_key(query, DetectorOptions(min_certainty="low")) == DiskCache.get_key(query)
+    assert DiskCache.get_key(query, DetectorOptions(only=("implicit_columns", "random_selection"))) == \
+        DiskCache.get_key(query, DetectorOptions(only=("random_selection", "implicit_columns")))
+    assert DiskCache.get_key(query, DetectorOptions(fail_fast=True)) != DiskCache.get_key(query)
+    assert DiskCache.get_key(query, DetectorOptions(skip=("implicit_columns",))) != DiskCache.get_key(query)
+
+
+def test_disk_cache_with_options(tmp_path):
+    options = DetectorOptions(skip=("implicit_columns",))
+
+    with DiskCache(str(tmp_path)) as cache:
+        list(analyze_many(QUERIES, workers=1, disk_cache=cache))
+        outputs = list(analyze_many(QUERIES, workers=1, disk_cache=cache, options=options))
+        assert (cache.hits, cache.misses) == (0, 6)
+
+    assert summarize(outputs) == summarize(analyze_many(QUERIES, workers=1, options=options))
+    assert outputs[0] == []
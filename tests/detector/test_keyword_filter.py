@@ -0,0 +1,46 @@
+"""Tests for sqleyes.detector.keyword_filter"""
+import re
+
+import pytest
+
+from sqleyes.detector.detector import DETECTORS, KEYWORD_FILTER, SCANNER
+from sqleyes.detector.keyword_filter import KeywordFilter
+from sqleyes.utils.parsed_query import ParsedQuery
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("", []),
+    ("SELECT 1", []),
+    ("select * from product", ["*", "FROM"]),
+    ("SELECT pId FROM product ORDER BY random()", ["FROM", "ORDER", "RAND"]),
+    ("SELECT pId FROM product WHERE name NULLIKE 'a'", ["FROM", "NULL", "LIKE"]),
+    # The Kelvin sign is matched by a case insensitive K
+    ("SELECT pId FROM product WHERE name li\u212ae 'a'", ["FROM", "LIKE"]),
+])
+def test_keyword_filter_scan(query, expected):
+    keyword_filter = KeywordFilter(["*", "from", "ORDER", "RAND", "NULL", "LIKE", "FROM"])
+
+    assert keyword_filter.keywords == ["*", "FROM", "ORDER", "RAND", "NULL", "LIKE"]
+    assert keyword_filter.scan(query) == keyword_filter.get_mask(expected)
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT 1",
+    "SELECT * FROM product",
+    "INSERT INTO product (pId, name) VALUES (1, 'a')",
+    "SELECT pId FROM product WHERE price != NULL AND pCat <> null AND a = NULL",
+    "select name from product where name like '%a%' or name regexp 'b' group  by name",
+    "SELECT pId FROM product ORDER BY RAND() UNION SELECT a FROM b ORDER\nBY random ()",
+    "SELECT pId, COUNT(price) FROM product GROUP BY pCategory",
+])
+def test_keyword_filter_skips_only_detectors_without_output(query):
+    # A detector is only skipped if none of its keywords occur, in which case
+    # it can not find anything
+    parsed_query = ParsedQuery(query)
+    matches = SCANNER.scan(query)
+    bitmap = KEYWORD_FILTER.scan(query)
+
+    for detector in DETECTORS:
+        if bitmap & KEYWORD_FILTER.get_mask(detector.keywords) == 0:
+            assert detector(parsed_query, matches).check() is None
+            assert not any(re.search(pattern, query, re.IGNORECASE) for pattern in detector.patterns)
@@ -0,0 +1,178 @@
+"""Tests for sqleyes.detector.manifest"""
+import os
+
+import pytest
+
+from sqleyes import main as main_module
+from sqleyes.detector import disk_cache as disk_cache_module
+from sqleyes.detector.manifest import (MANIFEST_FILENAME, Manifest,
+                                       get_manifest_path)
+
+
+def write(path, text, mtime=None):
+    path.write_text(text)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def directory(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / ".git").mkdir()
+    write(tmp_path / "a.sql", "SELECT * FROM product;\nSELECT pId FROM product WHERE price <> NULL;")
+    write(tmp_path / "sub" / "b.sql", "SELECT * FROM product; SELECT pId FROM product")
+    write(tmp_path / "notes.txt", "SELECT * FROM product")
+    write(tmp_path / ".git" / "c.sql", "SELECT * FROM product")
+    return tmp_path
+
+
+def test_manifest_initial_update(directory):
+    manifest = Manifest(str(directory))
+    changed, removed = manifest.update()
+
+    assert sorted(changed) == [str(directory / "a.sql"), str(directory / "sub" / "b.sql")]
+    assert removed == []
+    assert manifest.statements == 4
+    # The statement both files contain is analyzed once
+    assert manifest.analyzed == 3
+    assert manifest.errors == {"Implicit Columns": 2, "Fear of the Unknown": 1}
+    assert manifest.files_with_errors == {"Implicit Columns": 2, "Fear of the Unknown": 1}
+    assert manifest.get_files() == [(str(directory / "a.sql"), 2), (str(directory / "sub" / "b.sql"), 1)]
+
+
+def test_manifest_only_analyzes_changed_statements(directory):
+    manifest = Manifest(str(directory))
+    manifest.update()
+
+    write(directory / "a.sql", "SELECT * FROM product;\nSELECT pId FROM product ORDER BY RAND();",
+          mtime=10 ** 18)
+    changed, removed = manifest.update()
+
+    assert changed == [str(directory / "a.sql")]
+    assert manifest.analyzed == 4
+    assert manifest.errors == {"Implicit Columns": 2, "Random Selection": 1}
+    assert [len(outputs) for _, outputs in manifest.get_outputs(str(directory / "a.sql"))] == [1, 1]
+    # Results of statements no file contains anymore are dropped
+    assert sorted(manifest.results) == [(str(directory / "a.sql"), 0), (str(directory / "a.sql"), 1),
+                                        (str(directory / "sub" / "b.sql"), 0),
+                                        (str(directory / "sub" / "b.sql"), 1)]
+
+
+def test_manifest_duplicate_statements(directory):
+    write(directory / "c.sql", "SELECT 1;\nSELECT * FROM product;\nSELECT * FROM product;")
+    manifest = Manifest(str(directory))
+    manifest.update()
+
+    assert manifest.analyzed == 4
+    # Every copy of a statement reports its own position
+    for path in manifest.files:
+        for statement, outputs in manifest.get_outputs(path):
+            assert [(output.statement_index, output.offset) for output in outputs] == \
+                [(statement.index, statement.offset)] * len(outputs)
+    assert [len(outputs) for _, outputs in manifest.get_outputs(str(directory / "c.sql"))] == [0, 1, 1]
+
+
+def test_manifest_failed_update(directory, monkeypatch):
+    manifest = Manifest(str(directory))
+    manifest.update()
+
+    def analyze_many(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    write(directory / "a.sql", "SELECT pId FROM product ORDER BY RAND();", mtime=10 ** 18)
+    os.remove(directory / "sub" / "b.sql")
+    with monkeypatch.context() as patch:
+        patch.setattr(main_module, "analyze_many", analyze_many)
+        with pytest.raises(KeyboardInterrupt):
+            manifest.update()
+
+    # Nothing is changed, so the next update picks up all changes
+    assert (manifest.statements, manifest.analyzed) == (4, 3)
+    assert manifest.errors == {"Implicit Columns": 2, "Fear of the Unknown": 1}
+    assert len(manifest.results) == 4
+
+    changed, removed = manifest.update()
+
+    assert (changed, removed) == ([str(directory / "a.sql")], [str(directory / "sub" / "b.sql")])
+    assert manifest.errors == {"Random Selection": 1}
+    assert list(manifest.results) == [(str(directory / "a.sql"), 0)]
+
+
+def test_manifest_unchanged_contents(directory):
+    manifest = Manifest(str(directory))
+    manifest.update()
+
+    assert manifest.update() == ([], [])
+
+    write(directory / "a.sql", (directory / "a.sql").read_text(), mtime=10 ** 18)
+    assert manifest.update() == ([], [])
+    assert manifest.analyzed == 3
+
+
+def test_manifest_removed_file(directory):
+    manifest = Manifest(str(directory))
+    manifest.update()
+
+    os.remove(directory / "a.sql")
+    changed, removed = manifest.update()
+
+    assert (changed, removed) == ([], [str(directory / "a.sql")])
+    assert manifest.statements == 2
+    assert manifest.errors == {"Implicit Columns": 1}
+    assert manifest.files_with_errors == {"Implicit Columns": 1}
+    assert manifest.titles["Fear of the Unknown"] == "Incorrect NULL usage"
+
+
+def test_manifest_statement_error(directory):
+    write(directory / "c.sql", "SELECT a FROM t WHERE x ( AS ); SELECT * FROM c")
+    manifest = Manifest(str(directory))
+    manifest.update()
+
+    assert manifest.errors == {"Implicit Columns": 3, "Fear of the Unknown": 1}
+    assert [error.split(":")[0] for error in manifest.failures.values()] == ["IndexError"]
+
+    os.remove(directory / "c.sql")
+    manifest.update()
+
+    assert manifest.failures == {}
+
+
+def test_manifest_save_and_load(directory):
+    write(directory / "c.sql", "SELECT a FROM t WHERE x ( AS ); SELECT * FROM c")
+    manifest = Manifest(str(directory))
+    manifest.update()
+    manifest.save(get_manifest_path(str(directory)))
+
+    loaded = Manifest(str(directory))
+    assert loaded.load(str(directory / MANIFEST_FILENAME))
+
+    # Nothing changed since the manifest was saved
+    assert loaded.update() == ([], [])
+    assert loaded.analyzed == 0
+    assert loaded.statements == manifest.statements
+    assert loaded.errors == manifest.errors
+    assert loaded.files_with_errors == manifest.files_with_errors
+    assert loaded.failures == manifest.failures
+    assert {key: [output.dict for output in outputs] for key, outputs in loaded.results.items()} == \
+        {key: [output.dict for output in outputs] for key, outputs in manifest.results.items()}
+
+    # Only the changed file is analyzed
+    write(directory / "sub" / "b.sql", "SELECT * FROM product; SELECT pId FROM product ORDER BY RAND()",
+          mtime=10 ** 18)
+    assert loaded.update() == ([str(directory / "sub" / "b.sql")], [])
+    assert loaded.analyzed == 1
+
+
+def test_manifest_load_other_ruleset(directory, monkeypatch, tmp_path_factory):
+    path = get_manifest_path(str(directory), str(tmp_path_factory.mktemp("cache")))
+    manifest = Manifest(str(directory))
+    manifest.update()
+    manifest.save(path)
+
+    monkeypatch.setattr(disk_cache_module, "_ruleset_version", "other")
+
+    loaded = Manifest(str(directory))
+    assert not loaded.load(path)
+    assert not loaded.load(str(directory / "missing.json"))
+    assert loaded.update()[0]
+    assert loaded.analyzed == 3
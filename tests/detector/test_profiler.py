@@ -0,0 +1,103 @@
+"""Tests for sqleyes.detector.profiler"""
+from array import array
+
+import pytest
+
+from sqleyes.detector import detector
+from sqleyes.detector.antipatterns.implicit_columns import ImplicitColumnsDetector
+from sqleyes.detector.profiler import Profiler, percentile
+from sqleyes.main import analyze_many, main
+from sqleyes.utils import query_functions
+from sqleyes.utils.parsed_query import ParsedQuery
+
+QUERIES = ["SELECT * FROM product",
+           "SELECT pId FROM product WHERE price <> NULL",
+           "SELECT pId, COUNT(price) FROM product GROUP BY pCategory"]
+
+
+@pytest.mark.parametrize("values, percent, expected", [
+    ([], 50, 0.0),
+    ([1.0], 99, 1.0),
+    ([1.0, 2.0, 3.0, 4.0], 50, 2.0),
+    ([1.0, 2.0, 3.0, 4.0], 90, 4.0),
+    ([float(i) for i in range(1, 101)], 99, 99.0),
+])
+def test_percentile(values, percent, expected):
+    assert percentile(values, percent) == expected
+
+
+def test_profiler_restores_targets():
+    parse = ParsedQuery.parse
+    check = ImplicitColumnsDetector.check
+    get_query_complexity = query_functions.get_query_complexity
+
+    with Profiler() as profiler:
+        assert profiler.enabled
+        assert ImplicitColumnsDetector.check is not check
+        assert query_functions.get_query_complexity is not get_query_complexity
+
+    assert not profiler.enabled
+    assert ParsedQuery.parse is parse
+    assert ImplicitColumnsDetector.check is check
+    assert query_functions.get_query_complexity is get_query_complexity
+
+
+def test_profiler_patches_imported_functions():
+    get_query_ops_and_expr = query_functions.get_query_ops_and_expr
+    modules = [module for module in [detector, query_functions]
+               if getattr(module, "get_query_ops_and_expr", None) is get_query_ops_and_expr]
+
+    with Profiler():
+        assert all(module.get_query_ops_and_expr is not get_query_ops_and_expr
+                   for module in modules)
+
+    assert all(module.get_query_ops_and_expr is get_query_ops_and_expr for module in modules)
+
+
+def test_profiler_counts_calls():
+    with Profiler() as profiler:
+        for query in QUERIES:
+            main(query)
+
+    stats = profiler.get_stats()
+    assert stats["ParsedQuery"]["calls"] == len(QUERIES)
+    assert stats["Scanner.scan"]["calls"] == len(QUERIES)
+    assert stats["SpaghettiQueryDetector.check"]["calls"] == len(QUERIES)
+    # Only the query with a * can have implicit columns
+    assert stats["ImplicitColumnsDetector.check"]["calls"] == 1
+    for values in stats.values():
+        assert values["p50"] <= values["p90"] <= values["p99"] <= values["max"]
+        assert values["total"] >= values["max"]
+
+
+def test_profiler_does_not_change_results():
+    expected = [main(query) for query in QUERIES]
+
+    with Profiler():
+        results = [main(query) for query in QUERIES]
+
+    assert [[output.dict for output in outputs] for outputs in results] == \
+        [[output.dict for output in outputs] for outputs in expected]
+
+
+def test_profiler_merge():
+    profiler = Profiler()
+    profiler.merge({"target": array("d", [1.0, 2.0])})
+    profiler.merge({"target": array("d", [3.0])})
+
+    stats = profiler.get_stats()["target"]
+    assert stats["calls"] == 3
+    assert stats["total"] == 6.0
+    assert stats["max"] == 3.0
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_analyze_many_profiler(workers):
+    profiler = Profiler()
+    queries = QUERIES * 4
+
+    results = list(analyze_many(queries, workers=workers, chunksize=2, profiler=profiler))
+
+    assert len(results) == len(queries)
+    assert not profiler.enabled
+    assert profiler.get_stats()["SpaghettiQueryDetector.check"]["calls"] == len(queries)
@@ -0,0 +1,101 @@
+"""Tests for sqleyes.detector.result_cache"""
+import pytest
+
+from sqleyes.detector.detector import Detector, DetectorOptions
+from sqleyes.detector.result_cache import ResultCache
+from sqleyes.main import main
+
+
+def test_result_cache_hits():
+    cache = ResultCache()
+
+    queries = ["SELECT * FROM product WHERE pId = {}".format(index) for index in range(5)]
+    outputs = [cache.run(query) for query in queries]
+
+    assert (cache.hits, cache.misses, len(cache)) == (4, 1, 1)
+    assert [[(output.type, output.locations) for output in query_outputs] for query_outputs in outputs] == \
+        [[(output.type, output.locations) for output in main(query)] for query in queries]
+
+
+def test_result_cache_remaps_locations():
+    cache = ResultCache()
+
+    cache.run("SELECT pId FROM product WHERE pCat IN (1) AND price = NULL")
+    outputs = cache.run("SELECT pId FROM product WHERE pCat IN (1, 2, 3, 4) AND price = NULL",
+                        statement_index=3, offset=10)
+
+    assert cache.hits == 1
+    assert [(output.locations, output.statement_index, output.offset) for output in outputs] == \
+        [([(61, 67)], 3, 10)]
+
+
+def test_result_cache_skips_findings_in_literals():
+    cache = ResultCache()
+
+    cache.run("SELECT pId FROM product WHERE description = 'a LIKE b'")
+    outputs = cache.run("SELECT pId FROM product WHERE description = 'abc'")
+
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert outputs == []
+
+
+def test_result_cache_evicts_least_recently_used():
+    cache = ResultCache(maxsize=2)
+
+    for query in ["SELECT a FROM b", "SELECT c FROM d", "SELECT a FROM b", "SELECT e FROM f", "SELECT c FROM d"]:
+        cache.run(query)
+
+    assert (cache.hits, cache.misses, len(cache)) == (1, 4, 2)
+
+
+def test_result_cache_keeps_options_apart():
+    cache = ResultCache()
+    options = DetectorOptions(only=("fear_of_the_unknown",))
+
+    assert [output.type for output in cache.run("SELECT * FROM product WHERE a = NULL")] == \
+        ["Fear of the Unknown", "Implicit Columns"]
+    assert [output.type for output in cache.run("SELECT * FROM product WHERE a = NULL", options=options)] == \
+        ["Fear of the Unknown"]
+    assert (cache.hits, cache.misses, len(cache)) == (0, 2, 2)
+
+
+@pytest.mark.parametrize("queries", [
+    ["SELECT a FROM t WHERE x = 'foo'", "SELECT a FROM t WHERE x = 'LIKE'"],
+    ["SELECT a FROM t WHERE x = 'foo'", "SELECT a FROM t WHERE x = '= NULL'"],
+    ["SELECT a FROM t WHERE x = 'a'", "SELECT a FROM t WHERE x = 'a b GROUP BY c ORDER BY d'"],
+    ["SELECT a, 'x' FROM t GROUP BY a", "SELECT a, 'x, y' FROM t GROUP BY a"],
+    ["SELECT a, 'x' FROM t GROUP BY a", "SELECT a, 'count' FROM t GROUP BY a"],
+    ["SELECT a, 1, 2 FROM t GROUP BY a ORDER BY b", "SELECT a, 1, 1 FROM t GROUP BY a ORDER BY b"],
+    ["SELECT a FROM t WHERE x = 'a' UNION SELECT b FROM u", "SELECT a FROM t WHERE x = 'UNION' UNION SELECT b FROM u"],
+    ["SELECT * FROM t WHERE x IN (1, 2)", "SELECT * FROM t WHERE x IN ('LIKE', 'RAND()')"],
+])
+def test_result_cache_equals_uncached_run(queries):
+    cache = ResultCache()
+
+    for query in queries:
+        assert [(output.type, output.certainty, output.locations) for output in cache.run(query)] == \
+            [(output.type, output.certainty, output.locations) for output in main(query)]
+
+
+@pytest.mark.parametrize("queries", [
+    ["SELECT a, b FROM t WHERE x = 1 AND y IN (2, 3) ORDER  BY a",
+     "select a, b from t where x = 1 and y in (2, 3) order  by a",
+     "SELECT a,  b FROM t\nWHERE x = 1 AND y in (2, 3) ORDER  BY a"],
+    ["SELECT a FROM t WHERE x LIKE 'a%' AND y NOT LIKE 'b%' GROUP BY a",
+     "select a from t where x like 'a%' and y not like 'b%' group by a",
+     "SELECT a FROM t WHERE x ILIKE 'a%' AND y NOT  like 'b%' GROUP BY a"],
+    ["SELECT a FROM t WHERE x NOT IN (1) AND y = NULL ORDER BY RAND()",
+     "select a from t where x not in (1) and y = null order by rand()",
+     "Select a From t Where x Not In (1)   And y = Null Order By Rand()"],
+    ["SELECT COUNT(a), MAX(b) FROM t GROUP BY c",
+     "SELECT count(a), max(b) FROM t GROUP BY c",
+     "select count (a), max (b) from t group by c"],
+])
+def test_result_cache_equals_uncached_run_across_variants(queries):
+    # The variants only differ in keyword case and whitespace, so some of them
+    # share a fingerprint
+    cache = ResultCache()
+
+    for query in queries * 2:
+        assert [(output.type, output.certainty, output.locations) for output in cache.run(query)] == \
+            [(output.type, output.certainty, output.locations) for output in Detector(query).run()]
@@ -0,0 +1,55 @@
+"""Tests for sqleyes.detector.scanner"""
+import re
+
+import pytest
+
+from sqleyes.detector.detector import DETECTORS, SCANNER
+from sqleyes.detector.scanner import Scanner
+
+
+def find_separately(rules, query):
+    return {rule: [match.span()
+                   for pattern in patterns
+                   for match in re.finditer(pattern, query, re.IGNORECASE)]
+            for rule, patterns in rules.items()}
+
+
+@pytest.mark.parametrize("query", [
+    "",
+    "SELECT * FROM product",
+    "SELECT pId FROM product WHERE price != NULL AND pCat <> null AND a = NULL",
+    "select name from product where name like '%a%' or name regexp 'b' group  by name",
+    "SELECT pId FROM product ORDER BY RAND() UNION SELECT a FROM b ORDER\nBY random ()",
+])
+def test_scanner_matches_detectors(query):
+    rules = {detector.type: detector.patterns for detector in DETECTORS}
+    assert SCANNER.scan(query) == find_separately(rules, query)
+
+
+def test_scanner_overlapping_patterns():
+    rules = {"a": ["ab", "b"], "b": ["aba", "ba"]}
+    scanner = Scanner(rules)
+
+    assert scanner.scan("ababa") == {"a": [(0, 2), (2, 4), (1, 2), (3, 4)],
+                                     "b": [(0, 3), (1, 3), (3, 5)]}
+    assert scanner.scan("ababa") == find_separately(rules, "ababa")
+
+
+def test_scanner_without_prefilter():
+    rules = {"a": ["a|b"], "b": [r"\d+"], "c": ["x?y"]}
+    scanner = Scanner(rules)
+
+    assert scanner.scan("a1 y xy 22b") == find_separately(rules, "a1 y xy 22b")
+
+
+def test_scanner_without_rules():
+    assert Scanner({}).scan("SELECT * FROM product") == {}
+    assert Scanner({"a": []}).scan("SELECT * FROM product") == {"a": []}
+
+
+def test_scanner_compile():
+    rules = {"a": ["ab", "b"], "b": [r"\d+"]}
+    scanner = Scanner(rules)
+    scanner.compile()
+
+    assert scanner.scan("ab 12 b") == find_separately(rules, "ab 12 b")
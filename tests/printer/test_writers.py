@@ -0,0 +1,106 @@
+"""Tests for sqleyes.printer.writers"""
+import csv
+import io
+import json
+
+import pytest
+
+from sqleyes.detector.detector_output import DetectorOutput
+from sqleyes.main import main
+from sqleyes.printer.writers import (FIELDS, CSVWriter, JSONLinesWriter,
+                                     SARIFWriter, iter_records)
+from sqleyes.utils.statement_splitter import split_statements
+
+SQL = (b"SELECT *\n  FROM product;\n"
+       b"SELECT pId FROM product\n  ORDER BY RAND();\n"
+       b"SELECT pId FROM product;\n"
+       b"SELECT a FROM t")
+
+
+def write(writer_class, source="queries.sql"):
+    stream = io.StringIO()
+    writer = writer_class(stream, source)
+    writer.start()
+    for statement in split_statements(io.BytesIO(SQL)):
+        writer.write(statement, main(statement.text))
+    writer.finish()
+    return stream.getvalue()
+
+
+def test_iter_records_positions():
+    statement = list(split_statements(io.BytesIO(SQL)))[1]
+    records = list(iter_records(statement, main(statement.text), "queries.sql"))
+
+    assert len(records) == 1
+    assert records[0]["type"] == "Random Selection"
+    assert (records[0]["line"], records[0]["column"]) == (4, 3)
+    assert (records[0]["end_line"], records[0]["end_column"]) == (4, 17)
+    assert records[0]["statement_index"] == 1
+    assert records[0]["offset"] == SQL.index(b"SELECT pId")
+    assert list(records[0]) == FIELDS
+
+
+def test_iter_records_without_locations():
+    statement = list(split_statements(io.BytesIO(SQL)))[3]
+    output = DetectorOutput(query=statement.text, certainty="low", description=None,
+                            detector_type="anti-pattern", locations=[],
+                            title="Avoid complex queries", type="Spaghetti Query")
+    records = list(iter_records(statement, [output], None))
+
+    assert len(records) == 1
+    assert (records[0]["line"], records[0]["column"]) == (6, 1)
+
+
+def test_jsonl_writer():
+    records = [json.loads(line) for line in write(JSONLinesWriter).splitlines()]
+
+    assert [record["type"] for record in records[:2]] == ["Implicit Columns", "Random Selection"]
+    assert all(record["source"] == "queries.sql" for record in records)
+    assert (records[0]["line"], records[0]["column"]) == (1, 1)
+
+
+def test_csv_writer():
+    rows = list(csv.DictReader(io.StringIO(write(CSVWriter))))
+
+    assert [row["type"] for row in rows[:2]] == ["Implicit Columns", "Random Selection"]
+    assert rows[1]["line"] == "4"
+    assert list(rows[0]) == FIELDS
+
+
+def test_csv_writer_empty():
+    stream = io.StringIO()
+    writer = CSVWriter(stream)
+    writer.start()
+    writer.finish()
+    assert stream.getvalue() == ",".join(FIELDS) + "\n"
+
+
+@pytest.mark.parametrize("source", ["queries.sql", None])
+def test_sarif_writer(source):
+    log = json.loads(write(SARIFWriter, source))
+
+    assert log["version"] == "2.1.0"
+    run = log["runs"][0]
+    rules = run["tool"]["driver"]["rules"]
+    results = run["results"]
+
+    assert results[0]["ruleId"] == "implicit_columns"
+    assert rules[results[0]["ruleIndex"]]["id"] == "implicit_columns"
+    assert results[1]["ruleId"] == "random_selection"
+    region = results[1]["locations"][0]["physicalLocation"]["region"]
+    assert (region["startLine"], region["startColumn"]) == (4, 3)
+
+    # Every physical location has the artifact SARIF requires
+    artifacts = {location["physicalLocation"]["artifactLocation"]["uri"]
+                 for result in results for location in result["locations"]}
+    assert artifacts == {source or "stdin"}
+
+
+def test_sarif_writer_empty():
+    stream = io.StringIO()
+    writer = SARIFWriter(stream)
+    writer.start()
+    writer.write(next(split_statements(io.BytesIO(b"SELECT 1"))), [])
+    writer.finish()
+
+    assert json.loads(stream.getvalue())["runs"][0]["results"] == []
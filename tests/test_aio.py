@@ -0,0 +1,148 @@
+"""Tests for sqleyes.aio"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from sqleyes import aio
+from sqleyes.aio import AsyncAnalyzer, analyze, analyze_many
+from sqleyes.main import main
+
+QUERIES = ["SELECT * FROM product",
+           "SELECT pId FROM product WHERE price <> NULL",
+           "SELECT pId FROM product",
+           "SELECT pId FROM product ORDER BY RAND()"]
+
+
+def expected(queries):
+    return [[output.dict for output in main(query)] for query in queries]
+
+
+def dicts(results):
+    # Statement indexes differ from main, which always uses 0
+    return [[dict(output.dict, statement_index=0) for output in outputs] for outputs in results]
+
+
+def run_coroutine(coroutine):
+    # asyncio.run is only available from Python 3.7 on
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def collect(iterator):
+    async def run():
+        return [outputs async for outputs in iterator]
+    return run_coroutine(run())
+
+
+@pytest.fixture
+def slow_run(monkeypatch):
+    # Tracks how many queries are analyzed at the same time
+    state = {"running": 0, "max": 0, "started": 0}
+    lock = threading.Lock()
+    run = aio._run
+
+    def slow(query, statement_index):
+        with lock:
+            state["running"] += 1
+            state["started"] += 1
+            state["max"] = max(state["max"], state["running"])
+        time.sleep(0.05)
+        with lock:
+            state["running"] -= 1
+        return run(query, statement_index)
+
+    monkeypatch.setattr(aio, "_run", slow)
+    return state
+
+
+def test_analyze():
+    outputs = run_coroutine(analyze(QUERIES[1]))
+    assert [output.dict for output in outputs] == expected([QUERIES[1]])[0]
+
+
+def test_analyze_process_executor():
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        outputs = run_coroutine(analyze(QUERIES[1], executor=executor))
+    assert [output.dict for output in outputs] == expected([QUERIES[1]])[0]
+
+
+def test_analyze_timeout(slow_run):
+    with pytest.raises(asyncio.TimeoutError):
+        run_coroutine(analyze(QUERIES[0], timeout=0.001))
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_analyze_many(ordered):
+    results = collect(analyze_many(QUERIES, ordered=ordered))
+
+    if ordered:
+        assert dicts(results) == expected(QUERIES)
+    else:
+        assert sorted(map(str, dicts(results))) == sorted(map(str, expected(QUERIES)))
+
+
+def test_analyze_many_statement_index():
+    results = collect(analyze_many(QUERIES))
+
+    assert [output.statement_index for outputs in results for output in outputs] == \
+        [index for index, outputs in enumerate(results) for _ in outputs]
+    assert results[1][0].statement_index == 1
+
+
+def test_analyze_many_async_iterable():
+    async def queries():
+        for query in QUERIES:
+            await asyncio.sleep(0)
+            yield query
+
+    assert dicts(collect(analyze_many(queries()))) == expected(QUERIES)
+
+
+def test_analyze_many_max_in_flight(slow_run):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = collect(analyze_many(QUERIES * 3, executor=executor, max_in_flight=2))
+
+    assert len(results) == len(QUERIES) * 3
+    assert slow_run["max"] == 2
+
+
+def test_analyzer_limit_is_shared(slow_run):
+    analyzer = AsyncAnalyzer(ThreadPoolExecutor(max_workers=8), max_in_flight=3)
+
+    async def run():
+        return await asyncio.gather(*[analyzer.analyze(query) for query in QUERIES * 2])
+
+    assert len(run_coroutine(run())) == len(QUERIES) * 2
+    assert slow_run["max"] == 3
+
+
+def test_analyze_many_timeout(slow_run):
+    with pytest.raises(asyncio.TimeoutError):
+        collect(analyze_many(QUERIES, timeout=0.001))
+
+
+def test_analyze_many_close_cancels_pending(slow_run):
+    analyzer = AsyncAnalyzer(ThreadPoolExecutor(max_workers=1), max_in_flight=2)
+
+    async def run():
+        iterator = analyzer.analyze_many(QUERIES * 10)
+        await iterator.__anext__()
+        await iterator.aclose()
+
+    run_coroutine(run())
+    # Only the queries that were pending could have started
+    assert slow_run["started"] <= 3
+
+
+def test_analyzer_invalid_max_in_flight():
+    with pytest.raises(ValueError):
+        AsyncAnalyzer(max_in_flight=0)
@@ -1,6 +1,193 @@
+import json
 import os
+import subprocess
+import sys
+
+import pytest
+
+from sqleyes.cli import cli
 
 
 def test_entrypoint():
     exit_status = os.system('sqleyes --help')
     assert exit_status == 0
+
+
+def test_entrypoint_file(tmp_path):
+    path = tmp_path / "queries.sql"
+    path.write_text("SELECT * FROM product; SELECT pId FROM product ORDER BY RAND()")
+
+    exit_status = os.system(f'sqleyes -f "{path}"')
+    assert exit_status == 0
+
+
+def test_entrypoint_cache_dir(tmp_path):
+    exit_status = os.system(f'sqleyes -q "SELECT * FROM product" --cache-dir "{tmp_path}"')
+    assert exit_status == 0
+
+    exit_status = os.system(f'sqleyes -q "SELECT * FROM product" --cache-dir "{tmp_path}"')
+    assert exit_status == 0
+    assert (tmp_path / "sqleyes-cache.sqlite3").exists()
+
+
+def test_cli_select_literal(capsys):
+    cli(["-q", "SELECT 1"])
+    assert "Found 0 errors in the given query" in capsys.readouterr().out
+
+
+def test_cli_import_does_not_parse_arguments():
+    code = "import sys; sys.argv = ['sqleyes', '--unknown']; import sqleyes.cli"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
+
+
+@pytest.mark.parametrize("code, unexpected", [
+    ("import sqleyes.cli", ["sqlparse", "rich", "sqleyes.main"]),
+    ("from sqleyes.cli import cli; cli(['-q', 'SELECT 1'])",
+     ["pkg_resources", "importlib.metadata", "rich.markdown", "sqlite3",
+      "concurrent.futures.process", "sqlparse", "sqleyes.detector.result_cache"]),
+    ("from sqleyes.cli import cli; cli(['-q', 'SELECT * FROM a', '--format', 'jsonl'])",
+     ["rich"]),
+    ("from sqleyes.cli import cli; cli(['-q', 'SELECT * FROM a', '--only', 'implicit_columns'])",
+     ["sqleyes.detector.antipatterns.spaghetti_query", "sqleyes.utils.query_functions"]),
+])
+def test_cli_imports_lazily(code, unexpected):
+    code += "; import sys; print(' '.join(sys.modules), file=sys.stderr)"
+    result = subprocess.run([sys.executable, "-c", code], stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, check=True)
+    modules = result.stderr.decode().split()
+
+    assert [module for module in unexpected if module in modules] == []
+
+
+def test_cli_profile(capsys):
+    cli(["-q", "SELECT * FROM product", "--profile"])
+    output = capsys.readouterr().out
+    assert "Profile of analysis" in output
+    assert "Wall times in milliseconds" in output
+
+
+def test_entrypoint_serve_help():
+    exit_status = os.system('sqleyes serve --help')
+    assert exit_status == 0
+
+
+def test_entrypoint_lsp_help():
+    exit_status = os.system('sqleyes lsp --help')
+    assert exit_status == 0
+
+
+def test_cli_watch_once(capsys, tmp_path):
+    (tmp_path / "queries.sql").write_text("SELECT * FROM product; SELECT pId FROM product ORDER BY RAND()")
+
+    cli(["watch", str(tmp_path), "--once"])
+    output = capsys.readouterr().out
+    assert "Found 2 errors in 2 statements of 1 files" in output
+    assert "queries.sql" in output
+
+
+def test_cli_watch_once_twice(capsys, tmp_path):
+    directory = tmp_path / "queries"
+    directory.mkdir()
+    (directory / "queries.sql").write_text("SELECT * FROM product; SELECT pId FROM product ORDER BY RAND()")
+
+    cli(["watch", str(directory), "--once", "--cache-dir", str(tmp_path / "cache")])
+    assert "analyzed 2 statements" in capsys.readouterr().out
+
+    # The manifest of the first run is loaded, nothing is analyzed again
+    cli(["watch", str(directory), "--once", "--cache-dir", str(tmp_path / "cache")])
+    output = capsys.readouterr().out
+    assert "0 files changed, 0 removed, analyzed 0 statements" in output
+    assert "Found 2 errors in 2 statements of 1 files" in output
+
+
+def test_cli_log_format(capsys, tmp_path):
+    path = tmp_path / "postgresql.log"
+    path.write_text("2024-01-01 12:00:00 UTC [1] LOG:  duration: 900.0 ms  statement: SELECT * FROM product\n"
+                    "2024-01-01 12:00:01 UTC [1] LOG:  duration: 100.0 ms  statement: SELECT pId FROM product ORDER BY RAND()\n")
+
+    cli(["-f", str(path), "--log-format", "postgres", "--profile"])
+    output = capsys.readouterr().out
+    assert "Analyzed 2 executions of 2 queries" in output
+    assert output.index("Implicit Columns") < output.index("Random Selection")
+    assert "Profile of analysis" in output
+
+
+@pytest.mark.parametrize("format", ["jsonl", "csv", "sarif"])
+def test_cli_format(capsys, tmp_path, format):
+    path = tmp_path / "queries.sql"
+    path.write_text("SELECT * FROM product;\nSELECT pId FROM product ORDER BY RAND()")
+
+    cli(["-f", str(path), "--format", format])
+    captured = capsys.readouterr()
+
+    assert "SQLEyes" not in captured.out
+    assert "Random Selection" in captured.out
+    assert "Analyzed 2 statements, found 2 errors" in captured.err
+
+
+def test_cli_format_with_log_format(tmp_path):
+    with pytest.raises(SystemExit):
+        cli(["-f", str(tmp_path / "slow.log"), "--log-format", "mysql", "--format", "jsonl"])
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_cli_scan_py(capsys, tmp_path, jobs):
+    (tmp_path / "a.py").write_text('def load(cursor):\n    cursor.execute("SELECT * FROM product")\n')
+    (tmp_path / "b.py").write_text("cursor.execute(")
+
+    cli(["scan-py", str(tmp_path), "-j", jobs, "--format", "jsonl"])
+    captured = capsys.readouterr()
+    record = json.loads(captured.out)
+    assert (record["source"], record["line"], record["column"]) == (str(tmp_path / "a.py"), 2, 21)
+    assert "Scanned 2 files, analyzed 1 statements, found 1 errors" in captured.err
+    assert "Skipped " + str(tmp_path / "b.py") in captured.err
+
+
+def test_cli_diff_error(capsys, tmp_path):
+    with pytest.raises(SystemExit):
+        cli(["--diff=--not-a-revision"])
+    assert "Invalid revision range" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("argv, status", [
+    (["-q", "SELECT * FROM product"], 1),
+    (["-q", "SELECT * FROM product", "--skip", "implicit_columns"], None),
+    (["-q", "SELECT pId FROM product WHERE name LIKE 'a%'", "--min-certainty", "high"], None),
+])
+def test_cli_fail_fast(capsys, argv, status):
+    if status is None:
+        cli(argv + ["--fail-fast"])
+    else:
+        with pytest.raises(SystemExit) as error:
+            cli(argv + ["--fail-fast"])
+        assert error.value.code == status
+
+
+def test_cli_fail_fast_file(capsys, tmp_path):
+    path = tmp_path / "queries.sql"
+    path.write_text("SELECT 1;\nSELECT pId FROM product ORDER BY RAND();\nSELECT * FROM product")
+
+    with pytest.raises(SystemExit):
+        cli(["-f", str(path), "--format", "jsonl", "--fail-fast"])
+    captured = capsys.readouterr()
+
+    assert [json.loads(line)["type"] for line in captured.out.splitlines()] == ["Random Selection"]
+    assert "Analyzed 2 statements, found 1 errors" in captured.err
+
+
+def test_cli_only_unknown_detector(capsys):
+    with pytest.raises(SystemExit):
+        cli(["-q", "SELECT 1", "--only", "implicit_columns,random"])
+    assert "Unknown detector 'random'" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_cli_file_continues_after_error(capsys, tmp_path, jobs):
+    path = tmp_path / "queries.sql"
+    path.write_text("SELECT * FROM product;\nSELECT a FROM t WHERE x ( AS );\nSELECT a FROM t ORDER BY RAND()")
+
+    cli(["-f", str(path), "-j", jobs])
+    captured = capsys.readouterr()
+
+    assert "Analyzed 3 statements, found 2 errors" in captured.out
+    assert "Skipped statement 1 (line 2, byte offset 23): IndexError" in captured.err
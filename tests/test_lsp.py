@@ -0,0 +1,229 @@
+"""Tests for sqleyes.lsp"""
+import io
+import json
+import os
+import threading
+
+import pytest
+
+from sqleyes.lsp import INVALID_PARAMS, METHOD_NOT_FOUND, Document, LanguageServer
+from sqleyes.utils.statement_splitter import split_statements
+
+TEXT = "SELECT * FROM product;\nSELECT pId FROM product\nWHERE price <> NULL;\nSELECT pId FROM product"
+
+
+def statements(text):
+    return [statement.text for statement in split_statements(io.BytesIO(text.encode()))]
+
+
+class Client:
+    """Runs a language server on a thread and talks to it over pipes"""
+
+    def __init__(self, **kwargs):
+        server_in, client_out = os.pipe()
+        client_in, server_out = os.pipe()
+        self.writer = os.fdopen(client_out, "wb")
+        self.reader = os.fdopen(client_in, "rb")
+        self.server = LanguageServer(os.fdopen(server_in, "rb"), os.fdopen(server_out, "wb"), **kwargs)
+        self.exit_code = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        self.exit_code = self.server.serve()
+
+    def send(self, method, params=None, id=None):
+        message = {"jsonrpc": "2.0", "method": method, "params": params or {}}
+        if id is not None:
+            message["id"] = id
+        body = json.dumps(message).encode()
+        self.writer.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+        self.writer.flush()
+
+    def receive(self):
+        length = None
+        while True:
+            line = self.reader.readline().strip()
+            if not line:
+                break
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return json.loads(self.reader.read(length))
+
+    def open(self, text, uri="file:///a.sql"):
+        self.send("textDocument/didOpen", {"textDocument": {
+            "uri": uri, "languageId": "sql", "version": 1, "text": text}})
+
+    def change(self, version, changes, uri="file:///a.sql"):
+        self.send("textDocument/didChange", {"textDocument": {"uri": uri, "version": version},
+                                             "contentChanges": changes})
+
+    def close(self):
+        self.send("shutdown", id="end")
+        assert self.receive()["id"] == "end"
+        self.send("exit")
+        self.writer.close()
+        self.thread.join(5)
+
+
+@pytest.fixture
+def client(request):
+    client = Client(debounce=getattr(request, "param", 0.05))
+    client.send("initialize", {"capabilities": {}}, id=1)
+    yield client
+    if client.thread.is_alive():
+        client.close()
+
+
+@pytest.mark.parametrize("start, end, text", [
+    (0, 0, ""),
+    (0, 0, "SELECT 1;"),
+    (21, 22, ""),
+    (5, 5, "'"),
+    (30, 30, "/* ; "),
+    (len(TEXT), len(TEXT), ";"),
+    (0, len(TEXT), "SELECT 2"),
+    (44, 44, ";\n"),
+])
+def test_document_replace(start, end, text):
+    document = Document("file:///a.sql", TEXT)
+    document.replace(start, end, text)
+
+    expected = statements(document.text)
+    assert [statement for _, statement in document.get_statements()] == expected
+    assert document.get_statements() == Document("file:///b.sql", document.text).get_statements()
+    assert all(document.text[offset:offset + len(statement)] == statement
+               for offset, statement in document.get_statements())
+
+
+@pytest.mark.parametrize("start, end, text", [
+    (0, 0, ""),
+    (12, 12, "x"),
+    (0, 13, ""),
+    (60, 60, ";"),
+])
+def test_document_replace_delimiters(start, end, text):
+    document = Document("file:///a.sql", "DELIMITER //\nCREATE PROCEDURE p() BEGIN SELECT 1; END//\nSELECT 2//")
+    document.replace(start, end, text)
+
+    assert [statement for _, statement in document.get_statements()] == statements(document.text)
+    assert document.get_statements() == Document("file:///b.sql", document.text).get_statements()
+
+
+def test_document_positions():
+    document = Document("file:///a.sql", "SELECT '\U0001F600',\r\n * FROM t")
+
+    assert document.get_position(10) == {"line": 0, "character": 11}
+    assert document.get_position(14) == {"line": 1, "character": 1}
+    assert document.get_offset({"line": 0, "character": 11}) == 10
+    assert document.get_offset({"line": 0, "character": 99}) == 11
+    assert document.get_offset({"line": 5, "character": 0}) == len(document.text)
+
+
+def test_document_apply_change():
+    document = Document("file:///a.sql", TEXT)
+    document.apply_change({"range": {"start": {"line": 1, "character": 7},
+                                     "end": {"line": 1, "character": 10}}, "text": "*"})
+    assert document.get_statements()[1] == (23, "SELECT * FROM product\nWHERE price <> NULL;")
+
+    document.apply_change({"text": "SELECT 1"})
+    assert document.get_statements() == [(0, "SELECT 1")]
+
+
+def test_initialize(client):
+    response = client.receive()
+    assert response["id"] == 1
+    assert response["result"]["capabilities"]["textDocumentSync"]["change"] == 2
+
+
+def test_publish_diagnostics(client):
+    client.receive()
+    client.open(TEXT)
+
+    notification = client.receive()
+    assert notification["method"] == "textDocument/publishDiagnostics"
+    params = notification["params"]
+    assert params["uri"] == "file:///a.sql"
+    assert [(diagnostic["code"], diagnostic["range"]) for diagnostic in params["diagnostics"]] == [
+        ("Implicit Columns", {"start": {"line": 0, "character": 0},
+                              "end": {"line": 0, "character": 8}}),
+        ("Fear of the Unknown", {"start": {"line": 2, "character": 12},
+                                 "end": {"line": 2, "character": 19}}),
+    ]
+    assert all(diagnostic["source"] == "sqleyes" for diagnostic in params["diagnostics"])
+
+
+@pytest.mark.parametrize("client", [0.5], indirect=True)
+def test_only_changed_statements_are_analyzed(client):
+    client.receive()
+    client.open(TEXT)
+    client.receive()
+    assert client.server.analyzed == 3
+
+    # Several edits in a row are analyzed once, after the last one
+    client.change(2, [{"range": {"start": {"line": 3, "character": 7},
+                                 "end": {"line": 3, "character": 10}}, "text": "pId, x"}])
+    client.change(3, [{"range": {"start": {"line": 3, "character": 7},
+                                 "end": {"line": 3, "character": 13}}, "text": "*"}])
+
+    params = client.receive()["params"]
+    assert params["version"] == 3
+    assert client.server.analyzed == 4
+    assert [diagnostic["range"]["start"]["line"] for diagnostic in params["diagnostics"]] == [0, 2, 3]
+
+
+def test_statement_error(client):
+    client.receive()
+    client.open("SELECT * FROM product;\nSELECT a FROM t WHERE x ( AS );")
+
+    diagnostics = client.receive()["params"]["diagnostics"]
+    assert [(diagnostic["severity"], diagnostic["range"]["start"]) for diagnostic in diagnostics] == [
+        (2, {"line": 0, "character": 0}), (1, {"line": 1, "character": 0})]
+    assert diagnostics[1]["message"].startswith("Could not analyze the statement: IndexError")
+
+    # The server keeps analyzing documents
+    client.open("SELECT * FROM product", uri="file:///b.sql")
+    params = client.receive()["params"]
+    assert params["uri"] == "file:///b.sql"
+    assert [diagnostic["code"] for diagnostic in params["diagnostics"]] == ["Implicit Columns"]
+
+
+def test_close_clears_diagnostics(client):
+    client.receive()
+    client.open(TEXT)
+    client.receive()
+    client.send("textDocument/didClose", {"textDocument": {"uri": "file:///a.sql"}})
+
+    assert client.receive()["params"] == {"uri": "file:///a.sql", "diagnostics": []}
+    assert client.server.documents == {}
+
+
+def test_unknown_request(client):
+    client.receive()
+    client.send("textDocument/hover", {}, id=2)
+
+    response = client.receive()
+    assert response["id"] == 2
+    assert response["error"]["code"] == METHOD_NOT_FOUND
+
+
+def test_invalid_params(client):
+    client.receive()
+    client.send("textDocument/didOpen", {"textDocument": {}}, id=3)
+    assert client.receive()["error"]["code"] == INVALID_PARAMS
+
+    # The server keeps running
+    client.open("SELECT * FROM product")
+    assert client.receive()["method"] == "textDocument/publishDiagnostics"
+
+
+def test_exit_code(client):
+    client.receive()
+    client.close()
+    assert client.exit_code == 0
+
+    client = Client()
+    client.send("exit")
+    client.thread.join(5)
+    assert client.exit_code == 1
@@ -1,8 +1,10 @@
 """Tests for sqleyes.main"""
+import io
+
 import pytest
 from sqleyes.definitions.definitions import DEFINITIONS
 
-from sqleyes.main import main
+from sqleyes.main import analyze_many, analyze_stream, main
 
 
 @pytest.mark.parametrize("test_input, expected", [
@@ -135,6 +137,11 @@ def test_main_fear_of_the_unknown(test_input, expected):
         [[DEFINITIONS["anti_patterns"]["ambiguous_groups"]["title"],
          DEFINITIONS["anti_patterns"]["ambiguous_groups"]["type"]]]
     ),
+    (
+        "select pSupplier, price, count(pId) from product group by pSupplier",
+        [[DEFINITIONS["anti_patterns"]["ambiguous_groups"]["title"],
+         DEFINITIONS["anti_patterns"]["ambiguous_groups"]["type"]]]
+    ),
     (
         "SELECT pSupplier, count(pId) FROM product GROUP BY pSupplier",
         []
@@ -297,3 +304,65 @@ def test_main_spaghetti_query(test_input, expected):
     else:
         for index, output in enumerate(outputs):
             assert [output.title, output.type, output.certainty] == expected[index]
+
+
+@pytest.mark.parametrize("test_input, expected", [
+    (
+        b"",
+        []
+    ),
+    (
+        b"SELECT pId FROM product; SELECT * FROM product;\nSELECT pId FROM product WHERE pCategory = NULL",
+        [[],
+         [[DEFINITIONS["anti_patterns"]["implicit_columns"]["type"], 1, 25]],
+         [[DEFINITIONS["anti_patterns"]["fear_of_the_unknown"]["type"], 2, 48]]]
+    ),
+])
+def test_analyze_stream(test_input, expected):
+    outputs = analyze_stream(io.BytesIO(test_input))
+
+    assert [[[output.type, output.statement_index, output.offset] for output in statement_outputs]
+            for statement_outputs in outputs] == expected
+
+
+@pytest.mark.parametrize("workers, chunksize", [
+    (1, None),
+    (2, None),
+    (2, 3),
+])
+def test_analyze_many(workers, chunksize):
+    queries = ["SELECT pId FROM product", "SELECT * FROM product",
+               "SELECT pId FROM product ORDER BY RAND()"] * 5
+
+    outputs = list(analyze_many(queries, workers=workers, chunksize=chunksize))
+
+    assert [[output.type for output in query_outputs] for query_outputs in outputs] == \
+        [[output.type for output in main(query)] for query in queries]
+
+
+def test_analyze_many_unordered():
+    queries = ["SELECT * FROM product WHERE pId = {}".format(index) for index in range(20)]
+
+    outputs = list(analyze_many(queries, workers=2, ordered=False))
+
+    assert sorted(query_outputs[0].statement_index for query_outputs in outputs) == list(range(20))
+
+
+# The detector fails on this statement
+FAILING_QUERY = "SELECT a FROM t WHERE x ( AS )"
+
+
+@pytest.mark.parametrize("workers, chunksize", [
+    (1, None),
+    (2, 2),
+])
+def test_analyze_many_continues_after_error(workers, chunksize):
+    queries = ["SELECT * FROM product", FAILING_QUERY, "SELECT pId FROM product ORDER BY RAND()"] * 2
+    failed = []
+
+    outputs = list(analyze_many(queries, workers=workers, chunksize=chunksize,
+                                on_error=lambda statement, error: failed.append((statement.index, error))))
+
+    assert [[output.type for output in query_outputs] for query_outputs in outputs] == \
+        [["Implicit Columns"], [], ["Random Selection"]] * 2
+    assert [(index, error.split(":")[0]) for index, error in failed] == [(1, "IndexError"), (4, "IndexError")]
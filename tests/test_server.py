@@ -0,0 +1,196 @@
+"""Tests for sqleyes.server"""
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+
+from sqleyes import server as server_module
+from sqleyes.main import main
+from sqleyes.server import Analyzer, create_server, parse_request
+
+QUERIES = ["SELECT * FROM product",
+           "SELECT pId FROM product WHERE price <> NULL",
+           "SELECT pId FROM product"]
+
+
+def send(analyzer, request):
+    return json.loads(json.dumps(analyzer.request(json.dumps(request).encode())()))
+
+
+def expected(query, statement_index=0):
+    # Responses are compared as they are sent, so locations become lists
+    return json.loads(json.dumps([dict(output.dict, statement_index=statement_index)
+                                  for output in main(query)]))
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    analyzer = Analyzer()
+    yield analyzer
+    analyzer.close()
+
+
+@pytest.fixture
+def serve(analyzer):
+    servers = []
+
+    def start(**kwargs):
+        server = create_server(analyzer, **kwargs)
+        servers.append(server)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.parametrize("data, message", [
+    (b"{", "Invalid JSON"),
+    (b"[]", "JSON object"),
+    (b"{}", "query"),
+    (b'{"queries": "SELECT 1"}', "query"),
+    (b'{"queries": [1]}', "strings"),
+])
+def test_parse_request_invalid(data, message):
+    with pytest.raises(ValueError, match=message):
+        parse_request(data)
+
+
+def test_parse_request():
+    assert parse_request(b'{"id": 3, "query": "SELECT 1"}') == (3, ["SELECT 1"], True)
+    assert parse_request(b'{"queries": ["SELECT 1"]}') == (None, ["SELECT 1"], False)
+
+
+def test_analyzer_single(analyzer):
+    response = send(analyzer, {"id": "a", "query": QUERIES[1]})
+    assert response == {"id": "a", "result": expected(QUERIES[1])}
+
+
+def test_analyzer_batch(analyzer):
+    response = send(analyzer, {"queries": QUERIES})
+    assert response == {"results": [expected(query, index) for index, query in enumerate(QUERIES)]}
+
+
+def test_analyzer_error(analyzer):
+    assert "error" in analyzer.request(b"not json")()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_analyzer_statement_error(workers):
+    analyzer = Analyzer(workers=workers)
+    try:
+        batch = send(analyzer, {"queries": [QUERIES[0], "SELECT a FROM t WHERE x ( AS )", QUERIES[1]]})
+        single = send(analyzer, {"query": "SELECT a FROM t WHERE x ( AS )"})
+    finally:
+        analyzer.close()
+
+    # The other queries of the batch still get their outputs
+    assert batch["results"][0] == expected(QUERIES[0])
+    assert list(batch["results"][1]) == ["error"] and batch["results"][1]["error"].startswith("IndexError")
+    assert batch["results"][2] == expected(QUERIES[1], 2)
+    assert single["error"].startswith("Analysis failed: IndexError")
+
+
+def test_analyzer_request_does_not_wait(analyzer, monkeypatch):
+    threads = []
+
+    class Detector:
+        def __init__(self, query, statement_index):
+            pass
+
+        def run(self):
+            threads.append(threading.current_thread())
+            return []
+
+    monkeypatch.setattr(server_module, "Detector", Detector)
+
+    # The request is analyzed by another thread, so reading can go on
+    assert analyzer.request(b'{"query": "SELECT 1"}')() == {"result": []}
+    assert threads and threads[0] is not threading.current_thread()
+
+
+@pytest.mark.parametrize("queries", [QUERIES, QUERIES * 3, []])
+def test_analyzer_pool(queries):
+    analyzer = Analyzer(workers=2, cache_size=16)
+    try:
+        response = send(analyzer, {"queries": queries})
+    finally:
+        analyzer.close()
+
+    assert response == {"results": [expected(query, index) for index, query in enumerate(queries)]}
+
+
+def test_http_server(serve):
+    server = serve(host="127.0.0.1", port=0)
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_port)
+
+    # Requests are sent over a single connection that is kept alive
+    for query in QUERIES:
+        connection.request("POST", "/analyze", json.dumps({"query": query}))
+        response = connection.getresponse()
+        assert response.status == 200
+        assert json.loads(response.read()) == {"result": expected(query)}
+
+    connection.request("POST", "/analyze", "[]")
+    response = connection.getresponse()
+    assert response.status == 400
+    assert "error" in json.loads(response.read())
+
+    connection.request("GET", "/health")
+    response = connection.getresponse()
+    assert json.loads(response.read())["status"] == "ok"
+
+    connection.request("GET", "/unknown")
+    response = connection.getresponse()
+    response.read()
+    assert response.status == 404
+    connection.close()
+
+
+@pytest.mark.parametrize("headers, status", [
+    (b"", 411),
+    (b"Content-Length: abc\r\n", 400),
+    (b"Content-Length: -1\r\n", 400),
+])
+def test_http_server_content_length(serve, headers, status):
+    server = serve(host="127.0.0.1", port=0)
+
+    with socket.create_connection(("127.0.0.1", server.server_port)) as client:
+        client.sendall(b"POST /analyze HTTP/1.1\r\nHost: localhost\r\n" + headers + b"\r\n")
+        response = http.client.HTTPResponse(client)
+        response.begin()
+
+        assert response.status == status
+        assert "Content-Length" in json.loads(response.read())["error"]
+        assert response.will_close
+
+
+def test_unix_server_pipelining(serve, tmp_path):
+    path = str(tmp_path / "sqleyes.sock")
+    serve(socket_path=path)
+
+    with socket.socket(socket.AF_UNIX) as client:
+        client.connect(path)
+        requests = [{"id": index, "query": query} for index, query in enumerate(QUERIES * 10)]
+        # All requests are sent before reading any response
+        client.sendall(b"".join(json.dumps(request).encode() + b"\n" for request in requests))
+        client.shutdown(socket.SHUT_WR)
+
+        with client.makefile("rb") as file:
+            responses = [json.loads(line) for line in file]
+
+    assert responses == [{"id": request["id"], "result": expected(request["query"])}
+                         for request in requests]
+
+
+def test_unix_server_removes_socket(analyzer, tmp_path):
+    path = tmp_path / "sqleyes.sock"
+    server = create_server(analyzer, socket_path=str(path))
+    assert path.exists()
+    server.server_close()
+    assert not path.exists()
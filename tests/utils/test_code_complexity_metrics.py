@@ -0,0 +1,27 @@
+"""Tests for sqleyes.utils.code_complexity_metrics"""
+import pytest
+
+from sqleyes.utils.code_complexity_metrics import halstead_metrics, halstead_metrics_batch
+
+
+@pytest.mark.parametrize("test_input, expected", [
+    ((2, 2, 4, 4), (8, 4, 16.0, 2.0, 32.0)),
+    ((0, 0, 0, 0), (0, 0, 0.0, 0.0, 0.0)),
+    ((1, 0, 1, 0), (1, 1, 0.0, 0.0, 0.0)),
+])
+def test_halstead_metrics(test_input, expected):
+    assert halstead_metrics(*test_input) == expected
+
+
+def test_halstead_metrics_batch():
+    pytest.importorskip("numpy")
+    inputs = [(2, 2, 4, 4), (0, 0, 0, 0), (1, 0, 1, 0), (3, 5, 7, 11), (4, 1, 9, 2)]
+    metrics = halstead_metrics_batch(*zip(*inputs))
+
+    for i, test_input in enumerate(inputs):
+        assert [metric[i] for metric in metrics] == pytest.approx(halstead_metrics(*test_input))
+
+
+def test_halstead_metrics_batch_empty():
+    pytest.importorskip("numpy")
+    assert all(len(metric) == 0 for metric in halstead_metrics_batch([], [], [], []))
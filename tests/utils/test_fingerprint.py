@@ -0,0 +1,62 @@
+"""Tests for sqleyes.utils.fingerprint"""
+import pytest
+
+from sqleyes.utils.fingerprint import fingerprint_query
+
+
+@pytest.mark.parametrize("test_input, expected", [
+    (
+        "SELECT a FROM b",
+        "SELECT a FROM b"
+    ),
+    (
+        "select a from b where c = 'it''s' and d > 10.5",
+        "SELECT a FROM b WHERE c = ? AND d > ?"
+    ),
+    (
+        "SELECT a FROM b WHERE c IN (1, 2, 3) AND d in ('x')",
+        "SELECT a FROM b WHERE c IN (?) AND d in (?)"
+    ),
+    (
+        "select count(a), max (b) from c where d like 'x' and e not in (f)",
+        "SELECT count(a), MAX (b) FROM c WHERE d like ? AND e not in (f)"
+    ),
+    (
+        "SELECT a FROM b WHERE c IN (SELECT c FROM d)",
+        "SELECT a FROM b WHERE c IN (SELECT c FROM d)"
+    ),
+    (
+        "SELECT   a\t\tFROM b   \n   WHERE c = 1",
+        "SELECT a\tFROM b\n WHERE c = ?"
+    ),
+])
+def test_fingerprint_query(test_input, expected):
+    assert fingerprint_query(test_input).text == expected
+
+
+@pytest.mark.parametrize("query_one, query_two", [
+    (
+        "SELECT * FROM product WHERE pId = 1",
+        "select  *  from product where pId = 12345"
+    ),
+    (
+        "SELECT pId FROM product WHERE pCat IN (1, 2)",
+        "SELECT pId FROM product WHERE pCat IN (1, 2, 3, 4, 5)"
+    ),
+])
+def test_fingerprint_query_equal(query_one, query_two):
+    assert fingerprint_query(query_one).text == fingerprint_query(query_two).text
+
+
+@pytest.mark.parametrize("test_input, span, expected", [
+    ("SELECT   *   FROM b WHERE c = 'abc'", (0, 10), ((0, 8), True)),
+    ("SELECT a FROM b WHERE c = 'abc' AND d = NULL", (38, 44), ((34, 40), True)),
+    ("SELECT a FROM b WHERE c LIKE '%LIKE%'", (31, 35), ((29, 30), False)),
+])
+def test_fingerprint_to_normalized(test_input, span, expected):
+    assert fingerprint_query(test_input).to_normalized(span) == expected
+
+
+def test_fingerprint_to_raw():
+    fingerprint = fingerprint_query("SELECT a FROM b WHERE c IN (1, 2, 3) AND d = NULL")
+    assert fingerprint.to_raw((37, 43)) == (43, 49)
@@ -0,0 +1,105 @@
+"""Tests for sqleyes.utils.git_diff"""
+import io
+import shutil
+import subprocess
+
+import pytest
+
+from sqleyes.detector.profiler import Profiler
+from sqleyes.main import analyze_diff
+from sqleyes.utils.git_diff import (get_head_revision, parse_hunks,
+                                    select_statements)
+from sqleyes.utils.statement_splitter import split_statements
+
+DIFF = b"""diff --git a/a.sql b/a.sql
+index 1111111..2222222 100644
+--- a/a.sql
++++ b/a.sql
+@@ -3 +3 @@ SELECT pId FROM product
+-WHERE price > 1;
++WHERE price <> NULL;
+@@ -8,2 +7,0 @@ SELECT a FROM b;
+-SELECT c
+-FROM d;
+diff --git a/old.sql b/old.sql
+deleted file mode 100644
+--- a/old.sql
++++ /dev/null
+@@ -1 +0,0 @@
+-SELECT 1;
+diff --git "a/we ird \\303\\251.sql" "b/we ird \\303\\251.sql"
+--- "a/we ird \\303\\251.sql"\t
++++ "b/we ird \\303\\251.sql"\t
+@@ -0,0 +1,2 @@
++SELECT 1;
++SELECT 2;
+"""
+
+SQL = "SELECT * FROM product;\nSELECT pId FROM product\nWHERE price <> NULL;\nSELECT a\nFROM b;\n"
+
+
+def run(directory, *args):
+    subprocess.run(["git", "-c", "user.name=sqleyes", "-c", "user.email=sqleyes@example.com"] + list(args),
+                   cwd=str(directory), check=True, stdout=subprocess.PIPE)
+
+
+def test_parse_hunks():
+    assert parse_hunks(DIFF) == {
+        "a.sql": [(3, 3), (8, 7)],
+        "we ird é.sql": [(1, 2)],
+    }
+
+
+@pytest.mark.parametrize("revision_range, head", [
+    ("main..feature", "feature"),
+    ("main...feature", "feature"),
+    ("main..", "HEAD"),
+    ("main", None),
+])
+def test_get_head_revision(revision_range, head):
+    assert get_head_revision(revision_range) == head
+
+
+@pytest.mark.parametrize("hunks, expected", [
+    ([(3, 3)], [1]),
+    ([(1, 1), (4, 4)], [0, 2]),
+    ([(2, 4)], [1, 2]),
+    # A deletion between two lines of a statement
+    ([(5, 4)], [2]),
+    # A deletion between two statements
+    ([(4, 3)], []),
+    ([(6, 6)], []),
+])
+def test_select_statements(hunks, expected):
+    statements = split_statements(io.BytesIO(SQL.encode()))
+    assert [statement.index for statement in select_statements(statements, hunks)] == expected
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_analyze_diff(tmp_path):
+    (tmp_path / "db").mkdir()
+    (tmp_path / "db" / "a.sql").write_text(SQL.replace("<> NULL", "> 1"))
+    (tmp_path / "b.sql").write_text("SELECT * FROM product")
+    run(tmp_path, "init", "-q")
+    run(tmp_path, "add", ".")
+    run(tmp_path, "commit", "-q", "-m", "base")
+
+    (tmp_path / "db" / "a.sql").write_text(SQL)
+    (tmp_path / "c.txt").write_text("SELECT * FROM product")
+    run(tmp_path, "add", ".")
+    run(tmp_path, "commit", "-q", "-m", "change")
+    (tmp_path / "b.sql").write_text("SELECT pId FROM product ORDER BY RAND()")
+
+    results = list(analyze_diff("HEAD~1..HEAD", cwd=str(tmp_path / "db")))
+    assert [(path, statement.line, [output.type for output in outputs])
+            for path, statement, outputs in results] == [("db/a.sql", 2, ["Fear of the Unknown"])]
+
+    # Without a head revision, the working tree is compared
+    profiler = Profiler()
+    results = list(analyze_diff("HEAD", cwd=str(tmp_path), profiler=profiler))
+    assert [(path, [output.type for output in outputs])
+            for path, _, outputs in results] == [("b.sql", ["Random Selection"])]
+    assert profiler.get_stats()["RandomSelectionDetector.check"]["calls"] == 1
+
+    with pytest.raises(RuntimeError):
+        list(analyze_diff("unknown..HEAD", cwd=str(tmp_path)))
@@ -0,0 +1,57 @@
+"""Tests for sqleyes.utils.load_file"""
+import os
+import subprocess
+import sys
+import zipfile
+
+import pytest
+
+import sqleyes
+from sqleyes.main import main
+from sqleyes.utils.load_file import (load_anti_pattern_description,
+                                     load_description)
+
+
+def test_load_description():
+    description = load_description("sqleyes.definitions", "antipatterns/",
+                                   "random_selection.md")
+
+    assert description.startswith("### Random Selection")
+    assert load_anti_pattern_description("Random Selection") is description
+
+
+def test_load_anti_pattern_description_unknown_type():
+    with pytest.raises(KeyError):
+        load_anti_pattern_description("Unknown")
+
+
+def test_descriptions_are_loaded_lazily():
+    load_description.cache_clear()
+
+    outputs = main("SELECT * FROM product ORDER BY RAND()")
+    assert load_description.cache_info().currsize == 0
+
+    assert outputs[0].description.startswith("### Implicit Columns")
+    assert outputs[0]["description"] == outputs[0].description
+    assert load_description.cache_info().currsize == 1
+
+
+def test_load_description_from_zip(tmp_path):
+    archive = tmp_path / "sqleyes.zip"
+    root = os.path.dirname(os.path.dirname(sqleyes.__file__))
+
+    with zipfile.ZipFile(archive, "w") as file:
+        for directory, _, filenames in os.walk(os.path.dirname(sqleyes.__file__)):
+            for filename in filenames:
+                if filename.endswith((".py", ".md")):
+                    path = os.path.join(directory, filename)
+                    file.write(path, os.path.relpath(path, root))
+
+    code = ("from sqleyes.main import main; "
+            "import sqleyes; assert sqleyes.__file__.startswith({!r}); "
+            "print(main('SELECT * FROM product')[0].description.splitlines()[0])").format(str(archive))
+    environment = dict(os.environ, PYTHONPATH=str(archive))
+    output = subprocess.run([sys.executable, "-c", code], env=environment, cwd=str(tmp_path),
+                            stdout=subprocess.PIPE, check=True).stdout
+
+    assert output.decode().strip() == "### Implicit Columns"
@@ -0,0 +1,100 @@
+"""Tests for sqleyes.utils.parsed_query"""
+import pytest
+import sqlparse
+
+from sqleyes.utils import parsed_query as parsed_query_module
+from sqleyes.utils.parsed_query import ParsedQuery
+from sqleyes.utils.tokenizer import is_supported
+
+
+@pytest.mark.parametrize("test_input, expected", [
+    (
+        "",
+        ""
+    ),
+    (
+        "select a, b FROM c, d where a > e, GROUP BY f, g",
+        "SELECT a, b FROM c, d WHERE a > e, GROUP BY f, g"
+    ),
+    (
+        "select a   \nfrom b;  select c from d",
+        "SELECT a\nFROM b;SELECT c FROM d"
+    ),
+])
+def test_parsed_query_formatted(test_input, expected):
+    assert ParsedQuery(test_input).formatted == expected
+
+
+@pytest.mark.parametrize("test_input, expected", [
+    (
+        "SELECT pId FROM (SELECT * FROM x) WHERE pId IN (SELECT * from y)",
+        [("SELECT pId FROM <subquery> WHERE pId IN <subquery>",
+          "SELECT pId FROM <subquery> WHERE pId IN <subquery>"),
+         ("SELECT * FROM x", "SELECT * FROM x"),
+         ("SELECT * from y", "SELECT * FROM y")]
+    ),
+])
+def test_parsed_query_subqueries(test_input, expected):
+    subqueries = ParsedQuery(test_input).subqueries
+    assert [(subquery.query, subquery.formatted) for subquery in subqueries] == expected
+
+
+@pytest.mark.parametrize("test_input, clause, expected", [
+    ("SELECT a FROM b", "GROUP BY", None),
+    ("SELECT a FROM b GROUP BY a", "GROUP BY", 8),
+    ("SELECT a FROM b group by a ORDER BY a", "ORDER BY", 12),
+    ("SELECT a FROM b ORDER BY", "ORDER BY", None),
+])
+def test_parsed_query_clause_index(test_input, clause, expected):
+    assert ParsedQuery(test_input).get_clause_index(clause) == expected
+
+
+@pytest.mark.parametrize("test_input, clause, expected", [
+    ("SELECT a FROM b", "GROUP BY", []),
+    ("SELECT a FROM b GROUP BY a, `c`.d ORDER BY a DESC", "GROUP BY", ["a", "d"]),
+    ("SELECT a FROM b GROUP BY a, `c`.d ORDER BY a DESC", "ORDER BY", ["a"]),
+    ("SELECT a FROM b ORDER BY RAND()", "ORDER BY", []),
+    ("SELECT a FROM b ORDER BY RAND(), a", "ORDER BY", ["RAND", "a"]),
+    ("SELECT a FROM b GROUP BY date, a", "GROUP BY", ["a"]),
+    ("SELECT a FROM b GROUP BY a + 1", "GROUP BY", []),
+    ("SELECT a FROM (SELECT b FROM c ORDER BY b DESC, d) e", "ORDER BY", []),
+])
+def test_parsed_query_clause_columns(test_input, clause, expected):
+    assert ParsedQuery(test_input).get_clause_columns(clause) == expected
+
+
+@pytest.mark.skipif(not is_supported(),
+                    reason="the tokenizer mirrors another version of sqlparse")
+@pytest.mark.parametrize("test_input", [
+    "SELECT a, b FROM c WHERE d IN (SELECT e FROM f GROUP BY e) ORDER BY a",
+    "SELECT (SELECT MAX(x) FROM y) -- comment\nFROM z",
+    "SELECT a.f((SELECT b FROM c GROUP BY b)) FROM d",
+    "SELECT a::int, b AT TIME ZONE 'UTC' FROM t GROUP BY a, b",
+    "INSERT INTO t VALUES (1, 2); SELECT * FROM t",
+    "CREATE TABLE t (a INT); SELECT a FROM t GROUP BY a",
+    "SELECT CASE WHEN a THEN (SELECT b FROM c) END FROM d ORDER BY [e]",
+    "SELECT a, count(*) FROM t GROUP BY 1, 2 ORDER BY a, 2",
+    "SELECT a FROM t GROUP BY a, count(b)",
+])
+def test_parsed_query_tokenizer_same_as_sqlparse(test_input):
+    def summary(query):
+        return [(subquery.query, subquery.formatted,
+                 subquery.get_clause_columns("GROUP BY"), subquery.get_clause_columns("ORDER BY"))
+                for subquery in query.subqueries] + [query.formatted]
+
+    fast, slow = ParsedQuery(test_input), ParsedQuery(test_input, use_tokenizer=False)
+
+    assert summary(fast) == summary(slow)
+    assert [token.value for token in fast.tokens] == [token.value for token in slow.tokens]
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+def test_parsed_query_without_tokenizer_for_other_sqlparse_version(monkeypatch):
+    def tokenize(query):
+        raise AssertionError("the tokenizer is used")
+
+    monkeypatch.setattr(sqlparse, "__version__", "0.5.3")
+    monkeypatch.setattr(parsed_query_module, "tokenize", tokenize)
+    query = ParsedQuery("SELECT a FROM t GROUP BY a")
+
+    assert query.get_clause_columns("GROUP BY") == ["a"]
@@ -0,0 +1,86 @@
+"""Tests for sqleyes.utils.python_source"""
+import pytest
+
+from sqleyes.utils.python_source import (decode_source, extract_statements,
+                                         find_python_files,
+                                         may_contain_queries)
+
+SOURCE = '''def load(cursor, columns):
+    cursor.execute("SELECT * FROM product")
+    cursor.execute(
+        "SELECT pId "  # a comment
+        'FROM product WHERE price <> NULL;'
+        f"SELECT {columns!r} FROM {tables['a']} WHERE a = {{b}}"
+    )
+    cursor.executemany(sql="INSERT INTO t VALUES (?)", seq_of_parameters=[])
+    return text(r"SELECT '\\d'")
+'''
+
+
+def test_extract_statements():
+    statements = extract_statements(SOURCE)
+
+    assert [statement.text for statement in statements] == [
+        "SELECT * FROM product",
+        "SELECT pId FROM product WHERE price <> NULL;",
+        "SELECT ? FROM ? WHERE a = {b}",
+        "INSERT INTO t VALUES (?)",
+        "SELECT '\\d'",
+    ]
+    assert [(statement.line, statement.column) for statement in statements] == [
+        (2, 21), (4, 10), (6, 11), (8, 29), (9, 19)]
+    assert [statement.index for statement in statements] == [0, 1, 2, 3, 4]
+
+
+def test_positions_follow_the_source():
+    statement = extract_statements(SOURCE)[1]
+
+    # "price <> NULL" is in the second literal of the concatenation
+    assert statement.get_position(statement.text.index("price")) == (5, 29)
+    assert statement.get_position(len(statement.text)) == (5, 43)
+
+    statement = extract_statements(SOURCE)[2]
+    assert statement.get_position(statement.text.index("WHERE")) == (6, 49)
+
+
+def test_positions_count_characters():
+    statements = extract_statements('x = "é\U0001F600"; db.execute("SELECT \\n * FROM t")\n')
+
+    assert statements[0].text == "SELECT \n * FROM t"
+    assert (statements[0].line, statements[0].column) == (1, 23)
+    assert statements[0].get_position(8) == (1, 32)
+    assert statements[0].offset == len('x = "é\U0001F600"; db.execute("'.encode())
+
+
+@pytest.mark.parametrize("source", [
+    "cursor.execute(query)",
+    "cursor.execute(b'SELECT 1')",
+    "cursor.execute('SELECT ' + columns)",
+    "cursor.fetch('SELECT 1')",
+    "cursor.execute()",
+])
+def test_extract_statements_skips_other_arguments(source):
+    assert extract_statements(source) == []
+
+
+def test_extract_statements_syntax_error():
+    with pytest.raises(SyntaxError):
+        extract_statements("cursor.execute('SELECT 1'")
+
+
+def test_may_contain_queries():
+    assert may_contain_queries(b"cursor.execute ('SELECT 1')")
+    assert not may_contain_queries(b"executed = True")
+
+
+def test_decode_source():
+    assert decode_source("# -*- coding: latin-1 -*-\nx = 'é'".encode("latin-1")).endswith("'é'")
+
+
+def test_find_python_files(tmp_path):
+    for path in ["a.py", "b.txt", "sub/c.py", ".git/d.py", "__pycache__/e.py", "venv/f.py"]:
+        (tmp_path / path).parent.mkdir(exist_ok=True)
+        (tmp_path / path).write_text("")
+
+    assert list(find_python_files(str(tmp_path), ["venv"])) == [
+        str(tmp_path / "a.py"), str(tmp_path / "sub" / "c.py")]
@@ -1,14 +1,17 @@
 """Tests for sqleyes.utils.query_functions"""
 import pytest
 
-from sqleyes.utils.query_functions import (check_single_value_rule, format_query,
+from sqleyes.utils.query_functions import (check_single_value_rule, count_query_ops_and_expr, format_query,
                                            get_all_columns, get_columns_from_order_by_statement,
                                            get_columns_from_select_statement,
                                            get_columns_from_group_by_statement, get_excepts,
+                                           get_halstead_counts, get_queries_halstead_metrics,
                                            get_query_complexity,
                                            get_query_ops_and_expr,
                                            get_unions, has_except, has_subqueries,
                                            has_union, parse_query)
+from sqleyes.utils.code_complexity_metrics import halstead_metrics
+from sqleyes.utils.parsed_query import ParsedQuery
 
 
 @pytest.mark.parametrize("test_input, expected", [
@@ -18,7 +21,7 @@ from sqleyes.utils.query_functions import (check_single_value_rule, format_query
     ),
 ])
 def test_format_query(test_input, expected):
-    assert format_query(test_input) == expected
+    assert format_query(ParsedQuery(test_input)) == expected
 
 
 @pytest.mark.parametrize("test_input, expected", [
@@ -64,7 +67,7 @@ ON a.task_id = b.task_id;
     ),
 ])
 def test_has_subqueries(test_input, expected):
-    assert has_subqueries(test_input) == expected
+    assert has_subqueries(ParsedQuery(test_input)) == expected
 
 
 @pytest.mark.parametrize("test_input, expected", [
@@ -82,7 +85,7 @@ def test_has_subqueries(test_input, expected):
     ),
 ])
 def test_has_union(test_input, expected):
-    assert has_union(test_input) == expected
+    assert has_union(ParsedQuery(test_input)) == expected
 
 
 @pytest.mark.parametrize("test_input, expected", [
@@ -100,7 +103,7 @@ def test_has_union(test_input, expected):
     ),
 ])
 def test_get_unions(test_input, expected):
-    assert get_unions(test_input) == expected
+    assert [union.query for union in get_unions(ParsedQuery(test_input))] == expected
 
 
 @pytest.mark.parametrize("test_input, expected", [
@@ -118,7 +121,7 @@ def test_get_unions(test_input, expected):
     ),
 ])
 def test_has_except(test_input, expected):
-    assert has_except(test_input) == expected
+    assert has_except(ParsedQuery(test_input)) == expected
 
 
 @pytest.mark.parametrize("test_input, expected", [
@@ -136,7 +139,7 @@ def test_has_except(test_input, expected):
     ),
 ])
 def test_get_excepts(test_input, expected):
-    assert get_excepts(test_input) == expected
+    assert [except_query.query for except_query in get_excepts(ParsedQuery(test_input))] == expected
 
 
 @pytest.mark.parametrize("test_input, expected", [
@@ -174,7 +177,7 @@ def test_get_excepts(test_input, expected):
     ),
 ])
 def test_get_columns_from_select_statement(test_input, expected):
-    assert get_columns_from_select_statement(test_input) == expected
+    assert get_columns_from_select_statement(ParsedQuery(test_input)) == expected
 
 
 @pytest.mark.parametrize("test_input, expected", [
@@ -201,7 +204,7 @@ def test_get_columns_from_select_statement(test_input, expected):
 
 ])
 def test_get_columns_from_group_by_statement(test_input, expected):
-    assert get_columns_from_group_by_statement(test_input) == expected
+    assert get_columns_from_group_by_statement(ParsedQuery(test_input)) == expected
 
 
 @pytest.mark.parametrize("test_input, expected", [
@@ -259,7 +262,7 @@ def test_check_single_value_rule(test_input, expected):
     ),
 ])
 def test_get_columns_from_order_by_statement(test_input, expected):
-    assert get_columns_from_order_by_statement(test_input) == expected
+    assert get_columns_from_order_by_statement(ParsedQuery(test_input)) == expected
 
 
 @pytest.mark.parametrize("test_input, expected", [
@@ -288,7 +291,7 @@ def test_get_columns_from_order_by_statement(test_input, expected):
     ),
 ])
 def test_get_all_columns(test_input, expected):
-    assert get_all_columns(test_input) == expected
+    assert get_all_columns(ParsedQuery(test_input)) == expected
 
 
 @pytest.mark.parametrize("test_input, expected", [
@@ -336,7 +339,25 @@ FROM OrderDetails;
 ])
 def test_get_query_ops_and_expr(test_input, expected):
     # We don't care about the order, so we can safely sort both lists
-    assert get_query_ops_and_expr(test_input).sort() == expected.sort()
+    assert get_query_ops_and_expr(ParsedQuery(test_input)).sort() == expected.sort()
+
+
+@pytest.mark.parametrize("test_input, expected", [
+    (
+        "SELECT * FROM product",
+        {}
+    ),
+    (
+        "SELECT a FROM b WHERE a IS NOT NULL AND b IS NULL AND NOT c GROUP BY a ORDER BY b",
+        {"WHERE": 1, "IS NOT NULL": 1, "AND": 2, "IS NULL": 1, "NOT": 1, "GROUP BY": 1, "ORDER BY": 1}
+    ),
+    (
+        "SELECT a FROM b WHERE a IS NOT",
+        {"WHERE": 1, "NOT": 1}
+    ),
+])
+def test_count_query_ops_and_expr(test_input, expected):
+    assert count_query_ops_and_expr(ParsedQuery(test_input)) == expected
 
 
 @pytest.mark.parametrize("query_one, query_two", [
@@ -371,7 +392,28 @@ def test_get_query_ops_and_expr(test_input, expected):
     ),
 ])
 def test_get_query_complexity(query_one, query_two):
-    assert get_query_complexity(query_one) <= get_query_complexity(query_two)
+    assert get_query_complexity(ParsedQuery(query_one)) <= get_query_complexity(ParsedQuery(query_two))
+
+
+def test_get_queries_halstead_metrics():
+    pytest.importorskip("numpy")
+    queries = [ParsedQuery(query) for query in [
+        "",
+        "SELECT a FROM b",
+        "SELECT a FROM b WHERE a > 10 AND b < 5 ORDER BY a",
+        "SELECT a FROM b UNION SELECT c FROM d WHERE c = 1",
+    ]]
+    metrics = get_queries_halstead_metrics(queries)
+
+    for i, query in enumerate(queries):
+        expected = halstead_metrics(*get_halstead_counts(query))
+        assert [metric[i] for metric in metrics] == pytest.approx(expected)
+        assert metrics[3][i] == pytest.approx(get_query_complexity(query))
+
+
+def test_get_queries_halstead_metrics_empty():
+    pytest.importorskip("numpy")
+    assert all(len(metric) == 0 for metric in get_queries_halstead_metrics([]))
 
 
 @pytest.mark.parametrize("test_input, expected", [
@@ -392,7 +434,11 @@ def test_get_query_complexity(query_one, query_two):
         ["SELECT pId FROM <subquery> WHERE pId IN <subquery>",
          "SELECT * FROM x",
          "SELECT * FROM y"]
+    ),
+    (
+        "select pId from (select * from newProduct)",
+        ["select pId from <subquery>", "select * from newProduct"]
     )
 ])
 def test_parse_query(test_input, expected):
-    assert parse_query(test_input) == expected
+    assert parse_query(ParsedQuery(test_input)) == expected
@@ -0,0 +1,176 @@
+"""Tests for sqleyes.utils.slow_log"""
+import io
+import json
+import os
+
+import pytest
+
+from sqleyes.utils.slow_log import (SlowLogReader, parse_mysql_slow_log,
+                                    parse_postgres_log)
+
+POSTGRES_LOG = (
+    b"2024-01-01 12:00:00.123 UTC [101] LOG:  duration: 1500.250 ms  statement: SELECT *\n"
+    b"\tFROM product\n"
+    b"\tWHERE price <> NULL;\n"
+    b"2024-01-01 12:00:01.000 UTC [101] LOG:  connection received: host=[local]\n"
+    b"2024-01-01 12:00:02.000 UTC [102] LOG:  duration: 20.000 ms  execute <unnamed>: SELECT pId FROM product WHERE pId = $1\n"
+    b"2024-01-01 12:00:02.000 UTC [102] DETAIL:  parameters: $1 = '1'\n"
+    b"2024-01-01 12:00:03.000 UTC [103] LOG:  duration: 5.000 ms  parse <unnamed>: SELECT 1\n"
+)
+
+MYSQL_LOG = (
+    b"/usr/sbin/mysqld, Version: 8.0.35 (MySQL Community Server - GPL). started with:\n"
+    b"Tcp port: 3306  Unix socket: /var/run/mysqld/mysqld.sock\n"
+    b"Time                 Id Command    Argument\n"
+    b"# Time: 2024-01-01T12:00:00.123456Z\n"
+    b"# User@Host: root[root] @ localhost []  Id:     8\n"
+    b"# Query_time: 2.500000  Lock_time: 0.000100 Rows_sent: 10  Rows_examined: 50000\n"
+    b"use shop;\n"
+    b"SET timestamp=1704110400;\n"
+    b"SELECT * FROM product\n"
+    b"ORDER BY RAND();\n"
+    b"# User@Host: root[root] @ localhost []  Id:     8\n"
+    b"# Query_time: 0.100000  Lock_time: 0.000000 Rows_sent: 1  Rows_examined: 7\n"
+    b"SET timestamp=1704110401;\n"
+    b"SELECT pId FROM product WHERE pName LIKE '%a%';\n"
+    b"# Time: 2024-01-01T12:00:05.000000Z\n"
+    b"# User@Host: root[root] @ localhost []  Id:     8\n"
+    b"# Query_time: 0.000100  Lock_time: 0.000000 Rows_sent: 0  Rows_examined: 0\n"
+    b"SET timestamp=1704110405;\n"
+    b"# administrator command: Quit;\n"
+)
+
+
+def test_parse_postgres_log():
+    entries = list(parse_postgres_log(io.BytesIO(POSTGRES_LOG)))
+
+    assert [entry.query for entry in entries] == [
+        "SELECT *\n\tFROM product\n\tWHERE price <> NULL;",
+        "SELECT pId FROM product WHERE pId = $1"]
+    assert [entry.duration for entry in entries] == [1.50025, 0.02]
+    assert [entry.timestamp for entry in entries] == ["2024-01-01 12:00:00.123 UTC",
+                                                      "2024-01-01 12:00:02.000 UTC"]
+    assert entries[0].rows_examined is None
+    assert entries[0].offset == 0
+    assert POSTGRES_LOG[entries[1].offset:].startswith(b"2024-01-01 12:00:02")
+    assert POSTGRES_LOG[entries[1].end:].startswith(b"2024-01-01 12:00:02.000 UTC [102] DETAIL")
+
+
+def test_parse_mysql_slow_log():
+    entries = list(parse_mysql_slow_log(io.BytesIO(MYSQL_LOG)))
+
+    assert [entry.query for entry in entries] == [
+        "SELECT * FROM product\nORDER BY RAND()",
+        "SELECT pId FROM product WHERE pName LIKE '%a%'"]
+    assert [entry.duration for entry in entries] == [2.5, 0.1]
+    assert [entry.rows_examined for entry in entries] == [50000, 7]
+    assert [entry.timestamp for entry in entries] == ["2024-01-01T12:00:00.123456Z",
+                                                      "2024-01-01T12:00:01Z"]
+    assert MYSQL_LOG[entries[0].offset:].startswith(b"# Time: 2024-01-01T12:00:00")
+    assert MYSQL_LOG[entries[1].offset:].startswith(b"# User@Host")
+
+
+@pytest.mark.parametrize("parse, log", [
+    (parse_postgres_log, POSTGRES_LOG),
+    (parse_mysql_slow_log, MYSQL_LOG),
+])
+def test_parse_not_final_holds_back_last_entry(parse, log):
+    entries = list(parse(io.BytesIO(log)))
+    held_back = list(parse(io.BytesIO(log[:entries[-1].end]), final=False))
+
+    assert [entry.query for entry in held_back] == [entry.query for entry in entries[:-1]]
+
+
+def test_parse_offset():
+    entries = list(parse_postgres_log(io.BytesIO(POSTGRES_LOG[100:]), offset=100))
+    assert all(entry.offset >= 100 for entry in entries)
+
+
+def test_slow_log_reader_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        SlowLogReader(str(tmp_path / "slow.log"), "oracle")
+
+
+def test_slow_log_reader_without_state(tmp_path):
+    path = tmp_path / "slow.log"
+    path.write_bytes(MYSQL_LOG)
+
+    reader = SlowLogReader(str(path), "mysql")
+    assert len(list(reader.read())) == 2
+    assert len(list(reader.read())) == 2
+
+
+def write_entry(file, query, duration=1.0):
+    file.write(f"# User@Host: root[root] @ localhost []\n# Query_time: {duration}\n{query};\n".encode())
+    file.flush()
+
+
+def test_slow_log_reader_incremental(tmp_path):
+    path = tmp_path / "slow.log"
+    reader = SlowLogReader(str(path), "mysql", str(tmp_path / "state.json"))
+
+    with open(path, "wb") as file:
+        write_entry(file, "SELECT 1")
+        # The last entry may still be written to, so it is held back
+        assert list(reader.read()) == []
+
+        write_entry(file, "SELECT 2")
+        assert [entry.query for entry in reader.read()] == ["SELECT 1"]
+        assert list(reader.read()) == []
+
+        write_entry(file, "SELECT 3")
+        write_entry(file, "SELECT 4")
+        assert [entry.query for entry in reader.read()] == ["SELECT 2", "SELECT 3"]
+
+
+def test_slow_log_reader_stopped_early(tmp_path):
+    path = tmp_path / "slow.log"
+    reader = SlowLogReader(str(path), "mysql", str(tmp_path / "state.json"))
+
+    with open(path, "wb") as file:
+        for index in range(4):
+            write_entry(file, f"SELECT {index}")
+
+    entries = reader.read()
+    assert next(entries).query == "SELECT 0"
+    entries.close()
+
+    assert [entry.query for entry in reader.read()] == ["SELECT 1", "SELECT 2"]
+
+
+def test_slow_log_reader_rotation(tmp_path):
+    path = tmp_path / "slow.log"
+    state = tmp_path / "state.json"
+    reader = SlowLogReader(str(path), "mysql", str(state))
+
+    with open(path, "wb") as file:
+        write_entry(file, "SELECT 1")
+        write_entry(file, "SELECT 2")
+        assert [entry.query for entry in reader.read()] == ["SELECT 1"]
+        write_entry(file, "SELECT 3")
+
+    os.rename(path, tmp_path / "slow.log.1")
+
+    with open(path, "wb") as file:
+        write_entry(file, "SELECT 4")
+        write_entry(file, "SELECT 5")
+
+    # The rest of the rotated log is read first
+    assert [entry.query for entry in reader.read()] == ["SELECT 2", "SELECT 3", "SELECT 4"]
+    assert json.loads(state.read_text())["inode"] == os.stat(path).st_ino
+
+
+def test_slow_log_reader_truncated(tmp_path):
+    path = tmp_path / "slow.log"
+    reader = SlowLogReader(str(path), "mysql", str(tmp_path / "state.json"))
+
+    with open(path, "wb") as file:
+        for index in range(5):
+            write_entry(file, f"SELECT {index}")
+    assert len(list(reader.read())) == 4
+
+    with open(path, "wb") as file:
+        write_entry(file, "SELECT 10")
+        write_entry(file, "SELECT 11")
+
+    assert [entry.query for entry in reader.read()] == ["SELECT 10"]
@@ -0,0 +1,155 @@
+"""Tests for sqleyes.utils.statement_splitter"""
+import io
+import pickle
+
+import pytest
+
+from sqleyes.utils.statement_splitter import (MappedStatement, Statement,
+                                              split_file, split_statements)
+
+
+def split(sql, **kwargs):
+    return [(statement.index, statement.offset, statement.text)
+            for statement in split_statements(io.BytesIO(sql), **kwargs)]
+
+
+@pytest.mark.parametrize("test_input, expected", [
+    (
+        b"",
+        []
+    ),
+    (
+        b"SELECT a FROM b",
+        [(0, 0, "SELECT a FROM b")]
+    ),
+    (
+        b"SELECT a FROM b; SELECT c FROM d;\n",
+        [(0, 0, "SELECT a FROM b;"), (1, 17, "SELECT c FROM d;")]
+    ),
+    (
+        b"SELECT 'a;b' FROM c; SELECT \"d;\" FROM e",
+        [(0, 0, "SELECT 'a;b' FROM c;"), (1, 21, "SELECT \"d;\" FROM e")]
+    ),
+    (
+        b"SELECT 'it''s;' FROM a; SELECT 'it\\'s;' FROM b",
+        [(0, 0, "SELECT 'it''s;' FROM a;"), (1, 24, "SELECT 'it\\'s;' FROM b")]
+    ),
+    (
+        b"SELECT a -- not; the end\nFROM b /* nor; this */; SELECT c",
+        [(0, 0, "SELECT a -- not; the end\nFROM b /* nor; this */;"), (1, 49, "SELECT c")]
+    ),
+    (
+        b";  ;\n SELECT a;",
+        [(0, 0, ";"), (1, 3, ";"), (2, 6, "SELECT a;")]
+    ),
+    (
+        "SELECT 'é'; SELECT b".encode("utf-8"),
+        [(0, 0, "SELECT 'é';"), (1, 13, "SELECT b")]
+    ),
+    (
+        b"CREATE FUNCTION f() AS $$ SELECT 1; $$; SELECT $tag$ a; $$ b; $tag$",
+        [(0, 0, "CREATE FUNCTION f() AS $$ SELECT 1; $$;"), (1, 40, "SELECT $tag$ a; $$ b; $tag$")]
+    ),
+    (
+        b"SELECT $1; SELECT a$b$c; SELECT d",
+        [(0, 0, "SELECT $1;"), (1, 11, "SELECT a$b$c;"), (2, 25, "SELECT d")]
+    ),
+    (
+        b"DELIMITER //\nCREATE PROCEDURE p() BEGIN SELECT 1; END //\ndelimiter ;\nSELECT a;",
+        [(0, 13, "CREATE PROCEDURE p() BEGIN SELECT 1; END"), (1, 69, "SELECT a;")]
+    ),
+    (
+        b"SELECT a,\ndelimiter FROM b; -- c\n  DELIMITER $$\nSELECT 'd$$' $$",
+        [(0, 0, "SELECT a,\ndelimiter FROM b;"), (1, 48, "SELECT 'd$$'")]
+    ),
+])
+def test_split_statements(test_input, expected):
+    assert split(test_input) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7])
+def test_split_statements_chunked(chunk_size):
+    sql = b"SELECT 'a;\\'b' FROM c -- x;\n; /* y; */ SELECT d; SELECT e"
+    expected = split(sql)
+    assert len(expected) == 3
+    assert split(sql, chunk_size=chunk_size) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7])
+def test_split_statements_chunked_delimiters(chunk_size):
+    sql = b"SELECT $body$ a; $body$;\n  DELIMITER $$\nSELECT 1; SELECT 2$$\nDELIMITER ;\nSELECT 3"
+    expected = split(sql)
+    assert [text for _, _, text in expected] == ["SELECT $body$ a; $body$;", "SELECT 1; SELECT 2", "SELECT 3"]
+    assert split(sql, chunk_size=chunk_size) == expected
+
+
+def positions(sql, **kwargs):
+    return [(statement.line, statement.column)
+            for statement in split_statements(io.BytesIO(sql), **kwargs)]
+
+
+@pytest.mark.parametrize("test_input, expected", [
+    (
+        b"SELECT a; SELECT b",
+        [(1, 1), (1, 11)]
+    ),
+    (
+        b"\n\n  SELECT a;\nSELECT b\nFROM c;   SELECT d",
+        [(3, 3), (4, 1), (5, 11)]
+    ),
+    (
+        "SELECT 'é'; SELECT b".encode("utf-8"),
+        [(1, 1), (1, 13)]
+    ),
+])
+def test_split_statements_positions(test_input, expected):
+    assert positions(test_input) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5])
+def test_split_statements_positions_chunked(chunk_size):
+    sql = "SELECT 'é\n'; -- x;\n SELECT b\nFROM c;\r\n\tSELECT d".encode("utf-8")
+    assert positions(sql, chunk_size=chunk_size) == positions(sql) == [(1, 1), (2, 4), (5, 2)]
+
+
+def test_statement_get_position():
+    statement = next(split_statements(io.BytesIO(b"\n  SELECT a\n  FROM b")))
+
+    assert statement.get_position(0) == (2, 3)
+    assert statement.get_position(7) == (2, 10)
+    assert statement.get_position(statement.text.index("FROM")) == (3, 3)
+
+
+@pytest.mark.parametrize("sql", [
+    b"",
+    b"\n\n  SELECT a;\nSELECT b\nFROM c;   SELECT d",
+    "SELECT 'é\n'; -- x;\n DELIMITER //\nSELECT $$ b; $$//\r\n\tSELECT d".encode("utf-8"),
+])
+def test_split_file(tmp_path, sql):
+    path = tmp_path / "dump.sql"
+    path.write_bytes(sql)
+
+    def key(statements):
+        return [(statement.index, statement.offset, statement.text, statement.line, statement.column)
+                for statement in statements]
+
+    assert key(split_file(str(path))) == key(split_statements(io.BytesIO(sql)))
+
+
+def test_split_file_decodes_lazily(tmp_path):
+    path = tmp_path / "dump.sql"
+    path.write_bytes("SELECT 'é'; SELECT b".encode("utf-8"))
+
+    statements = list(split_file(str(path)))
+    assert all(isinstance(statement, MappedStatement) for statement in statements)
+    first = statements[0]
+    assert isinstance(first, MappedStatement)
+    # The map is kept until the text is decoded
+    mapped = first.data is not None
+    assert first.text == "SELECT 'é';"
+    assert mapped and first.data is None
+
+    # Copies for other processes do not refer to the map
+    copy = pickle.loads(pickle.dumps(statements[1]))
+    assert type(copy) is Statement
+    assert (copy.index, copy.offset, copy.text, copy.column) == (1, 13, "SELECT b", 13)
@@ -0,0 +1,64 @@
+"""Tests for sqleyes.utils.tokenizer"""
+import warnings
+from typing import List
+
+import pytest
+import sqlparse
+from sqlparse import lexer
+
+from sqleyes.utils import tokenizer as tokenizer_module
+from sqleyes.utils.tokenizer import (CLOSE, COMMA, COMPARISON, DML, KEYWORD,
+                                     NAME, NUMBER, OPEN, STRING, WHITESPACE,
+                                     WILDCARD, is_supported, tokenize)
+
+
+def is_blank(value):
+    return value.isspace() and "\r" not in value and "\n" not in value
+
+
+def test_tokenize_types_and_offsets():
+    tokens = tokenize("SELECT * FROM t WHERE a IN (1, 'x')")
+
+    assert tokens.types == [DML, WHITESPACE, WILDCARD, WHITESPACE, KEYWORD, WHITESPACE, NAME,
+                            WHITESPACE, KEYWORD, WHITESPACE, NAME, WHITESPACE, COMPARISON,
+                            WHITESPACE, OPEN, NUMBER, COMMA, WHITESPACE, STRING, CLOSE]
+    assert tokens.get_value(4) == "FROM"
+    assert (tokens.starts[6], tokens.ends[6]) == (14, 15)
+    assert "".join(tokens.get_values()) == "SELECT * FROM t WHERE a IN (1, 'x')"
+
+
+@pytest.mark.skipif(not is_supported(), reason="the tokenizer mirrors another version of sqlparse")
+@pytest.mark.parametrize("test_input", [
+    "",
+    "select a, b from c group  by a order by b desc",
+    "SELECT p.id, COUNT(*) FROM product p LEFT OUTER JOIN x ON p.id = x.id",
+    "SELECT a FROM b WHERE c NOT LIKE '%x%' AND d IS NOT NULL -- comment\nLIMIT 1",
+    "SELECT $$a; b$$, $tag$ c $tag$, :name, %s, ?, `q`, \"d\" FROM t /* c */;",
+    "SELECT a::int, b AT TIME ZONE 'UTC', 1.5e-3, -0x1F FROM t UNION ALL SELECT 1",
+    "SELECT ÀB, _a$1#, 1abc, name(x) FROM \"t\" WHERE a <> b || c",
+])
+def test_tokenize_same_tokens_as_sqlparse(test_input):
+    # Runs of whitespace are a single token, sqlparse has one per character
+    expected: List[str] = []
+    for _, value in lexer.tokenize(test_input):
+        if expected and is_blank(value) and is_blank(expected[-1]):
+            expected[-1] += value
+        else:
+            expected.append(value)
+
+    assert tokenize(test_input).get_values() == expected
+
+
+def test_is_supported_by_sqlparse_version(monkeypatch):
+    monkeypatch.setattr(sqlparse, "__version__", "0.4.2")
+    assert is_supported()
+
+    monkeypatch.setattr(sqlparse, "__version__", "0.5.3")
+    monkeypatch.setattr(tokenizer_module, "_warned", False)
+
+    # Falling back to sqlparse is only warned about once
+    with pytest.warns(RuntimeWarning, match="sqlparse 0.5.3"):
+        assert not is_supported()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert not is_supported()